@@ -22,7 +22,10 @@ from .start_messenger import clear_manager_login
 
 from .mergeAndCodePages import (
     make_PDF,
+    make_base_PDF,
+    version_pattern_key,
     create_QR_codes,
+    create_QR_code_images,
     create_invalid_QR_and_bar_codes,
 )
 from .build_extra_page_with_qrcodes import build_extra_page_pdf
@@ -42,6 +45,7 @@ from .scribble_hw_utils import make_hw_scribbles
 # what you get from "from plom.create import *"
 __all__ = [
     "make_PDF",
+    "make_base_PDF",
     "make_scribbles",
     "make_hw_scribbles",
     "PlomClasslistValidator",
@@ -7,9 +7,9 @@
 # Copyright (C) 2023 Edith Coates
 # Copyright (C) 2023 Julian Lapenna
 
+import io
 import math
 import pathlib
-import tempfile
 from pathlib import Path
 from typing import Any
 
@@ -17,7 +17,7 @@ from typing import Any
 import pymupdf
 import segno
 
-# from plom.common.misc_utils import run_length_encoding
+from plom.common.misc_utils import run_length_encoding
 from plom.common.tpv_utils import encodeScrapPaperCode, encodeTPV
 from plom.common.spec_verifier import (
     build_page_to_group_name_dict,
@@ -69,6 +69,49 @@ def create_QR_codes(
     return qr_file
 
 
+def _qr_code_png_bytes(tpv: str) -> bytes:
+    """Render a QR code to PNG in memory.
+
+    Args:
+        tpv: the full string to encode in the QR code.
+
+    Returns:
+        The PNG file as bytes, rendered the same way as in :func:`create_QR_codes`.
+    """
+    qr_code = segno.make_qr(tpv, error="H")
+    buf = io.BytesIO()
+    # border=4 (also the default) is the whitespace padding around the QR codes
+    qr_code.save(buf, kind="png", scale=4, border=4)
+    return buf.getvalue()
+
+
+def create_QR_code_images(
+    papernum: int, pagenum: int, ver: int, code: str
+) -> list[bytes]:
+    """Creates QR codes as in-memory png images.
+
+    This is an alternative to :func:`create_QR_codes` which does not
+    touch the disc.  The codes are not cached: each contains the paper
+    number, so they do not repeat within a build.
+
+    Arguments:
+        papernum: the paper number.
+        pagenum: the page number.
+        ver: the version of this page.
+        code: short digit code distinguishing this document from others.
+
+    Returns:
+        List of PNG images as ``bytes``, one for each corner's QR code,
+        indexed counterclockwise from the top-right, as in
+        :func:`create_QR_codes`.
+    """
+    return [
+        # Note: TPV indexes corners from 1
+        _qr_code_png_bytes(encodeTPV(papernum, pagenum, ver, corner_index + 1, code))
+        for corner_index in range(4)
+    ]
+
+
 def label_for_top_of_page(paper: str | int, group: str, page: int) -> str:
     """Format the text label that appears at the top of each page.
 
@@ -79,17 +122,101 @@ def label_for_top_of_page(paper: str | int, group: str, page: int) -> str:
     return f"Paper {paper}  {group}  p. {page}"
 
 
+def _merge_source_pages(
+    spec: dict[str, Any],
+    qvmap_row: dict[int | str, int],
+    source_versions: dict[int, pathlib.Path],
+) -> pymupdf.Document:
+    """Creates an unstamped PDF document by taking each page from the appropriate source version.
+
+    Arguments:
+        spec (dict): A validated assessment specification
+        qvmap_row: version number for each question of this paper.
+            and optionally the id page.  A row of the "qvmap".
+        source_versions: dict of paths for the source versions, keyed
+            by version.  Some can be missing as long as they don't appear
+            in the ``qvmap_row``.
+
+    Returns:
+        PDF document, open, caller is responsible for closing it.
+    """
+    page_to_version = build_page_to_version_dict(spec, qvmap_row)
+
+    exam = pymupdf.open()
+    # Insert the relevant page-versions into this pdf.  Copying one page at
+    # a time causes a lot of "churn"; large font tables [1], etc.  Instead,
+    # do a run-length encoding of the page versions then copy multiple
+    # pages at a time.  In single-version case, we do a single block of copying.
+    # [1] https://gitlab.com/plom/plom/-/issues/1795
+    ver_runs = run_length_encoding(
+        [page_to_version[p] for p in range(1, spec["numberOfPages"] + 1)]
+    )
+    for ver, start, end in ver_runs:
+        with pymupdf.open(source_versions[ver]) as src:
+            # Pymupdf starts pagecounts from 0, as does the encoding.
+            exam.insert_pdf(src, from_page=start, to_page=end - 1, start_at=-1)
+    return exam
+
+
+def version_pattern_key(spec: dict[str, Any], qvmap_row: dict[int | str, int]) -> str:
+    """A short string identifying which version each page of a paper comes from.
+
+    Papers with the same key can be built from the same base PDF, see
+    :func:`make_base_PDF`, as they differ only in their stamps.
+
+    Arguments:
+        spec (dict): A validated assessment specification
+        qvmap_row: version number for each question of this paper.
+
+    Returns:
+        The page versions, in page order, joined by dashes.
+    """
+    page_to_version = build_page_to_version_dict(spec, qvmap_row)
+    return "-".join(
+        str(page_to_version[p]) for p in range(1, spec["numberOfPages"] + 1)
+    )
+
+
+def make_base_PDF(
+    spec,
+    question_versions: dict[int | str, int],
+    source_versions: dict[int, Path],
+    save_name: Path,
+) -> Path:
+    """Make an unstamped PDF from the appropriate versions of the source pages.
+
+    Every paper with the same pattern of page versions (see
+    :func:`version_pattern_key`) can be made from this same base, by
+    passing it to :func:`make_PDF` as ``base_pdf``.  Only the
+    per-paper stamps need to be added.
+
+    Arguments:
+        spec (dict | SpecVerifier): A validated specification
+        question_versions: the version of each question, a row of the
+            "qvmap".
+        source_versions: dict of the locations of the source-version
+            files, keyed by version.
+        save_name: where to write the PDF file.
+
+    Returns:
+        The file that was just written, same as ``save_name``.
+    """
+    with _merge_source_pages(spec, question_versions, source_versions) as base:
+        base.save(save_name, garbage=4, deflate=True, clean=True)
+    return save_name
+
+
 def _create_QRcoded_pdf(
     spec: dict[str, Any],
     papernum: int,
     qvmap_row: dict[int | str, int],
-    tmpdir: pathlib.Path,
     source_versions: dict[int, pathlib.Path],
     public_code: str,
     *,
     no_qr: bool = False,
     paperstr: str | None = None,
     qr_code_size: float | int | None = None,
+    base_pdf: pathlib.Path | None = None,
 ) -> pymupdf.Document:
     """Creates a PDF document from versioned sources, stamps QR codes on the corners.
 
@@ -100,7 +227,6 @@ def _create_QRcoded_pdf(
         papernum (int): the paper number.
         qvmap_row: version number for each question of this paper.
             and optionally the id page.  A row of the "qvmap".
-        tmpdir (pathlib.Path): a place where we can make temporary files.
         source_versions: dict of paths for the source versions, keyed
             by version.  Some can be missing as long as they don't appear
             in the ``qvmap_row``.
@@ -111,6 +237,9 @@ def _create_QRcoded_pdf(
             Note backward logic: False means yes to QR-codes.
         paperstr: override the default string version of the paper number.
         qr_code_size: width/height of the QR codes.
+        base_pdf: an unstamped PDF already containing the right version
+            of each page, as made by :func:`make_base_PDF`.  If given,
+            we start from a copy of this instead of the source versions.
 
     Returns:
         PDF document, apparently open, which seems to me a scary
@@ -124,42 +253,20 @@ def _create_QRcoded_pdf(
     # also build page to version mapping from spec and the question-version dict
     page_to_version = build_page_to_version_dict(spec, qvmap_row)
 
-    # dict of version (int) -> source pdf (pymupdf.Document)
-    pdf_version = {v: pymupdf.open(f) for v, f in source_versions.items()}
-
-    exam = pymupdf.open()
-    # Insert the relevant page-versions into this pdf.
-    for page_index in range(1, spec["numberOfPages"] + 1):
-        # Pymupdf starts pagecounts from 0 rather than 1. So offset things.
-        exam.insert_pdf(
-            pdf_version[page_to_version[page_index]],
-            from_page=page_index - 1,
-            to_page=page_index - 1,
-            start_at=-1,
-        )
-
-    # The above loops over pages: a lot of "churn"; large font tables [1], etc.
-    # Instead, do a run-length encoding of the page version then copy multiple
-    # pages at a time.  In single-version case, we do a single block of copying.
-    # [1] https://gitlab.com/plom/plom/-/issues/1795
-    # ver_runs = run_length_encoding([v for p, v in page_to_version.items()])
-    # for run in ver_runs:
-    #     ver, start, end = run
-    #     exam.insert_pdf(
-    #         pdf_version[ver],
-    #         from_page=start,
-    #         to_page=end - 1,
-    #         start_at=-1,
-    #     )
+    if base_pdf is not None:
+        exam = pymupdf.open(base_pdf)
+        assert len(exam) == spec["numberOfPages"], "base PDF has wrong page count"
+    else:
+        exam = _merge_source_pages(spec, qvmap_row, source_versions)
 
     for p in range(1, spec["numberOfPages"] + 1):
         odd: bool | None = (p - 1) % 2 == 0
         if no_qr:
             odd = None
-            qr_files = []
+            qr_files: list[bytes] = []
         else:
             ver = page_to_version[p]
-            qr_files = create_QR_codes(papernum, p, ver, public_code, tmpdir)
+            qr_files = create_QR_code_images(papernum, p, ver, public_code)
 
         label = label_for_top_of_page(
             papernum if paperstr is None else paperstr,
@@ -174,9 +281,6 @@ def _create_QRcoded_pdf(
             odd=odd,
             qr_code_size=qr_code_size,
         )
-
-    for ver, pdf in pdf_version.items():
-        pdf.close()
     return exam
 
 
@@ -217,7 +321,7 @@ def pdf_page_add_labels_QRs(
     page: pymupdf.Page,
     shortname: str,
     stamp: str,
-    qr_code: list[pathlib.Path],
+    qr_code: list[pathlib.Path] | list[bytes],
     *,
     odd: bool | None = True,
     qr_code_size: float | int | None = None,
@@ -229,7 +333,8 @@ def pdf_page_add_labels_QRs(
         shortname: a short string that we will write on the staple
             indicator.
         stamp: text for the top-middle
-        qr_code: QR images, if empty, don't do corner work.
+        qr_code: QR images, if empty, don't do corner work.  These can be
+            files or in-memory images as from :func:`create_QR_code_images`.
 
     Keyword Args:
         odd: True for an odd page number (counting from 1),
@@ -440,6 +545,7 @@ def make_PDF(
     font_subsetting: bool | None = None,
     paperstr: str | None = None,
     qr_code_size: float | int | None = None,
+    base_pdf: Path | None = None,
 ) -> pathlib.Path:
     """Make a PDF of particular versions, with QR codes, and optionally name stamped.
 
@@ -489,6 +595,10 @@ def make_PDF(
         paperstr: override the default string version of the paper number.
             Probably you don't need to do this, although Mocker does.
         qr_code_size: width/height of the QR codes.
+        base_pdf: an unstamped PDF from :func:`make_base_PDF` with the
+            same version pattern as ``question_versions``.  If given, we
+            copy it and only add the stamps, rather than merging pages
+            from the source versions.
 
     Returns:
         pathlib.Path: the file that was just written.
@@ -520,19 +630,17 @@ def make_PDF(
         # Only legacy code should be passing None in here: likely can be removed soon!
         public_code = spec["publicCode"]
 
-    # Build all relevant pngs in a temp directory
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        exam = _create_QRcoded_pdf(
-            spec,
-            papernum,
-            question_versions,
-            Path(tmp_dir),
-            source_versions,
-            public_code,
-            no_qr=no_qr,
-            paperstr=paperstr,
-            qr_code_size=qr_code_size,
-        )
+    exam = _create_QRcoded_pdf(
+        spec,
+        papernum,
+        question_versions,
+        source_versions,
+        public_code,
+        no_qr=no_qr,
+        paperstr=paperstr,
+        qr_code_size=qr_code_size,
+        base_pdf=base_pdf,
+    )
 
     # If provided with student name and id, preprint on cover
     if extra:
@@ -8,10 +8,11 @@ from pytest import raises
 import pymupdf
 
 from plom.common.tpv_utils import new_magic_code
-from plom.common.spec_verifier import SpecVerifier
+from plom.common.spec_verifier import SpecVerifier, build_page_to_version_dict
 from plom.create.demotools import buildDemoSourceFiles
 from plom.create.mergeAndCodePages import pdf_page_add_labels_QRs, create_QR_codes
-from plom.create.mergeAndCodePages import make_PDF
+from plom.create.mergeAndCodePages import create_QR_code_images
+from plom.create.mergeAndCodePages import make_PDF, make_base_PDF, version_pattern_key
 from plom.scan import QRextract_legacy
 from plom.scan import processFileToBitmaps
 
@@ -104,3 +105,84 @@ def test_qr_stamp_all_pages(tmp_path) -> None:
         # each page has three images: will break if we add images to the demo
         for p in doc.pages():
             assert len(p.get_images()) == 3
+
+
+def test_QR_code_images_in_memory(tmp_path) -> None:
+    qr = create_QR_code_images(6, 3, 1, "123456")
+    assert len(qr) == 4
+    for q in qr:
+        assert isinstance(q, bytes)
+    assert len(set(qr)) == 4
+    # same images as the on-disc ones
+    for q, f in zip(qr, create_QR_codes(6, 3, 1, "123456", tmp_path)):
+        assert q == f.read_bytes()
+
+
+def test_make_pdf_copies_runs_of_versions(tmp_path) -> None:
+    spec = SpecVerifier.demo()
+    source_versions = {}
+    for v in (1, 2):
+        with pymupdf.open() as d:
+            for p in range(1, spec["numberOfPages"] + 1):
+                d.new_page().insert_text((72, 400), f"version {v} page {p}")
+            source_versions[v] = tmp_path / f"version{v}.pdf"
+            d.save(source_versions[v])
+    pdf_path = make_PDF(
+        spec,
+        5,
+        {1: 1, 2: 2, 3: 1},
+        public_code=new_magic_code(),
+        where=tmp_path,
+        source_versions=source_versions,
+    )
+    page_to_version = build_page_to_version_dict(spec, {1: 1, 2: 2, 3: 1})
+    with pymupdf.open(pdf_path) as doc:
+        assert len(doc) == spec["numberOfPages"]
+        for p, page in enumerate(doc.pages(), start=1):
+            assert f"version {page_to_version[p]} page {p}" in page.get_text()
+            assert len(page.get_images()) == 3
+
+
+def test_make_pdf_from_base_matches_direct(tmp_path) -> None:
+    spec = SpecVerifier.demo()
+    source_versions = {}
+    for v in (1, 2):
+        with pymupdf.open() as d:
+            for p in range(1, spec["numberOfPages"] + 1):
+                d.new_page().insert_text((72, 400), f"version {v} page {p}")
+            source_versions[v] = tmp_path / f"version{v}.pdf"
+            d.save(source_versions[v])
+    qvmap_row = {1: 2, 2: 1, 3: 2}
+    base = make_base_PDF(spec, qvmap_row, source_versions, tmp_path / "base.pdf")
+    code = new_magic_code()
+    (tmp_path / "direct").mkdir()
+    (tmp_path / "from_base").mkdir()
+    direct = make_PDF(
+        spec,
+        6,
+        qvmap_row,
+        public_code=code,
+        where=tmp_path / "direct",
+        source_versions=source_versions,
+    )
+    from_base = make_PDF(
+        spec,
+        6,
+        qvmap_row,
+        public_code=code,
+        where=tmp_path / "from_base",
+        source_versions=source_versions,
+        base_pdf=base,
+    )
+    with pymupdf.open(direct) as d1, pymupdf.open(from_base) as d2:
+        assert len(d1) == len(d2) == spec["numberOfPages"]
+        for p1, p2 in zip(d1.pages(), d2.pages()):
+            assert p1.get_text() == p2.get_text()
+            assert len(p2.get_images()) == 3
+
+
+def test_version_pattern_key() -> None:
+    spec = SpecVerifier.demo()
+    k1 = version_pattern_key(spec, {1: 1, 2: 2, 3: 1})
+    assert k1 == version_pattern_key(spec, {1: 1, 2: 2, 3: 1})
+    assert k1 != version_pattern_key(spec, {1: 2, 2: 2, 3: 1})
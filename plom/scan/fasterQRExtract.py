@@ -19,6 +19,15 @@ from .rotate import pil_load_with_jpeg_exif_rot_applied
 # from zxingcpp import read_barcodes, BarcodeFormat
 
 
+# Plom stamps QR codes near the corners of the page: we look first in
+# these corner regions, as fractions of the page width and height.
+# These must be less than the 0.4 used by :func:`findCorner`.
+CORNER_ROI_FRACTION = 0.3
+# Downscale the corner regions of large images to roughly this height
+# before decoding (the QR codes need a few pixels per module).
+CORNER_ROI_TARGET_HEIGHT = 1600
+
+
 def findCorner(qr, dim):
     """Determines the x-y coordinates and relative location of the given QR code's approximate centre.
 
@@ -42,6 +51,11 @@ def findCorner(qr, dim):
     ]
     mx = mean([p.x for p in qr_polygon])
     my = mean([p.y for p in qr_polygon])
+    return _corner_from_xy(mx, my, dim)
+
+
+def _corner_from_xy(mx, my, dim) -> tuple[str, Any, Any]:
+    """Determine which corner of an image contains the point (mx, my), as per findCorner."""
     width, height = dim
 
     NS = "?"
@@ -62,7 +76,11 @@ def findCorner(qr, dim):
 
 
 def QRextract(
-    image, *, try_harder: bool = True, rotation: int = 0
+    image,
+    *,
+    try_harder: bool = True,
+    rotation: int = 0,
+    corners_first: bool = True,
 ) -> dict[str, dict[str, Any]]:
     """Decode and return QR codes in an image.
 
@@ -76,8 +94,16 @@ def QRextract(
             Defaults to True.  Sometimes this seems work around high
             failure rates in the synthetic images used in CI testing.
             Details below.
-        rotation (int): Rotate the image by 90, -90, 180 or 270 degrees
-            counterclockwise prior to reading the QR codes. Defaults to 0.
+        rotation (int): Report the QR codes as if the image had been
+            rotated by 90, -90, 180 or 270 degrees counterclockwise.
+            Defaults to 0.  The image is not actually rotated: we decode
+            as-is and then transform the results, see
+            :func:`rotate_QR_results`.
+        corners_first (bool): Start by decoding only the four corner
+            regions of the image, where Plom puts its QR codes, at a
+            reduced resolution for large images.  We fall back to decoding
+            the whole page only if fewer than three corners are found.
+            Defaults to True.
 
     Returns:
         A dict with keys "NW", "NE", "SW", "SE", each with a dict containing
@@ -106,7 +132,6 @@ def QRextract(
 
     if rotation != 0:
         assert rotation in (-90, 90, 270, 180)
-        image = image.rotate(rotation, expand=True)
 
     # PIL does lazy loading.  Force loading now so we see errors now.
     # Otherwise, zxing-cpp might hide error messages, Issue #2597
@@ -118,6 +143,15 @@ def QRextract(
         # workaround github.com/zxing-cpp/zxing-cpp/issues/512
         micro = BarcodeFormat.MircoQRCode
 
+    if corners_first:
+        cornerQR = _QRextract_corner_regions(
+            image, formats=(BarcodeFormat.QRCode | micro)
+        )
+        if sum(1 for v in cornerQR.values() if v) >= 3:
+            return rotate_QR_results(cornerQR, rotation, image.size)
+        # otherwise fall back to the whole page, keeping anything we found
+        # (results from the whole page take precedence)
+
     qrlist = read_barcodes(image, formats=(BarcodeFormat.QRCode | micro))
     for qr in qrlist:
         cnr, x_coord, y_coord = findCorner(qr, image.size)
@@ -129,15 +163,18 @@ def QRextract(
         # think I've seen this find a QR-code missed by the above since
         # switching to ZXing-cpp (Issue #2520), so we'll leave it.
         try:
-            image = image.reduce(2)
+            small = image.reduce(2)
         except ValueError:
             # mode-P (paletted pngs) fail to reduce, Issue #2631
             qrlist = []
         else:
-            qrlist = read_barcodes(image, formats=(BarcodeFormat.QRCode | micro))
+            qrlist = read_barcodes(small, formats=(BarcodeFormat.QRCode | micro))
         for qr in qrlist:
-            cnr, x_coord, y_coord = findCorner(qr, image.size)
+            cnr, x_coord, y_coord = findCorner(qr, small.size)
             if cnr in cornerQR.keys():
+                # back to the coordinates of the full-resolution image
+                x_coord *= image.width / small.width
+                y_coord *= image.height / small.height
                 s = qr.text
                 prev_tpv_signature = cornerQR[cnr].get("tpv_signature")
                 if not prev_tpv_signature:
@@ -157,9 +194,111 @@ def QRextract(
                     # For now, just ignore and keep the previous hires result
                     pass
 
+    return rotate_QR_results(cornerQR, rotation, image.size)
+
+
+def _QRextract_corner_regions(image: Image.Image, *, formats) -> dict[str, dict]:
+    """Decode QR codes in only the four corner regions of an image.
+
+    Large images are downscaled by an integer factor before decoding;
+    the coordinates returned are in the original full-resolution image.
+
+    Args:
+        image: an already-loaded Pillow image.
+
+    Keyword Args:
+        formats: passed to zxingcpp's ``read_barcodes``.
+
+    Returns:
+        A dict in the same format as :func:`QRextract`.
+    """
+    # hide import inside function to prevent PlomClient depending on it
+    from zxingcpp import read_barcodes
+
+    cornerQR: dict[str, dict[str, Any]] = {"NW": {}, "NE": {}, "SW": {}, "SE": {}}
+    width, height = image.size
+    factor = max(1, height // CORNER_ROI_TARGET_HEIGHT)
+    if factor > 1 and image.mode in ("P", "1"):
+        # mode-P (paletted pngs) fail to reduce, Issue #2631
+        image = image.convert("L")
+    rw = int(CORNER_ROI_FRACTION * width)
+    rh = int(CORNER_ROI_FRACTION * height)
+    regions = {
+        "NW": (0, 0, rw, rh),
+        "NE": (width - rw, 0, width, rh),
+        "SW": (0, height - rh, rw, height),
+        "SE": (width - rw, height - rh, width, height),
+    }
+    for cnr, box in regions.items():
+        roi = image.crop(box)
+        if factor > 1:
+            roi = roi.reduce(factor)
+        for qr in read_barcodes(roi, formats=formats):
+            qr_polygon = [
+                qr.position.top_left,
+                qr.position.top_right,
+                qr.position.bottom_left,
+                qr.position.bottom_right,
+            ]
+            mx = box[0] + factor * mean([p.x for p in qr_polygon])
+            my = box[1] + factor * mean([p.y for p in qr_polygon])
+            if _corner_from_xy(mx, my, image.size)[0] == cnr:
+                cornerQR[cnr].update({"tpv_signature": qr.text, "x": mx, "y": my})
     return cornerQR
 
 
+def rotate_QR_results(
+    cornerQR: dict[str, dict[str, Any]], rotation: int, dim: tuple[int, int]
+) -> dict[str, dict[str, Any]]:
+    """Transform QR code results as if the image had been rotated.
+
+    This is much cheaper than rotating the image and decoding again.
+
+    Args:
+        cornerQR: a dict of QR codes as returned by :func:`QRextract`.
+        rotation: counterclockwise angle: 0, 90, -90, 180 or 270,
+            as in Pillow's ``rotate(rotation, expand=True)``.
+        dim: the (width, height) of the unrotated image.
+
+    Returns:
+        A new dict with the corners relabelled and the coordinates
+        transformed to the rotated image.
+    """
+    if rotation == 0:
+        return cornerQR
+    assert rotation in (-90, 90, 270, 180)
+    width, height = dim
+    if rotation == 90:
+        newdim = (height, width)
+
+        def transform(x, y):
+            return y, width - x
+
+    elif rotation == 180:
+        newdim = (width, height)
+
+        def transform(x, y):
+            return width - x, height - y
+
+    else:
+        newdim = (height, width)
+
+        def transform(x, y):
+            return height - y, x
+
+    rotatedQR: dict[str, dict[str, Any]] = {"NW": {}, "NE": {}, "SW": {}, "SE": {}}
+    for qr in cornerQR.values():
+        if not qr:
+            continue
+        x, y = transform(qr["x"], qr["y"])
+        cnr = _corner_from_xy(x, y, newdim)[0]
+        if cnr in rotatedQR.keys():
+            rotatedQR[cnr].update(
+                {"tpv_signature": qr["tpv_signature"], "x": x, "y": y}
+            )
+    return rotatedQR
+
+
 def QRextract_legacy(
     image, *, write_to_file: bool = True, try_harder: bool = True
 ) -> dict[str, list[str]] | None:
@@ -7,7 +7,7 @@ import json
 from importlib import resources
 
 import plom.scan
-from plom.scan import QRextract, QRextract_legacy
+from plom.scan import QRextract, QRextract_legacy, rotate_QR_results
 
 from .test_rotations import _PIL_Image_open
 
@@ -95,6 +95,59 @@ def test_qr_reads_upside_down_legacy() -> None:
     assert p["NE"] == ["00002806013823730"]
 
 
+def test_qr_reads_corners_first_matches_whole_page() -> None:
+    im = _PIL_Image_open(resources.files(plom.scan) / "test_zbar_fails.png")
+    q = QRextract(im, corners_first=True)
+    p = QRextract(im, corners_first=False)
+    for cnr in ("NW", "NE", "SW", "SE"):
+        assert q[cnr].get("tpv_signature") == p[cnr].get("tpv_signature")
+        if q[cnr]:
+            assert relative_error(q[cnr]["x"], p[cnr]["x"]) < 0.01
+            assert relative_error(q[cnr]["y"], p[cnr]["y"]) < 0.01
+
+
+def test_qr_reads_corners_first_large_image() -> None:
+    im = _PIL_Image_open(resources.files(plom.scan) / "test_zbar_fails.png")
+    # roughly a 300 dpi letter-sized scan, which will be downscaled
+    im = im.convert("L").resize((2550, 3300))
+    q = QRextract(im, corners_first=True)
+    assert not q["NE"]
+    assert q["NW"]["tpv_signature"] == "00002806012823730"
+    assert q["SE"]["tpv_signature"] == "00002806014823730"
+    assert q["SW"]["tpv_signature"] == "00002806013823730"
+    assert relative_error(q["SE"]["x"], 1419 * 2550 / 1546) < 0.01
+    assert relative_error(q["SE"]["y"], 1861 * 3300 / 2000) < 0.01
+
+
+def test_qr_rotation_inferred_without_redecoding() -> None:
+    im = _PIL_Image_open(resources.files(plom.scan) / "test_zbar_fails.png")
+    q = QRextract(im)
+    for angle in (90, -90, 180, 270):
+        r = rotate_QR_results(q, angle, im.size)
+        p = QRextract(im.rotate(angle, expand=True))
+        assert r == QRextract(im, rotation=angle)
+        for cnr in ("NW", "NE", "SW", "SE"):
+            assert r[cnr].get("tpv_signature") == p[cnr].get("tpv_signature")
+            if r[cnr]:
+                assert abs(r[cnr]["x"] - p[cnr]["x"]) < 5
+                assert abs(r[cnr]["y"] - p[cnr]["y"]) < 5
+
+
+def test_qr_rotation_on_whole_page_fallback() -> None:
+    im = _PIL_Image_open(resources.files(plom.scan) / "test_zbar_fails.png")
+    # corners_first=False takes the whole page path, with the reduced image
+    q = QRextract(im, corners_first=False, try_harder=True)
+    for angle in (90, -90, 180, 270):
+        r = QRextract(im, rotation=angle, corners_first=False, try_harder=True)
+        assert r == rotate_QR_results(q, angle, im.size)
+        p = QRextract(im.rotate(angle, expand=True), corners_first=False)
+        for cnr in ("NW", "NE", "SW", "SE"):
+            assert r[cnr].get("tpv_signature") == p[cnr].get("tpv_signature")
+            if r[cnr]:
+                assert abs(r[cnr]["x"] - p[cnr]["x"]) < 5
+                assert abs(r[cnr]["y"] - p[cnr]["y"]) < 5
+
+
 def test_qr_reads_from_file(tmp_path) -> None:
     b = (resources.files(plom.scan) / "test_zbar_fails.png").read_bytes()
     f = tmp_path / "test_zbar.png"
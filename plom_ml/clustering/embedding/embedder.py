@@ -3,6 +3,8 @@
 # Copyright (C) 2026 Colin B. Macdonald
 
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Sequence
 
 import numpy as np
 from PIL import Image
@@ -11,13 +13,48 @@ import cv2
 import onnxruntime as ort  # type: ignore[import]
 
 
+def _run_in_batches(
+    session: ort.InferenceSession, x: np.ndarray, *, batch_size: int = 64
+) -> list[np.ndarray]:
+    """Run an ONNX session on the rows of x, a batch at a time.
+
+    Args:
+        session: the ONNX model, with a single input.
+        x: the inputs stacked along the first axis.
+
+    Keyword Args:
+        batch_size: how many rows to pass to the model at once.  Ignored if
+            the model was exported with a fixed batch size.
+
+    Returns:
+        The outputs of the model, each concatenated over all the batches.
+    """
+    model_input = session.get_inputs()[0]
+    if isinstance(model_input.shape[0], int):
+        # model was exported with a fixed batch size, not a symbolic one
+        batch_size = model_input.shape[0]
+    outputs: list[list[np.ndarray]] = []
+    for start in range(0, len(x), batch_size):
+        results = session.run(None, {model_input.name: x[start : start + batch_size]})
+        if not outputs:
+            outputs = [[] for _ in results]
+        for out, r in zip(outputs, results):
+            out.append(r)
+    return [np.concatenate(out) for out in outputs]
+
+
 class Embedder(ABC):
     """Abstract class that generates images embeddings for ML tasks.
 
     In simple terms: this is the class that uses ML models to generate "some numbers"
     for images such that they can be grouped based on those numbers.
+
+    Subclasses should set ``model_id``, a string identifying the model
+    weights, for example so that stored embeddings can be reused.
     """
 
+    model_id: str
+
     @abstractmethod
     def embed(self, image: np.ndarray) -> np.ndarray:
         """Convert image array into a feature matrix.
@@ -30,6 +67,21 @@ class Embedder(ABC):
         """
         pass
 
+    def embed_batch(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Convert many images into a feature matrix.
+
+        Subclasses should override this to run their model on batches
+        of images, rather than one image at a time.
+
+        Args:
+            images: numpy array images whose features to be generated.
+
+        Returns:
+            A numpy array of shape (N, D) where N is the number of images
+            and D is embedding dimension.
+        """
+        return np.vstack([np.ravel(self.embed(image)) for image in images])
+
 
 class MCQEmbedder(Embedder):
     """Embed images with MCQ Clustering model."""
@@ -38,6 +90,7 @@ class MCQEmbedder(Embedder):
         # Hiding this import so torch unneeded unless this class instantiated
 
         self.out_features = out_features
+        self.model_id = f"MCQ:{Path(weight_path).name}"
 
         # init model
         self.model = ort.InferenceSession(
@@ -66,15 +119,9 @@ class MCQEmbedder(Embedder):
         x = x[None, :, :].astype(np.float32)
         return np.expand_dims(x, 0)
 
-    def embed(self, img: np.ndarray) -> np.ndarray:
-        """Convert image array into a feature matrix.
-
-        Args:
-            img: numpy array image whose features to be generated.
-
-        Returns:
-            A numpy array of shape (1, D) where D is embedding dimension.
-        """
+    @staticmethod
+    def _blob_crops(img: np.ndarray) -> list[np.ndarray]:
+        """Find the large enough blobs in the image, which might be letters."""
         # build a structuring element that will bridge any gap
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
 
@@ -85,51 +132,69 @@ class MCQEmbedder(Embedder):
         # merges all “nearby” pieces
         n_labels, _, stats, _ = cv2.connectedComponentsWithStats(closed, connectivity=8)
 
-        bestConfidence, bestFeatures = 0.0, [0] * self.out_features
-
-        # get the probs with highest confidence
+        crops = []
         for lab in range(1, n_labels):  # skip background
             x, y, w, h, area = stats[lab]
             if area < 100:
                 continue
+            crops.append(img[y : y + h, x : x + w])
+        return crops
 
-            crop = img[y : y + h, x : x + w]
-            bestConfidence, bestFeatures = 0.0, [0] * self.out_features
+    def embed(self, img: np.ndarray) -> np.ndarray:
+        """Convert image array into a feature matrix.
 
-            x_np = self.infer_transform(Image.fromarray(crop))
+        Args:
+            img: numpy array image whose features to be generated.
 
-            # onnx session .run returns a list where each entry represents a tensor for
-            # an output value (there may be multiple outputs, but in this case there is only one).
-            # Therefore, we do [0] to access the only one output value in the return list
-            logits_all_batches = self.model.run(None, {self.input_name: x_np})[0]
+        Returns:
+            A numpy array of shape (1, D) where D is embedding dimension.
+        """
+        return self.embed_batch([img])[0]
 
-            # The format now then be come [batch, num_classes], but since there is only 1 batch
-            # it's [1, num_classes] and we will squeeze the batch dim.
-            logits = logits_all_batches[0]
+    def embed_batch(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Convert many images into a feature matrix, running the model on all their blobs at once.
 
-            # convert logits to probability distribution (softmax)
-            probs = np.exp(logits) / np.sum(np.exp(logits))
+        Args:
+            images: numpy array images whose features to be generated.
 
-            # Convert to hellinger space for probability distribution clustering
-            hellinger = np.sqrt(probs)
+        Returns:
+            A numpy array of shape (N, D) where D is embedding dimension.
+        """
+        crops_per_image = [self._blob_crops(img) for img in images]
+        all_crops = [crop for crops in crops_per_image for crop in crops]
+        features = np.zeros((len(images), self.out_features), dtype=np.float32)
+        if all_crops:
+            x_np = np.concatenate(
+                [self.infer_transform(Image.fromarray(crop)) for crop in all_crops]
+            )
+            # the one output of the model is [batch, num_classes]
+            logits = _run_in_batches(self.model, x_np)[0]
 
-            # We are running the inference on potentially more than one blob in the scene.
-            # We may hit on noise strokes instead of the real letters, thus we choose to
-            # go with the one blob with highest confidence as a letter.
-            confidence = max(probs)
-            if confidence > bestConfidence:
-                bestConfidence = confidence
-                bestFeatures = hellinger
+            # convert logits to probability distribution (softmax)
+            probs = np.exp(logits) / np.sum(np.exp(logits), axis=1, keepdims=True)
+
+            start = 0
+            for i, crops in enumerate(crops_per_image):
+                if not crops:
+                    continue
+                blob_probs = probs[start : start + len(crops)]
+                start += len(crops)
+                # We are running the inference on potentially more than one blob in the scene.
+                # We may hit on noise strokes instead of the real letters, thus we choose to
+                # go with the one blob with highest confidence as a letter.
+                best = np.argmax(blob_probs.max(axis=1))
+                # Convert to hellinger space for probability distribution clustering
+                features[i] = np.sqrt(blob_probs[best])
 
         # avoid 0 which can mess up cosine similarity
-        clipped = np.clip(bestFeatures, 1e-8, 1)
-        return np.array(clipped)
+        return np.clip(features, 1e-8, 1)
 
 
 class SymbolicEmbedder(Embedder):
     """Embeds images using a ResNet-34 backbone + projection head."""
 
     def __init__(self, model_path: str):
+        self.model_id = f"Symbolic:{Path(model_path).name}"
 
         # Load model
         self.model = ort.InferenceSession(
@@ -164,26 +229,35 @@ class SymbolicEmbedder(Embedder):
         Returns:
             1D np.ndarray of length emb_dim (e.g. 128).
         """
-        # collapse a singleton channel
-        if image.ndim == 3 and image.shape[2] == 1:
-            image = image[:, :, 0]
+        return self.embed_batch([image])[0]
 
-        # ensure uint8
-        if image.dtype != np.uint8:
-            image = image.astype(np.uint8)
+    def embed_batch(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Embed many grayscale images, running the model on batches of them.
 
-        pil = Image.fromarray(image, mode="L")
-        x_np = self.infer_transform(pil)
-        emb, logits = self.model.run(None, {self.input_name: x_np})
-        probs = np.sqrt(1 / (1 + np.exp(-logits)))[0]
+        Args:
+            images: np.ndarrays of shape (H, W) or (H, W, 1), dtype uint8 or convertible.
 
-        return probs
+        Returns:
+            np.ndarray of shape (N, emb_dim).
+        """
+        x = []
+        for image in images:
+            # collapse a singleton channel
+            if image.ndim == 3 and image.shape[2] == 1:
+                image = image[:, :, 0]
+            # ensure uint8
+            if image.dtype != np.uint8:
+                image = image.astype(np.uint8)
+            x.append(self.infer_transform(Image.fromarray(image, mode="L")))
+        emb, logits = _run_in_batches(self.model, np.concatenate(x))
+        return np.sqrt(1 / (1 + np.exp(-logits)))
 
 
 class TrOCREmbedder(Embedder):
     """Embeds images using an 8-bit TrOCR encoder (last_hidden_state CLS token)."""
 
     def __init__(self, model_path: str):
+        self.model_id = f"TrOCR:{Path(model_path).name}"
         # Load processor for converting images
         self.processor = TrOCRProcessor.from_pretrained(
             "fhswf/TrOCR_Math_handwritten", use_fast=True
@@ -203,11 +277,32 @@ class TrOCREmbedder(Embedder):
         Returns:
             1D numpy array of length D (hidden size of the encoder).
         """
-        pil = Image.fromarray(arr).convert("RGB")
-        # I don't know why this needs a typing exception: "imge_processor" was
-        # renamed during transformers 4 -> 5, but this is the new name: strange
-        x_t = self.processor.image_processor(pil, return_tensors="pt").pixel_values  # type: ignore[attr-defined]
-        x_np = x_t.numpy().astype(np.float32)
-        cls_tokens = self.model.run(None, {self.input_name: x_np})[0][0, 0, :]
-
-        return cls_tokens
+        return self.embed_batch([arr])[0]
+
+    def embed_batch(
+        self, images: Sequence[np.ndarray], *, batch_size: int = 16
+    ) -> np.ndarray:
+        """Embed many images via the encoder's [CLS] token, running the model on batches of them.
+
+        Args:
+            images: np.ndarrays of shape (H, W) or (H, W, 3).
+
+        Keyword Args:
+            batch_size: how many images to pass to the model at once.
+
+        Returns:
+            numpy array of shape (N, D), D being the hidden size of the encoder.
+        """
+        cls_tokens = []
+        for start in range(0, len(images), batch_size):
+            pils = [
+                Image.fromarray(arr).convert("RGB")
+                for arr in images[start : start + batch_size]
+            ]
+            # I don't know why this needs a typing exception: "imge_processor" was
+            # renamed during transformers 4 -> 5, but this is the new name: strange
+            x_t = self.processor.image_processor(pils, return_tensors="pt").pixel_values  # type: ignore[attr-defined]
+            x_np = x_t.numpy().astype(np.float32)
+            hidden = _run_in_batches(self.model, x_np, batch_size=batch_size)[0]
+            cls_tokens.append(hidden[:, 0, :])
+        return np.concatenate(cls_tokens)
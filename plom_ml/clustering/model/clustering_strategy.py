@@ -8,7 +8,7 @@ import yaml
 from abc import abstractmethod
 from importlib import resources
 from pathlib import Path
-from typing import Mapping
+from typing import Mapping, Sequence
 
 import numpy as np
 from sklearn.metrics import silhouette_score, davies_bouldin_score
@@ -104,14 +104,21 @@ class ClusteringStrategy:
         b. clustering algorithm used to cluster the generated features.
         c. Any task-specific logic eg: PCA decomposition before clustering
 
-    This class enforces every subclass to implement cluster_papers that outputs the
-    paper_number to their clusterId. Furthermore the class has get_embeddings method
-    that generate a feature vector for an image. The feature vector is a concatenation of
-    embeddings generated by the embedderes.
+    This class enforces every subclass to implement cluster_embeddings that outputs the
+    paper_number to their clusterId given their feature vectors. Furthermore the class has
+    get_embeddings method that generate a feature vector for an image. The feature vector
+    is a concatenation of embeddings generated by the embedderes.  The two steps can be
+    used separately, for example to reuse previously computed feature vectors, or
+    together via cluster_papers.
     """
 
     embedders: list[Embedder]
 
+    @property
+    def model_id(self) -> str:
+        """A string identifying the models used to make the feature vectors."""
+        return "+".join(embedder.model_id for embedder in self.embedders)
+
     def get_embeddings(self, image: np.ndarray) -> np.ndarray:
         """Generate an array of embeddings generated by embedders for the inputted image.
 
@@ -132,7 +139,42 @@ class ClusteringStrategy:
 
         return np.concatenate([embedder.embed(image) for embedder in self.embedders])
 
+    def get_embeddings_batch(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Generate the feature vectors for many images, running each embedder on batches.
+
+        Args:
+            images: the images whose feature vectors will be generated for clustering.
+
+        Returns:
+            a 2D float32 array of shape (N, D), one row for each image,
+            the same dtype as the embeddings kept in the database.
+
+        Raises:
+            MissingEmbedderException: if ClusteringStrategy has not initialized embedders property.
+        """
+        if not hasattr(self, "embedders") or not self.embedders:
+            raise MissingEmbedderException(
+                f"Missing self.embedders in {self.__class__.__name__} ClusteringStrategy"
+            )
+
+        X = np.hstack([embedder.embed_batch(images) for embedder in self.embedders])
+        return X.astype(np.float32, copy=False)
+
     @abstractmethod
+    def cluster_embeddings(
+        self, paper_numbers: Sequence[int], X: np.ndarray
+    ) -> dict[int, int]:
+        """Cluster papers given their feature vectors.
+
+        Args:
+            paper_numbers: the papers, in the same order as the rows of X.
+            X: the feature matrix, as from get_embeddings_batch.
+
+        Returns:
+            A dictionary mapping the paper number to their cluster id.
+        """
+        pass
+
     def cluster_papers(
         self, paper_to_image: Mapping[int, np.ndarray]
     ) -> dict[int, int]:
@@ -149,7 +191,8 @@ class ClusteringStrategy:
         Returns:
             A dictionary mapping the paper number to their cluster id.
         """
-        pass
+        X = self.get_embeddings_batch(list(paper_to_image.values()))
+        return self.cluster_embeddings(list(paper_to_image.keys()), X)
 
 
 class HMEClusteringStrategy(ClusteringStrategy):
@@ -242,13 +285,14 @@ class HMEClusteringStrategy(ClusteringStrategy):
             TrOCREmbedder(trocr_model_path),
         ]
 
-    def cluster_papers(
-        self, paper_to_image: Mapping[int, np.ndarray]
+    def cluster_embeddings(
+        self, paper_numbers: Sequence[int], X: np.ndarray
     ) -> dict[int, int]:
         """Cluster the given papers.
 
         Args:
-            paper_to_image: a dictionary mapping paper number to a (processed) image.
+            paper_numbers: the papers, in the same order as the rows of X.
+            X: the feature matrix, as from get_embeddings_batch.
 
         Returns:
             A dictionary mapping the paper number to their cluster id.
@@ -261,11 +305,6 @@ class HMEClusteringStrategy(ClusteringStrategy):
         # distance thresholds range, such that they have consistent enough behavior
         # for differing datasets.
 
-        # Build feature matrix
-        X = np.vstack(
-            [self.get_embeddings(image) for pn, image in paper_to_image.items()]
-        )
-
         # set up distance threshold search space.
         # Make range to smaller value if intends for more fine-grained clustering eg: (3.5, 5).
         # From my experimentation: don't go under 3, otherwise it will be too fine-grained.
@@ -277,7 +316,7 @@ class HMEClusteringStrategy(ClusteringStrategy):
         thresholds = np.linspace(min_thresh, max_thresh, thresh_counts)
 
         clusterIDs = get_best_clustering(X, thresholds, "euclidean", "davies")
-        return dict(zip(list(paper_to_image.keys()), clusterIDs))
+        return dict(zip(paper_numbers, clusterIDs))
 
 
 class MCQClusteringStrategy(ClusteringStrategy):
@@ -333,23 +372,18 @@ class MCQClusteringStrategy(ClusteringStrategy):
             MCQEmbedder(weight_path=weight_path, out_features=out_features)
         ]
 
-    def cluster_papers(
-        self, paper_to_image: Mapping[int, np.ndarray]
+    def cluster_embeddings(
+        self, paper_numbers: Sequence[int], X: np.ndarray
     ) -> dict[int, int]:
         """Cluster papers based on handwritten MCQ.
 
         Args:
-            paper_to_image: a dictionary mapping paper number to the
-                cropped region used for clustering.
+            paper_numbers: the papers, in the same order as the rows of X.
+            X: the feature matrix, as from get_embeddings_batch.
 
         Returns:
             A dictionary mapping the paper number to their cluster id
         """
-        # Build feature matrix
-        X = np.vstack(
-            [self.get_embeddings(image) for _, image in paper_to_image.items()]
-        )
-
         # NOTE: this threshold space is empirically tuned with custom dataset
         # to enforce more fine-grained cluster move the threshold to smaller value range.
         # Unlike HME, this range tends to be pretty robust, but that could be because I have less
@@ -359,4 +393,4 @@ class MCQClusteringStrategy(ClusteringStrategy):
         clusterIDs = get_best_clustering(
             X, thresholds=thresholds, distance_metric="cosine", metric="silhouette"
         )
-        return dict(zip(list(paper_to_image.keys()), clusterIDs))
+        return dict(zip(paper_numbers, clusterIDs))
@@ -2,7 +2,7 @@
 # Copyright (C) 2025 Bryan Tanady
 # Copyright (C) 2026 Colin B. Macdonald
 
-from typing import Mapping
+from typing import Mapping, Sequence
 
 import numpy as np
 
@@ -43,11 +43,32 @@ class ClusteringPipeline:
         Returns:
             A dictionary mapping paper number to their cluster id.
         """
-        # Preprocess the images
-        processed_paper_to_images = {
-            pn: self.preprocessor.process(images)
-            for pn, images in paper_to_images.items()
-        }
-
-        # Feed the processed inputs to the model
-        return self.ClusteringStrategy.cluster_papers(processed_paper_to_images)
+        X = self.embed(list(paper_to_images.values()))
+        return self.ClusteringStrategy.cluster_embeddings(list(paper_to_images), X)
+
+    def embed(self, images: Sequence[Mapping[str, np.ndarray]]) -> np.ndarray:
+        """Preprocess then generate the feature vectors of many inputs, in batches.
+
+        Args:
+            images: a list of dicts each representing the image(s) for one
+                paper, as in :meth:`cluster`.
+
+        Returns:
+            The feature matrix, one row for each item of the input.
+        """
+        processed = [self.preprocessor.process(x) for x in images]
+        return self.ClusteringStrategy.get_embeddings_batch(processed)
+
+    def cluster_embeddings(
+        self, paper_numbers: Sequence[int], X: np.ndarray
+    ) -> dict[int, int]:
+        """Cluster papers given their feature vectors, for example as from :meth:`embed`.
+
+        Args:
+            paper_numbers: the papers, in the same order as the rows of X.
+            X: the feature matrix.
+
+        Returns:
+            A dictionary mapping paper number to their cluster id.
+        """
+        return self.ClusteringStrategy.cluster_embeddings(paper_numbers, X)
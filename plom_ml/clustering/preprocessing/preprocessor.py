@@ -61,6 +61,12 @@ class Preprocessor:
         """
         pass
 
+    @property
+    def preprocessor_id(self) -> str:
+        """A string identifying this preprocessor and its parameters."""
+        params = ", ".join(f"{k}={v!r}" for k, v in sorted(vars(self).items()))
+        return f"{type(self).__name__}({params})"
+
     def process(self, images: Mapping[str, np.ndarray]) -> np.ndarray:
         """Takes one or more images to preprocess it into another image for clustering model input.
 
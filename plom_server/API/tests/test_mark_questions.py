@@ -308,3 +308,54 @@ class TestMarkQuestionAPI:
         )
 
         assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+    def test_claim_batch(
+        self,
+        mocker: pytest_mock.MockerFixture,
+    ) -> None:
+        """Test POST: /MK/tasks/claim claims tasks and returns their page data."""
+        dummy_page = {"id": 7, "md5": "abc", "server_path": "/nonexistent"}
+        mocker.patch.object(
+            page_data,
+            page_data.get_question_pages_list.__name__,
+            side_effect=lambda *args: [dummy_page.copy()],
+        )
+        url = reverse("api_mark_task_claim")
+        resp = self.auth_client.post(f"{url}?n=3")
+        assert resp.status_code == status.HTTP_200_OK
+        (claimed,) = resp.json()
+        assert claimed["code"] == self.task.code
+        assert claimed["integrity_check"] == self.task.pk
+        assert claimed["tags"] == [self.tag.text]
+        (page,) = claimed["pages"]
+        assert page["url"] == reverse(
+            "api_MK_one_image", kwargs={"pk": 7, "hash": "abc"}
+        )
+        self.task.refresh_from_db()
+        assert self.task.status == MarkingTask.OUT
+
+        # nothing left to claim
+        resp = self.auth_client.post(url)
+        assert resp.status_code == status.HTTP_204_NO_CONTENT
+
+    def test_claim_batch_bad_n(self) -> None:
+        """Test POST: /MK/tasks/claim with a nonsense number of tasks."""
+        url = reverse("api_mark_task_claim")
+        resp = self.auth_client.post(f"{url}?n=0")
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_image_not_modified(self) -> None:
+        """Test GET: /MK/images/{pk}/{hash} revalidates against the hash."""
+        url = reverse("api_MK_one_image", kwargs={"pk": 1, "hash": "abc"})
+        resp = self.auth_client.get(
+            url, {"size": "half"}, HTTP_IF_NONE_MATCH='"abc-half"'
+        )
+        assert resp.status_code == status.HTTP_304_NOT_MODIFIED
+        assert resp.headers["ETag"] == '"abc-half"'
+        assert "immutable" in resp.headers["Cache-Control"]
+
+    def test_get_image_bad_size(self) -> None:
+        """Test GET: /MK/images/{pk}/{hash} with an unknown size."""
+        url = reverse("api_MK_one_image", kwargs={"pk": 1, "hash": "abc"})
+        resp = self.auth_client.get(url, {"size": "huge"})
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
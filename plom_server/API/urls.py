@@ -21,6 +21,7 @@ from .views import (
     Classlist,
     GetTasks,
     MarkTaskNextAvailable,
+    MarkTaskClaimBatch,
     MarkTask,
     ReassignTask,
     ResetTask,
@@ -193,6 +194,7 @@ urlpatterns += [
         "MK/tasks/available", MarkTaskNextAvailable.as_view(), name="api_mark_task_next"
     ),
     path("MK/tasks/all", GetTasks.as_view(), name="api_MK_get_tasks_all"),
+    path("MK/tasks/claim", MarkTaskClaimBatch.as_view(), name="api_mark_task_claim"),
     # TODO: consider changing to api/v0/tasks/<int:papernum>/<int:qidx>
     path("MK/tasks/<str:code>", MarkTask.as_view(), name="api_mark_task"),
     path(
@@ -90,6 +90,6 @@ from .latex import (
     MlatexFragment,
 )
 
-from .mark_question import MarkTaskNextAvailable, MarkTask
+from .mark_question import MarkTaskNextAvailable, MarkTaskClaimBatch, MarkTask
 
 from .rectangle_extractor import RectangleExtractorView
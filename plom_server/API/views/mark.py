@@ -10,8 +10,12 @@ from rest_framework.response import Response
 from rest_framework import serializers, status
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponseNotModified
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
 
+from plom_server.Base.models import BaseImageRendition
 from plom_server.Finish.services import SolnImageService
 from plom_server.Mark.services import (
     mark_task,
@@ -304,14 +308,48 @@ class MgetPageDataQuestionInContext(APIView):
 class MgetOneImage(APIView):
     """Get a page image from the server."""
 
-    def get(self, request: Request, *, pk: int, hash: str) -> Response:
-        """Get a page image."""
-        pds = PageDataService()
-        try:
-            img_django_file = pds.get_page_image(pk, img_hash=hash)
-            return FileResponse(img_django_file, status=status.HTTP_200_OK)
-        except Image.DoesNotExist:
-            return _error_response("Image does not exist.", status.HTTP_400_BAD_REQUEST)
+    def get(self, request: Request, *, pk: int, hash: str) -> HttpResponseBase:
+        """Get a page image.
+
+        The optional query parameter ``size`` asks for a smaller copy of
+        the image: ``"half"`` or ``"thumb"``.  Omit it, or pass ``"full"``,
+        for the original.
+
+        The image behind a given hash never changes, so responses carry
+        a strong ETag and may be cached indefinitely.  Requests with a
+        matching ``If-None-Match`` header get a 304 without the image
+        being read.
+
+        Returns:
+            200: the image.
+            304: the client already has this image.
+            400: no such image, or invalid size.
+        """
+        size = request.query_params.get("size") or "full"
+        if size != "full" and size not in BaseImageRendition.SCALES:
+            return _error_response(
+                f'Invalid image size "{size}"', status.HTTP_400_BAD_REQUEST
+            )
+        etag = quote_etag(f"{hash}-{size}")
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in if_none_match or if_none_match.strip() == "*":
+            response: HttpResponseBase = HttpResponseNotModified()
+        else:
+            pds = PageDataService()
+            try:
+                img_django_file = pds.get_page_image(
+                    pk, img_hash=hash, size=None if size == "full" else size
+                )
+            except Image.DoesNotExist:
+                return _error_response(
+                    "Image does not exist.", status.HTTP_400_BAD_REQUEST
+                )
+            response = FileResponse(img_django_file, status=status.HTTP_200_OK)
+        response.headers["ETag"] = etag
+        # private: these are only for authenticated users
+        patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+        return response
 
 
 # GET: /annotations/{paper}/{question}
@@ -10,6 +10,7 @@ import pathlib
 
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.request import Request
@@ -24,7 +25,7 @@ from plom.common.exceptions import (
 )
 
 from plom_server.Mark.services import QuestionMarkingService, MarkingTaskService
-from plom_server.Mark.services import mark_task, page_data
+from plom_server.Mark.services import dispatch_queue, mark_task, page_data
 from plom_server.Progress.services import UserInfoService
 from plom_server.Papers.services import PaperInfoService
 from .utils import _error_response
@@ -71,6 +72,10 @@ class MarkTaskNextAvailable(APIView):
         influenced by there "marking priority" which can be controlled
         elsewhere.
 
+        If the server has the prefetched dispatch queue enabled, then
+        concurrent requests for the same question and version (and no
+        other options) are given different tasks from that queue.
+
         Returns:
             200: An available task exists, returns the task code as a string.
             204: There are no available tasks.
@@ -96,6 +101,19 @@ class MarkTaskNextAvailable(APIView):
         else:
             tags = []
 
+        if (
+            dispatch_queue.is_enabled()
+            and question
+            and version
+            and not (tags or min_paper_num or max_paper_num)
+        ):
+            # each caller pops a different task: no sorting of the task table
+            code = dispatch_queue.next_available_task_code(
+                question, version, user=request.user
+            )
+            if code is not None:
+                return Response(code, status=status.HTTP_200_OK)
+
         task = QuestionMarkingService.get_first_available_task(
             question_idx=question,
             version=version,
@@ -120,6 +138,105 @@ class MarkTaskNextAvailable(APIView):
         return Response(task.code, status=status.HTTP_200_OK)
 
 
+class MarkTaskClaimBatch(APIView):
+    """Claim several marking tasks at once, with what's needed to start marking them."""
+
+    # Don't let one client hoard the whole queue
+    max_tasks = 10
+
+    # POST: /MK/tasks/claim
+    def post(self, request: Request) -> Response:
+        """Claim up to ``n`` available marking tasks, and return their page data.
+
+        This combines, for each of several tasks, what would otherwise
+        be separate calls to "next available task", claiming the task,
+        and the page metadata.  The server also starts reading the page
+        images of these tasks, so the subsequent image downloads are
+        faster.
+
+        Query parameters are as in :class:`MarkTaskNextAvailable`, plus
+        ``n``, how many tasks to claim (default 1, at most 10).  As there,
+        ``tags`` is a preference rather than a requirement.
+
+        Returns:
+            200: a list of dicts, one per claimed task, with keys
+            ``code``, ``question_index``, ``version``, ``integrity_check``
+            (the ``task.pk``, as returned when claiming a single task),
+            ``tags`` (list of strings) and ``pages``, a list of the page
+            data as returned when claiming a single task, where each
+            page also has a ``url`` from which its image can be fetched.
+            204: there are no available tasks.
+            400: malformed options.
+            403: you're not in the "marker" group.
+        """
+        calling_user = request.user
+        group_list = list(request.user.groups.values_list("name", flat=True))
+        if "marker" not in group_list:
+            return _error_response(
+                f"You ({calling_user}) cannot claim marking tasks because"
+                ' your account is not in the "marker" group',
+                status.HTTP_403_FORBIDDEN,
+            )
+
+        data = request.query_params
+
+        def int_or_None(x):
+            return None if x is None else int(x)
+
+        try:
+            n = int(data.get("n", 1))
+            question = int_or_None(data.get("q"))
+            version = int_or_None(data.get("v"))
+            min_paper_num = int_or_None(data.get("min_paper_num"))
+            max_paper_num = int_or_None(data.get("max_paper_num"))
+        except ValueError as e:
+            return _400(e)
+        if n < 1:
+            return _400(f"must claim a positive number of tasks, not {n}")
+        n = min(n, self.max_tasks)
+
+        _tag: str | None = data.get("tags")
+        tags = _tag.split(",") if _tag else []
+
+        tasks = QuestionMarkingService.claim_next_tasks(
+            calling_user,
+            n,
+            tags=tags,
+            question_idx=question,
+            version=version,
+            min_paper_num=min_paper_num,
+            max_paper_num=max_paper_num,
+        )
+        if not tasks:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        mts = MarkingTaskService()
+        result = []
+        paths = []
+        for task in tasks:
+            pages = page_data.get_question_pages_list(
+                task.paper.paper_number, task.question_index
+            )
+            for page in pages:
+                page["url"] = reverse(
+                    "api_MK_one_image",
+                    kwargs={"pk": page["id"], "hash": page["md5"]},
+                )
+                paths.append(page["server_path"])
+            result.append(
+                {
+                    "code": task.code,
+                    "question_index": task.question_index,
+                    "version": task.question_version,
+                    "integrity_check": task.pk,
+                    "tags": mts.get_tags_for_task_pk(task.pk),
+                    "pages": pages,
+                }
+            )
+        page_data.warm_page_images(paths)
+        return Response(result, status=status.HTTP_200_OK)
+
+
 class MarkTask(APIView):
     """Handles claiming or surrendering tasks, and submitting annotations."""
 
@@ -193,9 +193,18 @@ class AuthService:
         if not password:
             user.is_active = False
         user.save()
+        cls._link_existing_tags(user)
 
         return user.username, groups_name_list
 
+    @staticmethod
+    def _link_existing_tags(user: User) -> None:
+        """Tags like ``@username`` may predate the user: point them at the new user."""
+        # avoid a circular import
+        from plom_server.Mark.models import MarkingTaskTag
+
+        MarkingTaskTag.objects.filter(text=f"@{user.username}").update(for_user=user)
+
     @classmethod
     @transaction.atomic
     def create_user_and_add_to_group(
@@ -239,6 +248,7 @@ class AuthService:
                 user.is_active = False
             user.groups.add(*groups)
             user.save()
+            cls._link_existing_tags(user)
         return user
 
     @classmethod
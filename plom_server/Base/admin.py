@@ -7,6 +7,7 @@ from django.contrib import admin
 
 from .models import (
     BaseImage,
+    BaseImageRendition,
     HueyTaskTracker,
     SettingsModel,
     SettingsBooleanModel,
@@ -14,6 +15,7 @@ from .models import (
 
 # This makes models appear in the admin interface
 admin.site.register(BaseImage)
+admin.site.register(BaseImageRendition)
 admin.site.register(HueyTaskTracker)
 admin.site.register(SettingsModel)
 admin.site.register(SettingsBooleanModel)
@@ -1,3 +1,4 @@
+import django.db.models.deletion
 import django.utils.timezone
 import plom_server.Base.models
 from django.db import migrations, models
@@ -35,6 +36,47 @@ class Migration(migrations.Migration):
                 ("width", models.IntegerField(default=0)),
             ],
         ),
+        migrations.CreateModel(
+            name="BaseImageRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("size", models.CharField(max_length=16)),
+                (
+                    "image_file",
+                    models.ImageField(
+                        height_field="height",
+                        upload_to="page_images/renditions/",
+                        width_field="width",
+                    ),
+                ),
+                ("height", models.IntegerField(default=0)),
+                ("width", models.IntegerField(default=0)),
+                (
+                    "baseimage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="Base.baseimage",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("baseimage", "size"),
+                        name="unique_baseimage_rendition",
+                    )
+                ],
+            },
+        ),
         migrations.CreateModel(
             name="HueyTaskTracker",
             fields=[
@@ -6,13 +6,19 @@
 # Copyright (C) 2024 Aden Chan
 # Copyright (C) 2026 Aidan Murphy
 
+import atexit
 import logging
+import threading
+import uuid
+from typing import Any
 
 import huey
 import huey.api
 import huey.signals
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, Value, When
 from django.utils import timezone
 from django_huey import get_queue
 
@@ -168,7 +174,7 @@ class HueyTaskTracker(models.Model):
 
     @classmethod
     def bulk_transition_to_queued_or_running(
-        cls, pk_huey_id_pair_list: list[tuple[int, str]]
+        cls, pk_huey_id_pair_list: list[tuple[int, str]], *, batch_size: int = 500
     ) -> None:
         """Move to the Queued state using locking, or a no-op if we're already Running.
 
@@ -176,12 +182,148 @@ class HueyTaskTracker(models.Model):
         is set as a durable-transaction, so that it must be the outermost atomic
         transaction and ensures that any database changes are committed when it
         runs without errors. See django documentation for more details.
+
+        Rather than one locking query per tracker, each batch of trackers is
+        updated by a single UPDATE statement: the database locks the rows
+        it changes, and the filter on ``STARTING`` keeps this a no-op for
+        any tracker that Huey has already moved to Running.
+
+        Keyword Args:
+            batch_size: how many trackers to update in each statement.
         """
         with transaction.atomic(durable=True):
-            for pk, huey_id in pk_huey_id_pair_list:
-                cls.objects.select_for_update().filter(
-                    pk=pk, status=cls.STARTING
-                ).update(huey_id=huey_id, status=cls.QUEUED)
+            for start in range(0, len(pk_huey_id_pair_list), batch_size):
+                batch = pk_huey_id_pair_list[start : start + batch_size]
+                # Update the parent table directly: pks are shared with
+                # the subclasses and this avoids a join per tracker.
+                HueyTaskTracker.objects.filter(
+                    pk__in=[pk for pk, _ in batch], status=cls.STARTING
+                ).update(
+                    huey_id=Case(
+                        *[
+                            When(
+                                pk=pk,
+                                then=Value(
+                                    uuid.UUID(str(huey_id)),
+                                    output_field=models.UUIDField(),
+                                ),
+                            )
+                            for pk, huey_id in batch
+                        ],
+                        output_field=models.UUIDField(),
+                    ),
+                    status=cls.QUEUED,
+                    last_update=timezone.now(),
+                )
+
+    @classmethod
+    def bulk_transition_to_complete(
+        cls, pk_msg_pair_list: list[tuple[int, str | None]]
+    ) -> int:
+        """Move many trackers from the Running state to the Complete state in one statement.
+
+        A bulk version of :meth:`transition_to_complete`.  Trackers that
+        are not Running are left alone and logged, rather than raising.
+
+        Args:
+            pk_msg_pair_list: pairs of the ID of a tracker and a message to
+                set, or ``None`` to leave the message unchanged.  Use the
+                empty string to blank the message.
+
+        Returns:
+            The number of trackers that were moved to the complete state.
+        """
+        if not pk_msg_pair_list:
+            return 0
+        pks = [pk for pk, _ in pk_msg_pair_list]
+        msgs = [
+            When(pk=pk, then=Value(msg))
+            for pk, msg in pk_msg_pair_list
+            if msg is not None
+        ]
+        changes: dict[str, Any] = {
+            "huey_id": None,
+            "status": cls.COMPLETE,
+            "last_update": timezone.now(),
+        }
+        if msgs:
+            changes["message"] = Case(
+                *msgs, default=F("message"), output_field=models.TextField()
+            )
+        with transaction.atomic():
+            n = HueyTaskTracker.objects.filter(pk__in=pks, status=cls.RUNNING).update(
+                **changes
+            )
+        if n != len(pks):
+            log.warning(
+                "Only %d of %d trackers were Running when moving them to Complete",
+                n,
+                len(pks),
+            )
+        return n
+
+    @classmethod
+    def transition_to_complete_soon(cls, pk: int, *, msg: str | None = None) -> None:
+        """Move to the complete state, batching the database update with others.
+
+        Like :meth:`transition_to_complete`, but the update is queued in a
+        per-process write-behind buffer.  This is flushed in bulk when it is
+        full, or within ``settings.PLOM_TRACKER_FLUSH_SECONDS`` seconds.
+        This is intended for the ends of the many small chores we can have
+        running at once; callers should not rely on seeing the Complete
+        state immediately.  If the flush delay is zero (the default), this
+        is the same as :meth:`transition_to_complete`.
+
+        Buffered completions are lost if the process is killed, or exits
+        without running its ``atexit`` handlers (as Huey's process workers
+        do), leaving those trackers Running.
+
+        Args:
+            pk: the ID of a tracker to transition.
+
+        Keyword Args:
+            msg: set the tracker's message.  If omitted (or ``None``),
+                we won't change it.
+        """
+        if not settings.PLOM_TRACKER_FLUSH_SECONDS:
+            cls.transition_to_complete(pk, msg=msg)
+            return
+        _tracker_completion_buffer.add(pk, msg)
+
+    @classmethod
+    def flush_completions(cls) -> int:
+        """Write any completions queued by :meth:`transition_to_complete_soon` now.
+
+        Returns:
+            The number of trackers that were moved to the complete state.
+        """
+        return _tracker_completion_buffer.flush()
+
+    @classmethod
+    def get_status_summary(cls, *, include_obsolete: bool = False) -> dict[str, int]:
+        """Count the trackers in each state, without loading them all.
+
+        Keyword Args:
+            include_obsolete: whether to count obsolete trackers too.
+
+        Returns:
+            A dict keyed by status display strings, such as "Complete",
+            of how many trackers (of this class) have that status.  All
+            statuses are present, possibly with zero counts.
+        """
+        query = cls.objects.all()
+        if not include_obsolete:
+            query = query.filter(obsolete=False)
+        labels = dict(cls.StatusChoices.choices)
+        summary = {label: 0 for label in labels.values()}
+        for status, count in (
+            query.order_by()
+            .values("status")
+            .annotate(count=Count("pk"))
+            .values_list("status", "count")
+        ):
+            summary[labels[status]] = count
+        return summary
 
     @classmethod
     def transition_to_complete(cls, pk: int, *, msg: str | None = None) -> None:
@@ -249,6 +391,57 @@ class HueyTaskTracker(models.Model):
             cls.objects.select_for_update().filter(pk=pk).update(message=msg)
 
 
+class _TrackerCompletionBuffer:
+    """A write-behind buffer of trackers to move to the Complete state.
+
+    Each process has one of these.  Completions are written in bulk by
+    :meth:`HueyTaskTracker.bulk_transition_to_complete` when enough
+    have accumulated, or by a timer thread shortly after the first one
+    arrives, or (on a best-effort basis) when the process exits.
+    """
+
+    def __init__(self, *, max_items: int = 32) -> None:
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._pending: dict[int, str | None] = {}
+        self._timer: threading.Timer | None = None
+
+    def add(self, pk: int, msg: str | None) -> None:
+        with self._lock:
+            self._pending[pk] = msg
+            full = len(self._pending) >= self.max_items
+            if not full and self._timer is None:
+                self._timer = threading.Timer(
+                    settings.PLOM_TRACKER_FLUSH_SECONDS, self._flush_from_timer
+                )
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write all the pending completions, returning how many trackers changed."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return HueyTaskTracker.bulk_transition_to_complete(list(pending.items()))
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            log.error(f"Failed to write completed trackers: {e}")
+        finally:
+            # the timer thread has its own database connection
+            connections.close_all()
+
+
+_tracker_completion_buffer = _TrackerCompletionBuffer()
+atexit.register(_tracker_completion_buffer.flush)
+
+
 # ---------------------------------
 # Define a singleton model as per
 # https://steelkiwi.com/blog/practical-application-singleton-design-pattern/
@@ -359,6 +552,41 @@ class BaseImage(models.Model):
     width = models.IntegerField(default=0)
 
 
+class BaseImageRendition(models.Model):
+    """A smaller copy of a BaseImage, for clients that don't need full resolution.
+
+    baseimage: the full-size image of which this is a copy.
+    size: which rendition this is, one of the keys of :attr:`SCALES`.
+    image_file: the downscaled image, in the same format as the original,
+        and with the same EXIF orientation data.
+    height, width: the raw size of the downscaled image in px, as in
+        BaseImage.
+    """
+
+    # each rendition is scaled by a factor, or to fit within a bounding box
+    SCALES = {"half": 0.5, "thumb": (256, 256)}
+
+    baseimage = models.ForeignKey(
+        BaseImage, null=False, on_delete=models.CASCADE, related_name="renditions"
+    )
+    size = models.CharField(null=False, max_length=16)
+    image_file = models.ImageField(
+        null=False,
+        upload_to="page_images/renditions/",
+        height_field="height",
+        width_field="width",
+    )
+    height = models.IntegerField(default=0)
+    width = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["baseimage", "size"], name="unique_baseimage_rendition"
+            ),
+        ]
+
+
 # ---------------------------------
 # Define the signal handlers for huey tasks.
 # ---------------------------------
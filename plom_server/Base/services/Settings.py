@@ -10,6 +10,7 @@ from plom.common.tpv_utils import new_magic_code, is_valid_public_code
 from plom.feedback_rules import feedback_rules as static_feedback_rules
 
 from ..models import SettingsModel
+from . import config_cache
 
 # If no value is set in the database, we use defaults recorded here
 default_settings = {
@@ -27,6 +28,10 @@ default_settings = {
 }
 
 
+def _all_settings_in_database() -> dict[str, Any]:
+    return dict(SettingsModel.objects.values_list("key", "value"))
+
+
 def key_value_store_get(key: str) -> Any:
     """Lookup a key to get a value from the key-value store.
 
@@ -43,9 +48,10 @@ def key_value_store_get(key: str) -> Any:
         KeyError: querying an unknown key, that also doesn't have a
             default value.
     """
+    stored = config_cache.get("settings", _all_settings_in_database)
     try:
-        return SettingsModel.objects.get(key=key).value
-    except SettingsModel.DoesNotExist:
+        return stored[key]
+    except KeyError:
         return default_settings[key]
 
 
@@ -78,6 +84,7 @@ def key_value_store_set(key: str, value: Any) -> None:
     obj, created = SettingsModel.objects.get_or_create(key=key)
     obj.value = value
     obj.save()
+    config_cache.invalidate("settings")
 
 
 def key_value_store_reset(key: str) -> None:
@@ -89,6 +96,7 @@ def key_value_store_reset(key: str) -> None:
     obj, created = SettingsModel.objects.get_or_create(key=key)
     obj.value = default_settings[key]
     obj.save()
+    config_cache.invalidate("settings")
 
 
 def get_feedback_rules():
@@ -142,6 +150,8 @@ def get_or_create_new_public_code():
     obj, _created = SettingsModel.objects.get_or_create(
         key="public_code", defaults={"value": new_magic_code()}
     )
+    if _created:
+        config_cache.invalidate("settings")
     return obj.value
 
 
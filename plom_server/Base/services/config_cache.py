@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""Cache rarely-changing configuration, such as the spec and the settings.
+
+Nearly every request reads the assessment specification or some
+settings, which change only a handful of times over an assessment.
+:func:`get` keeps such values in the Django cache (shared by the web
+workers and the Huey consumers, see ``CACHES`` in the settings) until
+code that changes them calls :func:`invalidate`.
+
+Each name has a generation in the cache, which :func:`invalidate`
+replaces, and values are stored under their generation, so a value
+computed from old data while a change commits is never found.  Values
+computed inside a transaction are not stored, as they might come from
+uncommitted data that is later rolled back; and inside a transaction
+that has invalidated a name, its value is always recomputed.
+"""
+
+import threading
+import time
+from typing import Any, Callable
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+# values are dropped after this many seconds even if never invalidated,
+# which bounds the staleness after changes made behind our back (e.g.,
+# in the Django admin)
+TIMEOUT = 3600
+
+_prefix = "plom:config"
+_missing = object()
+_local = threading.local()
+
+
+def _dirty() -> set[str]:
+    # names invalidated in the current transaction of this thread
+    if not hasattr(_local, "dirty"):
+        _local.dirty = set()
+    return _local.dirty
+
+
+def _new_generation(name: str) -> None:
+    cache.set(f"{_prefix}:{name}", time.time_ns(), timeout=None)
+
+
+def _generation(name: str) -> int:
+    cache.add(f"{_prefix}:{name}", time.time_ns(), timeout=None)
+    return cache.get(f"{_prefix}:{name}", 0)
+
+
+def get(name: str, compute: Callable[[], Any]) -> Any:
+    """Return the cached value called ``name``, or compute and cache it.
+
+    Args:
+        name: which value this is.
+        compute: a function of no arguments that reads the value from
+            the database.  Values must be picklable, and callers get
+            their own copy, free to modify it.
+
+    Returns:
+        The value.
+    """
+    in_transaction = connection.in_atomic_block
+    if not in_transaction:
+        _dirty().clear()
+    elif name in _dirty():
+        return compute()
+    key = f"{_prefix}:{name}:{_generation(name)}"
+    value = cache.get(key, _missing)
+    if value is _missing:
+        value = compute()
+        if not in_transaction:
+            cache.set(key, value, timeout=TIMEOUT)
+    return value
+
+
+def invalidate(name: str) -> None:
+    """Note that the value called ``name`` has changed, or is about to.
+
+    Call this from code that writes the underlying data, inside the
+    same transaction (if any) as the write: the value is invalidated
+    now and again when the transaction commits.
+    """
+    _new_generation(name)
+    if connection.in_atomic_block:
+        _dirty().add(name)
+        transaction.on_commit(lambda: _new_generation(name))
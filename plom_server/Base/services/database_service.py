@@ -9,6 +9,7 @@ from pathlib import Path
 import sqlite3
 
 from django.conf import settings
+from django.core.cache import cache
 
 from plom_server import __version__, Plom_DB_Version
 
@@ -142,15 +143,27 @@ def update_last_used_plom_version() -> None:
     Settings.key_value_store_set("database-last-used-by-plom-version", __version__)
 
 
+def _clear_cache() -> None:
+    # The cache can outlive the database (e.g., in files) and holds
+    # copies of its contents, such as the spec and the settings.
+    log.info("Clearing the cache")
+    cache.clear()
+
+
 def drop_database(*, verbose: bool = True) -> None:
-    """Delete the existing database: DESTRUCTIVE!"""
+    """Delete the existing database: DESTRUCTIVE!
+
+    Also clears the cache, which could otherwise keep serving data from
+    the deleted database.
+    """
     engine = settings.DATABASES["default"]["ENGINE"]
     if "postgres" in engine:
-        return _drop_postgres_database()
+        _drop_postgres_database()
     elif "sqlite" in engine:
-        return sqlite_delete_database()
+        sqlite_delete_database()
     else:
         raise NotImplementedError(f'Database engine "{engine}" not implemented')
+    _clear_cache()
 
 
 def _drop_postgres_database(*, verbose: bool = True) -> None:
@@ -191,16 +204,19 @@ def _drop_postgres_database(*, verbose: bool = True) -> None:
 def create_database() -> None:
     """Create a new database.
 
+    Also clears the cache, in case it holds data from an older database.
+
     Raises:
         ValueError: there is already a database.
     """
     engine = settings.DATABASES["default"]["ENGINE"]
     if "postgres" in engine:
-        return _create_postgres_database()
+        _create_postgres_database()
     elif "sqlite" in engine:
-        return _create_sqlite_database()
+        _create_sqlite_database()
     else:
         raise NotImplementedError(f'Database engine "{engine}" not implemented')
+    _clear_cache()
 
 
 def _create_postgres_database(*, verbose: bool = True) -> None:
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""Downscaled copies of page images, served to clients that ask for them.
+
+Each :class:`BaseImage` can have a :class:`BaseImageRendition` for each
+of the sizes in :attr:`BaseImageRendition.SCALES`.  These are made in a
+background chore when a bundle is pushed, or on demand if a client asks
+for one that does not yet exist.
+"""
+
+import io
+import logging
+from pathlib import Path
+from typing import Iterable
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django_huey import db_task
+from PIL import Image as PILImage
+
+from ..models import BaseImage, BaseImageRendition
+
+log = logging.getLogger(__name__)
+
+
+def _render(bimg: BaseImage, size: str) -> BaseImageRendition:
+    """Make a downscaled copy of a base image, without saving the database row."""
+    scale = BaseImageRendition.SCALES[size]
+    with PILImage.open(bimg.image_file.path) as img:
+        fmt = img.format or "PNG"
+        exif = img.info.get("exif")
+        # resample in a mode with enough levels, keeping any colour
+        if img.mode == "1":
+            img = img.convert("L")
+        elif img.mode == "P":
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        if isinstance(scale, tuple):
+            small = img.copy()
+            small.thumbnail(scale, PILImage.Resampling.LANCZOS)
+        else:
+            w, h = img.size
+            small = img.resize(
+                (max(1, round(w * scale)), max(1, round(h * scale))),
+                PILImage.Resampling.LANCZOS,
+            )
+    kwargs = {}
+    if exif:
+        # keep the orientation metadata: clients apply their own rotations on top
+        kwargs["exif"] = exif
+    if fmt == "JPEG":
+        kwargs["quality"] = 85
+    buf = io.BytesIO()
+    small.save(buf, fmt, **kwargs)
+
+    p = Path(bimg.image_file.name)
+    rendition = BaseImageRendition(baseimage=bimg, size=size)
+    rendition.image_file.save(
+        f"{p.stem}_{size}{p.suffix}", ContentFile(buf.getvalue()), save=False
+    )
+    return rendition
+
+
+def _discard_unsaved_files(renditions: list[BaseImageRendition]) -> int:
+    """Delete the files of renditions whose rows were not created.
+
+    When two callers render the same image at once, only one row wins
+    the unique constraint: the other's file would be orphaned.
+
+    Returns:
+        How many files were deleted.
+    """
+    if not renditions:
+        return 0
+    saved = set(
+        BaseImageRendition.objects.filter(
+            baseimage__in={r.baseimage_id for r in renditions}
+        ).values_list("image_file", flat=True)
+    )
+    n = 0
+    for r in renditions:
+        if r.image_file.name not in saved:
+            r.image_file.delete(save=False)
+            n += 1
+    return n
+
+
+def make_renditions(baseimage_pks: Iterable[int]) -> int:
+    """Make any missing renditions of the given base images.
+
+    Args:
+        baseimage_pks: which base images.
+
+    Returns:
+        How many renditions were made.
+    """
+    pks = list(baseimage_pks)
+    have = set(
+        BaseImageRendition.objects.filter(baseimage__in=pks).values_list(
+            "baseimage_id", "size"
+        )
+    )
+    new = []
+    for bimg in BaseImage.objects.filter(pk__in=pks):
+        for size in BaseImageRendition.SCALES:
+            if (bimg.pk, size) in have:
+                continue
+            try:
+                new.append(_render(bimg, size))
+            except (OSError, ValueError) as e:
+                log.warning("Could not make %s rendition of %s: %s", size, bimg, e)
+    BaseImageRendition.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new) - _discard_unsaved_files(new)
+
+
+def get_rendition_file(bimg: BaseImage, size: str) -> File:
+    """Get the file of a rendition of a base image, making it if necessary.
+
+    Args:
+        bimg: the base image.
+        size: one of the keys of :attr:`BaseImageRendition.SCALES`.
+
+    Returns:
+        A Django file object.
+
+    Raises:
+        KeyError: no such size.
+    """
+    if size not in BaseImageRendition.SCALES:
+        raise KeyError(f'No such image size "{size}"')
+    rendition = BaseImageRendition.objects.filter(baseimage=bimg, size=size).first()
+    if rendition is None:
+        with transaction.atomic():
+            rendition = _render(bimg, size)
+            BaseImageRendition.objects.bulk_create([rendition], ignore_conflicts=True)
+        _discard_unsaved_files([rendition])
+        rendition = BaseImageRendition.objects.get(baseimage=bimg, size=size)
+    return rendition.image_file
+
+
+def get_rendition_paths(baseimages: Iterable[BaseImage]) -> list[str]:
+    """The files of all the renditions of some base images, e.g., to unlink them."""
+    return [
+        r.image_file.path
+        for r in BaseImageRendition.objects.filter(baseimage__in=baseimages)
+    ]
+
+
+def queue_make_renditions(baseimage_pks: Iterable[int]) -> None:
+    """Make the renditions of these base images in a background chore."""
+    pks = list(baseimage_pks)
+    if pks:
+        huey_make_renditions(pks)
+
+
+@db_task(queue="chores")
+def huey_make_renditions(baseimage_pks: list[int]) -> None:
+    """Make the renditions of some base images, run as a background Huey chore.
+
+    Args:
+        baseimage_pks: which base images.
+    """
+    n = make_renditions(baseimage_pks)
+    log.info("Made %d renditions of %d page images", n, len(baseimage_pks))
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""A counter that changes whenever marking or ID tasks change, for caching summaries.
+
+Summaries of the tasks (counts by status, statistics of the marks, ...)
+are expensive to compute on large exams and are requested often, e.g.,
+by auto-refreshing dashboards.  Code that changes tasks calls
+:func:`bump`; code that summarizes them can then cache its results
+using :func:`cached`, which keys the cache on the current generation.
+
+The counter lives in the Django cache.  Callers should also fold a
+token derived from the database into their keys (see ``fingerprint``
+in :func:`cached`), so that writes which do not bump the counter, or
+a cache that is not shared between processes, only delay freshness
+by at most the timeout.
+"""
+
+import time
+from typing import Any, Callable
+
+from django.core.cache import cache
+from django.db import transaction
+
+_key = "plom:task_generation"
+
+
+def _incr() -> None:
+    # if the counter is missing, start from the clock so we never reuse
+    # a value that an evicted counter had already handed out.
+    if not cache.add(_key, time.time_ns(), timeout=None):
+        try:
+            cache.incr(_key)
+        except ValueError:
+            cache.add(_key, time.time_ns(), timeout=None)
+
+
+def bump() -> None:
+    """Note that tasks have changed.
+
+    We bump now, so readers in this transaction see the change, and
+    again when the transaction commits (if we are in one), so that a
+    summary computed concurrently from uncommitted data is not kept.
+    """
+    _incr()
+    transaction.on_commit(_incr)
+
+
+def current() -> int:
+    """Return the current generation."""
+    cache.add(_key, time.time_ns(), timeout=None)
+    return cache.get(_key, 0)
+
+
+def cached(
+    name: str, compute: Callable[[], Any], *, fingerprint: Any = "", timeout: int = 60
+) -> Any:
+    """Return a cached value for the current generation, or compute and cache it.
+
+    Args:
+        name: which summary this is, should identify any arguments too.
+        compute: a function of no arguments that computes the value.
+
+    Keyword Args:
+        fingerprint: something cheap to compute from the database that
+            changes when the tasks do, included in the cache key.
+        timeout: how many seconds to keep the value at most.
+
+    Returns:
+        The value.
+    """
+    fingerprint = str(fingerprint).replace(" ", "_")
+    key = f"plom:summary:{name}:{current()}:{fingerprint}"
+    return cache.get_or_set(key, compute, timeout=timeout)
@@ -0,0 +1,32 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from .models import SettingsModel
+from .services import Settings, database_service
+
+
+class DatabaseServiceCacheTests(TransactionTestCase):
+    # not a TestCase: nothing is cached inside a transaction
+    def setUp(self) -> None:
+        Settings.key_value_store_set("public_code", "123456")
+        # now cached
+        self.assertEqual(Settings.get_public_code(), "123456")
+        # as if the database were recreated behind our back
+        SettingsModel.objects.all().delete()
+        self.assertEqual(Settings.get_public_code(), "123456")
+
+    @mock.patch.object(database_service, "sqlite_delete_database")
+    @mock.patch.object(database_service, "_drop_postgres_database")
+    def test_drop_database_clears_cache(self, *mocks) -> None:
+        database_service.drop_database()
+        self.assertIsNone(Settings.get_public_code())
+
+    @mock.patch.object(database_service, "_create_sqlite_database")
+    @mock.patch.object(database_service, "_create_postgres_database")
+    def test_create_database_clears_cache(self, *mocks) -> None:
+        database_service.create_database()
+        self.assertIsNone(Settings.get_public_code())
@@ -7,9 +7,12 @@
 # Copyright (C) 2024 Aden Chan
 # Copyright (C) 2024, 2026 Aidan Murphy
 
+import hashlib
 import logging
+import os
 import pathlib
 import random
+import shutil
 import time
 from tempfile import TemporaryDirectory
 from typing import Any
@@ -24,7 +27,7 @@ from django.db import transaction
 from django.db.models import Q
 from django_huey import db_task, get_queue
 
-from plom.create import make_PDF
+from plom.create import make_PDF, make_base_PDF, version_pattern_key
 
 # TODO: why "staging"? We should talk to the "real" student service
 from plom_server.Preparation.services import (
@@ -35,6 +38,7 @@ from plom_server.Preparation.services import (
 from plom_server.Base.services import Settings
 from plom_server.Papers.services import SpecificationService
 from plom_server.Papers.models import Paper
+from plom_server.Preparation.models import PaperSourcePDF
 from plom_server.Preparation.services import SourceService
 from plom_server.Base.models import HueyTaskTracker
 from plom_server.Preparation.services.preparation_dependency_service import (
@@ -58,6 +62,7 @@ def huey_build_single_paper(
     student_info: dict[str, Any] | None = None,
     prename_config: dict[str, Any],
     qr_code_size: float | int | None = None,
+    base_pdf_dir: pathlib.Path | None = None,
     tracker_pk: int,
     _debug_be_flaky: bool = False,
     task: huey.api.Task | None = None,
@@ -85,6 +90,13 @@ def huey_build_single_paper(
         prename_config: A dict containing keys ``"xcoord"`` and
             ``"ycoord"``, used to position the prenaming box if student_info isn't None.
         qr_code_size: size of the QR codes or ``None`` to use default.
+        base_pdf_dir: if given, a directory of unstamped "base" PDFs,
+            one per pattern of page versions, which are shared by all
+            papers with that pattern.  We make the base for our pattern
+            if no-one has yet, then stamp a copy of it, instead of
+            merging pages from the source versions for each paper.
+            The caller is responsible for using a fresh directory if
+            the source versions change.
         tracker_pk: a key into the database for anyone interested in
             our progress.
         _debug_be_flaky: for debugging, all take a while and some
@@ -100,6 +112,11 @@ def huey_build_single_paper(
     assert task is not None
     HueyTaskTracker.transition_to_running(tracker_pk, task.id)
     with TemporaryDirectory() as tempdir:
+        base_pdf = None
+        if base_pdf_dir is not None:
+            base_pdf = _get_or_make_base_pdf(
+                base_pdf_dir, spec, qvmap_row, source_versions
+            )
         save_path = make_PDF(
             spec,
             papernum,
@@ -111,6 +128,7 @@ def huey_build_single_paper(
             where=pathlib.Path(tempdir),
             source_versions=source_versions,
             qr_code_size=qr_code_size,
+            base_pdf=base_pdf,
         )
         assert save_path is not None
 
@@ -132,10 +150,42 @@ def huey_build_single_paper(
                     _chore.display_filename = save_path.name
                     _chore.save()
 
-    HueyTaskTracker.transition_to_complete(tracker_pk)
+    HueyTaskTracker.transition_to_complete_soon(tracker_pk)
     return True
 
 
+def _get_or_make_base_pdf(
+    base_pdf_dir: pathlib.Path,
+    spec: dict,
+    qvmap_row: dict[int | str, int],
+    source_versions: dict[int, pathlib.Path],
+) -> pathlib.Path:
+    """Find the unstamped base PDF for this pattern of versions, making it if needed.
+
+    Several workers may race to make the same base: each writes to its
+    own temporary file and atomically renames it into place, so the
+    loser just replaces an identical file.
+    """
+    key = hashlib.sha256(version_pattern_key(spec, qvmap_row).encode()).hexdigest()
+    base_pdf = base_pdf_dir / f"base_{key[:16]}.pdf"
+    if base_pdf.exists():
+        return base_pdf
+    base_pdf_dir.mkdir(parents=True, exist_ok=True)
+    tmp = (
+        base_pdf_dir / f"tmp_{key[:16]}_{os.getpid()}_{random.getrandbits(32):08x}.pdf"
+    )
+    try:
+        make_base_PDF(spec, qvmap_row, source_versions, tmp)
+        os.replace(tmp, base_pdf)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return base_pdf
+
+
+def _base_pdf_root() -> pathlib.Path:
+    return settings.MEDIA_ROOT / "papersToPrint" / "base_pdfs"
+
+
 class BuildPapersService:
     """Generate and stamp test-paper PDFs."""
 
@@ -170,6 +220,16 @@ class BuildPapersService:
             .count()
         )
 
+    @staticmethod
+    def get_task_status_summary() -> dict[str, int]:
+        """Count the non-obsolete chores in each state, in a single query.
+
+        Returns:
+            A dict keyed by status display strings, such as "Complete" or
+            "Error", of how many chores have that status.
+        """
+        return BuildPaperPDFChore.get_status_summary()
+
     def get_n_tasks(self) -> int:
         """Get the total number of non-obsolete chores."""
         return BuildPaperPDFChore.objects.filter(obsolete=False).count()
@@ -327,6 +387,18 @@ class BuildPapersService:
         # (I suppose in theory the source versions could change during the lifetime
         # of the chores but Plom presumably prevents changing sources during builds)
 
+        base_pdf_dir = None
+        if settings.PLOM_BUILD_PAPERS_FROM_BASE:
+            # keyed by the source hashes so that new sources get new bases
+            sources_hash = hashlib.sha256(
+                "".join(
+                    PaperSourcePDF.objects.order_by("version").values_list(
+                        "pdf_hash", flat=True
+                    )
+                ).encode()
+            ).hexdigest()
+            base_pdf_dir = _base_pdf_root() / sources_hash[:16]
+
         # for each of the newly created chores, actually ask Huey to run them
         chore_pk_huey_id_list = []
         for chore in chore_list:
@@ -343,6 +415,7 @@ class BuildPapersService:
                 student_info=student_info,
                 prename_config=prename_config,
                 qr_code_size=settings.PLOM_QR_CODE_SIZE,
+                base_pdf_dir=base_pdf_dir,
                 tracker_pk=chore.pk,
                 _debug_be_flaky=False,
             )
@@ -431,6 +504,7 @@ class BuildPapersService:
         with transaction.atomic():
             # bulk set all obsolete and delete associated files
             BuildPaperPDFChore.set_every_task_obsolete(unlink_files=True)
+        shutil.rmtree(_base_pdf_root(), ignore_errors=True)
 
     @transaction.atomic
     def get_all_task_status(self) -> dict[int, str]:
@@ -3,6 +3,8 @@
 # Copyright (C) 2022 Brennen Chiu
 # Copyright (C) 2023-2024 Colin Macdonald
 
+import uuid
+
 from django.test import TestCase
 from model_bakery import baker
 from warnings import catch_warnings, simplefilter
@@ -56,3 +58,87 @@ class BuildPaperPDFTests(TestCase):
 
         n_running = bps.get_n_tasks_started_but_not_complete()
         self.assertEqual(n_running, 3)
+
+    def test_get_task_status_summary(self) -> None:
+        summary = BuildPapersService.get_task_status_summary()
+        self.assertEqual(set(summary.values()), {0})
+        self.make_tasks()
+        baker.make(BuildPaperPDFChore, status=BuildPaperPDFChore.ERROR, obsolete=True)
+        summary = BuildPapersService.get_task_status_summary()
+        self.assertEqual(summary["Complete"], 2)
+        self.assertEqual(summary["Error"], 1)
+        self.assertEqual(summary["To Do"], 0)
+        summary = BuildPaperPDFChore.get_status_summary(include_obsolete=True)
+        self.assertEqual(summary["Error"], 2)
+
+    def test_bulk_transitions(self) -> None:
+        a, b, c = [
+            baker.make(BuildPaperPDFChore, status=BuildPaperPDFChore.STARTING)
+            for _ in range(3)
+        ]
+        c.transition_to_running(c.pk, "00000000-0000-0000-0000-000000000003")
+        BuildPaperPDFChore.bulk_transition_to_queued_or_running(
+            [
+                (a.pk, "00000000-0000-0000-0000-000000000001"),
+                (b.pk, "00000000-0000-0000-0000-000000000002"),
+                (c.pk, "00000000-0000-0000-0000-000000000004"),
+            ],
+            batch_size=2,
+        )
+        for x in (a, b, c):
+            x.refresh_from_db()
+        self.assertEqual(a.status, BuildPaperPDFChore.QUEUED)
+        self.assertEqual(str(b.huey_id), "00000000-0000-0000-0000-000000000002")
+        # stored as a proper UUID, so lookups by huey id (as in the signal
+        # handlers) find it: reading it back would parse either form
+        self.assertEqual(
+            BuildPaperPDFChore.objects.get(
+                huey_id=uuid.UUID("00000000-0000-0000-0000-000000000002")
+            ),
+            b,
+        )
+        # already running: unchanged
+        self.assertEqual(c.status, BuildPaperPDFChore.RUNNING)
+        self.assertEqual(str(c.huey_id), "00000000-0000-0000-0000-000000000003")
+
+        c.message = "old"
+        c.save()
+        n = BuildPaperPDFChore.bulk_transition_to_complete(
+            [(a.pk, "not running"), (c.pk, None)]
+        )
+        self.assertEqual(n, 1)
+        a.refresh_from_db()
+        c.refresh_from_db()
+        self.assertEqual(a.status, BuildPaperPDFChore.QUEUED)
+        self.assertEqual(c.status, BuildPaperPDFChore.COMPLETE)
+        self.assertIsNone(c.huey_id)
+        self.assertEqual(c.message, "old")
+
+    def test_transition_to_complete_soon_is_written_on_flush(self) -> None:
+        x = baker.make(BuildPaperPDFChore, status=BuildPaperPDFChore.RUNNING)
+        with self.settings(PLOM_TRACKER_FLUSH_SECONDS=60):
+            BuildPaperPDFChore.transition_to_complete_soon(x.pk, msg="done")
+            x.refresh_from_db()
+            self.assertEqual(x.status, BuildPaperPDFChore.RUNNING)
+            BuildPaperPDFChore.flush_completions()
+        x.refresh_from_db()
+        self.assertEqual(x.status, BuildPaperPDFChore.COMPLETE)
+        self.assertEqual(x.message, "done")
+
+    def test_transition_to_complete_soon_is_immediate_by_default(self) -> None:
+        x = baker.make(
+            BuildPaperPDFChore, status=BuildPaperPDFChore.RUNNING, message="old"
+        )
+        BuildPaperPDFChore.transition_to_complete_soon(x.pk)
+        x.refresh_from_db()
+        self.assertEqual(x.status, BuildPaperPDFChore.COMPLETE)
+        self.assertEqual(x.message, "old")
+
+    def test_bulk_transition_to_complete_can_blank_message(self) -> None:
+        x = baker.make(
+            BuildPaperPDFChore, status=BuildPaperPDFChore.RUNNING, message="old"
+        )
+        BuildPaperPDFChore.bulk_transition_to_complete([(x.pk, "")])
+        x.refresh_from_db()
+        self.assertEqual(x.status, BuildPaperPDFChore.COMPLETE)
+        self.assertEqual(x.message, "")
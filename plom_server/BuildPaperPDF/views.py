@@ -29,7 +29,9 @@ from plom.common.exceptions import PlomDependencyConflict
 def _task_context_and_status() -> tuple[dict[str, Any], int]:
     db_initialised = PaperInfoService.is_paper_database_populated()
     bps = BuildPapersService()
-    n_complete = bps.get_n_complete_tasks()
+    # one query for all the counts, rather than one per status
+    summary = bps.get_task_status_summary()
+    n_complete = summary["Complete"]
     n_papers = bps.get_n_papers()
     # Note: task_context could be longer if we include obsoletes
     task_context = bps.get_task_context()
@@ -51,12 +53,12 @@ def _task_context_and_status() -> tuple[dict[str, Any], int]:
     if n_complete == n_papers:
         status = 286
 
-    n_running = bps.get_n_tasks_started_but_not_complete()
+    n_running = summary["Starting"] + summary["Queued"] + summary["Running"]
     poll = n_running > 0
 
     d = {
         "tasks": task_context,
-        "pdf_errors": bps.are_there_errors(),
+        "pdf_errors": summary["Error"] > 0,
         "message": msg,
         "zip_enabled": zip_enabled,
         "poll": poll,
@@ -80,7 +80,7 @@ class Command(BaseCommand):
             return
         # now that we have the IDbox rectangle, we can use existing services to
         # extract them
-        id_box_image_dict = IDBoxProcessorService.save_all_id_boxes(
+        id_boxes = IDBoxProcessorService.iter_id_boxes(
             {
                 1: {
                     X: idbox_location_rectangle[X]
@@ -96,12 +96,9 @@ class Command(BaseCommand):
         dir = Path(settings.MEDIA_ROOT / "digit_images")
         dir.mkdir(exist_ok=True)
 
-        for paper_num, id_box_file in id_box_image_dict.items():
-            id_page_file = Path(id_box_file)
+        for paper_num, id_box in id_boxes:
             ID_box: cv.typing.MatLike | None = (
-                IDBoxProcessorService.resize_ID_box_and_extract_digit_strip(
-                    id_page_file
-                )
+                IDBoxProcessorService.resize_ID_box_and_extract_digit_strip(id_box)
             )
             if ID_box is None:
                 self.stdout.write(f"Trouble finding the ID box on paper {paper_num}")
@@ -1,11 +1,12 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # Copyright (C) 2024 Andrew Rechnitzer
 # Copyright (C) 2025 Aden Chan
-# Copyright (C) 2024-2025 Colin B. Macdonald
+# Copyright (C) 2024-2026 Colin B. Macdonald
 
 from django.core.management.base import BaseCommand
 
 from ...services import StudentMarkService
+from ...services.csv_stream import write_csv_file
 
 
 class Command(BaseCommand):
@@ -17,6 +18,5 @@ class Command(BaseCommand):
         pass
 
     def handle(self, *args, **options):
-        csv_as_string = StudentMarkService.build_marks_csv_as_string(True, True, True)
-        with open("marks.csv", "w+") as fh:
-            fh.write(csv_as_string)
+        csv_chunks = StudentMarkService.stream_marks_csv(True, True, True)
+        write_csv_file("marks.csv", csv_chunks)
@@ -1,9 +1,11 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # Copyright (C) 2024 Andrew Rechnitzer
+# Copyright (C) 2026 Colin B. Macdonald
 
 from django.core.management.base import BaseCommand
 
 from ...services import TaMarkingService
+from ...services.csv_stream import write_csv_file
 
 
 class Command(BaseCommand):
@@ -15,6 +17,4 @@ class Command(BaseCommand):
         pass
 
     def handle(self, *args, **options):
-        csv_as_string = TaMarkingService().build_ta_info_csv_as_string()
-        with open("ta_info.csv", "w+") as fh:
-            fh.write(csv_as_string)
+        write_csv_file("ta_info.csv", TaMarkingService().stream_ta_info_csv())
@@ -100,7 +100,7 @@ def pdf_builder(
 
     des = DataExtractionService()
     mts = MarkingTaskService()
-    mpls = MatplotlibService()
+    mpls = MatplotlibService(des)
 
     # info for report
     shortname = SpecificationService.get_shortname()
@@ -1,10 +1,16 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # Copyright (C) 2025 Aden Chan
-import csv
-import io
-from typing import Any
+# Copyright (C) 2026 Colin B. Macdonald
 
+import itertools
+from typing import Any, Iterator
+
+from plom_server.Mark.models import MarkingTask
 from plom_server.Mark.models.annotations import Annotation
+from .csv_stream import stream_csv
+
+# how many annotations to read from the database at once
+_CHUNK_SIZE = 2000
 
 
 class AnnotationDataService:
@@ -36,26 +42,60 @@ class AnnotationDataService:
         Returns:
             List of dictionaries containing the annotation data for each annotation in the database.
         """
-        annotations = Annotation.objects.all()
-        data = []
-
-        annotations = annotations.prefetch_related("rubric_set", "task__paper")
-
-        for annotation in annotations:
-            data.append(
-                {
-                    "score": annotation.score,
-                    "marking_time": annotation.marking_time,
-                    "marking_time_delta": annotation.marking_delta_time,
-                    "task": annotation.task,
-                    "user": annotation.user,
-                    "time_of_last_update": annotation.time_of_last_update,
-                    "rubrics": [rubric.rid for rubric in annotation.rubric_set.all()],
-                    "paper_number": annotation.task.paper.paper_number,
-                }
-            )
+        return list(self._iter_csv_data())
+
+    @staticmethod
+    def _iter_csv_data() -> Iterator[dict[str, Any]]:
+        """Generate the rows of :meth:`build_csv_data`, reading the database in chunks.
 
-        return data
+        Only a chunk of annotations is in memory at once: the annotations
+        are read with a server-side cursor (where the database has them),
+        and the rubrics of each chunk with one more query.
+        """
+        rubric_links = Annotation.rubric_set.through.objects
+        annotations = (
+            Annotation.objects.values_list(
+                "pk",
+                "score",
+                "marking_time",
+                "marking_delta_time",
+                "task__paper__paper_number",
+                "task__question_index",
+                "task__question_version",
+                "task__status",
+                "user__username",
+                "time_of_last_update",
+            )
+            .order_by("pk")
+            .iterator(chunk_size=_CHUNK_SIZE)
+        )
+        while chunk := list(itertools.islice(annotations, _CHUNK_SIZE)):
+            rubrics: dict[int, list[str]] = {}
+            for apk, rid in (
+                rubric_links.filter(annotation_id__in=[row[0] for row in chunk])
+                .order_by("pk")
+                .values_list("annotation_id", "rubric__rid")
+            ):
+                rubrics.setdefault(apk, []).append(rid)
+            for apk, score, t, dt, pn, qidx, ver, status, user, when in chunk:
+                if status is None:
+                    task = None
+                else:
+                    # same as str() of the MarkingTask, without fetching it
+                    task = (
+                        f"MarkingTask (paper {pn}, qidx {qidx}, v{ver}) "
+                        f"{MarkingTask.StatusChoices(status).label}"
+                    )
+                yield {
+                    "score": score,
+                    "marking_time": t,
+                    "marking_time_delta": dt,
+                    "task": task,
+                    "user": user,
+                    "time_of_last_update": when,
+                    "rubrics": rubrics.get(apk, []),
+                    "paper_number": pn,
+                }
 
     def get_csv_data_as_string(self) -> str:
         """Get the csv data as a string.
@@ -63,14 +103,11 @@ class AnnotationDataService:
         Returns:
             The csv data as a string.
         """
-        data = self.build_csv_data()
-        keys = self.get_csv_header()
+        return "".join(self.stream_csv_data())
 
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=keys)
-        writer.writeheader()
+    def stream_csv_data(self) -> Iterator[str]:
+        """Generate the csv data a few rows at a time, e.g., for a streaming response.
 
-        for row in data:
-            writer.writerow(row)
-
-        return output.getvalue()
+        Memory use does not grow with the number of annotations.
+        """
+        return stream_csv(self.get_csv_header(), self._iter_csv_data())
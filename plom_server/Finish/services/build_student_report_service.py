@@ -19,6 +19,7 @@ from plom_server.Papers.services import SpecificationService
 from plom_server.QuestionTags.services import QuestionTagService
 from ..services import StudentMarkService
 from .. import services as _finish_services
+from .student_report_assets import StudentReportAssets
 
 
 def _get_descriptive_statistics_from_score_list(
@@ -52,18 +53,15 @@ def _get_descriptive_statistics_from_score_list(
 
 
 def brief_report_pdf_builder(
-    paper_number: int,
-    total_score_list: list[float],
-    question_score_lists: dict[int, list[float]],
+    paper_number: int, assets: StudentReportAssets
 ) -> dict[str, Any]:
     """Build a Student Report PDF file report and return it as bytes.
 
     Args:
         paper_number: the number of the paper
-        total_score_list: a list of total scores of all completely
-            marked papers.
-        question_score_lists: a dict (keyed by question index) of lists
-            of scores of all marked questions.
+        assets: the score lists of all marked papers and questions,
+            and the plots of their distributions, shared by all the
+            student reports.
 
     Returns:
         A dictionary with the bytes of a PDF file, a suggested
@@ -82,6 +80,8 @@ def brief_report_pdf_builder(
     from weasyprint import HTML, CSS
     from . import MinimalPlotService
 
+    total_score_list = assets.total_score_list
+    question_score_lists = assets.question_score_lists
     paper_info = StudentMarkService.get_paper_id_and_marks(paper_number)
     timestamp = datetime.utcnow()
     timestamp_str = timestamp.strftime("%d/%m/%Y at %H:%M (UTC)")
@@ -95,15 +95,8 @@ def brief_report_pdf_builder(
         "paper_number": paper_number,
         "grade": paper_info["total"],
         "total_stats": _get_descriptive_statistics_from_score_list(total_score_list),
-        "kde_graph": MinimalPlotService.kde_plot_of_total_marks(
-            total_score_list, highlighted_score=paper_info["total"]
-        ),
-        "boxplots": [
-            MinimalPlotService().boxplot_of_grades_on_question(
-                qi, score_list, highlighted_score=paper_info[qi]
-            )
-            for qi, score_list in question_score_lists.items()
-        ],
+        "kde_graph": assets.kde_graph(paper_info["total"]),
+        "boxplots": [assets.boxplot(qi, paper_info[qi]) for qi in question_score_lists],
         "pedagogy_tags": None,
         "pedagogy_tags_graph": None,
     }
@@ -162,18 +155,14 @@ class BuildStudentReportService:
     """Class that contains helper functions for building student report pdf."""
 
     @staticmethod
-    def build_brief_report(
-        paper_number: int,
-        total_score_list: list[float],
-        question_score_lists: dict[int, list[float]],
-    ) -> dict[str, Any]:
+    def build_brief_report(paper_number: int, report_assets_key: str) -> dict[str, Any]:
         """Build brief student report for the given paper number.
 
         Args:
             paper_number: the paper_number to be built a report.
-            total_score_list: list of scores of all marked assessments.
-            question_score_lists: dict, keyed by question index, of
-                lists of scores for each question.
+            report_assets_key: which scores to compare with, as from
+                :func:`store_report_score_lists`.  Plots of these are
+                shared between all the reports.
 
         Returns:
             A dictionary with student report PDF file in bytes.
@@ -183,5 +172,5 @@ class BuildStudentReportService:
         outdir.mkdir(exist_ok=True)
 
         return brief_report_pdf_builder(
-            paper_number, total_score_list, question_score_lists
+            paper_number, StudentReportAssets.load(report_assets_key)
         )
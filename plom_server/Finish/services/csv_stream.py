@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""Write csv files a few rows at a time, for streaming downloads."""
+
+import csv
+from typing import Any, Iterable, Iterator
+
+# how many rows of csv to put in each chunk of text
+ROWS_PER_CHUNK = 500
+
+
+class _Echo:
+    """A pseudo-file whose ``write`` returns the text instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def stream_csv(keys: list[str], rows: Iterable[dict[str, Any]]) -> Iterator[str]:
+    """Generate the text of a csv file, in chunks of several rows.
+
+    Args:
+        keys: the column names, in order.
+        rows: dicts keyed by the column names, other keys are ignored.
+            This can be a generator, in which case memory use does not
+            grow with the number of rows.
+
+    Yields:
+        Strings which together are the csv file, starting with the header.
+    """
+    writer = csv.DictWriter(_Echo(), keys, extrasaction="ignore")
+    chunk = [writer.writeheader()]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def write_csv_file(filename: str, chunks: Iterable[str]) -> None:
+    """Write chunks of csv text (e.g., from :func:`stream_csv`) to a file."""
+    with open(filename, "w", newline="") as fh:
+        for chunk in chunks:
+            fh.write(chunk)
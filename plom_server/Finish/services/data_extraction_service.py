@@ -18,9 +18,10 @@ class DataExtractionService:
     or only use methods that return other data types. See method type hints for more
     details.
 
-    Upon instantiation, the service pulls data from the database. It does not refresh
-    the data, so it is recommended to create a new instance of the service if the
-    data in the database has changed.
+    Upon instantiation, the service pulls data from the database, by way of the
+    shared snapshot in :mod:`.marking_snapshot`, so this is cheap when nothing has
+    changed. It does not refresh the data, so it is recommended to create a new
+    instance of the service if the data in the database has changed.
 
     Pandas dataframes are used to store the data. The original dataframes can be
     accessed using the `get_ta_data` and `get_student_data` methods.
@@ -0,0 +1,220 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""A snapshot of the marks and IDs of all papers, for the spreadsheets and reports.
+
+The marks spreadsheet, the TA spreadsheet, the instructor report and the
+student reports all need the same data: the latest score of every
+completed marking task and the student of every identified paper.
+Rather than each of them querying (and looping over) the tasks, they
+read it from one :class:`MarkingSnapshot`, kept in the Django cache.
+
+The snapshot stores plain tuples, one per completed task, from which
+columns can be taken cheaply, e.g., to build dataframes.  It is
+versioned by the task generation and database fingerprints.  When
+those change, the snapshot is brought up to date by re-reading only
+the tasks whose ``last_update`` is recent; a full rebuild happens if
+the counts do not agree afterwards (e.g., a task was deleted), or
+every :data:`FULL_REBUILD_AFTER` seconds.
+"""
+
+from datetime import timedelta
+from typing import Any
+
+from django.core.cache import cache
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+
+from plom_server.Base.services import task_generation
+from plom_server.Identify.models import PaperIDTask
+from plom_server.Mark.models import MarkingTask
+from plom_server.Mark.services import mark_task
+from plom_server.Papers.services import SpecificationService
+
+# even if the deltas agree, rebuild everything after this many seconds
+FULL_REBUILD_AFTER = 600
+
+# re-read tasks updated this long before the last snapshot, in case
+# their transactions had not yet committed when it was taken
+_SLACK = timedelta(minutes=1)
+
+_key = "plom:finish:marking_snapshot"
+
+
+class MarkingSnapshot:
+    """The marks and IDs of all papers, at some point in time.
+
+    Attributes:
+        version: a string that changes when the data might have.
+        built: when this snapshot was last built from scratch.
+        since: when this snapshot was last brought up to date.
+        marks: a dict keyed by task pk of tuples of :attr:`mark_fields`,
+            for each completed marking task.
+        ids: a dict keyed by task pk of tuples of :attr:`id_fields`,
+            for each completed ID task.
+        unfinished_papers: the paper numbers with some task to do or out.
+    """
+
+    mark_fields = (
+        "task_pk",
+        "paper_number",
+        "question_index",
+        "question_version",
+        "score",
+        "marking_time",
+        "username",
+        "last_update",
+    )
+    id_fields = (
+        "task_pk",
+        "paper_number",
+        "student_id",
+        "student_name",
+        "last_update",
+    )
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        self.built = self.since = timezone.now()
+        self.marks: dict[int, tuple] = {}
+        self.ids: dict[int, tuple] = {}
+        self.unfinished_papers: list[int] = []
+
+    @staticmethod
+    def _read_marks(tasks: QuerySet) -> dict[int, tuple]:
+        return {
+            row[0]: row
+            for row in tasks.filter(status=MarkingTask.COMPLETE).values_list(
+                "pk",
+                "paper__paper_number",
+                "question_index",
+                "question_version",
+                "latest_annotation__score",
+                "latest_annotation__marking_time",
+                "latest_annotation__user__username",
+                "last_update",
+            )
+        }
+
+    @staticmethod
+    def _read_ids(tasks: QuerySet) -> dict[int, tuple]:
+        return {
+            row[0]: row
+            for row in tasks.filter(status=PaperIDTask.COMPLETE).values_list(
+                "pk",
+                "paper__paper_number",
+                "latest_action__student_id",
+                "latest_action__student_name",
+                "last_update",
+            )
+        }
+
+    def _read_unfinished(self) -> None:
+        mark_tasks = MarkingTask.objects.filter(
+            status__in=[MarkingTask.TO_DO, MarkingTask.OUT]
+        )
+        id_tasks = PaperIDTask.objects.filter(
+            status__in=[PaperIDTask.TO_DO, PaperIDTask.OUT]
+        )
+        unfinished = set(
+            mark_tasks.values_list("paper__paper_number", flat=True).distinct()
+        )
+        unfinished.update(
+            id_tasks.values_list("paper__paper_number", flat=True).distinct()
+        )
+        self.unfinished_papers = sorted(unfinished)
+
+    def rebuild(self) -> None:
+        """Read everything from the database."""
+        self.built = self.since = timezone.now()
+        self.marks = self._read_marks(MarkingTask.objects.all())
+        self.ids = self._read_ids(PaperIDTask.objects.all())
+        self._read_unfinished()
+
+    def refresh(self) -> bool:
+        """Re-read only the recently changed tasks from the database.
+
+        Returns:
+            True if the snapshot now agrees with the database, False if
+            it needs a full :meth:`rebuild`.
+        """
+        now = timezone.now()
+        cutoff = self.since - _SLACK
+        for table, model, read in (
+            (self.marks, MarkingTask, self._read_marks),
+            (self.ids, PaperIDTask, self._read_ids),
+        ):
+            changed = model.objects.filter(last_update__gte=cutoff)
+            for pk in changed.values_list("pk", flat=True):
+                table.pop(pk, None)
+            table.update(read(changed))
+        self._read_unfinished()
+        self.since = now
+        n_marks = MarkingTask.objects.filter(status=MarkingTask.COMPLETE).count()
+        n_ids = PaperIDTask.objects.filter(status=PaperIDTask.COMPLETE).count()
+        return len(self.marks) == n_marks and len(self.ids) == n_ids
+
+    def mark_columns(self) -> dict[str, list[Any]]:
+        """The completed marking tasks, as a dict of columns keyed by field name."""
+        rows = sorted(self.marks.values(), key=lambda r: (r[1], r[2]))
+        columns = zip(*rows) if rows else [[] for _ in self.mark_fields]
+        return {k: list(col) for k, col in zip(self.mark_fields, columns)}
+
+    def id_columns(self) -> dict[str, list[Any]]:
+        """The completed ID tasks, as a dict of columns keyed by field name."""
+        rows = sorted(self.ids.values(), key=lambda r: r[1])
+        columns = zip(*rows) if rows else [[] for _ in self.id_fields]
+        return {k: list(col) for k, col in zip(self.id_fields, columns)}
+
+
+def _version() -> str:
+    agg = PaperIDTask.objects.aggregate(n=Max("pk"), t=Max("last_update"))
+    t = agg["t"].timestamp() if agg["t"] else 0
+    return (
+        f"{task_generation.current()}.{mark_task.marking_fingerprint()}"
+        f".{agg['n']}.{t}"
+    )
+
+
+def get_marking_snapshot() -> MarkingSnapshot:
+    """Get an up-to-date snapshot of the marks and IDs of all papers.
+
+    Callers must not modify the snapshot.
+    """
+    version = _version()
+    snap = cache.get(_key)
+    if snap is not None and snap.version == version:
+        return snap
+    too_old = timezone.now() - timedelta(seconds=FULL_REBUILD_AFTER)
+    if snap is None or snap.built < too_old or not snap.refresh():
+        snap = MarkingSnapshot(version)
+        snap.rebuild()
+    snap.version = version
+    cache.set(_key, snap, timeout=None)
+    return snap
+
+
+def build_report_score_lists() -> tuple[list[float], dict[int, list[float]]]:
+    """The scores needed for the statistics in the reports.
+
+    Returns:
+        A pair: the list of total scores of the completely marked papers,
+        and a dict keyed by question index of lists of the scores of that
+        question.  Both are in order of paper number.
+    """
+    question_indices = SpecificationService.get_question_indices()
+    cols = get_marking_snapshot().mark_columns()
+    question_score_lists: dict[int, list[float]] = {qi: [] for qi in question_indices}
+    paper_scores: dict[int, list[float]] = {}
+    for pn, qi, score in zip(
+        cols["paper_number"], cols["question_index"], cols["score"]
+    ):
+        question_score_lists.setdefault(qi, []).append(score)
+        paper_scores.setdefault(pn, []).append(score)
+    # only totals for papers with all questions marked
+    total_score_list = [
+        sum(scores)
+        for scores in paper_scores.values()
+        if len(scores) == len(question_indices)
+    ]
+    return (total_score_list, question_score_lists)
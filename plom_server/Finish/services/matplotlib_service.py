@@ -10,12 +10,17 @@
 
 import base64
 from io import BytesIO
+from typing import Any
 
 import matplotlib
+import matplotlib.axes
+import matplotlib.colors
 import matplotlib.patches
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import PIL.Image
+import PIL.ImageDraw
 import seaborn as sns
 
 from . import DataExtractionService
@@ -23,6 +28,7 @@ from plom_server.Papers.services import SpecificationService
 
 RANGE_BIN_OFFSET = 2
 HIGHLIGHT_COLOR = "orange"
+BOXPLOT_HIGHLIGHT_MARKERSIZE = 16
 _acceptable_formats = ("base64", "bytes")
 
 
@@ -64,13 +70,121 @@ def get_graph_as_base64(bytes: BytesIO) -> str:
     return base64.b64encode(bytes.read()).decode()
 
 
+def get_axes_geometry(ax: matplotlib.axes.Axes) -> dict[str, Any]:
+    """Record where the data coordinates of some axes land in the saved image.
+
+    This lets us draw on a saved plot later without redrawing it, which
+    assumes the axes are linear.
+
+    Args:
+        ax: the axes, whose figure should be saved at its own dpi.
+
+    Returns:
+        A dict of floats, in pixels with the origin at the top-left of
+        the image: ``x0``, ``sx`` so that data x maps to ``x0 + sx * x``,
+        likewise ``y0`` and ``sy`` for y, and ``bbox``, the left, top,
+        right and bottom of the axes.  Also the ``dpi`` and the ``ylim``.
+    """
+    fig = ax.figure
+    # make sure the layout (e.g., from tight_layout) is done
+    fig.canvas.draw()
+    height = fig.bbox.height
+    (x0, y0), (x1, y1) = ax.transData.transform([(0, 0), (1, 1)])
+    bbox = ax.bbox
+    return {
+        "x0": float(x0),
+        "sx": float(x1 - x0),
+        "y0": float(height - y0),
+        "sy": float(y0 - y1),
+        "bbox": [
+            float(bbox.x0),
+            float(height - bbox.y1),
+            float(bbox.x1),
+            float(height - bbox.y0),
+        ],
+        "dpi": float(fig.dpi),
+        "ylim": [float(y) for y in ax.get_ylim()],
+    }
+
+
+def _draw_highlight_on_png(png_bytes: bytes, draw) -> BytesIO:
+    """Composite a highlight, drawn by a function, over a PNG image."""
+    img = PIL.Image.open(BytesIO(png_bytes)).convert("RGBA")
+    overlay = PIL.Image.new("RGBA", img.size, (0, 0, 0, 0))
+    draw(PIL.ImageDraw.Draw(overlay))
+    out = BytesIO()
+    PIL.Image.alpha_composite(img, overlay).save(out, format="png")
+    out.seek(0)
+    return out
+
+
+def _highlight_rgba(alpha: float) -> tuple[int, int, int, int]:
+    r, g, b = matplotlib.colors.to_rgb(HIGHLIGHT_COLOR)
+    return (round(255 * r), round(255 * g), round(255 * b), round(255 * alpha))
+
+
+def highlight_kde_plot(
+    png_bytes: bytes, geometry: dict[str, Any], highlighted_score: float
+) -> BytesIO:
+    """Draw the highlight bar of a student's score onto a saved KDE plot.
+
+    Args:
+        png_bytes: the plot, from :meth:`MinimalPlotService.kde_plot_background_of_total_marks`.
+        geometry: the geometry of its axes, from the same place.
+        highlighted_score: where to draw the bar.
+
+    Returns:
+        The PNG bytes of the highlighted plot.
+    """
+    g = geometry
+    left, top, right, bottom = g["bbox"]
+    # same width as the default of ``plt.bar``
+    x_lo = g["x0"] + g["sx"] * (highlighted_score - 0.4)
+    x_hi = g["x0"] + g["sx"] * (highlighted_score + 0.4)
+    y_lo = min(g["y0"] + g["sy"] * max(0, g["ylim"][0]), bottom)
+
+    def draw(d):
+        d.rectangle(
+            [max(x_lo, left), top, min(x_hi, right), y_lo],
+            fill=_highlight_rgba(0.5),
+        )
+
+    return _draw_highlight_on_png(png_bytes, draw)
+
+
+def highlight_boxplot(
+    png_bytes: bytes, geometry: dict[str, Any], highlighted_score: float
+) -> BytesIO:
+    """Draw the dot of a student's score onto a saved boxplot.
+
+    Args:
+        png_bytes: the plot, from :meth:`MinimalPlotService.boxplot_background_of_grades_on_question`.
+        geometry: the geometry of its axes, from the same place.
+        highlighted_score: where to draw the dot.
+
+    Returns:
+        The PNG bytes of the highlighted plot.
+    """
+    g = geometry
+    x = g["x0"] + g["sx"] * highlighted_score
+    y = g["y0"]
+    # markersize is a diameter in points
+    r = BOXPLOT_HIGHLIGHT_MARKERSIZE / 2 * g["dpi"] / 72
+
+    def draw(d):
+        d.ellipse([x - r, y - r, x + r, y + r], fill=_highlight_rgba(1.0))
+
+    return _draw_highlight_on_png(png_bytes, draw)
+
+
 class MatplotlibService:
     """Service for generating matplotlib plots from data."""
 
     matplotlib.use("Agg")
 
-    def __init__(self):
-        self.des = DataExtractionService()
+    def __init__(self, des: DataExtractionService | None = None):
+        """Get the data for the plots, from the given data service or a new one."""
+        self.des = des if des is not None else DataExtractionService()
 
         self.student_df = self.des._get_student_data()
         self.ta_df = self.des._get_ta_data()
@@ -690,7 +804,25 @@ class MinimalPlotService:
         _ensure_all_figures_closed()
 
     @staticmethod
+    def _kde_plot_axes(total_score_list) -> matplotlib.axes.Axes:
+        """Draw the KDE plot of total marks, without any highlighting, on a new figure."""
+        # note this could be higher than "totalMarks" b/c of bonus questions
+        max_possible_score = SpecificationService.get_assessment_total(
+            include_bonus=True
+        )
+        sns.set_theme()
+        ax = sns.kdeplot(
+            data=np.array(total_score_list),
+            fill=True,
+            clip=(0, max_possible_score),
+        )
+        plt.xlim(0, max_possible_score)
+        plt.ylabel("Proportion of students")
+        return ax
+
+    @classmethod
     def kde_plot_of_total_marks(
+        cls,
         total_score_list,
         *,
         highlighted_score: float | None = None,
@@ -712,23 +844,12 @@ class MinimalPlotService:
         """
         assert format in _acceptable_formats
         _ensure_all_figures_closed()
-        # note this could be higher than "totalMarks" b/c of bonus questions
-        max_possible_score = SpecificationService.get_assessment_total(
-            include_bonus=True
-        )
-        sns.set_theme()
-        sns.kdeplot(
-            data=np.array(total_score_list),
-            fill=True,
-            clip=(0, max_possible_score),
-        )
-        plt.xlim(0, max_possible_score)
+        cls._kde_plot_axes(total_score_list)
         # Overlay the student's score by highlighting the bar
         if highlighted_score is not None:
             # this gives x-coord of bar, we get the y-coord from the ylim of the plot
             plt.bar(highlighted_score, plt.ylim()[1], color=HIGHLIGHT_COLOR, alpha=0.5)
 
-        plt.ylabel("Proportion of students")
         graph_bytes = get_graph_as_BytesIO(plt.gcf())
         _ensure_all_figures_closed()
         if format == "bytes":
@@ -736,6 +857,56 @@ class MinimalPlotService:
         else:
             return get_graph_as_base64(graph_bytes)
 
+    @classmethod
+    def kde_plot_background_of_total_marks(
+        cls, total_score_list
+    ) -> tuple[BytesIO, dict[str, Any]]:
+        """Generate a KDE plot of total marks to be highlighted later.
+
+        Args:
+            total_score_list: list of total scores for all marked assessments
+
+        Returns:
+            A pair of the PNG bytes of the plot and the geometry of its
+            axes, for use with :func:`highlight_kde_plot`.
+        """
+        _ensure_all_figures_closed()
+        ax = cls._kde_plot_axes(total_score_list)
+        geometry = get_axes_geometry(ax)
+        graph_bytes = get_graph_as_BytesIO(ax.figure)
+        _ensure_all_figures_closed()
+        return graph_bytes, geometry
+
+    @staticmethod
+    def _boxplot_axes(question_idx: int, question_score_list) -> matplotlib.axes.Axes:
+        """Draw the boxplot of grades on a question, without any highlighting, on a new figure."""
+        maxmark = SpecificationService.get_question_mark(question_idx)
+        qlabel = SpecificationService.get_question_label(question_idx)
+        fig, ax = plt.subplots(figsize=(6.8, 1.5), tight_layout=True)
+        sns.set_theme()
+
+        sns.boxplot(
+            np.array(question_score_list),
+            orient="h",
+            medianprops={"linewidth": 4, "color": "blue"},
+            boxprops={"alpha": 0.5},
+            # WET - this defines outliers, changes must be reflected in generated report
+            # docs: https://seaborn.pydata.org/generated/seaborn.boxplot.html#seaborn-boxplot
+            # in particular, 1.5 is mentioned explicitly in brief_student_report.html elsewhere
+            whis=1.5,
+            capprops={"linewidth": 4, "color": "red"},
+            widths=[0.25],
+            zorder=2.0,
+        )
+        ax.set_xlabel(f"{qlabel} mark")
+        ax.set_yticks([])
+        # pad the left-right extremes so that things look nice.
+        ax.set_xlim(left=-maxmark * 0.05, right=maxmark * 1.05)
+        for side in ["top", "right", "left"]:
+            ax.spines[side].set_visible(False)
+        ax.set_xticks(range(0, maxmark + 1))
+        return ax
+
     def boxplot_of_grades_on_question(
         self,
         question_idx: int,
@@ -762,44 +933,19 @@ class MinimalPlotService:
         assert format in self.formats
         _ensure_all_figures_closed()
 
-        maxmark = SpecificationService.get_question_mark(question_idx)
-        qlabel = SpecificationService.get_question_label(question_idx)
-        fig, ax = plt.subplots(figsize=(6.8, 1.5), tight_layout=True)
-        sns.set_theme()
-
-        sns.boxplot(
-            np.array(question_score_list),
-            orient="h",
-            medianprops={"linewidth": 4, "color": "blue"},
-            boxprops={"alpha": 0.5},
-            # WET - this defines outliers, changes must be reflected in generated report
-            # docs: https://seaborn.pydata.org/generated/seaborn.boxplot.html#seaborn-boxplot
-            # in particular, 1.5 is mentioned explicitly in brief_student_report.html elsewhere
-            whis=1.5,
-            capprops={"linewidth": 4, "color": "red"},
-            widths=[0.25],
-            zorder=2.0,
-        )
+        ax = self._boxplot_axes(question_idx, question_score_list)
         if highlighted_score:
             # Overlay the student's score by highlighting the bar
             ax.plot(
                 highlighted_score,
                 0,
                 marker="o",
-                markersize=16,
+                markersize=BOXPLOT_HIGHLIGHT_MARKERSIZE,
                 color=HIGHLIGHT_COLOR,
                 zorder=3.0,
             )
 
-        ax.set_xlabel(f"{qlabel} mark")
-        ax.set_yticks([])
-        # pad the left-right extremes so that things look nice.
-        ax.set_xlim(left=-maxmark * 0.05, right=maxmark * 1.05)
-        for side in ["top", "right", "left"]:
-            ax.spines[side].set_visible(False)
-        ax.set_xticks(range(0, maxmark + 1))
-
-        graph_bytes = get_graph_as_BytesIO(fig)
+        graph_bytes = get_graph_as_BytesIO(ax.figure)
         _ensure_all_figures_closed()
 
         if format == "bytes":
@@ -807,6 +953,27 @@ class MinimalPlotService:
         else:
             return get_graph_as_base64(graph_bytes)
 
+    @classmethod
+    def boxplot_background_of_grades_on_question(
+        cls, question_idx: int, question_score_list
+    ) -> tuple[BytesIO, dict[str, Any]]:
+        """Generate a boxplot of the grades on a question to be highlighted later.
+
+        Args:
+            question_idx: The question index number, one-based.
+            question_score_list: List of scores of marked questions of this question index.
+
+        Returns:
+            A pair of the PNG bytes of the plot and the geometry of its
+            axes, for use with :func:`highlight_boxplot`.
+        """
+        _ensure_all_figures_closed()
+        ax = cls._boxplot_axes(question_idx, question_score_list)
+        geometry = get_axes_geometry(ax)
+        graph_bytes = get_graph_as_BytesIO(ax.figure)
+        _ensure_all_figures_closed()
+        return graph_bytes, geometry
+
     def lollipop_of_pedagogy_tags(
         self,
         tag_to_questions,
@@ -31,13 +31,14 @@ from plom_server.Base.models import HueyTaskTracker
 from plom_server.Base.services import Settings
 from plom_server.Identify.models import PaperIDTask
 from plom_server.Mark.models import MarkingTask
-from plom_server.Mark.services import MarkingTaskService, MarkingStatsService
+from plom_server.Mark.services import MarkingTaskService
 from plom_server.Papers.models import Paper, MobilePage, FixedPage
 from plom_server.Papers.services import SpecificationService
 from plom_server.Scan.services import ManageScanService
 
 from ..models import ReassemblePaperChore
 from .student_marks_service import StudentMarkService
+from .marking_snapshot import build_report_score_lists
 
 log = logging.getLogger(__name__)
 
@@ -491,8 +492,7 @@ class ReassembleService:
         paper_num: int,
         *,
         build_student_report: bool = True,
-        total_score_list: None | list[float] = None,
-        question_score_lists: None | dict[int, list[float]] = None,
+        report_assets_key: str | None = None,
     ) -> None:
         """Create and queue a huey task to reassemble the given paper.
 
@@ -503,8 +503,9 @@ class ReassembleService:
 
         Keyword Args:
             build_student_report: Whether or not build the student report along with reassembling the paper.
-            total_score_list: a list of total scores of all completely marked papers.
-            question_score_lists: a dict (keyed by question index) of lists of scores of all marked questions.
+            report_assets_key: the score lists for the student report, as
+                stored by :func:`store_report_score_lists`.  If omitted,
+                we use the current scores.
 
         Raises:
             ValueError: no paper with that number, or existing chore.
@@ -522,11 +523,8 @@ class ReassembleService:
 
         # if build_student_report is true, but we dont have the
         # score_list data, then build it here
-        if build_student_report:
-            if (total_score_list is None) or (question_score_lists is None):
-                total_score_list, question_score_lists = (
-                    MarkingStatsService().build_report_score_lists()
-                )
+        if build_student_report and report_assets_key is None:
+            report_assets_key = self._store_current_report_score_lists()
 
         with transaction.atomic(durable=True):
             if ReassemblePaperChore.objects.filter(
@@ -548,8 +546,7 @@ class ReassembleService:
             paper_num,
             tracker_pk=tracker_pk,
             build_student_report=build_student_report,
-            total_score_list=total_score_list,
-            question_score_lists=question_score_lists,
+            report_assets_key=report_assets_key,
             _debug_be_flaky=False,
         )
         log.info(f"Just enqueued Huey reassembly task id={res.id}")
@@ -694,6 +691,15 @@ class ReassembleService:
                     f"The running task {chore.huey_id} has finished, and returned {r}"
                 )
 
+    @staticmethod
+    def _store_current_report_score_lists() -> str:
+        """Store the current scores for student reports, returning a key to find them."""
+        # avoid circular import
+        from .student_report_assets import store_report_score_lists
+
+        total_score_list, question_score_lists = build_report_score_lists()
+        return store_report_score_lists(total_score_list, question_score_lists)
+
     def reset_all_paper_reassembly(self) -> None:
         """Reset all reassembly chores, including completed ones."""
         # TODO: future work for a waiting version, see WIP below?
@@ -713,6 +719,10 @@ class ReassembleService:
                     raise NotImplementedError(
                         f"waiting on the chore running: {chore.huey_id}"
                     )
+        # all chores are obsolete so no one needs the student report assets
+        from .student_report_assets import clear_report_assets
+
+        clear_report_assets()
 
     def _WIP_reset_all_paper_reassembly(self) -> None:
         """Reset all reassembly chores and remove any associated pdfs.
@@ -783,10 +793,11 @@ class ReassembleService:
         Keyword Args:
             build_student_report: whether or not to build the student reports at same time.
         """
+        # Store the scores once: each task gets just a key to find them, and
+        # the plots of their distributions are shared between the reports.
+        report_assets_key = None
         if build_student_report:
-            total_score_list, question_score_lists = (
-                MarkingStatsService().build_report_score_lists()
-            )
+            report_assets_key = self._store_current_report_score_lists()
 
         # first work out which papers are ready
         for data in self.get_all_paper_status_for_reassembly():
@@ -801,15 +812,11 @@ class ReassembleService:
             if data["reassembled_status"] == "Complete" and not data["outdated"]:
                 # is complete and not outdated
                 continue
-            if build_student_report:
-                self.queue_single_paper_reassembly(
-                    data["paper_num"],
-                    build_student_report=True,
-                    total_score_list=total_score_list,
-                    question_score_lists=question_score_lists,
-                )
-            else:
-                self.queue_single_paper_reassembly(data["paper_num"])
+            self.queue_single_paper_reassembly(
+                data["paper_num"],
+                build_student_report=build_student_report,
+                report_assets_key=report_assets_key,
+            )
 
     def how_many_papers_are_mid_reassembly(self) -> int:
         """Return number of papers that are in the middle of being reassembled."""
@@ -935,8 +942,7 @@ def huey_reassemble_paper(
     *,
     tracker_pk: int,
     build_student_report: bool = True,
-    total_score_list: None | list[float] = None,
-    question_score_lists: None | dict[int, list[float]] = None,
+    report_assets_key: str | None = None,
     _debug_be_flaky: bool = False,
     task: huey.api.Task | None = None,
 ) -> bool:
@@ -949,8 +955,8 @@ def huey_reassemble_paper(
         tracker_pk: a key into the database for anyone interested in
             our progress.
         build_student_report: whether or not to build the student report at the same time.
-        total_score_list: a list of total scores of all completely marked papers.
-        question_score_lists: a dict (keyed by question index) of lists of scores of all marked questions.
+        report_assets_key: which scores the student report compares with,
+            as from :func:`store_report_score_lists`.
         _debug_be_flaky: for debugging, all take a while and some
             percentage will fail.
         task: includes our ID in the Huey process queue.  This kwarg is
@@ -976,10 +982,9 @@ def huey_reassemble_paper(
         if build_student_report:
             from .build_student_report_service import BuildStudentReportService
 
-            assert total_score_list is not None
-            assert question_score_lists is not None
+            assert report_assets_key is not None
             report_data = BuildStudentReportService.build_brief_report(
-                paper_number, total_score_list, question_score_lists
+                paper_number, report_assets_key
             )
             # save the report data to file in tempdir - TODO can we do this all in memory?
             report_path = Path(tempdir) / report_data["filename"]
@@ -1009,5 +1014,5 @@ def huey_reassemble_paper(
                         chore.report_display_filename = report_path.name
                         chore.save()
 
-    HueyTaskTracker.transition_to_complete(tracker_pk)
+    HueyTaskTracker.transition_to_complete_soon(tracker_pk)
     return True
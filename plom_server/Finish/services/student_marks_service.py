@@ -9,10 +9,8 @@
 # Copyright (C) 2025 Aden Chan
 # Copyright (C) 2025 Aidan Murphy
 
-import csv
 import hashlib
-from io import StringIO
-from typing import Any
+from typing import Any, Iterator
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Exists, OuterRef, Count, Q
@@ -25,6 +23,8 @@ from plom_server.Mark.models import MarkingTask
 from plom_server.Papers.models.paper_structure import Paper
 from plom_server.Papers.services import SpecificationService, PaperInfoService
 from plom_server.Scan.services import ManageScanService
+from .csv_stream import stream_csv
+from .marking_snapshot import get_marking_snapshot
 
 
 class StudentMarkService:
@@ -364,8 +364,33 @@ class StudentMarkService:
         Returns:
             The csv in string format.
         """
-        student_marks = cls.get_all_marking_info()
+        return "".join(
+            cls.stream_marks_csv(
+                version_info,
+                timing_info,
+                warning_info,
+                privacy_mode=privacy_mode,
+                privacy_salt=privacy_salt,
+            )
+        )
 
+    @classmethod
+    def stream_marks_csv(
+        cls,
+        version_info: bool,
+        timing_info: bool,
+        warning_info: bool,
+        *,
+        privacy_mode: bool = False,
+        privacy_salt: str = "",
+    ) -> Iterator[str]:
+        """Generate a csv with the marks of all students, a few rows at a time.
+
+        Args and keyword args are as in :meth:`build_marks_csv_as_string`.
+
+        Yields:
+            Chunks of the csv text, for example to pass to a streaming response.
+        """
         keys = cls._get_csv_header(
             version_info=version_info,
             timing_info=timing_info,
@@ -373,22 +398,17 @@ class StudentMarkService:
             include_name=(not privacy_mode),
         )
 
-        # Hash the StudentID if privacy mode is on
-        if privacy_mode:
-            for mark in student_marks:
+        def rows():
+            for mark in cls.get_all_marking_info():
+                # Hash the StudentID if privacy mode is on
                 student_id = mark.get("StudentID", "")
-                if student_id:
+                if privacy_mode and student_id:
                     salted_id = student_id + privacy_salt
                     hashed_id = hashlib.sha256(salted_id.encode()).hexdigest()
                     mark["StudentID"] = hashed_id
+                yield mark
 
-        csv_io = StringIO()
-        w = csv.DictWriter(csv_io, keys, extrasaction="ignore")
-        w.writeheader()
-        w.writerows(student_marks)
-
-        csv_io.seek(0)
-        return csv_io.getvalue()
+        return stream_csv(keys, rows())
 
     @staticmethod
     def get_all_marking_info() -> list[dict[str, Any]]:
@@ -422,16 +442,14 @@ class StudentMarkService:
         csv_row_template.update({f"{q}_mark": None for q in qlabels})
         csv_row_template.update({f"{q}_version": None for q in qlabels})
 
-        # get all completed ID-tasks
-        completed_id_task_info = (
-            PaperIDTask.objects.filter(status=PaperIDTask.COMPLETE)
-            .prefetch_related("paper", "latest_action")
-            .values_list(
-                "paper__paper_number",
-                "latest_action__student_id",
-                "latest_action__student_name",
-                "last_update",
-            )
+        # the completed ID and marking tasks are read from a shared snapshot
+        snapshot = get_marking_snapshot()
+        id_cols = snapshot.id_columns()
+        completed_id_task_info = zip(
+            id_cols["paper_number"],
+            id_cols["student_id"],
+            id_cols["student_name"],
+            id_cols["last_update"],
         )
         # get the id-info for each paper into our dict
         for pn, sid, sname, lu in completed_id_task_info:
@@ -459,16 +477,13 @@ class StudentMarkService:
             return max(A, B)
 
         # get all completed marking tasks
-        completed_marking_task_info = (
-            MarkingTask.objects.filter(status=MarkingTask.COMPLETE)
-            .prefetch_related("paper", "latest_annotation")
-            .values_list(
-                "paper__paper_number",
-                "question_index",
-                "question_version",
-                "latest_annotation__score",
-                "last_update",
-            )
+        mark_cols = snapshot.mark_columns()
+        completed_marking_task_info = zip(
+            mark_cols["paper_number"],
+            mark_cols["question_index"],
+            mark_cols["question_version"],
+            mark_cols["score"],
+            mark_cols["last_update"],
         )
         # now get the marking info for each paper into the dict
         # note that some of these papers might not have been ID'd
@@ -495,22 +510,9 @@ class StudentMarkService:
         # been scanned, but not been ID'd or marked - these also need
         # to go into our marking spreadsheet
         # so get paper-number of any unfinished ID / Marking tasks
-        unfinished_id_tasks = (
-            PaperIDTask.objects.filter(status__in=[PaperIDTask.TO_DO, PaperIDTask.OUT])
-            .prefetch_related("paper")
-            .values_list("paper__paper_number", flat=True)
-        )
-        unfinished_marking_tasks = (
-            MarkingTask.objects.filter(status__in=[MarkingTask.TO_DO, MarkingTask.OUT])
-            .prefetch_related("paper")
-            .values_list("paper__paper_number", flat=True)
-        )
-        # so we iterate over all of these and if we haven't seen
-        # these paper-numbers, we add them to our paper-dictionary
-        unfinished_tasks = list(
-            set(list(unfinished_id_tasks) + list(unfinished_marking_tasks))
-        )
-        for pn in unfinished_tasks:
+        # and if we haven't seen these paper-numbers, we add them to
+        # our paper-dictionary
+        for pn in snapshot.unfinished_papers:
             if pn not in all_papers:
                 all_papers[pn] = csv_row_template.copy()
                 all_papers[pn]["PaperNumber"] = pn
@@ -0,0 +1,178 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""Shared graphics for student reports, rendered once per snapshot of the scores.
+
+Every student report shows the same distributions of total marks and of
+marks on each question: only the highlighted score of the student
+differs.  Here we store the score lists once, render the background
+plots once, and composite the highlight of each student onto them.
+
+Assets are keyed by a hash of the scores and the relevant parts of the
+spec.  Any change to the marks gives a new key, so assets never need to
+be invalidated, only cleaned up, see :func:`clear_report_assets`.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+
+from plom_server.Papers.services import SpecificationService
+from .matplotlib_service import (
+    MinimalPlotService,
+    highlight_boxplot,
+    highlight_kde_plot,
+)
+
+log = logging.getLogger(__name__)
+
+
+def _report_assets_root() -> Path:
+    return settings.MEDIA_ROOT / "student_report" / "assets"
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write a file so that readers never see it partially written."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def store_report_score_lists(
+    total_score_list: list[float], question_score_lists: dict[int, list[float]]
+) -> str:
+    """Store the score lists used by student reports, returning a key to find them.
+
+    Storing the same scores again is cheap and gives the same key.
+
+    Args:
+        total_score_list: a list of total scores of all completely
+            marked papers.
+        question_score_lists: a dict (keyed by question index) of lists
+            of scores of all marked questions.
+
+    Returns:
+        A short string, to be passed to :class:`StudentReportAssets`,
+        for example in the payload of background tasks.
+    """
+    # the plots also depend on the max marks and the labels
+    data = {
+        "total_score_list": total_score_list,
+        "question_score_lists": {str(k): v for k, v in question_score_lists.items()},
+        "total": SpecificationService.get_assessment_total(include_bonus=True),
+        "question_marks": {
+            str(k): v for k, v in SpecificationService.get_questions_max_marks().items()
+        },
+        "question_labels": {
+            str(k): v for k, v in SpecificationService.get_question_labels_map().items()
+        },
+    }
+    blob = json.dumps(data, sort_keys=True).encode()
+    key = hashlib.sha256(blob).hexdigest()[:32]
+    where = _report_assets_root() / key
+    scores_file = where / "scores.json"
+    if not scores_file.exists():
+        where.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(scores_file, blob)
+    return key
+
+
+def clear_report_assets() -> None:
+    """Remove all stored score lists and rendered plots for student reports."""
+    shutil.rmtree(_report_assets_root(), ignore_errors=True)
+    StudentReportAssets.load.cache_clear()
+
+
+class StudentReportAssets:
+    """The score lists and background plots shared by all student reports.
+
+    Use :meth:`load` rather than constructing these directly.  The
+    background plots are rendered on first use and saved, so that other
+    processes can reuse them.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._dir = _report_assets_root() / key
+        with (self._dir / "scores.json").open("r") as f:
+            data = json.load(f)
+        self.total_score_list: list[float] = data["total_score_list"]
+        self.question_score_lists: dict[int, list[float]] = {
+            int(k): v for k, v in data["question_score_lists"].items()
+        }
+        self._plots: dict[str, tuple[bytes, dict[str, Any]]] = {}
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def load(key: str) -> "StudentReportAssets":
+        """Get the assets for a key, reusing them within this process.
+
+        Args:
+            key: as returned by :func:`store_report_score_lists`.
+
+        Raises:
+            FileNotFoundError: no scores stored under this key, perhaps
+                they were cleared.
+        """
+        return StudentReportAssets(key)
+
+    def _get_or_render_plot(self, name: str, render) -> tuple[bytes, dict[str, Any]]:
+        if name in self._plots:
+            return self._plots[name]
+        png_file = self._dir / f"{name}.png"
+        geom_file = self._dir / f"{name}.json"
+        try:
+            plot = (png_file.read_bytes(), json.loads(geom_file.read_text()))
+        except FileNotFoundError:
+            log.info("Rendering %s for student reports %s", name, self.key)
+            png, geometry = render()
+            plot = (png.getvalue(), geometry)
+            # geometry last: its presence means the png is there too
+            _atomic_write_bytes(png_file, plot[0])
+            _atomic_write_bytes(geom_file, json.dumps(geometry).encode())
+        self._plots[name] = plot
+        return plot
+
+    def kde_graph(self, highlighted_score: float | None) -> str:
+        """The KDE plot of total marks highlighting a score, as a base64 string."""
+        png, geometry = self._get_or_render_plot(
+            "kde",
+            lambda: MinimalPlotService.kde_plot_background_of_total_marks(
+                self.total_score_list
+            ),
+        )
+        if highlighted_score is None:
+            return base64.b64encode(png).decode()
+        return base64.b64encode(
+            highlight_kde_plot(png, geometry, highlighted_score).getvalue()
+        ).decode()
+
+    def boxplot(self, question_idx: int, highlighted_score: float | None) -> str:
+        """The boxplot of marks on a question highlighting a score, as a base64 string."""
+        png, geometry = self._get_or_render_plot(
+            f"boxplot_q{question_idx}",
+            lambda: MinimalPlotService.boxplot_background_of_grades_on_question(
+                question_idx, self.question_score_lists[question_idx]
+            ),
+        )
+        # as in MinimalPlotService.boxplot_of_grades_on_question, a zero
+        # score is not highlighted
+        if not highlighted_score:
+            return base64.b64encode(png).decode()
+        return base64.b64encode(
+            highlight_boxplot(png, geometry, highlighted_score).getvalue()
+        ).decode()
@@ -3,12 +3,13 @@
 # Copyright (C) 2023-2024 Andrew Rechnitzer
 # Copyright (C) 2024-2026 Colin B. Macdonald
 
-import csv
-from io import StringIO
+from typing import Any, Iterator
 
 import arrow
 
-from plom_server.Mark.services import MarkingTaskService
+from plom_server.Papers.services import SpecificationService
+from .csv_stream import stream_csv
+from .marking_snapshot import get_marking_snapshot
 
 
 class TaMarkingService:
@@ -43,48 +44,41 @@ class TaMarkingService:
         Raises:
             None expected
         """
-        complete_marking_tasks = (
-            MarkingTaskService()
-            .get_complete_marking_tasks()
-            .prefetch_related("paper", "latest_annotation", "latest_annotation__user")
-            .order_by(
-                "latest_annotation__user__username",
-                "paper__paper_number",
-                "question_index",
-            )
-        )
-        csv_data = []
-        for task in complete_marking_tasks:
-            assert task.latest_annotation.user is not None
-            assert task.latest_annotation._get_annotation_data() is not None
-            csv_data.append(
-                {
-                    "user": task.latest_annotation.user.username,
-                    "paper_number": task.paper.paper_number,
-                    "question_index": task.question_index,
-                    "question_version": task.question_version,
-                    "score_given": task.latest_annotation.score,
-                    # TODO: must be easier way to get this than looking into the blob
-                    "max_score": task.latest_annotation._get_annotation_data()[
-                        "maxMark"
-                    ],
-                    "seconds_spent_marking": task.latest_annotation.marking_time,
-                    "last_update_time": arrow.get(task.last_update).isoformat(
-                        " ", "seconds"
-                    ),
-                }
-            )
+        return list(self._iter_csv_data())
 
-        return csv_data
+    @staticmethod
+    def _iter_csv_data() -> Iterator[dict[str, Any]]:
+        """Generate the rows of :meth:`build_csv_data` one at a time."""
+        max_marks = SpecificationService.get_questions_max_marks()
+        cols = get_marking_snapshot().mark_columns()
+        rows = zip(
+            cols["username"],
+            cols["paper_number"],
+            cols["question_index"],
+            cols["question_version"],
+            cols["score"],
+            cols["marking_time"],
+            cols["last_update"],
+        )
+        for user, pn, qi, ver, score, marking_time, last_update in sorted(
+            rows, key=lambda r: (r[0], r[1], r[2])
+        ):
+            assert user is not None
+            yield {
+                "user": user,
+                "paper_number": pn,
+                "question_index": qi,
+                "question_version": ver,
+                "score_given": score,
+                "max_score": max_marks[qi],
+                "seconds_spent_marking": marking_time,
+                "last_update_time": arrow.get(last_update).isoformat(" ", "seconds"),
+            }
 
     def build_ta_info_csv_as_string(self) -> str:
         """Constructs TA info csv and casts it to a string."""
-        ta_info = self.build_csv_data()
-        keys = self.get_csv_header()
-        csv_io = StringIO()
-        w = csv.DictWriter(csv_io, keys, extrasaction="ignore")
-        w.writeheader()
-        w.writerows(ta_info)
-        csv_io.seek(0)
+        return "".join(self.stream_ta_info_csv())
 
-        return csv_io.getvalue()
+    def stream_ta_info_csv(self) -> Iterator[str]:
+        """Generate the TA info csv a few rows at a time, for streaming responses."""
+        return stream_csv(self.get_csv_header(), self._iter_csv_data())
@@ -0,0 +1,30 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+import csv
+from io import StringIO
+
+from django.test import TestCase
+
+from ..services import csv_stream
+from ..services.csv_stream import stream_csv
+
+
+class CsvStreamTests(TestCase):
+    def test_same_as_dictwriter(self) -> None:
+        keys = ["a", "b"]
+        rows = [{"a": n, "b": f"x,{n}", "c": "ignored"} for n in range(7)]
+        expected = StringIO()
+        w = csv.DictWriter(expected, keys, extrasaction="ignore")
+        w.writeheader()
+        w.writerows(rows)
+        self.assertEqual("".join(stream_csv(keys, rows)), expected.getvalue())
+
+    def test_chunks(self) -> None:
+        rows = ({"a": n} for n in range(2 * csv_stream.ROWS_PER_CHUNK + 1))
+        chunks = list(stream_csv(["a"], rows))
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[0].startswith("a\r\n0\r\n"))
+
+    def test_no_rows(self) -> None:
+        self.assertEqual(list(stream_csv(["a", "b"], [])), ["a,b\r\n"])
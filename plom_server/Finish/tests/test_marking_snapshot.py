@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from plom_server.Identify.models import PaperIDAction, PaperIDTask
+from plom_server.Mark.models import Annotation, MarkingTask
+from ..services.marking_snapshot import get_marking_snapshot
+
+
+class MarkingSnapshotTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = baker.make(User, username="marker0")
+        self.tasks = [
+            baker.make(
+                MarkingTask,
+                status=MarkingTask.TO_DO,
+                question_index=1,
+                question_version=1,
+                paper__paper_number=n,
+            )
+            for n in range(1, 4)
+        ]
+
+    def _mark(self, task: MarkingTask, score: float) -> None:
+        task.latest_annotation = baker.make(
+            Annotation, task=task, score=score, user=self.user, marking_time=10
+        )
+        task.status = MarkingTask.COMPLETE
+        task.save()
+
+    def test_empty(self) -> None:
+        snap = get_marking_snapshot()
+        self.assertEqual(snap.mark_columns()["score"], [])
+        self.assertEqual(snap.id_columns()["student_id"], [])
+        self.assertEqual(snap.unfinished_papers, [1, 2, 3])
+
+    def test_marks_are_columns(self) -> None:
+        self._mark(self.tasks[1], 2)
+        self._mark(self.tasks[0], 3)
+        cols = get_marking_snapshot().mark_columns()
+        self.assertEqual(cols["paper_number"], [1, 2])
+        self.assertEqual(cols["score"], [3, 2])
+        self.assertEqual(cols["username"], ["marker0", "marker0"])
+
+    def test_refreshed_after_changes(self) -> None:
+        self._mark(self.tasks[0], 3)
+        snap = get_marking_snapshot()
+        built = snap.built
+        self._mark(self.tasks[1], 1)
+        self.tasks[0].status = MarkingTask.OUT_OF_DATE
+        self.tasks[0].save()
+        snap = get_marking_snapshot()
+        # an incremental refresh, not a rebuild
+        self.assertEqual(snap.built, built)
+        self.assertEqual(snap.mark_columns()["paper_number"], [2])
+        self.assertEqual(snap.unfinished_papers, [3])
+
+    def test_deleted_task_causes_rebuild(self) -> None:
+        self._mark(self.tasks[0], 3)
+        self._mark(self.tasks[1], 1)
+        get_marking_snapshot()
+        MarkingTask.objects.filter(pk=self.tasks[1].pk).delete()
+        self._mark(self.tasks[2], 2)
+        snap = get_marking_snapshot()
+        self.assertEqual(snap.mark_columns()["paper_number"], [1, 3])
+
+    def test_ids(self) -> None:
+        task = baker.make(PaperIDTask, paper=self.tasks[0].paper)
+        get_marking_snapshot()
+        task.latest_action = baker.make(
+            PaperIDAction, task=task, student_id="12345678", student_name="A"
+        )
+        task.status = PaperIDTask.COMPLETE
+        task.save()
+        cols = get_marking_snapshot().id_columns()
+        self.assertEqual(cols["paper_number"], [1])
+        self.assertEqual(cols["student_id"], ["12345678"])
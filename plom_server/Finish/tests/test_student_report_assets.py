@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+import base64
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from plom_server.TestingSupport.utils import config_test
+from ..services import MinimalPlotService
+from ..services.student_report_assets import (
+    StudentReportAssets,
+    clear_report_assets,
+    store_report_score_lists,
+)
+
+
+def _orange_centroid(png_bytes: bytes) -> tuple[float, float]:
+    a = np.asarray(Image.open(BytesIO(png_bytes)).convert("RGB")).astype(int)
+    mask = (abs(a[..., 0] - 255) < 20) & (abs(a[..., 1] - 165) < 30) & (a[..., 2] < 60)
+    ys, xs = np.nonzero(mask)
+    assert len(xs) > 0, "no highlight found"
+    return xs.mean(), ys.mean()
+
+
+class StudentReportAssetsTests(TestCase):
+    @config_test({"test_spec": "demo"})
+    def setUp(self) -> None:
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        media = override_settings(MEDIA_ROOT=Path(self._tmpdir.name))
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(StudentReportAssets.load.cache_clear)
+        rng = np.random.default_rng(0)
+        self.totals = [float(x) for x in rng.integers(0, 21, 100)]
+        self.q1 = [float(x) for x in rng.integers(0, 6, 100)]
+
+    def test_key_depends_only_on_scores(self) -> None:
+        key = store_report_score_lists(self.totals, {1: self.q1})
+        self.assertEqual(key, store_report_score_lists(self.totals, {1: self.q1}))
+        self.assertNotEqual(
+            key, store_report_score_lists(self.totals[1:], {1: self.q1})
+        )
+        assets = StudentReportAssets.load(key)
+        self.assertEqual(assets.total_score_list, self.totals)
+        self.assertEqual(assets.question_score_lists, {1: self.q1})
+
+    def test_highlighted_boxplot_matches_direct_render(self) -> None:
+        assets = StudentReportAssets.load(
+            store_report_score_lists(self.totals, {1: self.q1})
+        )
+        for score in (1, 4):
+            direct = MinimalPlotService().boxplot_of_grades_on_question(
+                1, self.q1, highlighted_score=score, format="bytes"
+            )
+            composited = base64.b64decode(assets.boxplot(1, score))
+            x1, _ = _orange_centroid(direct.getvalue())
+            x2, _ = _orange_centroid(composited)
+            self.assertAlmostEqual(x1, x2, delta=2)
+
+    def test_kde_graph_is_png(self) -> None:
+        assets = StudentReportAssets.load(
+            store_report_score_lists(self.totals, {1: self.q1})
+        )
+        png = base64.b64decode(assets.kde_graph(7))
+        self.assertEqual(Image.open(BytesIO(png)).format, "PNG")
+
+    def test_clear(self) -> None:
+        key = store_report_score_lists(self.totals, {1: self.q1})
+        StudentReportAssets.load(key)
+        clear_report_assets()
+        with self.assertRaises(FileNotFoundError):
+            StudentReportAssets.load(key)
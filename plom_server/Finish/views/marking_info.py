@@ -1,14 +1,14 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # Copyright (C) 2023 Julian Lapenna
 # Copyright (C) 2023 Divy Patel
-# Copyright (C) 2023-2025 Colin B. Macdonald
+# Copyright (C) 2023-2026 Colin B. Macdonald
 # Copyright (C) 2023 Edith Coates
 # Copyright (C) 2024 Andrew Rechnitzer
 # Copyright (C) 2025 Aden Chan
 
 import arrow
 
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, StreamingHttpResponse
 
 from plom_server.Base.base_group_views import ManagerRequiredView
 from plom_server.Papers.services import SpecificationService
@@ -18,14 +18,14 @@ from ..services import StudentMarkService, TaMarkingService, AnnotationDataServi
 class MarksDownloadView(ManagerRequiredView):
     """View to download marks."""
 
-    def post(self, request: HttpRequest) -> HttpResponse:
+    def post(self, request: HttpRequest) -> StreamingHttpResponse:
         """Download marks as a csv file."""
         version_info = request.POST.get("version_info", "off") == "on"
         timing_info = request.POST.get("timing_info", "off") == "on"
         warning_info = request.POST.get("warning_info", "off") == "on"
         privacy_mode = request.POST.get("privacy_mode", "off") == "on"
         privacy_salt = request.POST.get("privacy_mode_salt", "")
-        csv_as_string = StudentMarkService.build_marks_csv_as_string(
+        csv_chunks = StudentMarkService.stream_marks_csv(
             version_info,
             timing_info,
             warning_info,
@@ -42,7 +42,7 @@ class MarksDownloadView(ManagerRequiredView):
             + ".csv"
         )
 
-        response = HttpResponse(csv_as_string, content_type="text/csv")
+        response = StreamingHttpResponse(csv_chunks, content_type="text/csv")
         response["Content-Disposition"] = "attachment; filename={filename}".format(
             filename=filename
         )
@@ -53,10 +53,10 @@ class MarksDownloadView(ManagerRequiredView):
 class TAInfoDownloadView(ManagerRequiredView):
     """View to download TA info."""
 
-    def post(self, request: HttpRequest) -> HttpResponse:
+    def post(self, request: HttpRequest) -> StreamingHttpResponse:
         """Download TA marking information as a csv file."""
         tms = TaMarkingService()
-        csv_as_string = tms.build_ta_info_csv_as_string()
+        csv_chunks = tms.stream_ta_info_csv()
 
         filename = (
             "TA--"
@@ -67,7 +67,7 @@ class TAInfoDownloadView(ManagerRequiredView):
             + ".csv"
         )
 
-        response = HttpResponse(csv_as_string, content_type="text/csv")
+        response = StreamingHttpResponse(csv_chunks, content_type="text/csv")
         response["Content-Disposition"] = "attachment; filename={filename}".format(
             filename=filename
         )
@@ -78,10 +78,10 @@ class TAInfoDownloadView(ManagerRequiredView):
 class AnnotationsInfoDownloadView(ManagerRequiredView):
     """View to download Annotation info."""
 
-    def post(self, request: HttpRequest) -> HttpResponse:
+    def post(self, request: HttpRequest) -> StreamingHttpResponse:
         """Download annotation information as a csv file."""
         ads = AnnotationDataService()
-        csv_as_string = ads.get_csv_data_as_string()
+        csv_chunks = ads.stream_csv_data()
 
         filename = (
             "annotations--"
@@ -92,7 +92,7 @@ class AnnotationsInfoDownloadView(ManagerRequiredView):
             + ".csv"
         )
 
-        response = HttpResponse(csv_as_string, content_type="text/csv")
+        response = StreamingHttpResponse(csv_chunks, content_type="text/csv")
         response["Content-Disposition"] = "attachment; filename={filename}".format(
             filename=filename
         )
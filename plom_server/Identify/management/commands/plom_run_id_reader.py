@@ -32,13 +32,20 @@ class Command(BaseCommand):
         self.stdout.write(f"Found id box rectangle at = {initial_rectangle}")
         return initial_rectangle
 
-    def run_the_reader(self, user_obj, rectangle: dict[str, float]) -> None:
+    def run_the_reader(
+        self,
+        user_obj,
+        rectangle: dict[str, float],
+        *,
+        lap_candidates: int | None = None,
+    ) -> None:
         try:
             self.stdout.write("Running the ID reader")
             IDReaderService.run_id_reader_in_background_via_huey(
                 user_obj,
                 {1: rectangle},
                 recompute_heatmap=True,
+                lap_candidates_per_paper=lap_candidates,
             )
         except MultipleObjectsReturned:
             raise CommandError("The ID reader is already running.")
@@ -78,6 +85,16 @@ class Command(BaseCommand):
             "--rectangle", action="store_true", help="Just get the ID-box rectangle"
         )
         parser.add_argument("--run", action="store_true", help="Run the ID-reader")
+        parser.add_argument(
+            "--lap-candidates",
+            type=int,
+            metavar="N",
+            help="""
+                With --run, only consider the N most likely students for
+                each paper when solving the assignment problem: faster on
+                large courses.  By default, consider every student.
+            """,
+        )
         parser.add_argument(
             "--delete", action="store_true", help="Delete any predictions"
         )
@@ -100,8 +117,12 @@ class Command(BaseCommand):
         if kwargs["rectangle"]:
             the_id_box_rectangle = self.get_the_rectangle()
         elif kwargs["run"]:
+            if kwargs["lap_candidates"] is not None and kwargs["lap_candidates"] < 1:
+                raise CommandError("--lap-candidates must be at least 1")
             the_id_box_rectangle = self.get_the_rectangle()
-            self.run_the_reader(user_obj, the_id_box_rectangle)
+            self.run_the_reader(
+                user_obj, the_id_box_rectangle, lap_candidates=kwargs["lap_candidates"]
+            )
         elif kwargs["list"]:
             self.list_predictions()
         elif kwargs["wait"]:
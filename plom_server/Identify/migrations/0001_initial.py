@@ -157,6 +157,11 @@ class Migration(migrations.Migration):
                     ),
                 ),
             ],
+            options={
+                "indexes": [
+                    models.Index(fields=["last_update"], name="id_task_last_update_idx")
+                ],
+            },
         ),
         migrations.AddField(
             model_name="paperidaction",
@@ -9,6 +9,7 @@ from django.db import models
 from django.utils import timezone
 
 from plom_server.Base.models import HueyTaskTracker
+from plom_server.Base.services import task_generation
 from plom_server.Papers.models import Paper
 
 
@@ -63,6 +64,17 @@ class PaperIDTask(models.Model):
     )
     last_update = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # for cheaply detecting changes, see ProgressOverviewService
+            models.Index(fields=["last_update"], name="id_task_last_update_idx"),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        """Save the task, and note that tasks have changed for cached summaries."""
+        super().save(*args, **kwargs)
+        task_generation.bump()
+
 
 class PaperIDAction(models.Model):
     """Represents an identification of a test-paper.
@@ -10,14 +10,17 @@
 
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
 
 import cv2 as cv
 
 # import cv2.typing - problems importing this - see MR 3050.
 import numpy as np
 from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
 
 import onnxruntime  # type: ignore
 
@@ -322,11 +325,14 @@ class IDReaderService:
         box_versions: dict[int, dict[str, float] | None],
         *,
         recompute_heatmap: bool = True,
+        lap_candidates_per_paper: int | None = None,
     ):
         """Some debugging code, currently uncalled.  Deprecated?"""
-        id_box_image_dict = IDBoxProcessorService.save_all_id_boxes(box_versions)
         IDBoxProcessorService.compute_id_predictions(
-            user, id_box_image_dict, recompute_heatmap=recompute_heatmap
+            user,
+            IDBoxProcessorService.iter_id_boxes(box_versions),
+            recompute_heatmap=recompute_heatmap,
+            lap_candidates_per_paper=lap_candidates_per_paper,
         )
 
     @staticmethod
@@ -344,9 +350,15 @@ class IDReaderService:
         user: User,
         box_versions: dict[int, dict[str, float] | None],
         recompute_heatmap: bool | None = True,
+        *,
+        lap_candidates_per_paper: int | None = None,
     ):
         """Run the ID reading process in the background.
 
+        Keyword Args:
+            lap_candidates_per_paper: passed to the LAP solver, see
+                :meth:`IDBoxProcessorService.run_lap_solver`.
+
         Raises:
             MultipleObjectsReturned: if the user tries to run multiple such tasks.
         """
@@ -385,6 +397,7 @@ class IDReaderService:
             user,
             box_versions,
             recompute_heatmap=recompute_heatmap,
+            lap_candidates_per_paper=lap_candidates_per_paper,
             tracker_pk=tracker_pk,
         )
         # and update the status
@@ -398,6 +411,7 @@ def huey_id_reading_task(
     box_versions: dict[int, tuple[float, float, float, float] | None],
     recompute_heatmap: bool,
     *,
+    lap_candidates_per_paper: int | None = None,
     tracker_pk: int,
     task: huey.api.Task | None = None,
 ) -> bool:
@@ -412,6 +426,8 @@ def huey_id_reading_task(
         recompute_heatmap: whether or not to recompute the digit probability heatmap.
 
     Keyword Args:
+        lap_candidates_per_paper: passed to the LAP solver, see
+            :meth:`IDBoxProcessorService.run_lap_solver`.
         tracker_pk: a key into the database for anyone interested in
             our progress.
         task: includes our ID in the Huey process queue.  This kwarg is
@@ -427,22 +443,33 @@ def huey_id_reading_task(
         tracker_pk, task.id, msg="ID Reading task has started. Getting ID boxes."
     )
 
-    id_box_image_dict = IDBoxProcessorService.save_all_id_boxes(box_versions)
-    # check if we got any ID boxes (eg no scanned papers, or all prenamed)
-    if len(id_box_image_dict) == 0:
-        HueyTaskTracker.transition_to_complete(
-            tracker_pk, msg="No ID-boxes found. Cannot make predictions."
+    if recompute_heatmap:
+        # the ID boxes are extracted lazily, straight into digit recognition
+        probabilities = IDBoxProcessorService.compute_and_save_probability_heatmap(
+            IDBoxProcessorService.iter_id_boxes(box_versions)
+        )
+        # check if we got any ID boxes (eg no scanned papers, or all prenamed)
+        if len(probabilities) == 0:
+            HueyTaskTracker.transition_to_complete(
+                tracker_pk, msg="No ID-boxes found. Cannot make predictions."
+            )
+            return True
+        HueyTaskTracker.set_message(
+            tracker_pk, "Digits in ID boxes read. Computing predictions."
         )
-        return True
-
-    HueyTaskTracker.set_message(
-        tracker_pk, "ID boxes from page images saved. Computing predictions."
-    )
 
     try:
-        IDBoxProcessorService.compute_id_predictions(
-            user, id_box_image_dict, recompute_heatmap=recompute_heatmap
-        )
+        if recompute_heatmap:
+            IDBoxProcessorService.predict_from_probabilities(
+                user, probabilities, lap_candidates_per_paper=lap_candidates_per_paper
+            )
+        else:
+            IDBoxProcessorService.compute_id_predictions(
+                user,
+                {},
+                recompute_heatmap=False,
+                lap_candidates_per_paper=lap_candidates_per_paper,
+            )
     except ValueError as e:
         HueyTaskTracker.transition_chore_to_error(
             tracker_pk, f"Did you upload a classlist?  {e}"
@@ -460,14 +487,13 @@ class IDBoxProcessorService:
     """Service for dealing with the ID box and processing it into ID predictions."""
 
     @staticmethod
-    @transaction.atomic
-    def save_all_id_boxes(
+    def iter_id_boxes(
         box_versions: dict[int, dict[str, float] | None],
         *,
         exclude_prenamed_papers: bool = True,
         save_dir: Path | None = None,
-    ) -> dict[int, Path]:
-        """Extract the id box, or really any rectangular part of the id page.
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """Extract the id box, or really any rectangular part of the id page, one paper at a time.
 
         Notice that this code makes use of the general 'extract a rectangle' code
         and so uses qr-code positions to rotate and find the given rectangle.
@@ -480,16 +506,17 @@ class IDBoxProcessorService:
         Keyword Args:
             exclude_prenamed_papers: by default we don't extract the id
                 box from prenamed papers.
-            save_dir: what directory to save to, or a default if omitted.
+            save_dir: if given, also save each ID box as a png file in
+                this directory, as a side effect.
 
-        Returns:
-            dict: a dict of paper_number -> ID box path and filename (temporary)
+        Yields:
+            Pairs of paper number and the ID box image as an OpenCV-style
+            (BGR) array.  Papers where the box cannot be extracted are
+            skipped.
         """
-        if not save_dir:
-            id_box_folder = settings.MEDIA_ROOT / "id_box_images"
-        else:
-            id_box_folder = Path(save_dir)
-        id_box_folder.mkdir(exist_ok=True, parents=True)
+        if save_dir:
+            save_dir = Path(save_dir)
+            save_dir.mkdir(exist_ok=True, parents=True)
         # get the ID page-number and the papers which have it scanned.
         id_page_number = SpecificationService.get_id_page_number()
         # but exclude any prenamed papers
@@ -498,7 +525,6 @@ class IDBoxProcessorService:
         else:
             exclude_papers = []
         # Note this gets all id pages regardless of version
-        img_file_dict = {}
         for v, box_as_dict in box_versions.items():
             # do each id page version separately
             if box_as_dict is None:
@@ -517,33 +543,72 @@ class IDBoxProcessorService:
                 )
                 if pn not in exclude_papers
             ]
-            # use the rectangle extractor to then get all the rectangles from those pages and save them
+            # use the rectangle extractor to then get all the rectangles from those pages;
+            # it just leaves out those where it cannot compute appropriate transforms
             rex = RectangleExtractor(v, id_page_number)
-            for pn in paper_numbers:
-                id_box_filename = id_box_folder / f"id_box_{pn:04}.png"
-                try:
-                    id_box_bytes = rex.extract_rect_region(pn, *box)
-                except ValueError:
-                    # just leave them out when rex cannot compute appropriate transforms
-                    continue
-                id_box_filename.write_bytes(id_box_bytes)
-                img_file_dict[pn] = id_box_filename
-
-        return img_file_dict
+            for pn, id_box in rex.iter_rect_region_arrays(paper_numbers, *box):
+                if save_dir:
+                    cv.imwrite(str(save_dir / f"id_box_{pn:04}.png"), id_box)
+                yield pn, id_box
+
+    @classmethod
+    @transaction.atomic
+    def save_all_id_boxes(
+        cls,
+        box_versions: dict[int, dict[str, float] | None],
+        *,
+        exclude_prenamed_papers: bool = True,
+        save_dir: Path | None = None,
+    ) -> dict[int, Path]:
+        """Extract the id box, or really any rectangular part of the id page, saving them to files.
+
+        If you only need the images, :meth:`iter_id_boxes` avoids writing
+        and reading back all these files.
+
+        Args:
+            box_versions: A dict keyed by version of dict giving coords
+                of the box to extract. Dict of coords has keys 'left_f', 'right_f',
+                'top_f', 'bottom_f', with float values.
+
+        Keyword Args:
+            exclude_prenamed_papers: by default we don't extract the id
+                box from prenamed papers.
+            save_dir: what directory to save to, or a default if omitted.
+
+        Returns:
+            dict: a dict of paper_number -> ID box path and filename (temporary)
+        """
+        if not save_dir:
+            id_box_folder = settings.MEDIA_ROOT / "id_box_images"
+        else:
+            id_box_folder = Path(save_dir)
+        return {
+            pn: id_box_folder / f"id_box_{pn:04}.png"
+            for pn, _ in cls.iter_id_boxes(
+                box_versions,
+                exclude_prenamed_papers=exclude_prenamed_papers,
+                save_dir=id_box_folder,
+            )
+        }
 
     # problem with cv2.typing - see MR 3050.
     # comment out the cv2.typing.MatLike hint here.
     # TODO - fix the cv2.typing issue in dev sometime.
     @staticmethod
-    def resize_ID_box_and_extract_digit_strip(id_box_file: Path):
+    def resize_ID_box_and_extract_digit_strip(id_box_file: Path | np.ndarray):
         # ) -> cv2.typing.MatLike | None:
-        """Extract the strip of digits from the ID box from the given image file."""
+        """Extract the strip of digits from the ID box from the given image file or array."""
         # WARNING: contains many magic numbers - must be updated if the IDBox
         # template is changed.
         template_id_box_width = 1250
-        # read the given file into an np.array.
-        id_box = cv.imread(str(id_box_file))
-        assert id_box is not None, f"Unexpectedly could not read id box {id_box_file}"
+        if isinstance(id_box_file, np.ndarray):
+            id_box = id_box_file
+        else:
+            # read the given file into an np.array.
+            id_box = cv.imread(str(id_box_file))
+            assert (
+                id_box is not None
+            ), f"Unexpectedly could not read id box {id_box_file}"
         assert len(id_box.shape) in (2, 3), f"Unexpected numpy shape {id_box.shape}"
         # third entry 1 (grayscale) or 3 (colour)
         height: int = id_box.shape[0]
@@ -658,6 +723,93 @@ class IDBoxProcessorService:
             processed_digits_images_list.append(bordered_image)
         return processed_digits_images_list
 
+    @classmethod
+    def _get_digit_images_from_id_box(
+        cls,
+        id_box: Path | np.ndarray,
+        num_digits: int,
+        *,
+        debugdir: Path | None = None,
+        debug_name: str | None = None,
+    ) -> list:
+        """Return the preprocessed digit images from an ID box image.
+
+        Args:
+            id_box: File path for the image of the ID box, or the image
+                itself as an OpenCV-style array.
+            num_digits: Number of digits in the student ID.
+
+        Keyword Args:
+            debugdir: if given, output the trimmed images into this directory.
+            debug_name: used in the names of the debug images, defaults
+                to the stem of the filename.
+
+        Returns:
+            A list of 28 by 28 images for each digit, as from
+            :meth:`get_digit_images`.  In case of errors, returns an empty list.
+        """
+        if debug_name is None and not isinstance(id_box, np.ndarray):
+            debug_name = Path(id_box).stem
+        # TODO - sort out cv.typing
+        # ID_box: cv.typing.MatLike | None = cls.resize_ID_box_and_extract_digit_strip(
+        #     id_box
+        # )
+        ID_box = cls.resize_ID_box_and_extract_digit_strip(id_box)
+        if ID_box is None:
+            return []
+        if debugdir:
+            p = debugdir / f"idbox_{debug_name}.png"
+            cv.imwrite(str(p), ID_box)
+        processed_digits_images = cls.get_digit_images(ID_box, num_digits)
+        if debugdir:
+            for n, digit_image in enumerate(processed_digits_images):
+                p = debugdir / f"digit_{debug_name}-pos{n}.png"
+                cv.imwrite(str(p), digit_image)
+        return processed_digits_images
+
+    @staticmethod
+    def _run_digit_model(
+        prediction_model: tuple["onnxruntime.InferenceSession", str],
+        digit_images: np.ndarray,
+        *,
+        batch_size: int = 1024,
+    ) -> np.ndarray:
+        """Run the prediction model on a stack of digit images, in batches.
+
+        Args:
+            prediction_model: PyTorch CNN Prediction model (ONNX).
+            digit_images: an ``(N, 28, 28)`` array of 8-bit digit images.
+
+        Keyword Args:
+            batch_size: how many images to pass to the model at once.
+                Ignored if the model has a fixed batch size.
+
+        Returns:
+            An ``(N, 11)`` array: for each image the probability that it
+            is a 0, 1, 2, ..., 9, blank.
+        """
+        model, device = prediction_model
+        model_input = model.get_inputs()[0]
+        input_name = model_input.name
+        output_name = model.get_outputs()[0].name
+        # model was exported with a fixed batch size, not a symbolic one
+        fixed_size = isinstance(model_input.shape[0], int)
+        if fixed_size:
+            batch_size = model_input.shape[0]
+        # get it into format needed by model predictor
+        x = (digit_images.astype(np.float32) / 255.0)[:, None, :, :]
+        probs = []
+        for start in range(0, len(x), batch_size):
+            batch = x[start : start + batch_size]
+            n = len(batch)
+            if fixed_size and n < batch_size:
+                # pad the last batch with blank images, dropping their results
+                padding = np.zeros((batch_size - n, *batch.shape[1:]), batch.dtype)
+                batch = np.concatenate([batch, padding])
+            logits = model.run([output_name], {input_name: batch})[0][:n]
+            probs.append(_np_softmax(logits, axis=1))
+        return np.concatenate(probs)
+
     @classmethod
     def get_digit_probabilities(
         cls,
@@ -665,7 +817,7 @@ class IDBoxProcessorService:
         id_box_file: Path,
         num_digits: int,
         *,
-        debug: bool = True,
+        debug: bool = False,
     ) -> list[list[float]]:
         """Return a list of probability predictions for the student ID digits on the cropped image.
 
@@ -683,80 +835,114 @@ class IDBoxProcessorService:
             that the digit is a 0, 1, 2, ..., 9, blank.
             In case of errors it returns an empty list
         """
-        model, device = prediction_model
-
         debugdir = None
-        id_page_file = Path(id_box_file)
-        # TODO - sort out cv.typing
-        # ID_box: cv.typing.MatLike | None = cls.resize_ID_box_and_extract_digit_strip(
-        #     id_page_file
-        # )
-        ID_box = cls.resize_ID_box_and_extract_digit_strip(id_page_file)
-        if ID_box is None:
-            return []
         if debug:
             debugdir = Path(settings.MEDIA_ROOT / "debug_id_reader")
             debugdir.mkdir(exist_ok=True)
-            p = debugdir / f"idbox_{id_page_file.stem}.png"
-            cv.imwrite(str(p), ID_box)
-        processed_digits_images = cls.get_digit_images(ID_box, num_digits)
+        processed_digits_images = cls._get_digit_images_from_id_box(
+            id_box_file, num_digits, debugdir=debugdir
+        )
         if len(processed_digits_images) == 0:
             # TODO - put in warning
             # self.stdout.write("Trouble finding digits inside the ID box")
             return []
-        if debugdir:
-            for n, digit_image in enumerate(processed_digits_images):
-                p = debugdir / f"digit_{id_page_file.stem}-pos{n}.png"
-                cv.imwrite(str(p), digit_image)
-        prob_lists = []
-        input_name = model.get_inputs()[0].name
-        output_name = model.get_outputs()[0].name
-        for digit_image in processed_digits_images:
-            # get it into format needed by model predictor
-            x = (digit_image.astype(np.float32) / 255.0)[None, None, :, :]
-            logits = model.run([output_name], {input_name: x})[0]
-            probs = _np_softmax(logits, axis=1)[0].tolist()
-            prob_lists.append(probs)
-
-        return prob_lists
+        return cls._run_digit_model(
+            prediction_model, np.stack(processed_digits_images)
+        ).tolist()
 
     @classmethod
     def _compute_probability_heatmap_for_idbox_images(
-        cls, image_file_paths: dict[int, Path], num_digits: int
+        cls,
+        id_boxes: (
+            dict[int, Path | np.ndarray] | Iterable[tuple[int, Path | np.ndarray]]
+        ),
+        num_digits: int,
+        *,
+        debug: bool = False,
+        max_workers: int | None = None,
     ) -> dict[int, list[list[float]]]:
-        """Return probabilities for digits for each paper in the given dictionary of images files.
+        """Return probabilities for digits for each paper in the given ID box images.
+
+        The digit images of all papers are extracted in parallel, then
+        passed through the model together in large batches.
 
         Args:
-            image_file_paths: A dictionary  {paper_number: path_to_id_box_image_file}
+            id_boxes: A dictionary {paper_number: id_box} or an iterable
+                (such as a generator) of such pairs, where each ``id_box``
+                is either the path to an image file or the image itself
+                as an OpenCV-style array.  When given a generator, we
+                work on each box as it arrives, only holding on to the
+                small digit images.
             num_digits: how many digits in a student ID.
 
+        Keyword Args:
+            debug: output the trimmed images into "debug_id_reader/".
+            max_workers: how many threads to use extracting digit images,
+                or ``None`` for a default based on the number of CPUs.
+
         Returns:
             dict: A dictionary which gives the probability that the number in the ID on a given paper is a particular digit.
         """
         prediction_model = load_model(where=settings.PLOM_MODEL_CACHE)
-        probabilities = {}
-        for paper_number, image_file in image_file_paths.items():
-            prob_lists = cls.get_digit_probabilities(
-                prediction_model, image_file, num_digits
-            )
-            if len(prob_lists) == 0:
+        debugdir = None
+        if debug:
+            debugdir = Path(settings.MEDIA_ROOT / "debug_id_reader")
+            debugdir.mkdir(exist_ok=True)
+
+        if isinstance(id_boxes, dict):
+            id_boxes = id_boxes.items()
+
+        # OpenCV releases the GIL so threads are enough here
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                (
+                    paper_number,
+                    pool.submit(
+                        cls._get_digit_images_from_id_box,
+                        id_box,
+                        num_digits,
+                        debugdir=debugdir,
+                        debug_name=f"{paper_number:04}",
+                    ),
+                )
+                for paper_number, id_box in id_boxes
+            ]
+            digits_per_paper = [(pn, f.result()) for pn, f in futures]
+
+        # which paper each image comes from, so we can map the results back
+        paper_numbers = []
+        num_images = []
+        all_digit_images = []
+        for paper_number, digit_images in digits_per_paper:
+            if len(digit_images) == 0:
                 # TODO - put in warning
                 # self.stdout.write(
                 #     f"Test{paper_number}: could not read digits, excluding from calculations"
                 # )
                 continue
-            elif len(prob_lists) != num_digits:
-                # TODO - put in warning
-                # self.stdout.write(
-                #     f"Test{paper_number}: unexpectedly len={len(prob_lists)}: {prob_lists}"
-                # )
-                probabilities[paper_number] = prob_lists
-            else:
-                probabilities[paper_number] = prob_lists
+            paper_numbers.append(paper_number)
+            num_images.append(len(digit_images))
+            all_digit_images.extend(digit_images)
+        if not all_digit_images:
+            return {}
+
+        probs = cls._run_digit_model(prediction_model, np.stack(all_digit_images))
+        probabilities = {}
+        start = 0
+        for paper_number, n in zip(paper_numbers, num_images):
+            probabilities[paper_number] = probs[start : start + n].tolist()
+            start += n
         return probabilities
 
     @classmethod
-    def compute_and_save_probability_heatmap(cls, id_box_files: dict[int, Path]):
+    def compute_and_save_probability_heatmap(
+        cls,
+        id_boxes: (
+            dict[int, Path | np.ndarray] | Iterable[tuple[int, Path | np.ndarray]]
+        ),
+        *,
+        debug: bool = False,
+    ) -> dict[int, list[list[float]]]:
         """Use classifier to compute and save a probability heatmap for the ids.
 
         This downloads a pre-trained random forest classier to compute the probability
@@ -765,12 +951,20 @@ class IDBoxProcessorService:
 
         Note: no database stuff: this just dumps a file on disc, which may not be
         ideal.  Lot of direct file access here.
+
+        Args:
+            id_boxes: the ID box images, as files or arrays, keyed by
+                paper number, or a generator of such pairs such as
+                :meth:`iter_id_boxes`.
+
+        Keyword Args:
+            debug: also output the trimmed digit images into "debug_id_reader/".
         """
         if not is_model_present(where=settings.PLOM_MODEL_CACHE):
             ensure_model_available(where=settings.PLOM_MODEL_CACHE)
         student_id_length = 8
         heatmap = cls._compute_probability_heatmap_for_idbox_images(
-            id_box_files, student_id_length
+            id_boxes, student_id_length, debug=debug
         )
 
         # probs_as_list = {k: [x.tolist() for x in v] for k, v in heatmap.items()}
@@ -782,23 +976,63 @@ class IDBoxProcessorService:
     def compute_id_predictions(
         cls,
         user: User,
-        id_box_files: dict[int, Path],
+        id_boxes: (
+            dict[int, Path | np.ndarray] | Iterable[tuple[int, Path | np.ndarray]]
+        ),
         *,
         recompute_heatmap: bool = True,
+        lap_candidates_per_paper: int | None = None,
     ) -> None:
         """Predict whxich IDs correspond to which SID from the classlist.
 
+        Args:
+            user: who will be associated with the predictions.
+            id_boxes: the ID box images, see
+                :meth:`compute_and_save_probability_heatmap`.
+                Not used if we are not recomputing the heatmap.
+
+        Keyword Args:
+            recompute_heatmap: if False, reuse the probabilities from the
+                last run.
+            lap_candidates_per_paper: passed to the LAP solver, see
+                :meth:`run_lap_solver`.
+
         Raises:
             ValueError: no classlist.
         """
         if recompute_heatmap:
-            probabilities = cls.compute_and_save_probability_heatmap(id_box_files)
+            probabilities = cls.compute_and_save_probability_heatmap(id_boxes)
         else:
             heatmaps_file = settings.MEDIA_ROOT / "id_prob_heatmaps.json"
             with open(heatmaps_file, "r") as fh:
                 probabilities = json.load(fh)
             probabilities = {int(k): v for k, v in probabilities.items()}
+        cls.predict_from_probabilities(
+            user, probabilities, lap_candidates_per_paper=lap_candidates_per_paper
+        )
+
+    @classmethod
+    def predict_from_probabilities(
+        cls,
+        user: User,
+        probabilities: dict[int, list[list[float]]],
+        *,
+        lap_candidates_per_paper: int | None = None,
+    ) -> None:
+        """Run the predictors on a probability heatmap and save their predictions.
+
+        Args:
+            user: who will be associated with the predictions.
+            probabilities: the digit probabilities for each paper, as from
+                :meth:`compute_and_save_probability_heatmap`.
+
+        Keyword Args:
+            lap_candidates_per_paper: passed to the LAP solver, see
+                :meth:`run_lap_solver`.
 
+        Raises:
+            ValueError: no classlist.
+        """
         student_ids = ClasslistService.get_classlist_sids_for_ID_matching()
         if not student_ids:
             raise ValueError("No student IDs provided")
@@ -809,7 +1043,12 @@ class IDBoxProcessorService:
         }
 
         cls.run_greedy(user, student_ids, sliced_probabilities)
-        cls.run_lap_solver(user, student_ids, sliced_probabilities)
+        cls.run_lap_solver(
+            user,
+            student_ids,
+            sliced_probabilities,
+            candidates_per_paper=lap_candidates_per_paper,
+        )
         cls.run_best_guess_predictor(user, probabilities)
 
     @classmethod
@@ -845,7 +1084,20 @@ class IDBoxProcessorService:
             )
 
     @classmethod
-    def run_lap_solver(cls, user: User, student_ids: list[str], probabilities) -> None:
+    def run_lap_solver(
+        cls,
+        user: User,
+        student_ids: list[str],
+        probabilities,
+        *,
+        candidates_per_paper: int | None = None,
+    ) -> None:
+        """Match papers to students by solving a linear assignment problem, saving the results.
+
+        Keyword Args:
+            candidates_per_paper: if given, only consider this many of the
+                most likely students for each paper: faster on large courses.
+        """
         # start by removing any IDs that have already been used.
         for ided_stu in IDReaderService.get_already_matched_sids():
             try:
@@ -860,7 +1112,12 @@ class IDBoxProcessorService:
                 f"Assignment problem is degenerate: {len(papers_to_id)} unidentified "
                 f"machine-read papers and {len(student_ids)} unused students."
             )
-        lap_predictions = cls._lap_predictor(papers_to_id, student_ids, probabilities)
+        lap_predictions = cls._lap_predictor(
+            papers_to_id,
+            student_ids,
+            probabilities,
+            candidates_per_paper=candidates_per_paper,
+        )
         for prediction in lap_predictions:
             IDReaderService.add_or_change_ID_prediction(
                 user, prediction[0], prediction[1], prediction[2], "MLLAP"
@@ -936,45 +1193,102 @@ class IDBoxProcessorService:
         return predictions
 
     @staticmethod
-    def _assemble_cost_matrix(paper_numbers, student_IDs, probabilities):
+    def _assemble_cost_matrix(
+        paper_numbers: list[int],
+        student_IDs: list[str],
+        probabilities: dict[int, list[list[float]]],
+    ) -> np.ndarray:
         """Compute the cost matrix between list of papers and list of student IDs.
 
+        The cost of matching a paper with a student is the negative
+        log-likelihood of that student's ID under the digit probabilities
+        of that paper.  We gather from a (papers x digits x classes)
+        array of negative log-probabilities using the (students x digits)
+        array of integer digits, summing over the digits.
+
         Args:
-            paper_numbers (list): int, the ones we want to match.
-            student_IDs (list): A list of student ID numbers
-            probabilities (dict): keyed by papernum (int), to list of lists of floats.
+            paper_numbers: int, the ones we want to match.
+            student_IDs: A list of student ID numbers, as strings of digits.
+            probabilities: keyed by papernum (int), to list of lists of floats.
 
         Returns:
-            list: list of lists of floats representing a matrix.
+            Array of floats of shape ``(len(paper_numbers), len(student_IDs))``.
 
         Raises:
             KeyError: If probabilities is missing data for one of the paper numbers.
+            ValueError: student IDs and probabilities have different numbers of digits.
         """
-
-        def _log_likelihood(student_ID, prediction_probs):
-            if len(prediction_probs) != len(student_ID):
-                raise ValueError("Wrong length")
-            log_likelihood = 0
-            for digit_index in range(0, len(student_ID)):
-                digit_predicted = int(student_ID[digit_index])
-                log_likelihood -= np.log(
-                    max(prediction_probs[digit_index][digit_predicted], 1e-30)
-                )  # avoids taking log of 0.
-
-            return log_likelihood
-
-        # could precompute big cost matrix, then select rows/columns: more complex
-        costs = []
-        for pn in paper_numbers:
-            row = []
-            for student_ID in student_IDs:
-                row.append(_log_likelihood(student_ID, probabilities[pn]))
-            costs.append(row)
+        num_digits = len(student_IDs[0]) if student_IDs else 0
+        if any(len(sid) != num_digits for sid in student_IDs):
+            raise ValueError("Wrong length")
+        probs = [probabilities[pn] for pn in paper_numbers]
+        if any(len(digit_probs) != num_digits for digit_probs in probs):
+            raise ValueError("Wrong length")
+
+        # (students x digits) array of the digits of each student ID
+        digits = np.array(
+            [[int(c) for c in sid] for sid in student_IDs], dtype=np.intp
+        ).reshape(len(student_IDs), num_digits)
+        # (papers x digits x classes), avoiding taking log of 0.
+        neg_log_probs = -np.log(
+            np.maximum(
+                np.array(probs, dtype=float).reshape(len(probs), num_digits, -1), 1e-30
+            )
+        )
+        costs = np.zeros((len(paper_numbers), len(student_IDs)))
+        for d in range(num_digits):
+            costs += neg_log_probs[:, d, digits[:, d]]
         return costs
 
+    @staticmethod
+    def _solve_pruned_lap(
+        cost_matrix: np.ndarray, candidates_per_paper: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Solve the assignment problem considering only the best few students for each paper.
+
+        Each paper keeps only its ``candidates_per_paper`` cheapest
+        students, and we solve the resulting sparse matching problem.
+        If the pruned problem has no full matching, we fall back to the
+        dense solver.
+
+        Args:
+            cost_matrix: the (papers x students) costs.
+            candidates_per_paper: how many students to consider for each paper.
+
+        Returns:
+            The row indices and the column indices of the matching, as
+            from :func:`scipy.optimize.linear_sum_assignment`.
+        """
+        num_papers, num_students = cost_matrix.shape
+        if candidates_per_paper >= num_students:
+            return linear_sum_assignment(cost_matrix)
+        cols = np.argpartition(cost_matrix, candidates_per_paper - 1, axis=1)[
+            :, :candidates_per_paper
+        ]
+        rows = np.repeat(np.arange(num_papers), candidates_per_paper)
+        cols = cols.ravel()
+        # shift all costs by one so none are zero, which a sparse matrix would
+        # not distinguish from a missing edge; every matching has the same
+        # number of edges so this does not change the optimum.
+        weights = cost_matrix[rows, cols] + 1.0
+        graph = csr_matrix((weights, (rows, cols)), shape=cost_matrix.shape)
+        try:
+            row_IDs, column_IDs = min_weight_full_bipartite_matching(graph)
+        except ValueError:
+            # no full matching among the candidates
+            return linear_sum_assignment(cost_matrix)
+        # present them sorted by row as the dense solver does
+        order = np.argsort(row_IDs)
+        return row_IDs[order], column_IDs[order]
+
     @classmethod
     def _lap_predictor(
-        cls, paper_numbers: list[int], student_IDs: list[str], probabilities
+        cls,
+        paper_numbers: list[int],
+        student_IDs: list[str],
+        probabilities,
+        *,
+        candidates_per_paper: int | None = None,
     ) -> list[tuple[int, str, float]]:
         """Run SciPy's linear sum assignment problem solver, return prediction results.
 
@@ -985,6 +1299,12 @@ class IDBoxProcessorService:
                 and values that contain a probability matrix,
                 which is a list of lists of floats.
 
+        Keyword Args:
+            candidates_per_paper: if given, only consider this many of the
+                most likely students for each paper, solving a sparse
+                problem, which is much faster on large courses.  By
+                default, consider every student for every paper.
+
         Returns:
             List of triples of (`paper_number`, `student_ID`, `certainty`),
             where certainty is the mean of digit probabilities for the student_ID
@@ -993,19 +1313,19 @@ class IDBoxProcessorService:
         cost_matrix = cls._assemble_cost_matrix(
             paper_numbers, student_IDs, probabilities
         )
-        row_IDs, column_IDs = linear_sum_assignment(cost_matrix)
+        if candidates_per_paper is None:
+            row_IDs, column_IDs = linear_sum_assignment(cost_matrix)
+        else:
+            row_IDs, column_IDs = cls._solve_pruned_lap(
+                cost_matrix, candidates_per_paper
+            )
 
         predictions = []
         for r, c in zip(row_IDs, column_IDs):
             pn = paper_numbers[r]
             sid = student_IDs[c]
-
-            # calculate the geometric mean of all digit probabilities
-            # use that as a certainty measure
-            digit_probs = []
-            for i in range(len(sid)):
-                i_prob = probabilities[pn][i][int(sid[i])]
-                digit_probs.append(i_prob)
-            certainty = np.array(digit_probs).prod() ** (1.0 / len(digit_probs))
+            # the geometric mean of all digit probabilities is a certainty measure;
+            # we can recover it from the cost, which is the negative log of their product
+            certainty = float(np.exp(-cost_matrix[r, c] / len(sid)))
             predictions.append((pn, sid, round(certainty, 2)))
         return predictions
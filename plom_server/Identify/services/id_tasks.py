@@ -11,8 +11,10 @@ from django.core.exceptions import (
     MultipleObjectsReturned,
 )
 from django.db import transaction, IntegrityError
+from django.utils import timezone
 
 from plom.common.exceptions import PlomConflict
+from plom_server.Base.services import task_generation
 from plom_server.Papers.models import FixedPage, Paper, Image
 from plom_server.Papers.services import ImageBundleService
 from ..models import PaperIDTask, PaperIDAction, IDPrediction
@@ -78,15 +80,20 @@ class IdentifyTaskService:
         with transaction.atomic():
             old_tasks = PaperIDTask.objects.filter(paper__in=papers)
             old_actions = PaperIDAction.objects.filter(task__in=old_tasks)
+            now = timezone.now()
             for task in old_tasks:
                 task.status = PaperIDTask.OUT_OF_DATE
                 task.assigned_user = None
-            PaperIDTask.objects.bulk_update(old_tasks, ["status", "assigned_user"])
+                task.last_update = now
+            PaperIDTask.objects.bulk_update(
+                old_tasks, ["status", "assigned_user", "last_update"]
+            )
             for action in old_actions:
                 action.is_valid = False
             PaperIDAction.objects.bulk_update(old_actions, ["is_valid"])
             new_tasks = [PaperIDTask(paper=X) for X in papers]
             PaperIDTask.objects.bulk_create(new_tasks)
+            task_generation.bump()
 
     @transaction.atomic
     def id_task_exists(self, paper: Paper) -> bool:
@@ -274,6 +281,7 @@ class IdentifyTaskService:
         PaperIDTask.objects.filter(assigned_user=user, status=PaperIDTask.OUT).update(
             assigned_user=None, status=PaperIDTask.TO_DO
         )
+        task_generation.bump()
 
     @transaction.atomic
     def set_paper_idtask_outdated(self, paper_number: int) -> None:
@@ -7,6 +7,7 @@
 # Copyright (C) 2024 Bryan Tanady
 
 from datetime import timedelta
+from types import SimpleNamespace
 
 from django.contrib.auth.models import User
 from django.core.exceptions import (
@@ -18,10 +19,12 @@ from django.db import IntegrityError
 from django.test import TestCase
 from django.utils import timezone
 from model_bakery import baker
+import numpy as np
 
 from plom.common.exceptions import PlomConflict
 from plom_server.Papers.models import FixedPage, Image, Paper
 from .services import IdentifyTaskService, IDProgressService, IDDirectService
+from .services import IDBoxProcessorService
 from .models import PaperIDTask, PaperIDAction
 
 
@@ -345,3 +348,106 @@ class IdentifyTaskTests(TestCase):
         }
 
         self.assertEqual(info_dict, ids.get_all_id_task_info())
+
+
+class IDLapSolverTests(TestCase):
+    """Tests for the cost matrix and LAP solver of ``IDBoxProcessorService``."""
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(42)
+        self.sids = ["".join(str(d) for d in rng.integers(0, 10, 8)) for _ in range(40)]
+        self.probs = {}
+        # papers 1 to 30 were written by the first 30 students
+        for pn, sid in enumerate(self.sids[:30], start=1):
+            m = rng.random((8, 10)) * 0.2
+            for d, c in enumerate(sid):
+                m[d, int(c)] += 1
+            self.probs[pn] = (m / m.sum(axis=1, keepdims=True)).tolist()
+
+    def test_cost_matrix_is_negative_log_likelihood(self) -> None:
+        pns = [3, 1, 7]
+        costs = IDBoxProcessorService._assemble_cost_matrix(pns, self.sids, self.probs)
+        self.assertEqual(costs.shape, (3, 40))
+        for r, pn in enumerate(pns):
+            for c, sid in enumerate(self.sids):
+                expected = -sum(
+                    np.log(self.probs[pn][d][int(sid[d])]) for d in range(8)
+                )
+                self.assertAlmostEqual(costs[r, c], expected)
+
+    def test_cost_matrix_wrong_length(self) -> None:
+        with self.assertRaises(ValueError):
+            IDBoxProcessorService._assemble_cost_matrix([1], ["1234"], self.probs)
+        with self.assertRaises(KeyError):
+            IDBoxProcessorService._assemble_cost_matrix([99], self.sids, self.probs)
+
+    def test_lap_pruned_candidates_same_as_dense(self) -> None:
+        pns = list(self.probs.keys())
+        dense = IDBoxProcessorService._lap_predictor(pns, self.sids, self.probs)
+        for pn, sid, _ in dense:
+            self.assertEqual(sid, self.sids[pn - 1])
+        pruned = IDBoxProcessorService._lap_predictor(
+            pns, self.sids, self.probs, candidates_per_paper=3
+        )
+        self.assertEqual(dense, pruned)
+        # more papers than students
+        dense = IDBoxProcessorService._lap_predictor(pns, self.sids[:20], self.probs)
+        pruned = IDBoxProcessorService._lap_predictor(
+            pns, self.sids[:20], self.probs, candidates_per_paper=2
+        )
+        self.assertEqual(len(pruned), 20)
+        self.assertEqual(dense, pruned)
+
+
+class _FakeDigitModel:
+    """Pretends to be an ONNX session: logits favour the image's mean brightness."""
+
+    def __init__(self, batch_dim: int | str = "batch") -> None:
+        self.batch_dim = batch_dim
+        self.batch_sizes: list[int] = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name="input", shape=[self.batch_dim, 1, 28, 28])]
+
+    def get_outputs(self):
+        return [SimpleNamespace(name="output")]
+
+    def run(self, output_names, inputs):
+        x = inputs["input"]
+        if isinstance(self.batch_dim, int) and len(x) != self.batch_dim:
+            raise ValueError(f"Got invalid dimensions for input: {x.shape}")
+        self.batch_sizes.append(len(x))
+        logits = np.zeros((len(x), 11), dtype=np.float32)
+        logits[np.arange(len(x)), (x.mean(axis=(1, 2, 3)) * 10).astype(int)] = 10.0
+        return [logits]
+
+
+class IDDigitModelTests(TestCase):
+    """Tests for batched digit prediction in ``IDBoxProcessorService``."""
+
+    def test_run_digit_model_in_batches(self) -> None:
+        images = np.zeros((10, 28, 28), dtype=np.uint8)
+        images[5:] = 255
+        model = _FakeDigitModel()
+        probs = IDBoxProcessorService._run_digit_model(
+            (model, "cpu"), images, batch_size=4
+        )
+        self.assertEqual(model.batch_sizes, [4, 4, 2])
+        self.assertEqual(probs.shape, (10, 11))
+        np.testing.assert_allclose(probs.sum(axis=1), 1.0, rtol=1e-5)
+        self.assertEqual(list(probs.argmax(axis=1)), [0] * 5 + [10] * 5)
+
+    def test_run_digit_model_fixed_batch_size(self) -> None:
+        images = np.zeros((3, 28, 28), dtype=np.uint8)
+        model = _FakeDigitModel(batch_dim=1)
+        probs = IDBoxProcessorService._run_digit_model((model, "cpu"), images)
+        self.assertEqual(model.batch_sizes, [1, 1, 1])
+        self.assertEqual(probs.shape, (3, 11))
+
+    def test_run_digit_model_fixed_batch_size_pads_last_batch(self) -> None:
+        images = np.full((6, 28, 28), 255, dtype=np.uint8)
+        model = _FakeDigitModel(batch_dim=4)
+        probs = IDBoxProcessorService._run_digit_model((model, "cpu"), images)
+        self.assertEqual(model.batch_sizes, [4, 4])
+        self.assertEqual(probs.shape, (6, 11))
+        self.assertEqual(list(probs.argmax(axis=1)), [10] * 6)
@@ -120,6 +120,22 @@ class Migration(migrations.Migration):
                     ),
                 ),
             ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=[
+                            "status",
+                            "question_index",
+                            "question_version",
+                            "-marking_priority",
+                        ],
+                        name="mark_task_dispatch_idx",
+                    ),
+                    models.Index(
+                        fields=["last_update"], name="mark_task_last_update_idx"
+                    ),
+                ],
+            },
         ),
         migrations.AddField(
             model_name="annotation",
@@ -145,6 +161,16 @@ class Migration(migrations.Migration):
                 ("time", models.DateField(default=django.utils.timezone.now)),
                 ("text", models.TextField()),
                 ("task", models.ManyToManyField(to="Mark.markingtask")),
+                (
+                    "for_user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
                 (
                     "user",
                     models.ForeignKey(
@@ -12,6 +12,7 @@ from django.db import models
 from django.utils import timezone
 
 from plom_server.Base.models import Tag
+from plom_server.Base.services import task_generation
 from plom_server.Papers.models import Paper
 
 
@@ -87,6 +88,28 @@ class MarkingTask(models.Model):
     )
     marking_priority = models.FloatField(null=False, default=0.0)
 
+    class Meta:
+        indexes = [
+            # matches the filter and ordering used to hand out tasks, see
+            # QuestionMarkingService.get_first_available_task()
+            models.Index(
+                fields=[
+                    "status",
+                    "question_index",
+                    "question_version",
+                    "-marking_priority",
+                ],
+                name="mark_task_dispatch_idx",
+            ),
+            # for cheaply detecting changes, see ProgressOverviewService
+            models.Index(fields=["last_update"], name="mark_task_last_update_idx"),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        """Save the task, and note that tasks have changed for cached summaries."""
+        super().save(*args, **kwargs)
+        task_generation.bump()
+
     def __str__(self):
         """Return information about the paper and the question."""
         return (
@@ -97,6 +120,15 @@ class MarkingTask(models.Model):
 
 
 class MarkingTaskTag(Tag):
-    """Represents a tag that can be assigned to one or more marking tasks."""
+    """Represents a tag that can be assigned to one or more marking tasks.
+
+    for_user: if the text of the tag is ``@username`` for some existing
+        user, then a reference to that user.  This is maintained when
+        tags and users are created, so that finding tasks "tagged for
+        someone else" does not need to compare text against every user.
+    """
 
     task = models.ManyToManyField(MarkingTask)
+    for_user = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
@@ -20,6 +20,7 @@ from django.db.models import QuerySet
 from plom_server.Base.services import Settings
 from plom_server.Papers.models import Paper
 from ..models import MarkingTask
+from . import dispatch_queue
 
 
 def get_mark_priority_strategy() -> str:
@@ -52,6 +53,7 @@ def modify_task_priority(task: MarkingTask, new_priority: int | float) -> None:
     """Modify the priority of a single marking task."""
     task.marking_priority = new_priority
     task.save()
+    dispatch_queue.invalidate()
 
 
 def update_priority_ordering(
@@ -198,3 +200,4 @@ def _bulk_set_marking_task_priorities(
     MarkingTask.objects.bulk_update(
         tasks_to_update, ["marking_priority"], batch_size=1000
     )
+    dispatch_queue.invalidate()
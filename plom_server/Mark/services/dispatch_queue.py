@@ -0,0 +1,185 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+"""Optional prefetched queues of marking tasks, for handing out tasks quickly.
+
+When ``settings.PLOM_MARKING_DISPATCH_QUEUE`` is a positive integer N, the
+server keeps, in the Django cache, a list of the primary keys of the next
+N "to do" tasks for each (question index, version), in priority order.
+Markers asking for "the next task" take successive entries of this list
+using an atomic counter, so concurrent markers are handed different tasks
+without a database query to sort the task table.  When a list is used up
+it is refilled with one query.  This needs a cache backend with an atomic
+``incr``, such as Redis, or the local-memory cache in a single process:
+the file-based cache's ``incr`` is not atomic.
+
+The queue only holds hints: whether a task is still available is always
+checked against the database, and claims are a conditional UPDATE.  Stale
+entries are skipped.  Tasks that become available after a list was filled
+(e.g., surrendered tasks) are picked up on the next refill, or after
+:data:`QUEUE_TTL` seconds.
+
+Tasks tagged for a particular user are never placed in the queue.  Those
+take priority for that user, so :func:`next_available_task_code` and
+:func:`claim_next_task` return None (and callers fall back to the
+database query) while the user has any.
+
+Changing priorities or tags calls :func:`invalidate`, which discards all
+the lists at once by bumping a generation counter.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from plom_server.Base.services import task_generation
+from ..models import MarkingTask, MarkingTaskTag
+
+# even if nothing is invalidated, lists are rebuilt after this many seconds
+QUEUE_TTL = 30
+
+_key_prefix = "plom:mark:dispatch"
+
+
+def queue_size() -> int:
+    """How many tasks to prefetch per question-version, or zero if disabled."""
+    return getattr(settings, "PLOM_MARKING_DISPATCH_QUEUE", 0)
+
+
+def is_enabled() -> bool:
+    """Is the prefetched dispatch queue turned on?"""
+    return queue_size() > 0
+
+
+def invalidate() -> None:
+    """Discard all prefetched queues, e.g., because priorities or tags changed."""
+    if not is_enabled():
+        return
+    gen_key = f"{_key_prefix}:gen"
+    if not cache.add(gen_key, 1, timeout=None):
+        try:
+            cache.incr(gen_key)
+        except ValueError:
+            # expired or evicted between add and incr
+            cache.add(gen_key, 1, timeout=None)
+
+
+def _generation() -> int:
+    gen_key = f"{_key_prefix}:gen"
+    cache.add(gen_key, 1, timeout=None)
+    return cache.get(gen_key, 1)
+
+
+def _has_tasks_tagged_for(user: User, question_idx: int, version: int) -> bool:
+    return MarkingTaskTag.objects.filter(
+        for_user=user,
+        task__status=MarkingTask.TO_DO,
+        task__question_index=question_idx,
+        task__question_version=version,
+    ).exists()
+
+
+def _fill(queue_key: str, question_idx: int, version: int) -> tuple[str, list[int]]:
+    """Query the next tasks for this question-version and store them in the cache."""
+    user_tags = MarkingTaskTag.objects.filter(for_user__isnull=False)
+    pks = list(
+        MarkingTask.objects.filter(
+            status=MarkingTask.TO_DO,
+            question_index=question_idx,
+            question_version=version,
+        )
+        .exclude(markingtasktag__in=user_tags)
+        .order_by("-marking_priority", "paper__paper_number")
+        .values_list("pk", flat=True)[: queue_size()]
+    )
+    fill = (uuid.uuid4().hex, pks)
+    cache.set(queue_key, fill, timeout=QUEUE_TTL)
+    return fill
+
+
+def _candidates(question_idx: int, version: int):
+    """Yield primary keys from the queue, each handed to only one caller.
+
+    Refills the queue (once) when it runs out.
+    """
+    queue_key = f"{_key_prefix}:{_generation()}:{question_idx}:{version}"
+    for attempt in range(2):
+        fill = cache.get(queue_key)
+        if fill is None or attempt > 0:
+            fill = _fill(queue_key, question_idx, version)
+        fill_id, pks = fill
+        if not pks:
+            return
+        pos_key = f"{queue_key}:{fill_id}:pos"
+        cache.add(pos_key, -1, timeout=QUEUE_TTL)
+        while True:
+            try:
+                pos = cache.incr(pos_key)
+            except ValueError:
+                # counter expired with the queue: start a new fill
+                break
+            if pos >= len(pks):
+                break
+            yield pks[pos]
+
+
+def next_available_task_code(
+    question_idx: int, version: int, *, user: User | None = None
+) -> str | None:
+    """Pop the code of an available task from the queue, without claiming it.
+
+    Args:
+        question_idx: which question.
+        version: which version.
+
+    Keyword Args:
+        user: who is asking, if known, so that tasks tagged for them
+            are not passed over.
+
+    Returns:
+        The task code, or None if the queue has nothing for us, or
+        the user has tasks tagged for them, in which case callers
+        should fall back to the database query.
+    """
+    if user is not None and _has_tasks_tagged_for(user, question_idx, version):
+        return None
+    for pk in _candidates(question_idx, version):
+        code = (
+            MarkingTask.objects.filter(pk=pk, status=MarkingTask.TO_DO)
+            .values_list("code", flat=True)
+            .first()
+        )
+        if code is not None:
+            return code
+    return None
+
+
+def claim_next_task(user: User, question_idx: int, version: int) -> MarkingTask | None:
+    """Pop a task from the queue and assign it to a user.
+
+    Each attempt is a single conditional UPDATE, so two callers can
+    never both claim the same task.
+
+    Args:
+        user: who is claiming the task.
+        question_idx: which question.
+        version: which version.
+
+    Returns:
+        The claimed task, or None if the queue has nothing for us, or
+        the user has tasks tagged for them, in which case callers
+        should fall back to the database query.
+    """
+    if _has_tasks_tagged_for(user, question_idx, version):
+        return None
+    for pk in _candidates(question_idx, version):
+        n = MarkingTask.objects.filter(
+            pk=pk, status=MarkingTask.TO_DO, assigned_user__isnull=True
+        ).update(status=MarkingTask.OUT, assigned_user=user, last_update=timezone.now())
+        if n:
+            task_generation.bump()
+            return MarkingTask.objects.select_related("paper").get(pk=pk)
+    return None
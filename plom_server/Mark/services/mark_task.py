@@ -8,6 +8,7 @@
 """Services for data related to specific marking tasks."""
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Max
 
 from ..models import MarkingTask
 
@@ -60,3 +61,17 @@ def get_latest_task(
                 "  You're likely asking for the wrong version."
             )
     return r
+
+
+def marking_fingerprint() -> str:
+    """A short string that changes when marking tasks are created or saved.
+
+    This uses indexed columns only, so it is cheap even for large exams.
+    Together with :mod:`plom_server.Base.services.task_generation` it is
+    used for keying cached summaries of the marking tasks.  It does not
+    notice deletions, nor ``.update()`` calls that do not also set the
+    ``last_update`` field.
+    """
+    agg = MarkingTask.objects.aggregate(n=Max("pk"), t=Max("last_update"))
+    t = agg["t"].timestamp() if agg["t"] else 0
+    return f"{agg['n']}.{t}"
@@ -5,26 +5,107 @@
 # Copyright (C) 2024 Bryan Tanady
 # Copyright (C) 2025 Deep Shah
 
-import statistics
-from typing import Any
+import math
+from collections import Counter
+from typing import Any, Callable
 
 import arrow
 from django.db import transaction
-from django.db.models import Count
-from numpy import histogram
+from django.db.models import Avg, Count, Max, Min, Q, QuerySet, StdDev
 
 from plom.common.misc_utils import pprint_score
+from plom_server.Base.services import task_generation
 from plom_server.Papers.services import SpecificationService
 from ..models import MarkingTask, MarkingTaskTag
-
-
-def _generic_stats_dict_from_list(mark_list):
+from . import mark_task
+
+# how many seconds to keep computed statistics, at most
+STATS_TTL = 30
+
+# the aggregates we ask the database for, over the latest scores of some tasks
+_score_aggregates = {
+    "number": Count("pk"),
+    "mark_mean": Avg("latest_annotation__score"),
+    "mark_stdev": StdDev("latest_annotation__score", sample=True),
+    "mark_min": Min("latest_annotation__score"),
+    "mark_max": Max("latest_annotation__score"),
+}
+
+
+def _cached(name: str, compute: Callable[[], Any]) -> Any:
+    """Cache some statistics until the marking tasks change."""
+    return task_generation.cached(
+        f"mark_stats:{name}",
+        compute,
+        fingerprint=mark_task.marking_fingerprint(),
+        timeout=STATS_TTL,
+    )
+
+
+def _completed_tasks(question: int, version: int | None = None) -> QuerySet:
+    """The completed tasks that have a score, optionally of one version."""
+    tasks = MarkingTask.objects.filter(
+        status=MarkingTask.COMPLETE,
+        question_index=question,
+        latest_annotation__score__isnull=False,
+    )
+    if version:
+        tasks = tasks.filter(question_version=version)
+    return tasks
+
+
+def _grouped_score_counts(
+    tasks: QuerySet, *fields: str
+) -> dict[tuple, dict[float, int]]:
+    """Count how many times each score occurs, grouped by some fields.
+
+    This is a single GROUP BY query: the number of rows is the number of
+    distinct scores in each group, not the number of tasks.
+
+    Returns:
+        A dict keyed by tuples of the values of ``fields``, of dicts
+        of score vs count.
+    """
+    grouped: dict[tuple, dict[float, int]] = {}
+    for *key, score, n in (
+        tasks.values_list(*fields, "latest_annotation__score")
+        .annotate(n=Count("pk"))
+        .order_by()
+    ):
+        grouped.setdefault(tuple(key), {})[score] = n
+    return grouped
+
+
+def _median_and_mode(score_counts: dict[float, int]) -> tuple[float, float]:
+    """Compute the median and mode from counts of each score.
+
+    Not every database has percentile aggregates (e.g., SQLite), so we
+    compute these from the (small) table of distinct scores.  Ties for
+    the mode go to the lowest score.
+    """
+    scores = sorted(score_counts)
+    n = sum(score_counts.values())
+    mode = max(scores, key=lambda s: score_counts[s])
+    # the middle one or two scores (0-based positions in sorted order)
+    lo, hi = (n - 1) // 2, n // 2
+    middle = []
+    seen = 0
+    for s in scores:
+        seen += score_counts[s]
+        while len(middle) < 2 and [lo, hi][len(middle)] < seen:
+            middle.append(s)
+        if len(middle) == 2:
+            break
+    return (middle[0] + middle[1]) / 2, mode
+
+
+def _generic_stats_dict(agg: dict[str, Any], score_counts: dict[float, int]):
+    """Build the dict of statistics from database aggregates and score counts."""
     stats_dict = {}
-    stats_dict["mark_max"] = max(mark_list)
-    stats_dict["mark_min"] = min(mark_list)
-    stats_dict["mark_median"] = statistics.median(mark_list)
-    stats_dict["mark_mean"] = statistics.mean(mark_list)
-    stats_dict["mark_mode"] = statistics.mode(mark_list)
+    stats_dict["mark_max"] = agg["mark_max"]
+    stats_dict["mark_min"] = agg["mark_min"]
+    stats_dict["mark_mean"] = agg["mark_mean"]
+    stats_dict["mark_median"], stats_dict["mark_mode"] = _median_and_mode(score_counts)
 
     stats_dict["mark_max_str"] = pprint_score(stats_dict["mark_max"])
     stats_dict["mark_min_str"] = pprint_score(stats_dict["mark_min"])
@@ -32,8 +113,8 @@ def _generic_stats_dict_from_list(mark_list):
     stats_dict["mark_mean_str"] = f"{stats_dict['mark_mean']:.1f}"
     stats_dict["mark_mode_str"] = pprint_score(stats_dict["mark_mode"])
 
-    if len(mark_list) >= 2:
-        stats_dict["mark_stdev"] = statistics.stdev(mark_list)
+    if agg["number"] >= 2 and agg["mark_stdev"] is not None:
+        stats_dict["mark_stdev"] = agg["mark_stdev"]
         stats_dict["mark_stdev_str"] = f"{stats_dict['mark_stdev']:.1f}"
     else:
         stats_dict["mark_stdev"] = stats_dict["mark_stdev_str"] = "n/a"
@@ -41,21 +122,34 @@ def _generic_stats_dict_from_list(mark_list):
     return stats_dict
 
 
-def score_histogram(score_list, max_score, min_score=0, bin_width=1):
-    """Helper function to make histogram dicts."""
-    bins = [edge for edge in range(min_score, max_score + bin_width, bin_width)]
-
-    # np.histogram doesn't consider the rightmost edge as a separate bin
-    bins.append(max_score)
-    bin_values, _ = histogram(score_list, bins)
-    # remove placeholder right bin edge
-    bins.pop()
+def score_histogram_from_counts(
+    score_counts: dict[float, int], max_score, min_score=0, bin_width=1
+) -> dict[int, int]:
+    """Helper function to make histogram dicts from counts of each score.
 
-    return dict(zip(bins, list(map(int, bin_values))))
+    Bins are half-open ``[edge, edge + bin_width)``, except that the
+    maximum score gets a bin of its own.  Scores outside
+    ``[min_score, max_score]`` are not counted.
+    """
+    bins = [edge for edge in range(min_score, max_score + bin_width, bin_width)]
+    hist = {edge: 0 for edge in bins}
+    for score, n in score_counts.items():
+        if score < min_score or score > max_score:
+            continue
+        if score == max_score:
+            edge = max_score
+        else:
+            edge = min_score + bin_width * math.floor((score - min_score) / bin_width)
+        hist[edge] += n
+    return hist
 
 
 class MarkingStatsService:
-    """Functions for getting marking stats."""
+    """Functions for getting marking stats.
+
+    The statistics are computed by aggregate queries in the database,
+    and cached for a short time, or until some marking task changes.
+    """
 
     @staticmethod
     def get_scores_for_question_version(question_idx: int, version: int) -> list[int]:
@@ -63,19 +157,35 @@ class MarkingStatsService:
 
         From the latest annotations of completed tasks.
         """
-        scores: list[int] = []
+        return list(
+            _completed_tasks(question_idx, version).values_list(
+                "latest_annotation__score", flat=True
+            )
+        )
+
+    @staticmethod
+    def get_score_counts_by_question_version() -> dict[int, dict[int, Counter]]:
+        """How many times each score was given, for every question and version.
+
+        From the latest annotations of completed tasks, using one query.
 
-        completed_tasks = MarkingTask.objects.filter(
-            question_index=question_idx,
-            question_version=version,
-            status=MarkingTask.StatusChoices.COMPLETE,
-        ).select_related("latest_annotation")
+        Returns:
+            Nested dicts indexed by question index then version, of
+            Counters of score vs count.  Question-versions with nothing
+            marked are omitted.
+        """
 
-        for task in completed_tasks:
-            if task.latest_annotation is not None:
-                scores.append(task.latest_annotation.score)
+        def compute():
+            tasks = MarkingTask.objects.filter(
+                status=MarkingTask.COMPLETE, latest_annotation__score__isnull=False
+            )
+            d: dict[int, dict[int, Counter]] = {}
+            grouped = _grouped_score_counts(tasks, "question_index", "question_version")
+            for (qidx, ver), score_counts in grouped.items():
+                d.setdefault(qidx, {})[ver] = Counter(score_counts)
+            return d
 
-        return scores
+        return _cached("score_counts", compute)
 
     @transaction.atomic
     def get_basic_marking_stats(
@@ -96,6 +206,15 @@ class MarkingStatsService:
             'mark_median_str', 'mark_mean', 'mark_mean_str', 'mark_mode',
             'mark_mode_str', 'mark_stdev', 'mark_stdev_str', 'mark_full'
         """
+        return _cached(
+            f"basic:{question}:{version}",
+            lambda: self._compute_basic_marking_stats(question, version=version),
+        )
+
+    @staticmethod
+    def _compute_basic_marking_stats(
+        question: int, *, version: int | None = None
+    ) -> dict[str, Any]:
         stats_dict = {
             "number_of_completed_tasks": 0,
             "all_task_count": 0,
@@ -115,26 +234,23 @@ class MarkingStatsService:
             "avg_marking_time": 0,
             "mark_full": SpecificationService.get_question_mark(question),
         }
-        try:
-            all_tasks = MarkingTask.objects.filter(question_index=question).exclude(
-                status=MarkingTask.OUT_OF_DATE
-            )
-            completed_tasks = MarkingTask.objects.filter(
-                status=MarkingTask.COMPLETE,
-                question_index=question,
-            ).prefetch_related("latest_annotation")
-            if version:
-                all_tasks = all_tasks.filter(question_version=version)
-                completed_tasks = completed_tasks.filter(question_version=version)
-
-        except MarkingTask.DoesNotExist:
-            return stats_dict
+        all_tasks = MarkingTask.objects.filter(question_index=question).exclude(
+            status=MarkingTask.OUT_OF_DATE
+        )
+        if version:
+            all_tasks = all_tasks.filter(question_version=version)
+        completed = Q(status=MarkingTask.COMPLETE)
+        counts = all_tasks.aggregate(
+            all_task_count=Count("pk"),
+            num_completed_tasks=Count("pk", filter=completed),
+            avg_marking_time=Avg("latest_annotation__marking_time", filter=completed),
+        )
 
-        all_task_count = all_tasks.count()
+        all_task_count = counts["all_task_count"]
         if all_task_count == 0:
             return stats_dict
 
-        num_completed_tasks = completed_tasks.count()
+        num_completed_tasks = counts["num_completed_tasks"]
         stats_dict["number_of_completed_tasks"] = num_completed_tasks
         stats_dict["all_task_count"] = all_task_count
         remaining_task_count = all_task_count - num_completed_tasks
@@ -143,17 +259,17 @@ class MarkingStatsService:
             num_completed_tasks / all_task_count * 100
         )
         if num_completed_tasks:
-            stats_dict["avg_marking_time"] = round(
-                sum([X.latest_annotation.marking_time for X in completed_tasks])
-                / num_completed_tasks
-            )
+            stats_dict["avg_marking_time"] = round(counts["avg_marking_time"] or 0)
             stats_dict["approx_remaining_hours"] = round(
                 stats_dict["avg_marking_time"] * remaining_task_count / 3600,
                 2,
             )
             # the following don't make sense until something is marked
-            mark_list = [X.latest_annotation.score for X in completed_tasks]
-            stats_dict.update(_generic_stats_dict_from_list(mark_list))
+            tasks = _completed_tasks(question, version)
+            agg = tasks.aggregate(**_score_aggregates)
+            if agg["number"]:
+                score_counts = _grouped_score_counts(tasks)[()]
+                stats_dict.update(_generic_stats_dict(agg, score_counts))
         return stats_dict
 
     @transaction.atomic
@@ -171,23 +287,13 @@ class MarkingStatsService:
         Returns:
             The histogram as a dict of mark vs count.
         """
-        max_question_mark = SpecificationService.get_question_mark(question)
-        scores = []
-
-        try:
-            completed_tasks = MarkingTask.objects.filter(
-                status=MarkingTask.COMPLETE,
-                question_index=question,
-            ).prefetch_related("latest_annotation")
-            if version:
-                completed_tasks = completed_tasks.filter(question_version=version)
-        except MarkingTask.DoesNotExist:
-            return score_histogram([], max_question_mark)
-        for X in completed_tasks:
-            scores.append(X.latest_annotation.score)
-
-        hist = score_histogram(scores, max_question_mark)
-        return hist
+
+        def compute():
+            max_question_mark = SpecificationService.get_question_mark(question)
+            grouped = _grouped_score_counts(_completed_tasks(question, version))
+            return score_histogram_from_counts(grouped.get((), {}), max_question_mark)
+
+        return _cached(f"histogram:{question}:{version}", compute)
 
     @staticmethod
     def get_list_of_users_who_marked_question(
@@ -261,39 +367,36 @@ class MarkingStatsService:
 
         Returns:
             dict (int, dict[str,any]): for each user-pk give a dict that
-            contains 'username', 'histogram', 'scores', 'number',
+            contains 'username', 'histogram', 'score_counts', 'number',
             'mark_max', 'mark_max_str', 'mark_min', 'mark_min_str',
             'mark_median', 'mark_median_str', 'mark_mean', 'mark_mean_str',
             'mark_mode', 'mark_mode_str', 'mark_stdev', 'mark_stdev_str'.
         """
-        max_question_mark = SpecificationService.get_question_mark(question)
-        data: dict[int, dict[str, Any]] = {}
-        try:
-            completed_tasks = MarkingTask.objects.filter(
-                status=MarkingTask.COMPLETE,
-                question_index=question,
-                question_version=version,
-            ).prefetch_related(
-                "latest_annotation",
-                "assigned_user",
-            )
-        except MarkingTask.DoesNotExist:
-            return data
 
-        for X in completed_tasks:
-            if X.assigned_user.pk not in data:
-                data[X.assigned_user.pk] = {
-                    "username": X.assigned_user.username,
-                    "scores": [],
+        def compute():
+            max_question_mark = SpecificationService.get_question_mark(question)
+            tasks = _completed_tasks(question, version)
+            grouped = _grouped_score_counts(tasks, "assigned_user__pk")
+            data: dict[int, dict[str, Any]] = {}
+            for agg in (
+                tasks.values("assigned_user__pk", "assigned_user__username")
+                .annotate(**_score_aggregates)
+                .order_by()
+            ):
+                upk = agg["assigned_user__pk"]
+                score_counts = grouped[(upk,)]
+                data[upk] = {
+                    "username": agg["assigned_user__username"],
+                    "score_counts": score_counts,
+                    "histogram": score_histogram_from_counts(
+                        score_counts, max_question_mark
+                    ),
+                    "number": agg["number"],
                 }
-            data[X.assigned_user.pk]["scores"].append(X.latest_annotation.score)
+                data[upk].update(_generic_stats_dict(agg, score_counts))
+            return data
 
-        for upk in data.keys():
-            mark_list = data[upk]["scores"]
-            data[upk]["histogram"] = score_histogram(mark_list, max_question_mark)
-            data[upk]["number"] = len(mark_list)
-            data[upk].update(_generic_stats_dict_from_list(mark_list))
-        return data
+        return _cached(f"by_users:{question}:{version}", compute)
 
     @transaction.atomic
     def get_mark_histogram_and_stats_by_versions(
@@ -306,44 +409,45 @@ class MarkingStatsService:
 
         Returns:
             dict (int, dict[str,any]): for each version give a dict that
-            contains 'histogram', 'scores', 'number', 'mark_max', 'mark_max_str',
-            'mark_min', 'mark_min_str', 'mark_median', 'mark_median_str',
-            'mark_mean','mark_mean_str', 'mark_mode','mark_mode_str',
-            'mark_stdev','mark_stdev_str', 'remaining'.
+            contains 'histogram', 'score_counts', 'number', 'mark_max',
+            'mark_max_str', 'mark_min', 'mark_min_str', 'mark_median',
+            'mark_median_str', 'mark_mean','mark_mean_str', 'mark_mode',
+            'mark_mode_str', 'mark_stdev','mark_stdev_str', 'remaining'.
         """
-        data: dict[int, dict[str, Any]] = {}
-        try:
-            completed_tasks = MarkingTask.objects.filter(
-                status=MarkingTask.COMPLETE,
-                question_index=question,
-            ).prefetch_related(
-                "latest_annotation",
-            )
-        except MarkingTask.DoesNotExist:
-            return data
-        for X in completed_tasks:
-            if X.question_version not in data:
-                data[X.question_version] = {
-                    "scores": [],
-                }
-            data[X.question_version]["scores"].append(X.latest_annotation.score)
 
-        for ver in data:
-            mark_list = data[ver]["scores"]
+        def compute():
             max_question_mark = SpecificationService.get_question_mark(question)
-            data[ver]["histogram"] = score_histogram(mark_list, max_question_mark)
-            data[ver]["number"] = len(mark_list)
-            data[ver].update(_generic_stats_dict_from_list(mark_list))
-            # get remaining tasks by excluding COMPLETE and OUT_OF_DATE
-            # TODO - can we optimise this a bit? one query per version is okay, but can likely do in 1.
-            data[ver]["remaining"] = (
-                MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
+            tasks = _completed_tasks(question)
+            grouped = _grouped_score_counts(tasks, "question_version")
+            # remaining tasks: exclude COMPLETE and OUT_OF_DATE
+            remaining = dict(
+                MarkingTask.objects.filter(question_index=question)
+                .exclude(status=MarkingTask.OUT_OF_DATE)
                 .exclude(status=MarkingTask.COMPLETE)
-                .filter(question_index=question, question_version=ver)
-                .count()
+                .values_list("question_version")
+                .annotate(n=Count("pk"))
+                .order_by()
             )
+            data: dict[int, dict[str, Any]] = {}
+            for agg in (
+                tasks.values("question_version")
+                .annotate(**_score_aggregates)
+                .order_by()
+            ):
+                ver = agg["question_version"]
+                score_counts = grouped[(ver,)]
+                data[ver] = {
+                    "score_counts": score_counts,
+                    "histogram": score_histogram_from_counts(
+                        score_counts, max_question_mark
+                    ),
+                    "number": agg["number"],
+                    "remaining": remaining.get(ver, 0),
+                }
+                data[ver].update(_generic_stats_dict(agg, score_counts))
+            return data
 
-        return data
+        return _cached(f"by_versions:{question}", compute)
 
     @transaction.atomic
     def get_marking_task_annotation_info(self, question, version):
@@ -459,39 +563,3 @@ class MarkingStatsService:
             .prefetch_related("assigned_user")
             .distinct("assigned_user")
         ]
-
-    @transaction.atomic
-    def _get_paper_question_score_data(self) -> dict[int, dict[int, int]]:
-        paper_question_score: dict[int, dict[int, int]] = {}
-        for task in MarkingTask.objects.filter(
-            status=MarkingTask.COMPLETE,
-        ).prefetch_related("latest_annotation", "paper"):
-            if task.paper.paper_number not in paper_question_score:
-                paper_question_score[task.paper.paper_number] = {}
-            paper_question_score[task.paper.paper_number][
-                task.question_index
-            ] = task.latest_annotation.score
-        return paper_question_score
-
-    def build_report_score_lists(
-        self,
-    ) -> tuple[list[float], dict[int, list[float]]]:
-        # get (effectively) all the marks for everything
-        # so that we can form all histograms and also
-        # a histogram for total marks only for those papers that
-        # are completely graded.
-        score_data = self._get_paper_question_score_data()
-        question_indices = SpecificationService.get_question_indices()
-        n_questions = len(question_indices)
-        question_score_lists: dict[int, list[float]] = {
-            qi: [] for qi in question_indices
-        }
-        total_score_list = []
-        for pn, data in score_data.items():
-            for qi, v in data.items():
-                question_score_lists[qi].append(v)
-            # only append total if all questions marked
-            if len(data) == n_questions:
-                total_score_list.append(sum(data.values()))
-
-        return (total_score_list, question_score_lists)
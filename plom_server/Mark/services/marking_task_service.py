@@ -12,17 +12,20 @@ import logging
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-from django.db.models import QuerySet, Count, Q
+from django.db.models import QuerySet, Count, Q, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
 from plom.common.exceptions import PlomConflict
 from plom.common.misc_utils import unpack_task_code
 from plom.tagging import is_valid_tag_text
+from plom_server.Base.services import task_generation
 from plom_server.Papers.services import ImageBundleService, PaperInfoService
 from plom_server.Papers.models import Paper
 
-from . import MarkingPriorityService, mark_task
+from . import MarkingPriorityService, dispatch_queue, mark_task
 from ..models import MarkingTask, MarkingTaskTag, Annotation
 
 log = logging.getLogger(__name__)
@@ -76,7 +79,7 @@ class MarkingTaskService:
         # as per #3220 do not erase assigned user.
         MarkingTask.objects.filter(code=task_code).exclude(
             status=MarkingTask.OUT_OF_DATE
-        ).update(status=MarkingTask.OUT_OF_DATE)
+        ).update(status=MarkingTask.OUT_OF_DATE, last_update=timezone.now())
 
         # get priority of latest old task to assign to new task, but
         # if no previous priority exists, set a new value based on the current strategy
@@ -136,9 +139,11 @@ class MarkingTaskService:
         # set all as out of date but keep any priorities and tags
         priorities = {}
         existing_tags = {}
+        now = timezone.now()
         for X in existing_tasks:
             X.status = MarkingTask.OUT_OF_DATE
             X.assigned_user = None
+            X.last_update = now
             priorities[X.code] = X.marking_priority
             existing_tags[X.code] = X.markingtasktag_set.all()
         # get priority strategy for new tasks
@@ -173,8 +178,11 @@ class MarkingTaskService:
                 )
             )
         # now bulk-update existing tasks and bulk_create the new ones
-        MarkingTask.objects.bulk_update(existing_tasks, ["assigned_user", "status"])
+        MarkingTask.objects.bulk_update(
+            existing_tasks, ["assigned_user", "status", "last_update"]
+        )
         MarkingTask.objects.bulk_create(new_tasks)
+        task_generation.bump()
         # copy over any old tags - unfortunately this is O(n) not O(1)
         if copy_old_tags:
             for X in new_tasks:
@@ -335,6 +343,7 @@ class MarkingTaskService:
         MarkingTask.objects.filter(assigned_user=user, status=MarkingTask.OUT).update(
             assigned_user=None, status=MarkingTask.TO_DO
         )
+        task_generation.bump()
 
     @staticmethod
     def surrender_task(user: User, papernum: int, qidx: int) -> None:
@@ -542,8 +551,35 @@ class MarkingTaskService:
                 log.debug('New tag "%s" created', tag_obj.text)
             else:
                 log.debug('New tag "%s" created by %s', tag_obj.text, user)
+            if tag_obj.text.startswith("@"):
+                MarkingTaskService.link_tags_to_users(
+                    MarkingTaskTag.objects.filter(pk=tag_obj.pk)
+                )
         return tag_obj
 
+    @staticmethod
+    def link_tags_to_users(tags: QuerySet[MarkingTaskTag] | None = None) -> int:
+        """Point ``@username`` tags at the user they name, in one UPDATE.
+
+        Tags whose text does not match any user get their ``for_user``
+        cleared.
+
+        Args:
+            tags: which tags to consider, defaults to all tags that
+                start with ``@``.
+
+        Returns:
+            How many tags were considered.
+        """
+        if tags is None:
+            tags = MarkingTaskTag.objects.all()
+        at_username = (
+            User.objects.annotate(at_name=Concat(Value("@"), "username"))
+            .filter(at_name=OuterRef("text"))
+            .values("pk")[:1]
+        )
+        return tags.filter(text__startswith="@").update(for_user=Subquery(at_username))
+
     @staticmethod
     @transaction.atomic
     def bulk_get_or_create_tag(
@@ -596,6 +632,7 @@ class MarkingTaskService:
 
             # Re-query just the new ones
             new_objs = MarkingTaskTag.objects.filter(user=user, text__in=to_create)
+            MarkingTaskService.link_tags_to_users(new_objs)
             for tag in new_objs:
                 existing_map[tag.text] = tag
 
@@ -618,6 +655,7 @@ class MarkingTaskService:
         # TODO: port to select_for_update?
         tag.task.add(task)
         tag.save()
+        dispatch_queue.invalidate()
 
     @transaction.atomic
     def add_tag_to_task_via_pks(self, tag_pk: int, task_pk: int) -> None:
@@ -717,6 +755,7 @@ class MarkingTaskService:
         if tag.task.filter(pk=task.pk).exists():
             tag.task.remove(task)
             tag.save()  # tag is select for update
+            dispatch_queue.invalidate()
         else:
             raise ValueError(f'Task {task.code} does not have tag "{tag.text}"')
 
@@ -3,12 +3,14 @@
 # Copyright (C) 2023 Andrew Rechnitzer
 # Copyright (C) 2023-2026 Colin B. Macdonald
 
-from typing import Any
+import os
+from typing import Any, Iterable
 
 from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files import File
 
+from plom_server.Base.services import page_image_renditions
 from plom_server.Papers.services import SpecificationService
 from plom_server.Papers.models import FixedPage, Image, MobilePage, Paper
 
@@ -80,6 +82,32 @@ def get_question_pages_list(paper: int, question_index: int) -> list[dict[str, A
     return page_list
 
 
+def warm_page_images(paths: Iterable[str]) -> None:
+    """Hint to the operating system that we will soon read these image files.
+
+    Where supported, this asks the kernel to begin reading the files into
+    its page cache in the background; it does not block on the reads.
+    Missing files are ignored.  On other platforms this does nothing.
+
+    Args:
+        paths: filenames of page images, e.g., the ``"server_path"``
+            values from :func:`get_question_pages_list`.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
 class PageDataService:
     """Class to encapsulate functions for selecting page data and sending it to the client."""
 
@@ -232,7 +260,9 @@ class PageDataService:
         return pages_metadata
 
     @transaction.atomic
-    def get_page_image(self, pk: int, *, img_hash: str | None = None) -> File:
+    def get_page_image(
+        self, pk: int, *, img_hash: str | None = None, size: str | None = None
+    ) -> File:
         """Return the path to a page-image from its public key and hash.
 
         Args:
@@ -240,12 +270,16 @@ class PageDataService:
 
         Keyword Args:
             img_hash: optionally the image's hash.
+            size: optionally, a smaller copy of the image, such as ``"half"``
+                or ``"thumb"``, see :class:`BaseImageRendition`.  If it does
+                not exist yet, it is made now.
 
         Returns:
             A Django file object.
 
         Raises:
             ObjectDoesNotExist: no such page image or hash does not match.
+            KeyError: no such size.
         """
         if img_hash:
             image = Image.objects.select_related("baseimage").get(
@@ -253,4 +287,6 @@ class PageDataService:
             )
         else:
             image = Image.objects.select_related("baseimage").get(pk=pk)
+        if size:
+            return page_image_renditions.get_rendition_file(image.baseimage, size)
         return image.baseimage.image_file
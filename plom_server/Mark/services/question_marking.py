@@ -11,6 +11,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import QuerySet
 
 from plom.common.misc_utils import unpack_task_code
 from plom.common.exceptions import (
@@ -20,8 +21,8 @@ from plom.common.exceptions import (
     PlomQuotaLimitExceeded,
 )
 
-from ..models import MarkingTask
-from . import mark_task
+from ..models import MarkingTask, MarkingTaskTag
+from . import dispatch_queue, mark_task
 from . import create_new_annotation_in_database
 from .marking_task_service import MarkingTaskService
 
@@ -51,8 +52,56 @@ class QuestionMarkingService:
     """
 
     @staticmethod
+    def _available_tasks(
+        *,
+        question_idx: int | None = None,
+        version: int | None = None,
+        user: User | None = None,
+        min_paper_num: int | None = None,
+        max_paper_num: int | None = None,
+        tags: list[str] | None = None,
+        exclude_tagged_for_others: bool = True,
+    ) -> QuerySet[MarkingTask]:
+        """The 'todo' tasks matching the filters, in the order to hand them out.
+
+        See :meth:`get_first_available_task` for the arguments.
+        """
+        available = MarkingTask.objects.filter(status=MarkingTask.TO_DO)
+
+        if question_idx:
+            available = available.filter(question_index=question_idx)
+
+        if version:
+            available = available.filter(question_version=version)
+
+        if min_paper_num:
+            available = available.filter(paper__paper_number__gte=min_paper_num)
+
+        if max_paper_num:
+            available = available.filter(paper__paper_number__lte=max_paper_num)
+
+        if tags:
+            available = available.filter(markingtasktag__text__in=tags)
+
+        if exclude_tagged_for_others:
+            # Tags like "@username" know their user (see MarkingTaskTag.for_user)
+            # so this is a subquery on the (small) tag table
+            other_user_tags = MarkingTaskTag.objects.filter(for_user__isnull=False)
+            if user is not None:
+                other_user_tags = other_user_tags.exclude(for_user=user)
+            # anything explicitly in tags should not be filtered here
+            if tags:
+                other_user_tags = other_user_tags.exclude(text__in=tags)
+            available = available.exclude(markingtasktag__in=other_user_tags)
+
+        return available.select_related("paper").order_by(
+            "-marking_priority", "paper__paper_number", "question_index"
+        )
+
+    @classmethod
     @transaction.atomic
     def get_first_available_task(
+        cls,
         *,
         question_idx: int | None = None,
         version: int | None = None,
@@ -90,38 +139,129 @@ class QuestionMarkingService:
             A reference to the first available task, or
             `None` if no such task exists.
         """
-        available = MarkingTask.objects.filter(status=MarkingTask.TO_DO)
-
-        if question_idx:
-            available = available.filter(question_index=question_idx)
+        return cls._available_tasks(
+            question_idx=question_idx,
+            version=version,
+            user=user,
+            min_paper_num=min_paper_num,
+            max_paper_num=max_paper_num,
+            tags=tags,
+            exclude_tagged_for_others=exclude_tagged_for_others,
+        ).first()
 
-        if version:
-            available = available.filter(question_version=version)
+    @classmethod
+    @transaction.atomic
+    def claim_first_available_task(
+        cls,
+        user: User,
+        *,
+        question_idx: int | None = None,
+        version: int | None = None,
+        min_paper_num: int | None = None,
+        max_paper_num: int | None = None,
+        tags: list[str] | None = None,
+        exclude_tagged_for_others: bool = True,
+    ) -> MarkingTask | None:
+        """Find the first available marking task and assign it to a user.
 
-        if min_paper_num:
-            available = available.filter(paper__paper_number__gte=min_paper_num)
+        Unlike calling :meth:`get_first_available_task` and then claiming
+        the result, concurrent callers do not race for the same task: the
+        row is locked as it is selected, and rows already locked by other
+        callers are skipped (``SELECT ... FOR UPDATE SKIP LOCKED``).  On
+        databases without row locking (SQLite) this degrades to an
+        ordinary select inside the transaction.
 
-        if max_paper_num:
-            available = available.filter(paper__paper_number__lte=max_paper_num)
+        Args:
+            user: who is claiming the task.
 
-        if tags:
-            available = available.filter(markingtasktag__text__in=tags)
+        Keyword Args:
+            question_idx: as in :meth:`get_first_available_task`.
+            version: as in :meth:`get_first_available_task`.
+            min_paper_num: as in :meth:`get_first_available_task`.
+            max_paper_num: as in :meth:`get_first_available_task`.
+            tags: as in :meth:`get_first_available_task`.
+            exclude_tagged_for_others: as in :meth:`get_first_available_task`.
+
+        If the prefetched dispatch queue is enabled (see
+        :mod:`plom_server.Mark.services.dispatch_queue`) and only the
+        question and version are specified, we try to claim from the
+        queue first, without sorting the task table.
 
-        if exclude_tagged_for_others:
-            users = User.objects.all()
-            other_user_tags = [f"@{u}" for u in users if u != user]
-            # anything explicitly in tags should not be filtered here
-            if tags:
-                other_user_tags = [x for x in other_user_tags if x not in tags]
-            available = available.exclude(markingtasktag__text__in=other_user_tags)
+        Returns:
+            The task, now OUT and assigned to the user, or `None` if
+            no task is available.
+        """
+        if (
+            dispatch_queue.is_enabled()
+            and question_idx
+            and version
+            and not (tags or min_paper_num or max_paper_num)
+            and exclude_tagged_for_others
+        ):
+            task = dispatch_queue.claim_next_task(user, question_idx, version)
+            if task is not None:
+                return task
 
-        if not available.exists():
+        task = (
+            cls._available_tasks(
+                question_idx=question_idx,
+                version=version,
+                user=user,
+                min_paper_num=min_paper_num,
+                max_paper_num=max_paper_num,
+                tags=tags,
+                exclude_tagged_for_others=exclude_tagged_for_others,
+            )
+            .select_for_update(skip_locked=True, of=("self",))
+            .first()
+        )
+        if task is None:
             return None
+        task.assigned_user = user
+        task.status = MarkingTask.OUT
+        task.save(update_fields=["assigned_user", "status", "last_update"])
+        return task
 
-        first_task = available.order_by(
-            "-marking_priority", "paper__paper_number", "question_index"
-        ).first()
-        return first_task
+    @classmethod
+    def claim_next_tasks(
+        cls,
+        user: User,
+        n: int,
+        *,
+        tags: list[str] | None = None,
+        **kwargs,
+    ) -> list[MarkingTask]:
+        """Claim up to ``n`` of the first available marking tasks for a user.
+
+        Each claim is made as in :meth:`claim_first_available_task`, and
+        is committed as it is made: a partial list is returned if we run
+        out of tasks.
+
+        Args:
+            user: who is claiming the tasks.
+            n: the maximum number of tasks to claim.
+
+        Keyword Args:
+            tags: a *preference* for tasks matching any of these tags:
+                when there are no more such tasks, we claim untagged tasks.
+            kwargs: other filters, as in :meth:`claim_first_available_task`.
+
+        Returns:
+            The claimed tasks, in the order they were claimed, possibly empty.
+        """
+        tasks: list[MarkingTask] = []
+        while len(tasks) < n:
+            task = None
+            if tags:
+                task = cls.claim_first_available_task(user, tags=tags, **kwargs)
+                if task is None:
+                    tags = None
+            if task is None:
+                task = cls.claim_first_available_task(user, **kwargs)
+            if task is None:
+                break
+            tasks.append(task)
+        return tasks
 
     @staticmethod
     def _user_can_update_task(user: User, task: MarkingTask) -> bool:
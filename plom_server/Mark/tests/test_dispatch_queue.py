@@ -0,0 +1,81 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from model_bakery import baker
+
+from ..services import MarkingTaskService, QuestionMarkingService
+from ..services import dispatch_queue
+from ..models import MarkingTask
+
+
+@override_settings(PLOM_MARKING_DISPATCH_QUEUE=2)
+class DispatchQueueTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.tasks = [
+            baker.make(
+                MarkingTask,
+                status=MarkingTask.TO_DO,
+                question_index=1,
+                question_version=1,
+                paper__paper_number=n,
+                code=f"{n:04}g1",
+                marking_priority=10 - n,
+            )
+            for n in range(1, 5)
+        ]
+
+    def test_pop_gives_different_codes(self) -> None:
+        codes = [dispatch_queue.next_available_task_code(1, 1) for _ in range(4)]
+        self.assertEqual(codes, ["0001g1", "0002g1", "0003g1", "0004g1"])
+
+    def test_claim_skips_stale_entries(self) -> None:
+        user: User = baker.make(User)
+        dispatch_queue.next_available_task_code(1, 1)  # fill the queue
+        self.tasks[0].status = MarkingTask.COMPLETE
+        self.tasks[0].save()
+        task = dispatch_queue.claim_next_task(user, 1, 1)
+        self.assertEqual(task, self.tasks[1])
+        self.assertEqual(task.status, MarkingTask.OUT)
+        self.assertEqual(task.assigned_user, user)
+
+    def test_tagging_invalidates(self) -> None:
+        user: User = baker.make(User, username="user0")
+        baker.make(User, username="user1")
+        self.assertEqual(dispatch_queue.next_available_task_code(1, 1), "0001g1")
+        tag = MarkingTaskService.get_or_create_tag("@user1")
+        MarkingTaskService()._add_tag(tag, self.tasks[1])
+        # fresh queue, from the start, but without the tagged task
+        task = QuestionMarkingService.claim_first_available_task(
+            user, question_idx=1, version=1
+        )
+        self.assertEqual(task, self.tasks[0])
+        task = QuestionMarkingService.claim_first_available_task(
+            user, question_idx=1, version=1
+        )
+        self.assertEqual(task, self.tasks[2])
+
+    def test_tasks_tagged_for_the_user_come_first(self) -> None:
+        user: User = baker.make(User, username="user1")
+        self.assertEqual(
+            dispatch_queue.next_available_task_code(1, 1, user=user), "0001g1"
+        )
+        self.tasks[3].marking_priority = 100
+        self.tasks[3].save()
+        tag = MarkingTaskService.get_or_create_tag("@user1")
+        MarkingTaskService()._add_tag(tag, self.tasks[3])
+        self.assertIsNone(dispatch_queue.next_available_task_code(1, 1, user=user))
+        self.assertIsNone(dispatch_queue.claim_next_task(user, 1, 1))
+        # the database query, which puts the tagged task first by priority
+        task = QuestionMarkingService.claim_first_available_task(
+            user, question_idx=1, version=1
+        )
+        self.assertEqual(task, self.tasks[3])
+        # none left tagged for them, so back to the queue
+        task = QuestionMarkingService.claim_first_available_task(
+            user, question_idx=1, version=1
+        )
+        self.assertEqual(task, self.tasks[0])
@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+import statistics
+
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from ..models import Annotation, MarkingTask
+from ..services import MarkingStatsService
+from ..services.marking_stats import _median_and_mode, score_histogram_from_counts
+
+
+class MarkingStatsHelperTests(TestCase):
+    def test_median_and_mode(self) -> None:
+        for marks in ([3], [1, 2], [0, 5, 5, 2], [1, 1, 2, 2, 4], [0.5, 2.5, 2.5]):
+            counts = {s: marks.count(s) for s in set(marks)}
+            median, mode = _median_and_mode(counts)
+            self.assertEqual(median, statistics.median(marks))
+            self.assertEqual(mode, min(statistics.multimode(marks)))
+
+    def test_histogram_bins(self) -> None:
+        # half-open bins, except the top mark which gets its own
+        counts = {0: 1, 0.5: 1, 1: 1, 2.5: 1, 3: 1, 4: 1, 7: 1}
+        hist = score_histogram_from_counts(counts, 3)
+        self.assertEqual(hist, {0: 2, 1: 1, 2: 1, 3: 1})
+
+
+class MarkingStatsServiceTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        for n, (ver, score) in enumerate([(1, 2), (1, 2), (1, 3), (2, 1)], start=1):
+            task = baker.make(
+                MarkingTask,
+                status=MarkingTask.COMPLETE,
+                question_index=1,
+                question_version=ver,
+                paper__paper_number=n,
+            )
+            task.latest_annotation = baker.make(Annotation, task=task, score=score)
+            task.save()
+        baker.make(
+            MarkingTask,
+            status=MarkingTask.TO_DO,
+            question_index=1,
+            question_version=2,
+            paper__paper_number=5,
+        )
+
+    def test_scores_for_question_version(self) -> None:
+        scores = MarkingStatsService.get_scores_for_question_version(1, 1)
+        self.assertEqual(sorted(scores), [2, 2, 3])
+
+    def test_score_counts(self) -> None:
+        d = MarkingStatsService.get_score_counts_by_question_version()
+        self.assertEqual(d, {1: {1: {2: 2, 3: 1}, 2: {1: 1}}})
+
+    def test_score_counts_see_new_marks(self) -> None:
+        MarkingStatsService.get_score_counts_by_question_version()
+        task = MarkingTask.objects.get(status=MarkingTask.TO_DO)
+        task.latest_annotation = baker.make(Annotation, task=task, score=1)
+        task.status = MarkingTask.COMPLETE
+        task.save()
+        d = MarkingStatsService.get_score_counts_by_question_version()
+        self.assertEqual(d[1][2], {1: 2})
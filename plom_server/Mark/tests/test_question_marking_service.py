@@ -5,10 +5,11 @@
 # Copyright (C) 2023 Andrew Rechnitzer
 # Copyright (C) 2025 Aidan Murphy
 
+from django.contrib.auth.models import User
 from django.test import TestCase
 from model_bakery import baker
 
-from ..services import QuestionMarkingService
+from ..services import QuestionMarkingService, MarkingTaskService
 from ..models import MarkingTask
 
 
@@ -46,3 +47,54 @@ class QuestionMarkingServiceTests(TestCase):
 
         next_task = QuestionMarkingService.get_first_available_task()
         self.assertEqual(next_task, task5)
+
+    def test_exclude_tasks_tagged_for_others(self) -> None:
+        alice: User = baker.make(User, username="alice")
+        bob: User = baker.make(User, username="bob")
+        task1 = baker.make(
+            MarkingTask, status=MarkingTask.TO_DO, paper__paper_number=1, code="1"
+        )
+        task2 = baker.make(
+            MarkingTask, status=MarkingTask.TO_DO, paper__paper_number=2, code="2"
+        )
+        tag = MarkingTaskService.get_or_create_tag("@bob")
+        self.assertEqual(tag.for_user, bob)
+        tag.task.add(task1)
+
+        self.assertEqual(
+            QuestionMarkingService.get_first_available_task(user=alice), task2
+        )
+        self.assertEqual(
+            QuestionMarkingService.get_first_available_task(user=bob), task1
+        )
+        self.assertEqual(
+            QuestionMarkingService.get_first_available_task(user=alice, tags=["@bob"]),
+            task1,
+        )
+        self.assertEqual(
+            QuestionMarkingService.get_first_available_task(
+                user=alice, exclude_tagged_for_others=False
+            ),
+            task1,
+        )
+
+    def test_claim_first_available_task(self) -> None:
+        user: User = baker.make(User)
+        task1 = baker.make(
+            MarkingTask,
+            status=MarkingTask.TO_DO,
+            paper__paper_number=1,
+            code="1",
+            marking_priority=2.0,
+        )
+        task2 = baker.make(
+            MarkingTask, status=MarkingTask.TO_DO, paper__paper_number=2, code="2"
+        )
+        task = QuestionMarkingService.claim_first_available_task(user)
+        self.assertEqual(task, task1)
+        task1.refresh_from_db()
+        self.assertEqual(task1.status, MarkingTask.OUT)
+        self.assertEqual(task1.assigned_user, user)
+
+        self.assertEqual(QuestionMarkingService.claim_first_available_task(user), task2)
+        self.assertIsNone(QuestionMarkingService.claim_first_available_task(user))
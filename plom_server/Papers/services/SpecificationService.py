@@ -18,9 +18,9 @@ from typing import Any
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.text import slugify
 from django.db import transaction
-from django.db.models import Max, Sum
 
 from plom.common.spec_verifier import SpecVerifier
+from plom_server.Base.services import config_cache
 from ..models import Specification, SpecQuestion
 from ..serializers import SpecSerializer
 from plom_server.Preparation.services.preparation_dependency_service import (
@@ -31,6 +31,66 @@ from plom_server.Papers.models import MobilePage
 log = logging.getLogger(__name__)
 
 
+def _read_spec_summary() -> dict[str, Any] | None:
+    with transaction.atomic():
+        spec = Specification.objects.first()
+        if spec is None:
+            return None
+        summary = {
+            f: getattr(spec, f)
+            for f in (
+                "name",
+                "longName",
+                "idPage",
+                "doNotMarkPages",
+                "numberOfQuestions",
+                "numberOfVersions",
+                "numberOfPages",
+                "totalMarks",
+            )
+        }
+        summary["questions"] = {
+            q.question_index: {
+                "mark": q.mark,
+                "label": q.label,
+                "bonus": q.bonus,
+                "pages": q.pages,
+                "select": q.select,
+            }
+            for q in SpecQuestion.objects.all().order_by("question_index")
+        }
+    return summary
+
+
+def _get_spec_summary_or_none() -> dict[str, Any] | None:
+    """The frequently-used parts of the spec, from the cache, or None if no spec.
+
+    Everything but the private seed, flattened into a dict with the
+    questions keyed by their index.
+    """
+    return config_cache.get("spec", _read_spec_summary)
+
+
+def _get_spec_summary() -> dict[str, Any]:
+    summary = _get_spec_summary_or_none()
+    if summary is None:
+        raise Specification.DoesNotExist(
+            "The database does not contain a specification."
+        )
+    return summary
+
+
+def _get_question_summary(question_index: str | int) -> dict[str, Any]:
+    summary = _get_spec_summary_or_none()
+    questions = summary["questions"] if summary else {}
+    try:
+        return questions[int(question_index)]
+    except KeyError:
+        raise SpecQuestion.DoesNotExist(
+            f"There is no question with index {question_index}."
+        ) from None
+
+
 def validate_spec_from_dict(spec_dict: dict[str, Any]) -> bool:
     """Validate an assessment specification (as a dict), but don't install it on server.
 
@@ -114,6 +174,7 @@ def install_spec_from_dict(
     # TODO: the raising of ValueErrors appears non-standard, consider refactor
     serializer.is_valid(raise_exception=True)
     valid_data = serializer.validated_data
+    config_cache.invalidate("spec")
     return serializer.create(valid_data)
 
 
@@ -172,7 +233,7 @@ def install_spec_from_json_string(jsonstr: str) -> Specification:
 
 def is_there_a_spec() -> bool:
     """Has a test-specification been uploaded to the database."""
-    return Specification.objects.count() == 1
+    return _get_spec_summary_or_none() is not None
 
 
 @transaction.atomic
@@ -243,43 +304,37 @@ def remove_spec() -> None:
 
     assert_can_modify_spec()
     with transaction.atomic():
+        config_cache.invalidate("spec")
         Specification.objects.all().delete()
         SpecQuestion.objects.all().delete()
 
 
-@transaction.atomic
 def get_longname() -> str:
     """Get the long name of the exam.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.longName
+    return _get_spec_summary()["longName"]
 
 
-@transaction.atomic
 def get_shortname() -> str:
     """Get the short name of the exam.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.name
+    return _get_spec_summary()["name"]
 
 
-@transaction.atomic
 def get_short_and_long_names_or_empty() -> tuple[str, str]:
     """Get the long and short names of the exam, or return empty strings."""
-    try:
-        spec = Specification.objects.get()
-        return (spec.name, spec.longName)
-    except ObjectDoesNotExist:
+    spec = _get_spec_summary_or_none()
+    if spec is None:
         return ("", "")
+    return (spec["name"], spec["longName"])
 
 
-@transaction.atomic
 def get_short_name_slug() -> str:
     """Get the short name of the exam, slugified.
 
@@ -289,29 +344,24 @@ def get_short_name_slug() -> str:
     return slugify(get_shortname())
 
 
-@transaction.atomic
 def get_id_page_number() -> int:
     """Get the page number of the ID page.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.idPage
+    return _get_spec_summary()["idPage"]
 
 
-@transaction.atomic
 def get_dnm_pages() -> list[int]:
     """Get the list of do-no-mark page numbers.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.doNotMarkPages
+    return _get_spec_summary()["doNotMarkPages"]
 
 
-@transaction.atomic
 def get_question_pages() -> dict[int, list[int]]:
     """Get the pages of each question, indexed from one.
 
@@ -320,23 +370,17 @@ def get_question_pages() -> dict[int, list[int]]:
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    # check if there is a spec, else raise an exception
-    _ = Specification.objects.get()
-    question_pages = {
-        q_obj.question_index: q_obj.pages for q_obj in SpecQuestion.objects.all()
-    }
-    return question_pages
+    questions = _get_spec_summary()["questions"]
+    return {qidx: q["pages"] for qidx, q in questions.items()}
 
 
-@transaction.atomic
 def get_n_questions() -> int:
     """Get the number of questions in the test.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.numberOfQuestions
+    return _get_spec_summary()["numberOfQuestions"]
 
 
 def get_n_versions() -> int:
@@ -345,11 +389,10 @@ def get_n_versions() -> int:
     If there is no spec, return 1, because there is implicitly always going
     to be at least one version.
     """
-    try:
-        spec = Specification.objects.get()
-        return spec.numberOfVersions
-    except ObjectDoesNotExist:
+    spec = _get_spec_summary_or_none()
+    if spec is None:
         return 1
+    return spec["numberOfVersions"]
 
 
 def get_list_of_versions() -> list[int]:
@@ -374,15 +417,13 @@ def get_question_indices() -> list[int]:
         return []
 
 
-@transaction.atomic
 def get_n_pages() -> int:
     """Get the number of pages in the test.
 
     Exceptions:
         ObjectDoesNotExist: no exam specification yet.
     """
-    spec = Specification.objects.get()
-    return spec.numberOfPages
+    return _get_spec_summary()["numberOfPages"]
 
 
 def get_list_of_pages() -> list[int]:
@@ -390,9 +431,10 @@ def get_list_of_pages() -> list[int]:
 
     If there is no spec, an empty list.
     """
-    if not is_there_a_spec():
+    spec = _get_spec_summary_or_none()
+    if spec is None:
         return []
-    return [p + 1 for p in range(get_n_pages())]
+    return [p + 1 for p in range(spec["numberOfPages"])]
 
 
 def get_question_max_mark(question_index: str | int) -> int:
@@ -408,32 +450,33 @@ def get_question_max_mark(question_index: str | int) -> int:
     Raises:
         ObjectDoesNotExist: no question exists with the given index.
     """
-    question = SpecQuestion.objects.get(question_index=question_index)
-    return question.mark
+    return _get_question_summary(question_index)["mark"]
 
 
 # Some code uses this older synonym but it confuses me without the word "max"
 get_question_mark = get_question_max_mark
 
 
-@transaction.atomic
+def _get_questions_or_empty() -> dict[int, dict[str, Any]]:
+    spec = _get_spec_summary_or_none()
+    return spec["questions"] if spec else {}
+
+
 def get_questions_max_marks() -> dict[int, int]:
     """Get the maximum marks of all questions.
 
     Returns:
         A dictionary of question indices giving the corresponding maximum marks.
     """
-    return {q.question_index: q.mark for q in SpecQuestion.objects.all()}
+    return {qidx: q["mark"] for qidx, q in _get_questions_or_empty().items()}
 
 
-@transaction.atomic
-def get_max_all_question_mark() -> int:
+def get_max_all_question_mark() -> int | None:
     """Get the maximum mark of all questions, or None if no questions.
 
     For example, if Q1 is out of 4 and Q2 is out of 6, this will return 6.
     """
-    # the aggregate function returns dict {"mark__max": n}
-    return SpecQuestion.objects.all().aggregate(Max("mark"))["mark__max"]
+    return max((q["mark"] for q in _get_questions_or_empty().values()), default=None)
 
 
 def get_assessment_total(*, include_bonus: bool) -> int:
@@ -449,15 +492,17 @@ def get_assessment_total(*, include_bonus: bool) -> int:
             in the future.
     """
     if not include_bonus:
-        spec = Specification.objects.get()
-        return spec.totalMarks
-    return SpecQuestion.objects.all().aggregate(Sum("mark"))["mark__sum"]
+        return _get_spec_summary()["totalMarks"]
+    questions = _get_questions_or_empty()
+    if not questions:
+        # as for the sum aggregate of no questions
+        return None
+    return sum(q["mark"] for q in questions.values())
 
 
 def is_question_bonus(question_index: int) -> bool:
     """Is a particular question a bonus question?"""
-    question = SpecQuestion.objects.get(question_index=question_index)
-    return question.bonus
+    return _get_question_summary(question_index)["bonus"]
 
 
 @transaction.atomic
@@ -466,7 +511,6 @@ def n_pages_for_question(question_index) -> int:
     return SpecQuestion.objects.filter(question_index=question_index).count()
 
 
-@transaction.atomic
 def get_question_label(question_index: str | int) -> str:
     """Get the question label from its one-index.
 
@@ -481,10 +525,10 @@ def get_question_label(question_index: str | int) -> str:
     Raises:
         ObjectDoesNotExist: no question exists with the given index.
     """
-    question = SpecQuestion.objects.get(question_index=question_index)
-    if question.label is None:
+    label = _get_question_summary(question_index)["label"]
+    if label is None:
         return f"Q{question_index}"
-    return question.label
+    return label
 
 
 def get_question_index_label_pairs() -> list[tuple[int, str]]:
@@ -494,11 +538,9 @@ def get_question_index_label_pairs() -> list[tuple[int, str]]:
         The question indices and labels as pairs of tuples in a list.
         The pairs are ordered by their indices.
     """
-    questions = SpecQuestion.objects.all().order_by("question_index")
     lst = []
-    for q in questions:
-        qidx = q.question_index
-        label = q.label
+    for qidx, q in sorted(_get_questions_or_empty().items()):
+        label = q["label"]
         if label is None:
             label = f"Q{qidx}"
         lst.append((qidx, label))
@@ -507,15 +549,10 @@ def get_question_index_label_pairs() -> list[tuple[int, str]]:
 
 def get_question_html_label_triples() -> list[tuple[int, str, str]]:
     """Get the question indices, string labels and fancy HTML labels as a list of triples."""
-    questions = SpecQuestion.objects.all().order_by("question_index")
-    lst = []
-    for q in questions:
-        qidx = q.question_index
-        label = q.label
-        if label is None:
-            label = f"Q{qidx}"
-        lst.append((qidx, label, _render_html_question_label(qidx, label)))
-    return lst
+    return [
+        (qidx, label, _render_html_question_label(qidx, label))
+        for qidx, label in get_question_index_label_pairs()
+    ]
 
 
 def get_question_labels() -> list[str]:
@@ -601,10 +638,8 @@ def get_selection_method_of_all_questions() -> dict[int, list[int] | None]:
     Returns:
         Dict of {q_index: selection} where selection is a list of versions, or None.
     """
-    selection_method = {}
-    for question in SpecQuestion.objects.all().order_by("question_index"):
-        selection_method[question.question_index] = question.select
-    return selection_method
+    questions = _get_questions_or_empty()
+    return {qidx: questions[qidx]["select"] for qidx in sorted(questions)}
 
 
 def _flatten_serializer_errors(errs) -> list[str]:
@@ -28,7 +28,6 @@ from ..models import (
     MobilePage,
     Paper,
 )
-from .paper_info import PaperInfoService
 from . import SpecificationService
 
 
@@ -92,7 +91,7 @@ class ImageBundleService:
 
         bundle_images = StagingImage.objects.filter(
             bundle=staged_bundle
-        ).prefetch_related("baseimage")
+        ).select_related("baseimage")
 
         # Staging has checked this - but we check again here to be very sure
         if not cls.all_staged_imgs_valid(bundle_images):
@@ -125,8 +124,27 @@ class ImageBundleService:
         )
         uploaded_bundle.save()
 
-        # we create all the images as O(n) but then update
-        # fixed-pages and associated structures in O(1) - I hope
+        # We create all the images in one bulk call and then update
+        # fixed-pages and associated structures in a handful of bulk calls,
+        # so that we hold the locks on the fixed-pages as briefly as we can.
+        images = [
+            Image(
+                bundle=uploaded_bundle,
+                bundle_order=staged.bundle_order,
+                original_name=staged.baseimage.image_file.name,
+                baseimage=staged.baseimage,
+                # ensure that a pushed image has a defined rotation
+                # hard-coded to set rotation=0 if no staging image rotation exists
+                # the use of rotation=None for StagingImages is currently unused,
+                # but could be in future for user scanning orientation default: see #1825 and #2050
+                rotation=0 if staged.rotation is None else staged.rotation,
+                parsed_qr=staged.parsed_qr,
+            )
+            for staged in bundle_images
+        ]
+        # On our supported databases this sets the primary keys of the images
+        Image.objects.bulk_create(images)
+
         new_mobile_pages = []
         new_discard_pages = []
         updated_fixed_pages = []
@@ -143,31 +161,31 @@ class ImageBundleService:
         # questions share pages).
         fixedpage_by_pn_pg = defaultdict(list)
         for fp in (
-            FixedPage.objects.select_for_update()
+            FixedPage.objects.select_for_update(of=("self",))
             .filter(paper__paper_number__in=paper_numbers)
-            .prefetch_related("paper")
+            .select_related("paper")
         ):
             fixedpage_by_pn_pg[(fp.paper.paper_number, fp.page_number)].append(fp)
 
-        for staged in bundle_images:
-            # ensure that a pushed image has a defined rotation
-            # hard-coded to set rotation=0 if no staging image rotation exists
-            # the use of rotation=None for StagingImages is currently unused,
-            # but could be in future for user scanning orientation default: see #1825 and #2050
-            if staged.rotation is None:
-                rot_to_push = 0
-            else:
-                rot_to_push = staged.rotation
-            image = Image(
-                bundle=uploaded_bundle,
-                bundle_order=staged.bundle_order,
-                original_name=staged.baseimage.image_file.name,
-                baseimage=staged.baseimage,
-                rotation=rot_to_push,
-                parsed_qr=staged.parsed_qr,
-            )
-            image.save()
-
+        # Extra pages need their papers and the versions of their questions:
+        # look these up all at once rather than per page and question.
+        extra_paper_numbers = set(
+            staged.paper_number
+            for staged in bundle_images
+            if staged.image_type == StagingImage.EXTRA
+        )
+        paper_by_pn = {
+            paper.paper_number: paper
+            for paper in Paper.objects.filter(paper_number__in=extra_paper_numbers)
+        }
+        version_by_pn_qidx: dict[tuple[int, int], int] = {}
+        for pn, qidx, v in FixedPage.objects.filter(
+            page_type=FixedPage.QUESTIONPAGE,
+            paper__paper_number__in=extra_paper_numbers,
+        ).values_list("paper__paper_number", "question_index", "version"):
+            version_by_pn_qidx.setdefault((pn, qidx), v)
+
+        for staged, image in zip(bundle_images, images):
             if staged.image_type == StagingImage.KNOWN:
                 # This handles all types of FixedPages: Question, ID and DNM
                 fp_list = fixedpage_by_pn_pg[(staged.paper_number, staged.page_number)]
@@ -182,12 +200,21 @@ class ImageBundleService:
 
             elif staged.image_type == StagingImage.EXTRA:
                 # need to make one mobile page for each question in the question-list
-                paper = Paper.objects.get(paper_number=staged.paper_number)
+                try:
+                    paper = paper_by_pn[staged.paper_number]
+                except KeyError:
+                    raise Paper.DoesNotExist(
+                        f"Paper {staged.paper_number} does not exist in the database."
+                    ) from None
                 for q in staged.question_idx_list:
                     # get the version from the paper/question info
-                    v = PaperInfoService.get_version_from_paper_question(
-                        staged.paper_number, q
-                    )
+                    try:
+                        v = version_by_pn_qidx[(staged.paper_number, q)]
+                    except KeyError:
+                        raise ValueError(
+                            f"Question index {q} does not exist"
+                            f" in paper {staged.paper_number}."
+                        ) from None
                     # defer actual DB creation to bulk operation later
                     new_mobile_pages.append(
                         MobilePage(
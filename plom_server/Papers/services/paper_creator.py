@@ -5,7 +5,7 @@
 # Copyright (C) 2023 Natalie Balashov
 
 import logging
-from typing import Any
+from typing import Any, Callable
 
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
@@ -54,31 +54,15 @@ def huey_populate_whole_db(
         tracker_pk, task.id, msg=f"Populating {N} papers in database..."
     )
 
-    id_page_number = SpecificationService.get_id_page_number()
-    dnm_page_numbers = SpecificationService.get_dnm_pages()
-    question_page_numbers = SpecificationService.get_question_pages()
+    def _report_progress(done: int, total: int) -> None:
+        PopulateEvacuateDBChore.set_message(
+            tracker_pk, f"Populated {done} of {total} papers in database"
+        )
+        log.info(f"Populated {done} of {total} papers in database")
 
-    # TODO - move much of this loop back into paper-creator.
-    for idx, (paper_number, qv_row) in enumerate(qv_map.items()):
-        try:
-            PaperCreatorService._create_single_paper_from_qvmapping_and_pages(
-                paper_number,
-                qv_row,
-                id_page_number=id_page_number,
-                dnm_page_numbers=dnm_page_numbers,
-                question_page_numbers=question_page_numbers,
-            )
-        except KeyError as e:
-            # increase verbosity, else it just prints like "4"
-            raise KeyError(
-                f"KeyError {e}: perhaps not enough columns in your upload?"
-            ) from e
-
-        if idx % 16 == 0:
-            PopulateEvacuateDBChore.set_message(
-                tracker_pk, f"Populated {idx} of {N} papers in database"
-            )
-            log.info(f"Populated {idx} of {N} papers in database")
+    PaperCreatorService._bulk_create_papers_from_qvmapping(
+        qv_map, progress_callback=_report_progress
+    )
 
     # TODO: currently we let the catch-all in Base/models.py handle exceptions but
     # we could do so here, avoiding errors in Huey logs... Which is better?
@@ -118,23 +102,14 @@ def huey_evacuate_whole_db(
     PopulateEvacuateDBChore.transition_to_running(
         tracker_pk, task.id, msg="Deleting all papers from database..."
     )
-    all_papers = Paper.objects.all().prefetch_related("fixedpage_set")
-    N = all_papers.count()
-    for idx, paper_obj in enumerate(all_papers):
-        for fp in paper_obj.fixedpage_set.all():
-            fp.delete()
-        paper_obj.delete()
-        if idx % 16 == 0:
-            PopulateEvacuateDBChore.set_message(
-                tracker_pk, f"Deleted {idx} of {N} papers from database"
-            )
-            log.info(f"Deleted {idx} of {N} papers from database")
-    # TODO - decide if we should delete by table rather than by paper.
-    # Table delete code follows below
-    # with transaction.atomic():
-    #     FixedPage.objects.all().delete()
-    # with transaction.atomic():
-    #     Paper.objects.all().delete()
+
+    def _report_progress(done: int, total: int) -> None:
+        PopulateEvacuateDBChore.set_message(
+            tracker_pk, f"Deleted {done} of {total} papers from database"
+        )
+        log.info(f"Deleted {done} of {total} papers from database")
+
+    N = PaperCreatorService._bulk_delete_all_papers(progress_callback=_report_progress)
 
     PopulateEvacuateDBChore.transition_to_complete(
         tracker_pk, msg=f"Deleted all {N} papers from database"
@@ -166,6 +141,73 @@ class PaperCreatorService:
     def _reset_number_to_produce(cls) -> None:
         Settings.key_value_store_reset("_tmp_number_of_papers_to_produce")
 
+    @staticmethod
+    def _make_unsaved_paper_and_fixedpages(
+        paper_number: int,
+        qv_row: dict[Any, int],
+        *,
+        id_page_number: int,
+        dnm_page_numbers: list[int],
+        question_page_numbers: dict[int, list[int]],
+    ) -> tuple[Paper, list[FixedPage]]:
+        """Build, but do not save, a paper and its fixed pages from supplied information.
+
+        Args:
+            paper_number: The number of the paper being created
+            qv_row: Mapping from each question index to
+                version for this particular paper. Of the form ``{q: v}``.
+                Optionally contains the key `"id"`, the value of which
+                is assumed to be 1 if omitted.
+
+        Keyword Args:
+            id_page_number: the id-page page-number
+            dnm_page_numbers: a list of the dnm pages
+            question_page_numbers: the pages of each question
+
+        Returns:
+            The paper and a list of its fixed pages.  The pages refer
+            to the paper, so the paper must be saved first.
+
+        Raises:
+            KeyError: problem with qvmap input.
+        """
+        paper_obj = Paper(paper_number=paper_number)
+        fixedpages = [
+            FixedPage(
+                page_type=FixedPage.IDPAGE,
+                paper=paper_obj,
+                image=None,
+                page_number=id_page_number,
+                version=qv_row.get("id", 1),
+            )
+        ]
+        # currently DNM pages are always taken from version 1
+        for pg in dnm_page_numbers:
+            fixedpages.append(
+                FixedPage(
+                    page_type=FixedPage.DNMPAGE,
+                    paper=paper_obj,
+                    image=None,
+                    page_number=pg,
+                    version=1,
+                )
+            )
+        for index, q_pages in question_page_numbers.items():
+            q_idx = int(index)
+            version = int(qv_row[q_idx])
+            for pg in q_pages:
+                fixedpages.append(
+                    FixedPage(
+                        page_type=FixedPage.QUESTIONPAGE,
+                        paper=paper_obj,
+                        image=None,
+                        page_number=int(pg),
+                        question_index=q_idx,
+                        version=version,
+                    )
+                )
+        return paper_obj, fixedpages
+
     @staticmethod
     @transaction.atomic()
     def _create_single_paper_from_qvmapping_and_pages(
@@ -208,35 +250,104 @@ class PaperCreatorService:
         if question_page_numbers is None:
             question_page_numbers = SpecificationService.get_question_pages()
 
-        paper_obj = Paper.objects.create(paper_number=paper_number)
-        FixedPage.objects.create(
-            page_type=FixedPage.IDPAGE,
-            paper=paper_obj,
-            image=None,
-            page_number=id_page_number,
-            version=qv_row.get("id", 1),
+        paper_obj, fixedpages = PaperCreatorService._make_unsaved_paper_and_fixedpages(
+            paper_number,
+            qv_row,
+            id_page_number=id_page_number,
+            dnm_page_numbers=dnm_page_numbers,
+            question_page_numbers=question_page_numbers,
         )
-        # currently DNM pages are always taken from version 1
-        for pg in dnm_page_numbers:
-            FixedPage.objects.create(
-                page_type=FixedPage.DNMPAGE,
-                paper=paper_obj,
-                image=None,
-                page_number=pg,
-                version=1,
-            )
-        for index, q_pages in question_page_numbers.items():
-            q_idx = int(index)
-            version = int(qv_row[q_idx])
-            for pg in q_pages:
-                FixedPage.objects.create(
-                    page_type=FixedPage.QUESTIONPAGE,
-                    paper=paper_obj,
-                    image=None,
-                    page_number=int(pg),
-                    question_index=q_idx,
-                    version=version,
-                )
+        paper_obj.save()
+        FixedPage.objects.bulk_create(fixedpages)
+
+    @classmethod
+    def _bulk_create_papers_from_qvmapping(
+        cls,
+        qv_map: dict[int, dict[int | str, int]],
+        *,
+        batch_size: int = 250,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> None:
+        """Create the papers and fixed pages of a whole qv-map in bulk.
+
+        Each batch of papers and their pages is inserted with a couple
+        of bulk queries, in its own transaction.
+
+        Args:
+            qv_map: For each paper give the question-version map.
+                Of the form `{paper_number: {q: v}}`
+
+        Keyword Args:
+            batch_size: how many papers to create in each batch.
+            progress_callback: if given, called after each batch with the
+                number of papers created so far and the total.
+
+        Raises:
+            ObjectDoesNotExist: no spec.
+            IntegrityError: a paper number already exists.
+            KeyError: problem with qvmap input.
+        """
+        id_page_number = SpecificationService.get_id_page_number()
+        dnm_page_numbers = SpecificationService.get_dnm_pages()
+        question_page_numbers = SpecificationService.get_question_pages()
+
+        N = len(qv_map)
+        rows = list(qv_map.items())
+        for start in range(0, N, batch_size):
+            papers = []
+            fixedpages = []
+            for paper_number, qv_row in rows[start : start + batch_size]:
+                try:
+                    paper_obj, paper_fixedpages = (
+                        cls._make_unsaved_paper_and_fixedpages(
+                            paper_number,
+                            qv_row,
+                            id_page_number=id_page_number,
+                            dnm_page_numbers=dnm_page_numbers,
+                            question_page_numbers=question_page_numbers,
+                        )
+                    )
+                except KeyError as e:
+                    # increase verbosity, else it just prints like "4"
+                    raise KeyError(
+                        f"KeyError {e}: perhaps not enough columns in your upload?"
+                    ) from e
+                papers.append(paper_obj)
+                fixedpages.extend(paper_fixedpages)
+            with transaction.atomic():
+                # On our supported databases this sets the primary keys of
+                # the papers, which the fixed pages need
+                Paper.objects.bulk_create(papers)
+                FixedPage.objects.bulk_create(fixedpages)
+            if progress_callback:
+                progress_callback(min(start + batch_size, N), N)
+
+    @staticmethod
+    def _bulk_delete_all_papers(
+        *,
+        batch_size: int = 250,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> int:
+        """Delete all the papers and their fixed pages, in batches of papers.
+
+        Keyword Args:
+            batch_size: how many papers to delete in each batch.
+            progress_callback: if given, called after each batch with the
+                number of papers deleted so far and the total.
+
+        Returns:
+            The number of papers deleted.
+        """
+        paper_pks = list(Paper.objects.order_by("pk").values_list("pk", flat=True))
+        N = len(paper_pks)
+        for start in range(0, N, batch_size):
+            batch = paper_pks[start : start + batch_size]
+            with transaction.atomic():
+                FixedPage.objects.filter(paper__pk__in=batch).delete()
+                Paper.objects.filter(pk__in=batch).delete()
+            if progress_callback:
+                progress_callback(min(start + batch_size, N), N)
+        return N
 
     @staticmethod
     def assert_no_running_chore():
@@ -367,17 +478,7 @@ class PaperCreatorService:
             cls._populate_whole_db_huey_wrapper(qv_map, background=background)
         else:
             # log(f"Adding {len(qv_map)} papers via foreground process for testing")
-            id_page_number = SpecificationService.get_id_page_number()
-            dnm_page_numbers = SpecificationService.get_dnm_pages()
-            question_page_numbers = SpecificationService.get_question_pages()
-            for idx, (paper_number, qv_row) in enumerate(qv_map.items()):
-                cls._create_single_paper_from_qvmapping_and_pages(
-                    paper_number,
-                    qv_row,
-                    id_page_number=id_page_number,
-                    dnm_page_numbers=dnm_page_numbers,
-                    question_page_numbers=question_page_numbers,
-                )
+            cls._bulk_create_papers_from_qvmapping(qv_map)
 
     @classmethod
     def append_papers_to_qv_map(
@@ -472,10 +573,7 @@ class PaperCreatorService:
             cls._evacuate_whole_db_huey_wrapper(background=background)
         else:
             # for testing purposes we delete in foreground
-            with transaction.atomic():
-                FixedPage.objects.all().delete()
-            with transaction.atomic():
-                Paper.objects.all().delete()
+            cls._bulk_delete_all_papers()
 
     @staticmethod
     def _evacuate_whole_db_huey_wrapper(*, background: bool = True) -> None:
@@ -4,6 +4,7 @@
 # Copyright (C) 2023-2026 Colin B. Macdonald
 
 import logging
+from typing import Iterable
 
 from django.db import transaction
 from django.db.models import Count
@@ -118,6 +119,38 @@ class PaperInfoService:
                 f" for page {page_number} of paper {paper_number}"
             ) from None
 
+    @staticmethod
+    def get_page_versions_of_papers(
+        paper_numbers: Iterable[int],
+    ) -> dict[int, dict[int, set[int]]]:
+        """Get the versions of all the pages of many papers, in bulk.
+
+        Like calling :meth:`get_version_from_paper_page` on every page of
+        these papers, but with only two queries, and without raising on
+        heterogeneous versions: the caller should check for those.
+
+        Args:
+            paper_numbers: which papers.
+
+        Returns:
+            A dict keyed by paper number of dicts keyed by page number of
+            the set of versions of that page.  Papers that do not exist in
+            the database are omitted; papers that exist but have no pages
+            map to an empty dict.
+        """
+        paper_numbers = list(paper_numbers)
+        versions: dict[int, dict[int, set[int]]] = {
+            pn: {}
+            for pn in Paper.objects.filter(paper_number__in=paper_numbers).values_list(
+                "paper_number", flat=True
+            )
+        }
+        for pn, pg, v in FixedPage.objects.filter(
+            paper__paper_number__in=paper_numbers
+        ).values_list("paper__paper_number", "page_number", "version"):
+            versions[pn].setdefault(pg, set()).add(v)
+        return versions
+
     @staticmethod
     def get_version_from_paper_question(paper_number: int, question_idx: int) -> int:
         """Given a paper number and question index, return the version of that question.
@@ -14,7 +14,7 @@ from plom_server.Base.models import BaseImage
 from plom_server.Preparation.services import PapersPrinted
 from plom_server.Scan.models import StagingImage, StagingBundle
 from ..services import ImageBundleService, SpecificationService
-from ..models import Bundle, Image, FixedPage, MobilePage, Paper
+from ..models import Bundle, DiscardPage, Image, FixedPage, MobilePage, Paper
 
 
 class ImageBundleTests(TestCase):
@@ -312,6 +312,69 @@ class ImageBundleTests(TestCase):
             bimg1.image_hash,
         )
 
+    def test_push_bundle_with_extra_and_discard_pages(self) -> None:
+        bundle = baker.make(StagingBundle, pdf_hash="abcdef", user=self.user)
+        paper2 = baker.make(Paper, paper_number=2)
+        for q, v in ((1, 2), (2, 1)):
+            baker.make(
+                FixedPage,
+                page_type=FixedPage.QUESTIONPAGE,
+                paper=paper2,
+                page_number=2 + q,
+                question_index=q,
+                version=v,
+            )
+        for order, qlist in enumerate(([1, 2], [])):
+            baker.make(
+                StagingImage,
+                bundle=bundle,
+                bundle_order=order,
+                baseimage=baker.make(BaseImage, _create_files=True),
+                image_type=StagingImage.EXTRA,
+                paper_number=2,
+                question_idx_list=qlist,
+            )
+        baker.make(
+            StagingImage,
+            bundle=bundle,
+            bundle_order=2,
+            baseimage=baker.make(BaseImage, _create_files=True),
+            image_type=StagingImage.DISCARD,
+            discard_reason="blank",
+        )
+
+        ImageBundleService.push_valid_bundle(bundle, self.user)
+
+        self.assertEqual(Image.objects.filter(bundle__pdf_hash="abcdef").count(), 3)
+        first = Image.objects.get(bundle_order=0)
+        self.assertEqual(
+            sorted(
+                MobilePage.objects.filter(image=first).values_list(
+                    "question_index", "version"
+                )
+            ),
+            [(1, 2), (2, 1)],
+        )
+        dnm = MobilePage.objects.get(image__bundle_order=1)
+        self.assertEqual(dnm.question_index, MobilePage.DNM_qidx)
+        self.assertEqual(
+            DiscardPage.objects.get(image__bundle_order=2).discard_reason, "blank"
+        )
+
+    def test_push_bundle_extra_page_unknown_question(self) -> None:
+        bundle = baker.make(StagingBundle, pdf_hash="abcdef", user=self.user)
+        baker.make(Paper, paper_number=2)
+        baker.make(
+            StagingImage,
+            bundle=bundle,
+            baseimage=baker.make(BaseImage, _create_files=True),
+            image_type=StagingImage.EXTRA,
+            paper_number=2,
+            question_idx_list=[1],
+        )
+        with self.assertRaises(ValueError):
+            ImageBundleService.push_valid_bundle(bundle, self.user)
+
 
 class ImageBundleReadyTests(TestCase):
     """Test 'ready' checking functions."""
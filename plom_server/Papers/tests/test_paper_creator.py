@@ -106,3 +106,35 @@ class PaperCreatorTests(TestCase):
         self.assertEqual(n_id, 0)
         self.assertEqual(n_dnm, 0)
         self.assertEqual(n_question, 0)
+
+    def test_bulk_create_and_delete_in_batches(self) -> None:
+        qv_map = {pn: {1: 1 + pn % 2, 2: 2 - pn % 2, "id": 2} for pn in range(1, 11)}
+        progress: list[tuple[int, int]] = []
+        PaperCreatorService._bulk_create_papers_from_qvmapping(
+            qv_map,
+            batch_size=4,
+            progress_callback=lambda done, total: progress.append((done, total)),
+        )
+        self.assertEqual(progress, [(4, 10), (8, 10), (10, 10)])
+        self.assertEqual(self.get_n_models(), (10, 60, 10, 30, 20))
+        for pn, qv_row in qv_map.items():
+            for q in (1, 2):
+                fp = FixedPage.objects.get(paper__paper_number=pn, question_index=q)
+                self.assertEqual(fp.version, qv_row[q])
+            fp = FixedPage.objects.get(
+                paper__paper_number=pn, page_type=FixedPage.IDPAGE
+            )
+            self.assertEqual(fp.version, 2)
+
+        progress = []
+        n = PaperCreatorService._bulk_delete_all_papers(
+            batch_size=6,
+            progress_callback=lambda done, total: progress.append((done, total)),
+        )
+        self.assertEqual(n, 10)
+        self.assertEqual(progress, [(6, 10), (10, 10)])
+        self.assertEqual(self.get_n_models(), (0, 0, 0, 0, 0))
+
+    def test_bulk_create_bad_qvmap_raises(self) -> None:
+        with self.assertRaisesRegex(KeyError, "not enough columns"):
+            PaperCreatorService._bulk_create_papers_from_qvmapping({1: {1: 1}})
@@ -2,9 +2,11 @@
 # Copyright (C) 2024-2026 Colin B. Macdonald
 # Copyright (C) 2025 Aidan Murphy
 
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.core.exceptions import ObjectDoesNotExist
 
+from plom_server.Base.services import config_cache
+from ..models import Specification
 from ..services import SpecificationService as s
 
 
@@ -101,3 +103,60 @@ class SpecificationServiceMiscNoSpecTests(TestCase):
     def test_get_question_pages(self) -> None:
         with self.assertRaises(ObjectDoesNotExist):
             s.get_question_pages()
+
+
+class SpecificationServiceCacheTests(TransactionTestCase):
+    # not a TestCase: nothing is cached inside a transaction
+    def setUp(self) -> None:
+        s.install_spec_from_dict(
+            {
+                "idPage": 1,
+                "numberOfVersions": 2,
+                "numberOfPages": 3,
+                "totalMarks": 10,
+                "numberOfQuestions": 2,
+                "name": "testing",
+                "longName": "Testing",
+                "doNotMarkPages": [],
+                "question": [{"pages": [2], "mark": 4}, {"pages": [3], "mark": 6}],
+            }
+        )
+
+    def tearDown(self) -> None:
+        # the database is flushed, but the cache is not
+        config_cache.invalidate("spec")
+
+    def test_reads_are_cached(self) -> None:
+        assert s.get_n_pages() == 3
+        # a change behind the service's back is not noticed...
+        Specification.objects.update(longName="Changed")
+        assert s.get_longname() == "Testing"
+        assert s.get_questions_max_marks() == {1: 4, 2: 6}
+
+    def test_remove_spec_invalidates(self) -> None:
+        assert s.is_there_a_spec()
+        s.remove_spec()
+        assert not s.is_there_a_spec()
+        assert s.get_n_versions() == 1
+        with self.assertRaises(ObjectDoesNotExist):
+            s.get_longname()
+
+    def test_install_spec_invalidates(self) -> None:
+        assert s.get_question_label(2) == "Q2"
+        s.install_spec_from_dict(
+            {
+                "idPage": 1,
+                "numberOfVersions": 1,
+                "numberOfPages": 2,
+                "totalMarks": 5,
+                "numberOfQuestions": 1,
+                "name": "other",
+                "longName": "Other",
+                "doNotMarkPages": [],
+                "question": [{"pages": [2], "mark": 5, "label": "Ex1"}],
+            }
+        )
+        assert s.get_question_label(1) == "Ex1"
+        assert s.get_assessment_total(include_bonus=True) == 5
+        with self.assertRaises(ObjectDoesNotExist):
+            s.get_question_label(2)
@@ -7,9 +7,11 @@ from django.contrib import admin
 
 from .models import (
     PaperSourcePDF,
+    ReferenceImageChore,
     StagingStudent,
 )
 
 # This makes models appear in the admin interface
 admin.site.register(PaperSourcePDF)
+admin.site.register(ReferenceImageChore)
 admin.site.register(StagingStudent)
@@ -1,3 +1,4 @@
+import django.db.models.deletion
 from django.db import migrations, models
 
 
@@ -5,7 +6,9 @@ class Migration(migrations.Migration):
 
     initial = True
 
-    dependencies = []
+    dependencies = [
+        ("Base", "0001_initial"),
+    ]
 
     operations = [
         migrations.CreateModel(
@@ -30,6 +33,24 @@ class Migration(migrations.Migration):
                 ("paper_size_height", models.FloatField(blank=True, null=True)),
             ],
         ),
+        migrations.CreateModel(
+            name="ReferenceImageChore",
+            fields=[
+                (
+                    "hueytasktracker_ptr",
+                    models.OneToOneField(
+                        auto_created=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        parent_link=True,
+                        primary_key=True,
+                        serialize=False,
+                        to="Base.hueytasktracker",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField()),
+            ],
+            bases=("Base.hueytasktracker",),
+        ),
         migrations.CreateModel(
             name="StagingStudent",
             fields=[
@@ -7,6 +7,8 @@
 
 from django.db import models
 
+from plom_server.Base.models import HueyTaskTracker
+
 
 class PaperSourcePDF(models.Model):
     """Describes the structure of one of the source PDF files.
@@ -41,6 +43,15 @@ class PaperSourcePDF(models.Model):
     paper_size_height = models.FloatField(null=True, blank=True)
 
 
+class ReferenceImageChore(HueyTaskTracker):
+    """Render the reference images of one source version in the background.
+
+    version: which source version.
+    """
+
+    version = models.PositiveIntegerField(null=False)
+
+
 # ---------------------------------
 # Make a table for students - for the purposes of preparing things. Hence "staging" prefix.
 
@@ -5,27 +5,38 @@
 # Copyright (C) 2026 Aidan Murphy
 
 import hashlib
+import logging
 import pathlib
 import tempfile
+import time
 from collections import defaultdict
 from importlib.resources.abc import Traversable
+from math import ceil
 from pathlib import Path
 from typing import Any
 
+import huey
+import huey.api
+import huey.exceptions
 import pymupdf
 from django.core.exceptions import SuspiciousFileOperation, ObjectDoesNotExist
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.files.utils import validate_file_name
 from django.db import transaction
+from django_huey import db_task
 
 from plom.scan import QRextract
+from plom_server.Base.models import HueyTaskTracker
 from plom_server.Papers.models import ReferenceImage
 from plom_server.Papers.services import SpecificationService
 from plom_server.Scan.services import ScanService
-from ..models import PaperSourcePDF
+from ..models import PaperSourcePDF, ReferenceImageChore
 from ..services.mocker import ExamMockerService
 from ..services.preparation_dependency_service import assert_can_modify_sources
 
+log = logging.getLogger(__name__)
+
 
 def _get_source_file(source_version: int) -> tuple[str, File]:
     """Return the Django-file for a specified source version.
@@ -95,6 +106,10 @@ def delete_source_pdf(version: int) -> None:
             pdf_obj = PaperSourcePDF.objects.get(version=version)
         except PaperSourcePDF.DoesNotExist:
             return
+        # any reference images still being rendered are no longer wanted
+        ReferenceImageChore.objects.filter(version=version, obsolete=False).update(
+            obsolete=True
+        )
         # force QuerySet to list: we're going to traverse twice; don't want any magic
         img_objs = list(ReferenceImage.objects.filter(version=version))
         # Make sure we delete after we get the ReferenceImages (before the cascade)
@@ -157,6 +172,7 @@ def get_source_info(version: int) -> dict[str, Any]:
             "paper_size_width": src.paper_size_width,
             "paper_size_height": src.paper_size_height,
             "duplicate_versions": duplicate_versions,
+            "reference_images_status": get_reference_images_status(version),
         }
     except PaperSourcePDF.DoesNotExist:
         return {"version": version, "uploaded": False}
@@ -320,7 +336,7 @@ def take_source_from_upload(version: int, in_memory_file: File) -> None:
             paper_size_width=w_float,
             paper_size_height=h_float,
         )
-        store_reference_images(version)
+        queue_reference_images(version)
 
 
 @transaction.atomic
@@ -345,32 +361,246 @@ def get_source_as_bytes(source_version: int) -> bytes:
         raise ValueError("Version does not exist")
 
 
-@transaction.atomic
-def store_reference_images(source_version: int):
+def _render_reference_pages(
+    pdf_file: Path, source_version: int, page_numbers: list[int], outdir: Path
+) -> list[dict[str, Any]]:
+    """Render some pages of a mocked source to PNG files and read their QR codes.
+
+    The QR codes are read from the rendered pixmap in memory, rather than
+    from the saved file.
+
+    Returns:
+        A list of dicts, one for each page, with keys "page_number",
+        "file_path", "parsed_qr", "width" and "height".
+    """
+    rendered = []
+    with pymupdf.open(pdf_file) as doc:
+        for pg in page_numbers:
+            pix = doc[pg - 1].get_pixmap(dpi=200, annots=True)
+            code_dict = QRextract(pix.pil_image())
+            fname = outdir / f"ref_{source_version}_{pg}.png"
+            pix.save(fname)
+            rendered.append(
+                {
+                    "page_number": pg,
+                    "file_path": str(fname),
+                    "parsed_qr": ScanService.parse_qr_code([code_dict]),
+                    "width": pix.width,
+                    "height": pix.height,
+                }
+            )
+    return rendered
+
+
+def _reference_images_from_rendered(
+    source_version: int, rendered: list[dict[str, Any]]
+) -> list[ReferenceImage]:
+    """Make (unsaved) ReferenceImages from the results of rendering pages."""
+    objs = []
+    for X in rendered:
+        path = Path(X["file_path"])
+        objs.append(
+            ReferenceImage(
+                page_number=X["page_number"],
+                version=source_version,
+                image_file=ContentFile(path.read_bytes(), name=path.name),
+                parsed_qr=X["parsed_qr"],
+                width=X["width"],
+                height=X["height"],
+            )
+        )
+    return objs
+
+
+def store_reference_images(source_version: int) -> None:
     """From an uploaded source pdf create reference images of each page.
 
     Uses the exam mocker to put qr codes stamps in correct pages.
     Then stores the images with that qr-code information.
+
+    This renders all the pages in this process and blocks until they are
+    stored; usually you want :func:`queue_reference_images` instead.
     """
     mock_exam_pdf_bytes = ExamMockerService.mock_exam(source_version)
-    doc = pymupdf.Document(stream=mock_exam_pdf_bytes)
+    with tempfile.TemporaryDirectory() as _tmpdir:
+        tmpdir = pathlib.Path(_tmpdir)
+        pdf_file = tmpdir / "mock.pdf"
+        pdf_file.write_bytes(mock_exam_pdf_bytes)
+        with pymupdf.open(pdf_file) as doc:
+            page_numbers = list(range(1, doc.page_count + 1))
+        rendered = _render_reference_pages(
+            pdf_file, source_version, page_numbers, tmpdir
+        )
+        with transaction.atomic():
+            ReferenceImage.objects.bulk_create(
+                _reference_images_from_rendered(source_version, rendered)
+            )
+
+
+def queue_reference_images(source_version: int, *, number_of_chunks: int = 4) -> None:
+    """Start rendering the reference images of a source version in the background.
+
+    Any earlier chore for this version is marked obsolete.  Progress can
+    be followed with :func:`get_reference_images_status`.
+
+    Args:
+        source_version: which source version.
+
+    Keyword Args:
+        number_of_chunks: the number of rendering jobs to run in parallel.
+    """
+    with transaction.atomic(durable=True):
+        ReferenceImageChore.objects.filter(
+            version=source_version, obsolete=False
+        ).update(obsolete=True)
+        chore = ReferenceImageChore.objects.create(
+            version=source_version,
+            huey_id=None,
+            status=ReferenceImageChore.STARTING,
+        )
+        tracker_pk = chore.pk
+
+    res = huey_parent_reference_images_chore(
+        source_version, number_of_chunks, tracker_pk=tracker_pk
+    )
+    log.info(f"Just enqueued Huey reference image chore id={res.id}")
+    HueyTaskTracker.transition_to_queued_or_running(tracker_pk, res.id)
+
+
+def get_reference_images_status(source_version: int) -> str | None:
+    """How is the rendering of the reference images of a source version going?
+
+    Args:
+        source_version: which source version.
+
+    Returns:
+        The status display string of the current chore, such as "Running"
+        or "Complete", possibly followed by its message, or None if no
+        reference images have been queued for this version.
+    """
+    chore = (
+        ReferenceImageChore.objects.filter(version=source_version, obsolete=False)
+        .order_by("-pk")
+        .first()
+    )
+    if chore is None:
+        return None
+    if chore.message:
+        return f"{chore.get_status_display()}: {chore.message}"
+    return chore.get_status_display()
+
+
+# The decorated function returns a ``huey.api.Result``
+@db_task(queue="parentchores", context=True)
+def huey_parent_reference_images_chore(
+    source_version: int,
+    number_of_chunks: int,
+    *,
+    tracker_pk: int,
+    task: huey.api.Task | None = None,
+) -> bool:
+    """Render the reference images of a source version using several child chores.
+
+    It is important to understand that running this function starts an
+    async task in queue that will run sometime in the future.
+
+    Args:
+        source_version: which source version.
+        number_of_chunks: the number of rendering jobs to run; each
+            will handle 1/number_of_chunks of the pages.
 
+    Keyword Args:
+        tracker_pk: a key into the database for anyone interested in
+            our progress.
+        task: includes our ID in the Huey process queue.  This kwarg is
+            passed by `context=True` in decorator: callers should not
+            pass this in!
+
+    Returns:
+        True, no meaning, just as per the Huey docs: "if you need to
+        block or detect whether a task has finished".
+
+    Raises:
+        RuntimeError: child chore failed.
+    """
+    assert task is not None
+    HueyTaskTracker.transition_to_running(tracker_pk, task.id)
+
+    # mock once, then share the file with the children
+    mock_exam_pdf_bytes = ExamMockerService.mock_exam(source_version)
     with tempfile.TemporaryDirectory() as _tmpdir:
         tmpdir = pathlib.Path(_tmpdir)
-        for n, pg in enumerate(doc.pages()):
-            pix = pg.get_pixmap(dpi=200, annots=True)
-            fname = tmpdir / f"ref_{source_version}_{n+1}.png"
-            pix.save(fname)
-            code_dict = QRextract(fname)
-            page_data = ScanService.parse_qr_code([code_dict])
-            with open(fname, "rb") as fh:
-                pix_file = File(fh, name=fname.name)
-                ReferenceImage.objects.create(
-                    page_number=n + 1,
-                    version=source_version,
-                    image_file=pix_file,
-                    parsed_qr=page_data,
+        pdf_file = tmpdir / "mock.pdf"
+        pdf_file.write_bytes(mock_exam_pdf_bytes)
+        with pymupdf.open(pdf_file) as doc:
+            n_pages = doc.page_count
+        chunk_length = ceil(n_pages / max(1, number_of_chunks))
+        page_numbers = list(range(1, n_pages + 1))
+        task_list = [
+            huey_child_render_reference_pages(
+                pdf_file,
+                source_version,
+                page_numbers[i : i + chunk_length],
+                tmpdir,
+            )
+            for i in range(0, n_pages, chunk_length)
+        ]
+
+        while True:
+            try:
+                result_chunks = [X.get() for X in task_list]
+            except huey.exceptions.TaskException as e:
+                log.error("Parent: child reference image chore failed with %s", e)
+                for chore in task_list:
+                    chore.revoke()
+                raise RuntimeError(f"child task failed rendering: {e}") from e
+            done = [chunk for chunk in result_chunks if chunk is not None]
+            n_done = sum(len(chunk) for chunk in done)
+            ReferenceImageChore.set_message(
+                tracker_pk, f"{n_done} of {n_pages} pages rendered"
+            )
+            if len(done) == len(task_list):
+                break
+            time.sleep(1)
+
+        rendered = [X for chunk in done for X in chunk]
+        with transaction.atomic(durable=True):
+            chore = ReferenceImageChore.objects.select_for_update().get(pk=tracker_pk)
+            # the source may have been deleted (and perhaps replaced) meanwhile
+            if chore.obsolete:
+                log.info(
+                    "Discarding reference images of obsolete chore for version %d",
+                    source_version,
                 )
+            else:
+                ReferenceImage.objects.bulk_create(
+                    _reference_images_from_rendered(source_version, rendered)
+                )
+
+    HueyTaskTracker.transition_to_complete(tracker_pk)
+    return True
+
+
+# The decorated function returns a ``huey.api.Result``
+@db_task(queue="chores")
+def huey_child_render_reference_pages(
+    pdf_file: Path, source_version: int, page_numbers: list[int], outdir: Path
+) -> list[dict[str, Any]]:
+    """Huey task to render some reference pages and read their QR codes.
+
+    It is important to understand that running this function starts an
+    async task in queue that will run sometime in the future.
+
+    Args:
+        pdf_file: the mocked source, readable by this worker.
+        source_version: which source version.
+        page_numbers: which pages to render, indexed from one.
+        outdir: where to save the rendered images.
+
+    Returns:
+        Information about each page, see :func:`_render_reference_pages`.
+    """
+    return _render_reference_pages(pdf_file, source_version, page_numbers, outdir)
 
 
 def _get_reference_image_file(source_version: int, page_number: int) -> File:
@@ -413,6 +643,7 @@ def get_reference_images_as_list(source_version: int) -> list[File]:
     if not reference_images_list:
         raise ObjectDoesNotExist(
             f'Reference images for source version "{source_version}"'
-            " couldn't be found. Probably the source file hasn't been uploaded."
+            " couldn't be found. Probably the source file hasn't been uploaded,"
+            " or its reference images are still being rendered."
         )
     return reference_images_list
@@ -14,7 +14,8 @@ from model_bakery import baker
 from plom_server.Papers.services import SpecificationService
 from plom_server.TestingSupport.utils import config_test
 from ..services import SourceService, PapersPrinted
-from ..models import PaperSourcePDF
+from plom_server.Papers.models import ReferenceImage
+from ..models import PaperSourcePDF, ReferenceImageChore
 from .. import useful_files_for_testing as useful_files
 
 
@@ -152,6 +153,43 @@ class SourceServiceTests(TestCase):
         self.assertEqual(n_sources, 1)
         SourceService.delete_source_pdf(1)
 
+    @config_test({"test_spec": "demo"})
+    def test_store_reference_images(self) -> None:
+        PapersPrinted.set_papers_printed(False, ignore_dependencies=True)
+        upload_path = resources.files(useful_files) / "test_version1.pdf"
+        SourceService.store_source_pdf(1, upload_path)
+        SourceService.store_reference_images(1)
+        refs = ReferenceImage.objects.filter(version=1).order_by("page_number")
+        self.assertEqual(refs.count(), SpecificationService.get_n_pages())
+        for ref in refs:
+            self.assertGreater(ref.width, 0)
+            self.assertEqual(ref.height, ref.image_file.height)
+            # the mocker stamps QR codes on every page
+            self.assertTrue(ref.parsed_qr)
+        SourceService.delete_source_pdf(1)
+        self.assertFalse(ReferenceImage.objects.exists())
+
+    @config_test({"test_spec": "demo"})
+    def test_upload_queues_reference_images(self) -> None:
+        PapersPrinted.set_papers_printed(False, ignore_dependencies=True)
+        pdf = resources.files(useful_files) / "test_version1.pdf"
+        with pdf.open("rb") as f:
+            django_file = SimpleUploadedFile(
+                name="test_version1.pdf",
+                content=f.read(),
+                content_type="application/pdf",
+            )
+            SourceService.take_source_from_upload(1, django_file)
+        chore = ReferenceImageChore.objects.get(version=1)
+        self.assertEqual(chore.status, ReferenceImageChore.QUEUED)
+        self.assertEqual(
+            SourceService.get_source_info(1)["reference_images_status"], "Queued"
+        )
+        SourceService.delete_source_pdf(1)
+        chore.refresh_from_db()
+        self.assertTrue(chore.obsolete)
+        self.assertIsNone(SourceService.get_reference_images_status(1))
+
     def test_delete_non_existing_source_pdf_in_range(self) -> None:
         """The service could hold the source pdf for this version, but doesn't."""
         # explicitly **unset** papers-printed for testing purposes
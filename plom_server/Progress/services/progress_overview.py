@@ -4,25 +4,114 @@
 # Copyright (C) 2024-2026 Colin B. Macdonald
 # Copyright (C) 2025 Deep Shah
 
-from typing import Any
+from typing import Any, Callable, Iterable
 
 from django.db import transaction
 from django.db.models import Count, Min, Max
 
 from plom.common.misc_utils import pprint_score
 
+from plom_server.Base.services import task_generation
 from plom_server.Identify.models import PaperIDTask
 from plom_server.Mark.models import MarkingTask
+from plom_server.Mark.services import mark_task
 from plom_server.Papers.services import SpecificationService, PaperInfoService
 
 
 class ProgressOverviewService:
+    """Summaries of the ID and marking tasks, for the progress dashboards.
+
+    The counts are computed from per-(question, version, status, user)
+    rollups, which are cached until tasks change: see
+    :meth:`get_marking_task_rollup`.
+    """
+
+    @staticmethod
+    def _fingerprint() -> str:
+        agg = PaperIDTask.objects.aggregate(n=Max("pk"), t=Max("last_update"))
+        t = agg["t"].timestamp() if agg["t"] else 0
+        return f"{mark_task.marking_fingerprint()}.{agg['n']}.{t}"
+
+    @classmethod
+    def _cached(cls, name: str, compute: Callable[[], Any]) -> Any:
+        """Cache a summary of the tasks until the tasks change."""
+        return task_generation.cached(
+            f"progress:{name}", compute, fingerprint=cls._fingerprint()
+        )
+
+    @classmethod
+    def get_marking_task_rollup(cls) -> list[tuple[int, int, int, str | None, int]]:
+        """Count the current marking tasks by question, version, status and user.
+
+        This is one grouped query, cached until some task changes.
+
+        Returns:
+            A list of tuples ``(qidx, ver, status, username, count)``,
+            where ``username`` is None for unassigned tasks.  Out-of-date
+            tasks are not included.
+        """
+
+        def compute():
+            tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
+            return list(
+                tasks.values_list(
+                    "question_index",
+                    "question_version",
+                    "status",
+                    "assigned_user__username",
+                )
+                .annotate(n=Count("pk"))
+                .order_by()
+            )
+
+        return cls._cached("mark_rollup", compute)
+
+    @classmethod
+    def get_id_task_rollup(cls) -> list[tuple[int, str | None, int]]:
+        """Count the current ID tasks by status and user.
+
+        Returns:
+            A list of tuples ``(status, username, count)``, where
+            ``username`` is None for unassigned tasks.  Out-of-date
+            tasks are not included.
+        """
+
+        def compute():
+            tasks = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
+            return list(
+                tasks.values_list("status", "assigned_user__username")
+                .annotate(n=Count("pk"))
+                .order_by()
+            )
+
+        return cls._cached("id_rollup", compute)
+
+    @classmethod
+    def get_papers_with_a_task(cls) -> list[int]:
+        """The sorted paper numbers that have some current ID or marking task."""
+
+        def compute():
+            tasks1 = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
+            tasks2 = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
+            inuse_papers = set(
+                tasks1.values_list("paper__paper_number", flat=True).distinct()
+            )
+            inuse_papers.update(
+                tasks2.values_list("paper__paper_number", flat=True).distinct()
+            )
+            return sorted(inuse_papers)
+
+        return cls._cached("inuse_papers", compute)
+
     @transaction.atomic
-    def get_id_task_status(self) -> list[dict]:
+    def get_id_task_status(
+        self, *, paper_numbers: Iterable[int] | None = None
+    ) -> list[dict]:
+        tasks = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
+        if paper_numbers is not None:
+            tasks = tasks.filter(paper__paper_number__in=paper_numbers)
         id_info = []
-        for task in PaperIDTask.objects.exclude(
-            status=PaperIDTask.OUT_OF_DATE
-        ).prefetch_related("paper", "latest_action", "assigned_user"):
+        for task in tasks.prefetch_related("paper", "latest_action", "assigned_user"):
             dat = {
                 "paper": task.paper.paper_number,
                 "status": task.get_status_display(),
@@ -36,11 +125,16 @@ class ProgressOverviewService:
         return id_info
 
     @transaction.atomic
-    def get_marking_task_status(self) -> list[dict]:
+    def get_marking_task_status(
+        self, *, paper_numbers: Iterable[int] | None = None
+    ) -> list[dict]:
+        tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
+        if paper_numbers is not None:
+            tasks = tasks.filter(paper__paper_number__in=paper_numbers)
         marking_info = []
-        for task in MarkingTask.objects.exclude(
-            status=MarkingTask.OUT_OF_DATE
-        ).prefetch_related("paper", "latest_annotation", "assigned_user"):
+        for task in tasks.prefetch_related(
+            "paper", "latest_annotation", "assigned_user"
+        ):
             # task status is one of to_do, out, complete
             dat = {
                 "paper": task.paper.paper_number,
@@ -60,7 +154,9 @@ class ProgressOverviewService:
         return marking_info
 
     @transaction.atomic
-    def get_task_overview(self) -> tuple[dict, dict]:
+    def get_task_overview(
+        self, *, paper_numbers: Iterable[int] | None = None
+    ) -> tuple[dict, dict]:
         """Return (id-info, marking-info) dicts with info for all id and marking tasks of every paper in use.
 
         Note that a paper is in use if it has at least one ID or marking task.
@@ -74,13 +170,19 @@ class ProgressOverviewService:
           * {status: 'To do', 'task_pk': blah} or
           * {'status': 'Out', 'user': username, 'task_pk': blah} - the name of the user who has the task
           * {status: 'Complete', 'user': username, 'score': score, 'task_pk: blah} - user who did the marking'ing, the score, and the pk of the corresponding marking task.
+
+        Keyword Args:
+            paper_numbers: restrict to these papers, for example one page
+                of :meth:`get_papers_with_a_task`.  By default, all papers.
         """
         id_task_overview: dict[int, None | dict[str, Any]] = {}
         marking_task_overview: dict[int, dict[int, None | dict[str, Any]]] = {}
         question_indices = SpecificationService.get_question_indices()
 
-        id_info = self.get_id_task_status()
-        marking_info = self.get_marking_task_status()
+        if paper_numbers is not None:
+            paper_numbers = list(paper_numbers)
+        id_info = self.get_id_task_status(paper_numbers=paper_numbers)
+        marking_info = self.get_marking_task_status(paper_numbers=paper_numbers)
         # get all the paper numbers that have **some** task
         papers_with_id_task = [X["paper"] for X in id_info]
         papers_with_marking_task = [X["paper"] for X in marking_info]
@@ -113,22 +215,14 @@ class ProgressOverviewService:
         tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
         return tasks.values_list("paper__paper_number", flat=True).distinct().count()
 
-    @staticmethod
-    def n_papers_with_at_least_one_task() -> int:
+    @classmethod
+    def n_papers_with_at_least_one_task(cls) -> int:
         """The number of papers that are currently being marked and IDed.
 
-        Tries to be database efficient, using only two database queries.
+        Tries to be database efficient, using only two database queries,
+        cached until the tasks change.
         """
-        # Note prefetch("papers") is unnecessary with values_list
-        tasks1 = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
-        tasks2 = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
-        inuse_papers = set(
-            tasks1.values_list("paper__paper_number", flat=True).distinct()
-        )
-        inuse_papers = inuse_papers.union(
-            tasks2.values_list("paper__paper_number", flat=True).distinct()
-        )
-        return len(inuse_papers)
+        return len(cls.get_papers_with_a_task())
 
     @staticmethod
     def n_marking_tasks_for_each_question() -> dict[int, int]:
@@ -148,13 +242,17 @@ class ProgressOverviewService:
             for qi in question_indices
         }
 
-    @staticmethod
-    def _missing_task_pq_pairs() -> list[tuple[int, int]]:
+    @classmethod
+    def _missing_task_pq_pairs(cls) -> list[tuple[int, int]]:
         """Return which tasks (p, q) are missing, compared against the in-use papers.
 
         Tries to be database efficient, using only three database queries
-        and some postprocessing.
+        and some postprocessing, cached until the tasks change.
         """
+        return cls._cached("missing_pq", cls._compute_missing_task_pq_pairs)
+
+    @staticmethod
+    def _compute_missing_task_pq_pairs() -> list[tuple[int, int]]:
         question_indices = SpecificationService.get_question_indices()
         tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
         id_tasks = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
@@ -198,15 +296,13 @@ class ProgressOverviewService:
         """Return number of completed ID tasks."""
         return PaperIDTask.objects.filter(status=PaperIDTask.COMPLETE).count()
 
-    @transaction.atomic
     def get_completed_marking_task_counts(self) -> dict:
         """Return dict of number of completed marking tasks for each question."""
-        return {
-            qi: MarkingTask.objects.filter(
-                question_index=qi, status=PaperIDTask.COMPLETE
-            ).count()
-            for qi in SpecificationService.get_question_indices()
-        }
+        counts = {qi: 0 for qi in SpecificationService.get_question_indices()}
+        for qi, v, status, user, n in self.get_marking_task_rollup():
+            if status == MarkingTask.COMPLETE and qi in counts:
+                counts[qi] += n
+        return counts
 
     def get_completed_task_counts(self) -> dict:
         return {
@@ -235,10 +331,8 @@ class ProgressOverviewService:
             MarkingTask.OUT.label: 0,
         }
 
-        tasks_query = PaperIDTask.objects.exclude(status=PaperIDTask.OUT_OF_DATE)
-        for X in tasks_query.values("status").annotate(count=Count("status")):
-            status_label = MarkingTask.StatusChoices(X["status"]).label
-            counts[status_label] = X["count"]
+        for status, user, n in cls.get_id_task_rollup():
+            counts[MarkingTask.StatusChoices(status).label] += n
 
         if _n_papers is None:
             # Note: wrong if papers with id task but no marking task
@@ -308,12 +402,8 @@ class ProgressOverviewService:
             for qi in qindices
         }
 
-        tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
-        for X in tasks.values("status", "question_index").annotate(
-            count=Count("status")
-        ):
-            status_label = MarkingTask.StatusChoices(X["status"]).label
-            counts[X["question_index"]][status_label] = X["count"]
+        for qi, v, status, user, n in cls.get_marking_task_rollup():
+            counts[qi][MarkingTask.StatusChoices(status).label] += n
 
         if _n_papers is None:
             n_papers = cls.n_papers_with_at_least_one_task()
@@ -352,19 +442,8 @@ class ProgressOverviewService:
                     MarkingTask.OUT.label: 0,
                 }
 
-        # extract (papernum, qidx, ver, status) tuples from database, for offline processing
-        tasks = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
-        task_tuples = list(
-            tasks.values_list(
-                "paper__paper_number", "question_index", "question_version", "status"
-            )
-            # TODO: maybe later we have multiple tasks per (p, q)
-            # .distinct()
-        )
-
-        for pn, qi, v, status in task_tuples:
-            status_label = MarkingTask.StatusChoices(status).label
-            counts[qi][v][status_label] += 1
+        for qi, v, status, user, n in cls.get_marking_task_rollup():
+            counts[qi][v][MarkingTask.StatusChoices(status).label] += n
 
         triplets = cls._missing_task_pqv_triplets()
         for qidx in question_indices:
@@ -405,16 +484,12 @@ class ProgressOverviewService:
             MarkingTask.OUT.label: 0,
         }
 
-        tasks_query = MarkingTask.objects.exclude(status=MarkingTask.OUT_OF_DATE)
-
-        if question_index is not None:
-            tasks_query = tasks_query.filter(question_index=question_index)
-        if version is not None:
-            tasks_query = tasks_query.filter(question_version=version)
-
-        for X in tasks_query.values("status").annotate(count=Count("status")):
-            status_label = MarkingTask.StatusChoices(X["status"]).label
-            counts[status_label] = X["count"]
+        for qi, v, status, user, n in cls.get_marking_task_rollup():
+            if question_index is not None and qi != question_index:
+                continue
+            if version is not None and v != version:
+                continue
+            counts[MarkingTask.StatusChoices(status).label] += n
 
         if version is None:
             pairs = cls._missing_task_pq_pairs()
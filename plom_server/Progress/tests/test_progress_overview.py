@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from model_bakery import baker
+
+from plom_server.Identify.models import PaperIDTask
+from plom_server.Mark.models import MarkingTask
+from plom_server.Mark.services import MarkingTaskService
+from ..services import ProgressOverviewService
+
+
+class ProgressOverviewRollupTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = baker.make(User, username="marker0")
+        for n in range(1, 4):
+            baker.make(
+                MarkingTask,
+                status=MarkingTask.TO_DO,
+                question_index=1,
+                question_version=1 + n % 2,
+                paper__paper_number=n,
+                code=f"{n:04}g1",
+            )
+        baker.make(PaperIDTask, status=PaperIDTask.TO_DO, paper__paper_number=5)
+
+    def test_marking_rollup(self) -> None:
+        rollup = ProgressOverviewService.get_marking_task_rollup()
+        self.assertEqual(
+            sorted(rollup),
+            [(1, 1, MarkingTask.TO_DO, None, 1), (1, 2, MarkingTask.TO_DO, None, 2)],
+        )
+
+    def test_papers_with_a_task(self) -> None:
+        self.assertEqual(ProgressOverviewService.get_papers_with_a_task(), [1, 2, 3, 5])
+        self.assertEqual(ProgressOverviewService.n_papers_with_at_least_one_task(), 4)
+
+    def test_rollup_sees_saved_changes(self) -> None:
+        ProgressOverviewService.get_marking_task_rollup()
+        task = MarkingTask.objects.get(code="0001g1")
+        task.status = MarkingTask.OUT
+        task.assigned_user = self.user
+        task.save()
+        rollup = ProgressOverviewService.get_marking_task_rollup()
+        self.assertIn((1, 2, MarkingTask.OUT, "marker0", 1), rollup)
+        self.assertIn((1, 2, MarkingTask.TO_DO, None, 1), rollup)
+
+    def test_rollup_sees_bulk_updates(self) -> None:
+        MarkingTask.objects.filter(code="0002g1").update(
+            status=MarkingTask.OUT, assigned_user=self.user
+        )
+        ProgressOverviewService.get_marking_task_rollup()
+        MarkingTaskService.surrender_all_tasks(self.user)
+        rollup = ProgressOverviewService.get_marking_task_rollup()
+        self.assertEqual(
+            sorted(rollup),
+            [(1, 1, MarkingTask.TO_DO, None, 1), (1, 2, MarkingTask.TO_DO, None, 2)],
+        )
@@ -7,6 +7,7 @@
 # Copyright (C) 2026 Aidan Murphy
 
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.paginator import Paginator
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 
@@ -27,12 +28,19 @@ from ..services import ProgressOverviewService
 class ProgressMarkHome(MarkerOrManagerView):
     """The Marking Progress page showing progress and stats for all question/version pairs in a grid of small cards."""
 
-    def _build_task_table_context(self) -> dict:
-        """Build context required for the table of all tasks."""
+    # how many papers to show on each page of the table of all tasks
+    papers_per_page = 100
+
+    def _build_task_table_context(self, page_number: str | int | None = 1) -> dict:
+        """Build context required for one page of the table of all tasks."""
         pos = ProgressOverviewService()  # acronym excellence
-        id_task_overview, marking_task_overview = pos.get_task_overview()
-        papers_with_a_task = list(id_task_overview.keys())
-        n_papers = len(papers_with_a_task)
+        all_papers = ProgressOverviewService.get_papers_with_a_task()
+        n_papers = len(all_papers)
+        page = Paginator(all_papers, self.papers_per_page).get_page(page_number)
+        papers_with_a_task = list(page.object_list)
+        id_task_overview, marking_task_overview = pos.get_task_overview(
+            paper_numbers=papers_with_a_task
+        )
 
         # get the counts for each id and marking task by their status
         id_task_status_counts = ProgressOverviewService.get_id_task_status_counts(
@@ -47,6 +55,7 @@ class ProgressMarkHome(MarkerOrManagerView):
             "question_indices": SpecificationService.get_question_indices(),
             "question_labels": SpecificationService.get_question_index_label_pairs(),
             "papers_with_a_task": papers_with_a_task,
+            "task_table_page": page,
             "id_task_overview": id_task_overview,
             "marking_task_overview": marking_task_overview,
             "n_papers": n_papers,
@@ -68,13 +77,19 @@ class ProgressMarkHome(MarkerOrManagerView):
         question_labels_html = SpecificationService.get_question_html_label_triples()
         versions = SpecificationService.get_list_of_versions()
         all_max_marks = SpecificationService.get_questions_max_marks()
+        all_score_counts = MarkingStatsService.get_score_counts_by_question_version()
         data_for_histograms = {}
         for qidx, __, __ in question_labels_html:
             _data: dict[int, list] = {}
             data_for_histograms[qidx] = _data
             for ver in versions:
                 max_mark = all_max_marks[qidx]
-                _data[ver] = _should_be_in_a_service(qidx, ver, max_mark)
+                _data[ver] = _should_be_in_a_service(
+                    qidx,
+                    ver,
+                    max_mark,
+                    score_counts=all_score_counts.get(qidx, {}).get(ver, Counter()),
+                )
 
         who_marked = MarkingStatsService.get_lists_of_users_who_marked()
         context.update(
@@ -88,7 +103,7 @@ class ProgressMarkHome(MarkerOrManagerView):
             }
         )
 
-        context.update(self._build_task_table_context())
+        context.update(self._build_task_table_context(request.GET.get("page")))
 
         return render(request, "Progress/Mark/mark_overview.html", context)
 
@@ -108,10 +123,17 @@ class ProgressStartMarkingIdentifying(IdentifierOrMarkerOrManagerView):
 
 # TODO: move this to MarkingStatsService?
 def _should_be_in_a_service(
-    question_idx: int, version: int, max_mark: int
+    question_idx: int,
+    version: int,
+    max_mark: int,
+    *,
+    score_counts: Counter | None = None,
 ) -> list[dict[str, int | float]]:
-    scores = MarkingStatsService.get_scores_for_question_version(question_idx, version)
-    score_counts = Counter(scores)
+    if score_counts is None:
+        scores = MarkingStatsService.get_scores_for_question_version(
+            question_idx, version
+        )
+        score_counts = Counter(scores)
 
     histogram_data = []
 
@@ -3,9 +3,15 @@
 
 from django.contrib import admin
 
-from .models import QVCluster, QVClusterLink, QuestionClusteringChore
+from .models import (
+    QVCluster,
+    QVClusterLink,
+    QuestionClusteringChore,
+    ClusteringEmbedding,
+)
 
 # This makes models appear in the admin interface
 admin.site.register(QVCluster)
 admin.site.register(QVClusterLink)
 admin.site.register(QuestionClusteringChore)
+admin.site.register(ClusteringEmbedding)
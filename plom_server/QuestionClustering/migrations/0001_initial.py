@@ -46,6 +46,41 @@ class Migration(migrations.Migration):
             ],
             bases=("Base.hueytasktracker",),
         ),
+        migrations.CreateModel(
+            name="ClusteringEmbedding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("image_hash", models.CharField(max_length=64)),
+                ("top", models.FloatField()),
+                ("left", models.FloatField()),
+                ("bottom", models.FloatField()),
+                ("right", models.FloatField()),
+                ("preprocessor", models.CharField(max_length=255)),
+                ("model", models.CharField(max_length=255)),
+                ("vector", models.BinaryField()),
+            ],
+            options={
+                "unique_together": {
+                    (
+                        "image_hash",
+                        "top",
+                        "left",
+                        "bottom",
+                        "right",
+                        "preprocessor",
+                        "model",
+                    )
+                },
+            },
+        ),
         migrations.CreateModel(
             name="QVCluster",
             fields=[
@@ -122,3 +122,42 @@ class QVClusterLink(models.Model):
 
     paper = models.ForeignKey(Paper, on_delete=models.CASCADE)
     qv_cluster = models.ForeignKey(QVCluster, on_delete=models.CASCADE)
+
+
+class ClusteringEmbedding(models.Model):
+    """A stored feature vector for a region of a scanned image, as used for clustering.
+
+    Computing these requires running ML models, so we keep them to make
+    re-clustering fast.  They depend only on the image contents, the
+    region, the preprocessing and the models, so they stay valid as long
+    as all of those are unchanged.
+
+    image_hash: the sha256 hash of the scanned image.
+    top: top left corner's y coordinate of the extracted rectangle.
+    left: top left corner's x coordinate of the extracted rectangle.
+    bottom: bottom right corner's y coordinate of the extracted rectangle.
+    right: bottom right corner's x coordinate of the extracted rectangle.
+    preprocessor: identifies the preprocessing and its parameters.
+    model: identifies the models that made the feature vector.
+    vector: the feature vector, as the bytes of a float32 array.
+    """
+
+    image_hash = models.CharField(null=False, max_length=64)
+    top = models.FloatField(null=False)
+    left = models.FloatField(null=False)
+    bottom = models.FloatField(null=False)
+    right = models.FloatField(null=False)
+    preprocessor = models.CharField(null=False, max_length=255)
+    model = models.CharField(null=False, max_length=255)
+    vector = models.BinaryField(null=False)
+
+    class Meta:
+        unique_together = (
+            "image_hash",
+            "top",
+            "left",
+            "bottom",
+            "right",
+            "preprocessor",
+            "model",
+        )
@@ -11,4 +11,5 @@ from .question_clustering_service import (
     QuestionClusteringService,
 )
 
+from .embedding_store_service import ClusteringEmbeddingService
 from .model_loader import get_ClusteringStrategy
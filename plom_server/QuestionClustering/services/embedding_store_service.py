@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+from typing import Iterable, Mapping
+
+import numpy as np
+
+from django.db import transaction
+
+from plom_server.QuestionClustering.models import ClusteringEmbedding
+
+
+class ClusteringEmbeddingService:
+    """Store and retrieve the feature vectors used for clustering.
+
+    Embeddings are keyed by the image hash, the rectangle, the preprocessor
+    and the model, so they can be reused across clustering jobs: only
+    images that have not been embedded before need to go through the models.
+    """
+
+    @staticmethod
+    def get_embeddings(
+        image_hashes: Iterable[str],
+        rect: Mapping[str, float],
+        *,
+        preprocessor: str,
+        model: str,
+    ) -> dict[str, np.ndarray]:
+        """Get the stored embeddings of many images, in one query.
+
+        Args:
+            image_hashes: the hashes of the scanned images.
+            rect: the rectangular region, with keys left, top, right, bottom.
+
+        Keyword Args:
+            preprocessor: identifies the preprocessing, for example as from
+                a Preprocessor's ``preprocessor_id``.
+            model: identifies the models, for example as from a
+                ClusteringStrategy's ``model_id``.
+
+        Returns:
+            A dict keyed by image hash of the feature vectors, as float32
+            arrays.  Images without stored embeddings are omitted.
+        """
+        query = ClusteringEmbedding.objects.filter(
+            image_hash__in=list(image_hashes),
+            top=rect["top"],
+            left=rect["left"],
+            bottom=rect["bottom"],
+            right=rect["right"],
+            preprocessor=preprocessor,
+            model=model,
+        ).values_list("image_hash", "vector")
+        return {h: np.frombuffer(v, dtype=np.float32) for h, v in query}
+
+    @staticmethod
+    def store_embeddings(
+        embeddings: Mapping[str, np.ndarray],
+        rect: Mapping[str, float],
+        *,
+        preprocessor: str,
+        model: str,
+    ) -> None:
+        """Store the embeddings of many images, ignoring any already stored.
+
+        Args:
+            embeddings: a dict keyed by image hash of the feature vectors,
+                which are stored as float32.
+            rect: the rectangular region, with keys left, top, right, bottom.
+
+        Keyword Args:
+            preprocessor: identifies the preprocessing.
+            model: identifies the models.
+        """
+        objs = [
+            ClusteringEmbedding(
+                image_hash=h,
+                top=rect["top"],
+                left=rect["left"],
+                bottom=rect["bottom"],
+                right=rect["right"],
+                preprocessor=preprocessor,
+                model=model,
+                vector=np.asarray(v, dtype=np.float32).tobytes(),
+            )
+            for h, v in embeddings.items()
+        ]
+        with transaction.atomic():
+            ClusteringEmbedding.objects.bulk_create(objs, ignore_conflicts=True)
+
+    @staticmethod
+    def delete_embeddings(*, model: str | None = None) -> int:
+        """Delete stored embeddings, for example after a model is updated.
+
+        Keyword Args:
+            model: only delete the embeddings from this model, or all
+                embeddings if omitted.
+
+        Returns:
+            The number of embeddings deleted.
+        """
+        query = ClusteringEmbedding.objects.all()
+        if model is not None:
+            query = query.filter(model=model)
+        n, _ = query.delete()
+        return n
@@ -5,6 +5,8 @@
 from collections import defaultdict
 from typing import Any, Mapping, Optional
 
+import numpy as np
+
 # django
 from django.forms.models import model_to_dict
 from django.db import transaction
@@ -29,12 +31,15 @@ from plom_server.QuestionClustering.models import ClusteringModelType
 
 # plom_server services
 from plom_server.Mark.services.marking_task_service import MarkingTaskService
-from plom_server.Mark.services import MarkingPriorityService
+from plom_server.Mark.services import MarkingPriorityService, dispatch_queue
 from plom_server.Papers.services import PaperInfoService
 from plom_server.Rectangles.services import (
     RectangleExtractor,
 )
 from plom_server.QuestionClustering.services.model_loader import get_ClusteringStrategy
+from plom_server.QuestionClustering.services.embedding_store_service import (
+    ClusteringEmbeddingService,
+)
 
 # exception
 from plom_server.QuestionClustering.exceptions.clustering_exception import (
@@ -211,19 +216,30 @@ class QuestionClusteringService:
                 base_cluster.paper.add(*papers)
                 user_facing_cluster.paper.add(*papers)
 
-    def cluster_mcq(
-        self, question_idx: int, version: int, page_num: int, rect: dict
+    def _cluster_with_pipeline(
+        self,
+        clustering_pipeline: ClusteringPipeline,
+        question_idx: int,
+        version: int,
+        page_num: int,
+        rect: dict,
     ) -> None:
-        """Cluster mcq responses within the given rect for (q, v) context.
+        """Cluster the responses within the given rect for (q, v) context using a pipeline.
+
+        Feature vectors are reused from the embedding store where possible:
+        only the scanned images not embedded before (with this rectangle,
+        preprocessor and model) are cropped and run through the models.
 
         Args:
+            clustering_pipeline: the pipeline to embed and cluster with.
             question_idx: question_index of the clustering context.
             version: version of the clustering context.
             page_num: the page_number used for the clustering.
             rect: the rectangular region used for clustering.
 
         Raises:
-            ValueError: problem extracting from reference image.
+            ValueError: problem extracting from reference image, or from
+                all of the scanned images.
         """
         # Get reference image within the rectangle
         rex = RectangleExtractor(version, page_num)
@@ -232,33 +248,66 @@ class QuestionClusteringService:
         paper_numbers = PaperInfoService.get_paper_numbers_containing_page(
             page_num, version=version, scanned=True
         )
+        paper_to_hash = rex.get_scanned_image_hashes(paper_numbers)
+
+        store_key = {
+            "preprocessor": clustering_pipeline.preprocessor.preprocessor_id,
+            "model": clustering_pipeline.ClusteringStrategy.model_id,
+        }
+        hash_to_vector = ClusteringEmbeddingService.get_embeddings(
+            paper_to_hash.values(), rect, **store_key
+        )
+        missing = [pn for pn, h in paper_to_hash.items() if h not in hash_to_vector]
 
-        # get paper_num to ref, scanned mapping used for clustering input
         # the key names (ref, scanned) are known from the type of Preprocessor (DiffProcessor)
+        # (any that failed to extract are omitted)
         paper_to_images: Mapping[int, Mapping[str, Any]] = {
-            pn: {"ref": ref, "scanned": rex.get_cropped_scanned_img_or_none(pn, rect)}
-            for pn in paper_numbers
-        }
-        # filter out any that failed
-        paper_to_images = {
-            pn: x for pn, x in paper_to_images.items() if x["scanned"] is not None
+            pn: {"ref": ref, "scanned": scanned}
+            for pn, scanned in rex.get_cropped_scanned_imgs(missing, rect).items()
         }
-        if not paper_to_images:
+        if paper_to_images:
+            X_new = clustering_pipeline.embed(list(paper_to_images.values()))
+            new_vectors = {
+                paper_to_hash[pn]: x for pn, x in zip(paper_to_images, X_new)
+            }
+            ClusteringEmbeddingService.store_embeddings(new_vectors, rect, **store_key)
+            hash_to_vector.update(new_vectors)
+
+        clustered_papers = [
+            pn for pn in sorted(paper_to_hash) if paper_to_hash[pn] in hash_to_vector
+        ]
+        if not clustered_papers:
             raise ValueError("Could not extract rectangles from ANY pages")
+        X = np.stack([hash_to_vector[paper_to_hash[pn]] for pn in clustered_papers])
+        paper_to_clusterId = clustering_pipeline.cluster_embeddings(clustered_papers, X)
+
+        # store clustered results into db
+        self._store_clustered_result(
+            paper_to_clusterId, question_idx, version, page_num, rect
+        )
+
+    def cluster_mcq(
+        self, question_idx: int, version: int, page_num: int, rect: dict
+    ) -> None:
+        """Cluster mcq responses within the given rect for (q, v) context.
+
+        Args:
+            question_idx: question_index of the clustering context.
+            version: version of the clustering context.
+            page_num: the page_number used for the clustering.
+            rect: the rectangular region used for clustering.
 
+        Raises:
+            ValueError: problem extracting from reference image.
+        """
         # get mcq ClusteringStrategy (use @lru_cache)
         ClusteringStrategy = get_ClusteringStrategy(model_type=ClusteringModelType.MCQ)
-
-        # run clustering pipeline
         clustering_pipeline = ClusteringPipeline(
             ClusteringStrategy=ClusteringStrategy,
             preprocessor=DiffProcessor(dilation_strength=1, invert=False),
         )
-        paper_to_clusterId = clustering_pipeline.cluster(paper_to_images)
-
-        # store clustered results into db
-        self._store_clustered_result(
-            paper_to_clusterId, question_idx, version, page_num, rect
+        self._cluster_with_pipeline(
+            clustering_pipeline, question_idx, version, page_num, rect
         )
 
     def cluster_hme(
@@ -275,41 +324,14 @@ class QuestionClusteringService:
         Raises:
             ValueError: extraction from problem reference image.
         """
-        # Get reference image within the rectangle
-        rex = RectangleExtractor(version, page_num)
-        ref = rex.get_cropped_ref_img(rect)
-
-        paper_numbers = PaperInfoService.get_paper_numbers_containing_page(
-            page_num, version=version, scanned=True
-        )
-
-        # get paper_num to ref, scanned mapping used for clustering input
-        # the key names (ref, scanned) are known from the type of Preprocessor (DiffProcessor)
-        # TODO: why do we need typing here?
-        paper_to_images: Mapping[int, Mapping[str, Any]] = {
-            pn: {"ref": ref, "scanned": rex.get_cropped_scanned_img_or_none(pn, rect)}
-            for pn in paper_numbers
-        }
-        # filter out any that failed
-        paper_to_images = {
-            pn: x for pn, x in paper_to_images.items() if x["scanned"] is not None
-        }
-        if not paper_to_images:
-            raise ValueError("Could not extract rectangles from ANY pages")
-
         # load model
         ClusteringStrategy = get_ClusteringStrategy(model_type=ClusteringModelType.HME)
-
-        # run clustering pipeline
         clustering_pipeline = ClusteringPipeline(
             ClusteringStrategy=ClusteringStrategy,
             preprocessor=DiffProcessor(dilation_strength=1, invert=True),
         )
-        paper_to_clusterId = clustering_pipeline.cluster(paper_to_images)
-
-        # store clustered results into db
-        self._store_clustered_result(
-            paper_to_clusterId, question_idx, version, page_num, rect
+        self._cluster_with_pipeline(
+            clustering_pipeline, question_idx, version, page_num, rect
         )
 
     def cluster_qv(
@@ -592,6 +614,7 @@ class QuestionClusteringService:
 
         # Insert once
         Through.objects.bulk_create(rows, ignore_conflicts=True)
+        dispatch_queue.invalidate()
 
     def remove_tag_from_a_cluster(
         self, question_idx: int, version: int, clusterId: int, tag_pk: int
@@ -611,6 +634,7 @@ class QuestionClusteringService:
         task_tags = MarkingTaskTag.objects.filter(task__in=tasks, id=tag_pk)
 
         task_tags.delete()
+        dispatch_queue.invalidate()
 
     def _get_cluster_id_from_cluster_tag(self, cluster_tag_text: str) -> int:
         """Get the cluster id given a cluster tag.
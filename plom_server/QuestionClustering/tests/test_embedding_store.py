@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# Copyright (C) 2026 Colin B. Macdonald
+
+import numpy as np
+from django.test import TestCase
+
+from ..services import ClusteringEmbeddingService
+
+
+class ClusteringEmbeddingServiceTests(TestCase):
+    """Tests for storing and retrieving clustering embeddings."""
+
+    rect = {"left": 0.1, "top": 0.2, "right": 0.9, "bottom": 0.5}
+    key = {"preprocessor": "DiffProcessor(invert=True)", "model": "HME:a+b"}
+
+    def test_store_and_get_roundtrip(self) -> None:
+        vectors = {
+            "aaa": np.arange(4, dtype=np.float32),
+            "bbb": np.ones(4, dtype=np.float32),
+        }
+        ClusteringEmbeddingService.store_embeddings(vectors, self.rect, **self.key)
+        got = ClusteringEmbeddingService.get_embeddings(
+            ["aaa", "bbb", "ccc"], self.rect, **self.key
+        )
+        self.assertEqual(set(got), {"aaa", "bbb"})
+        self.assertEqual(got["aaa"].dtype, np.float32)
+        self.assertTrue(np.array_equal(got["aaa"], vectors["aaa"]))
+
+    def test_get_depends_on_rect_preprocessor_and_model(self) -> None:
+        ClusteringEmbeddingService.store_embeddings(
+            {"aaa": np.zeros(3, dtype=np.float32)}, self.rect, **self.key
+        )
+        other_rect = dict(self.rect, left=0.2)
+        self.assertEqual(
+            ClusteringEmbeddingService.get_embeddings(["aaa"], other_rect, **self.key),
+            {},
+        )
+        for k in ("preprocessor", "model"):
+            other_key = dict(self.key, **{k: "something else"})
+            got = ClusteringEmbeddingService.get_embeddings(
+                ["aaa"], self.rect, **other_key
+            )
+            self.assertEqual(got, {})
+
+    def test_store_twice_keeps_first(self) -> None:
+        ClusteringEmbeddingService.store_embeddings(
+            {"aaa": np.zeros(3, dtype=np.float32)}, self.rect, **self.key
+        )
+        ClusteringEmbeddingService.store_embeddings(
+            {"aaa": np.ones(3, dtype=np.float32)}, self.rect, **self.key
+        )
+        got = ClusteringEmbeddingService.get_embeddings(["aaa"], self.rect, **self.key)
+        self.assertTrue(np.array_equal(got["aaa"], np.zeros(3, dtype=np.float32)))
+
+    def test_delete(self) -> None:
+        ClusteringEmbeddingService.store_embeddings(
+            {"aaa": np.zeros(3, dtype=np.float32)}, self.rect, **self.key
+        )
+        self.assertEqual(ClusteringEmbeddingService.delete_embeddings(model="nah"), 0)
+        self.assertEqual(ClusteringEmbeddingService.delete_embeddings(), 1)
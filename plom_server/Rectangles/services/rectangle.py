@@ -3,16 +3,19 @@
 # Copyright (C) 2023 Natalie Balashov
 # Copyright (C) 2024-2025 Andrew Rechnitzer
 
+from collections import OrderedDict
 from io import BytesIO
 import logging
 from math import ceil, floor
 from pathlib import Path
-from typing import Any
+import threading
+from typing import Any, Callable, Hashable, Iterable, Iterator
 
 import cv2 as cv
 import imutils
 import numpy as np
 import zipfile
+from django.conf import settings
 from PIL import Image
 
 from plom_server.Papers.models import ReferenceImage
@@ -184,6 +187,71 @@ def _get_perspective_transform_scan_to_ref(
     return cv.getPerspectiveTransform(scan_rect_coords, dest_rect_coords)
 
 
+class _DecodedPageImageCache:
+    """A least-recently-used cache of decoded page images, bounded by their total size in bytes.
+
+    The cached arrays are shared between callers so they are marked
+    read-only.  Thread-safe: two threads may occasionally both decode
+    the same image, but only one copy is kept.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._cache: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], np.ndarray]
+    ) -> np.ndarray:
+        """Return the array for the key, calling the loader if it is not cached."""
+        if self.max_bytes <= 0:
+            return loader()
+        with self._lock:
+            arr = self._cache.get(key)
+            if arr is not None:
+                self._cache.move_to_end(key)
+                return arr
+        # decode outside the lock so other threads are not blocked
+        arr = loader()
+        arr.setflags(write=False)
+        if arr.nbytes > self.max_bytes:
+            return arr
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = arr
+                self._nbytes += arr.nbytes
+                while self._nbytes > self.max_bytes:
+                    _, old = self._cache.popitem(last=False)
+                    self._nbytes -= old.nbytes
+        return arr
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+
+
+_page_image_cache = _DecodedPageImageCache(
+    settings.PLOM_PAGE_IMAGE_CACHE_MB * 1024 * 1024
+)
+
+
+def _load_page_array(img: Path, pre_rotation: int, scale: float) -> np.ndarray:
+    """Decode a page image into an OpenCV-style array, rotating and optionally scaling it."""
+    pil_img = rotate.pil_load_with_jpeg_exif_rot_applied(img)
+    # Note: this `img_obj.rotation` is (currently) only 0, 90, 180, 270
+    # (The small adjustments from true will be handled by warpPerspective)
+    pil_img = pil_img.rotate(pre_rotation, expand=True)
+    if scale != 1.0:
+        pil_img = pil_img.resize(
+            (round(pil_img.width * scale), round(pil_img.height * scale)),
+            Image.Resampling.LANCZOS,
+        )
+    # convert PIL format to OpenCV format via numpy array; feels fragile :(
+    return cv.cvtColor(np.array(pil_img), cv.COLOR_RGB2BGR)
+
+
 def _extract_rect_region_from_image(
     img: Path,
     qr_dict: dict[str, dict[str, Any]],
@@ -195,6 +263,51 @@ def _extract_rect_region_from_image(
     *,
     pre_rotation: int = 0,
 ) -> None | bytes:
+    """Given an image, get a particular sub-rectangle as png, after applying an affine transformation to correct it.
+
+    This is :func:`_extract_rect_region_array_from_image` followed
+    by encoding the result; see that function for the arguments.
+
+    Returns:
+        The bytes of the image in png format, or None if there were not
+        enough QR codes to accurately extract a region.
+    """
+    extracted_rect_img = _extract_rect_region_array_from_image(
+        img,
+        qr_dict,
+        left_f,
+        top_f,
+        right_f,
+        bottom_f,
+        reference_region,
+        pre_rotation=pre_rotation,
+    )
+    if extracted_rect_img is None:
+        return None
+    return _encode_bgr_array_as_png(extracted_rect_img)
+
+
+def _encode_bgr_array_as_png(bgr_img: np.ndarray) -> bytes:
+    # convert the result to a PIL.Image
+    resulting_img = Image.fromarray(cv.cvtColor(bgr_img, cv.COLOR_BGR2RGB))
+    with BytesIO() as fh:
+        resulting_img.save(fh, format="png")
+        return fh.getvalue()
+
+
+def _extract_rect_region_array_from_image(
+    img: Path,
+    qr_dict: dict[str, dict[str, Any]],
+    left_f: float,
+    top_f: float,
+    right_f: float,
+    bottom_f: float,
+    reference_region: tuple[int | float, int | float, int | float, int | float],
+    *,
+    pre_rotation: int = 0,
+    image_key: str | None = None,
+    scale: float = 1.0,
+) -> None | np.ndarray:
     """Given an image, get a particular sub-rectangle, after applying an affine transformation to correct it.
 
     Args:
@@ -213,10 +326,17 @@ def _extract_rect_region_from_image(
 
     Keyword Args:
         pre_rotation: TODO.
+        image_key: if given, a unique identifier of the image contents,
+            such as its hash, used to keep the decoded image in a cache
+            shared by later calls, if that is enabled by the
+            ``PLOM_PAGE_IMAGE_CACHE_MB`` setting.  By default, no caching.
+        scale: decode the image at this scale, less than one being
+            faster and using less memory when full resolution is not
+            needed.  The extracted rectangle is the same size regardless.
 
     Returns:
-        The bytes of the image in png format, or None if there were not
-        enough QR codes to accurately extract a region.
+        The image as an OpenCV-style array (BGR colour order), or None
+        if there were not enough QR codes to accurately extract a region.
 
     Raises:
         TODO
@@ -248,22 +368,18 @@ def _extract_rect_region_from_image(
     # the origin.
     M_s_to_r = _get_perspective_transform_scan_to_ref(ref_rect, M_r_to_s)
     # now get the scan-image ready to extract the rectangle
-    pil_img = rotate.pil_load_with_jpeg_exif_rot_applied(img)
-    # Note: this `img_obj.rotation` is (currently) only 0, 90, 180, 270
-    # (The small adjustments from true will be handled by warpPerspective)
-    pil_img = pil_img.rotate(pre_rotation, expand=True)
-    # convert PIL format to OpenCV format via numpy array; feels fragile :(
-    opencv_img = cv.cvtColor(np.array(pil_img), cv.COLOR_RGB2BGR)
+    if image_key is None:
+        opencv_img = _load_page_array(img, pre_rotation, scale)
+    else:
+        opencv_img = _page_image_cache.get_or_load(
+            (image_key, pre_rotation, scale),
+            lambda: _load_page_array(img, pre_rotation, scale),
+        )
+    if scale != 1.0:
+        # the transform is in full-resolution scan coordinates
+        M_s_to_r = M_s_to_r @ np.diag([1.0 / scale, 1.0 / scale, 1.0])
     # now finally extract out the rectangle from the scan image
-    extracted_rect_img = cv.warpPerspective(
-        opencv_img, M_s_to_r, (rect_width_int, rect_height_int)
-    )
-    # convert the result to a PIL.Image
-    resulting_img = Image.fromarray(cv.cvtColor(extracted_rect_img, cv.COLOR_BGR2RGB))
-
-    with BytesIO() as fh:
-        resulting_img.save(fh, format="png")
-        return fh.getvalue()
+    return cv.warpPerspective(opencv_img, M_s_to_r, (rect_width_int, rect_height_int))
 
 
 class RectangleExtractor:
@@ -304,6 +420,53 @@ class RectangleExtractor:
         # overall width and height of the actual reference image
         self.FULL_WIDTH = rimg_obj.width
         self.FULL_HEIGHT = rimg_obj.height
+        # scanned images of our page, keyed by paper number, see prefetch_scanned_images
+        self._scanned_images: dict[int, Any] = {}
+
+    def prefetch_scanned_images(
+        self, paper_numbers: Iterable[int] | None = None
+    ) -> list[int]:
+        """Look up the scanned images of our page and version for many papers in one query.
+
+        Later extractions from these papers will not need to query the
+        database.
+
+        Args:
+            paper_numbers: which papers to look up, or all papers if omitted.
+
+        Returns:
+            The sorted paper numbers which have a scan of our page and version.
+        """
+        fixedpages = FixedPage.objects.select_related(
+            "paper", "image", "image__baseimage"
+        ).filter(
+            version=self.version, page_number=self.page_number, image__isnull=False
+        )
+        if paper_numbers is not None:
+            fixedpages = fixedpages.filter(paper__paper_number__in=list(paper_numbers))
+        found = {}
+        # Issue #4003: multiple FixedPages can share an image
+        for fp in fixedpages:
+            found.setdefault(fp.paper.paper_number, fp.image)
+        self._scanned_images.update(found)
+        return sorted(found)
+
+    def get_scanned_image_hashes(
+        self, paper_numbers: Iterable[int] | None = None
+    ) -> dict[int, str]:
+        """Get the hashes of the scanned images of our page and version for many papers.
+
+        Args:
+            paper_numbers: which papers to look up, or all papers if omitted.
+
+        Returns:
+            A dict keyed by paper number of the sha256 hashes of the scanned
+            images.  Papers without a scan of our page are omitted.
+        """
+        return {
+            pn: self._scanned_images[pn].baseimage.image_hash
+            for pn in self.prefetch_scanned_images(paper_numbers)
+        }
 
     def _get_affine_transformation_matrix_ref_to_scan(
         self, qr_dict: dict[str, dict[str, Any]]
@@ -320,6 +483,104 @@ class RectangleExtractor:
             (self.LEFT, self.TOP, self.RIGHT, self.BOTTOM), qr_dict
         )
 
+    def _get_scanned_image_obj(
+        self, paper_number: int, *, _version_ignore: bool = False
+    ):
+        """Get the scanned image (a database object) of our page of the given paper."""
+        if not _version_ignore and paper_number in self._scanned_images:
+            return self._scanned_images[paper_number]
+        paper_obj = Paper.objects.get(paper_number=paper_number)
+        if _version_ignore:
+            log.info("recklessly ignoring the version...")
+            return (
+                FixedPage.objects.select_related("image", "image__baseimage")
+                .filter(page_number=self.page_number, paper=paper_obj)
+                .first()
+                .image
+            )
+        # Issue #4003: multiple FixedPages can share an image, don't use "get"
+        return (
+            FixedPage.objects.select_related("image", "image__baseimage")
+            .filter(version=self.version, page_number=self.page_number, paper=paper_obj)
+            .first()
+            .image
+        )
+
+    def _extract_rect_region_array_from_image_obj(
+        self,
+        img_obj,
+        left_f: float,
+        top_f: float,
+        right_f: float,
+        bottom_f: float,
+        *,
+        scale: float = 1.0,
+    ) -> None | np.ndarray:
+        # TODO: Issue #3888 this `.path` assumes storage is local and will fail
+        # with a NotImplementedError when FileField uses remote storage.
+        return _extract_rect_region_array_from_image(
+            img_obj.baseimage.image_file.path,
+            img_obj.parsed_qr,
+            left_f,
+            top_f,
+            right_f,
+            bottom_f,
+            (self.LEFT, self.TOP, self.RIGHT, self.BOTTOM),
+            pre_rotation=img_obj.rotation,
+            image_key=img_obj.baseimage.image_hash,
+            scale=scale,
+        )
+
+    def extract_rect_region_array(
+        self,
+        paper_number: int,
+        left_f: float,
+        top_f: float,
+        right_f: float,
+        bottom_f: float,
+        *,
+        scale: float = 1.0,
+        _version_ignore: bool = False,
+    ) -> np.ndarray:
+        """Get a particular sub-rectangle of a scanned image as an array, after correcting it.
+
+        Same as :meth:`extract_rect_region` but without encoding the result.
+        If the ``PLOM_PAGE_IMAGE_CACHE_MB`` setting is nonzero, decoded
+        page images are kept in a size-limited cache shared by all
+        extractors, so extracting several rectangles from the same page
+        only decodes it once.
+
+        Keyword Args:
+            scale: work from the scanned page at this scale: less than one
+                is faster when full resolution is not needed.  The size of
+                the result does not change.
+            _version_ignore: see :meth:`extract_rect_region`.
+
+        Returns:
+            The image as an OpenCV-style array: ``height x width x 3``
+            in BGR colour order.
+
+        Raises:
+            ObjectDoesNotExist: if that paper number does not have our page
+                and our version.
+            ValueError: less than three QR codes so we cannot triangulate
+                accurately to extract regions.
+        """
+        img_obj = self._get_scanned_image_obj(
+            paper_number, _version_ignore=_version_ignore
+        )
+        rect_img = self._extract_rect_region_array_from_image_obj(
+            img_obj, left_f, top_f, right_f, bottom_f, scale=scale
+        )
+        if rect_img is None:
+            raise ValueError(
+                "Cannot accurately extract rectangle using "
+                f"{len(img_obj.parsed_qr)} QR codes; "
+                f"Paper number {paper_number} version {self.version} "
+                f"page {self.page_number}"
+            )
+        return rect_img
+
     def extract_rect_region(
         self,
         paper_number: int,
@@ -358,47 +619,62 @@ class RectangleExtractor:
             ValueError: less than three QR codes so we cannot triangulate
                 accurately to extract regions.
         """
-        # start by getting the scanned image
-        paper_obj = Paper.objects.get(paper_number=paper_number)
-        if _version_ignore:
-            log.info("recklessly ignoring the version...")
-            img_obj = (
-                FixedPage.objects.select_related("image", "image__baseimage")
-                .filter(page_number=self.page_number, paper=paper_obj)
-                .first()
-                .image
-            )
-        else:
-            # Issue #4003: multiple FixedPages can share an image, don't use "get"
-            img_obj = (
-                FixedPage.objects.select_related("image", "image__baseimage")
-                .filter(
-                    version=self.version, page_number=self.page_number, paper=paper_obj
-                )
-                .first()
-                .image
-            )
-
-        # TODO: Issue #3888 this `.path` assumes storage is local and will fail
-        # with a NotImplementedError when FileField uses remote storage.
-        bytes = _extract_rect_region_from_image(
-            img_obj.baseimage.image_file.path,
-            img_obj.parsed_qr,
+        rect_img = self.extract_rect_region_array(
+            paper_number,
             left_f,
             top_f,
             right_f,
             bottom_f,
-            (self.LEFT, self.TOP, self.RIGHT, self.BOTTOM),
-            pre_rotation=img_obj.rotation,
+            _version_ignore=_version_ignore,
         )
-        if not bytes:
-            raise ValueError(
-                "Cannot accurately extract rectangle using "
-                f"{len(img_obj.parsed_qr)} QR codes; "
-                f"Paper number {paper_number} version {self.version} "
-                f"page {self.page_number}"
+        return _encode_bgr_array_as_png(rect_img)
+
+    def iter_rect_region_arrays(
+        self,
+        paper_numbers: Iterable[int],
+        left_f: float,
+        top_f: float,
+        right_f: float,
+        bottom_f: float,
+        *,
+        scale: float = 1.0,
+    ) -> Iterator[tuple[int, np.ndarray]]:
+        """Extract the same rectangle from many papers, one at a time.
+
+        The scanned images are looked up together, then each rectangle is
+        extracted only when asked for, so the caller can process them as
+        they come without holding them all in memory.
+
+        Args:
+            paper_numbers: which papers to extract from.  Papers that
+                do not have our page and version are skipped.
+            left_f: the boundaries of the rectangle, as in
+                :meth:`extract_rect_region`.
+            top_f: same as left, defining the top boundary.
+            right_f: same as left, defining the right boundary.
+            bottom_f: same as left, defining the bottom boundary.
+
+        Keyword Args:
+            scale: see :meth:`extract_rect_region_array`.
+
+        Yields:
+            Pairs of paper number and the extracted rectangle as an
+            OpenCV-style (BGR) array.  Papers where we cannot
+            accurately extract the rectangle (e.g., less than three QR
+            codes) are skipped.
+        """
+        for pn in self.prefetch_scanned_images(paper_numbers):
+            rect_img = self._extract_rect_region_array_from_image_obj(
+                self._scanned_images[pn], left_f, top_f, right_f, bottom_f, scale=scale
             )
-        return bytes
+            if rect_img is None:
+                log.warning(
+                    "Cannot extract rectangle from paper %d page %d: too few QR codes",
+                    pn,
+                    self.page_number,
+                )
+                continue
+            yield pn, rect_img
 
     def build_zipfile(
         self,
@@ -415,24 +691,22 @@ class RectangleExtractor:
         zipfile on disc. This could cause problems if large rectangles
         are selected from many pages.
         """
-        # paper_numbers may be duplicated if there are multiple questions on a page
-        paper_numbers = set(
-            PaperInfoService.get_paper_numbers_containing_page(
-                self.page_number, version=self.version, scanned=True
-            )
-        )
-
         with zipfile.ZipFile(dest_filename, mode="w") as archive:
             # TODO: maybe we could avoid the empty zip case by writing a bit
             # of JSON metadata in here, like the coordinates for example.
-            for pn in paper_numbers:
+            # TODO: is just ignoring the failures right?  What if they all fail
+            # do we make an empty zip?  That's no fun.
+            for pn, rect_img in self.iter_rect_region_arrays(
+                PaperInfoService.get_paper_numbers_containing_page(
+                    self.page_number, version=self.version, scanned=True
+                ),
+                left_f,
+                top_f,
+                right_f,
+                bottom_f,
+            ):
                 fname = f"extracted_rectangle_pn{pn}.png"
-                dat = self.extract_rect_region(pn, left_f, top_f, right_f, bottom_f)
-                if dat is None:
-                    # TODO: is just ignoring the None's right?  What if they are all Nones
-                    # do we make an empty zip?  That's no fun.
-                    continue
-                archive.writestr(fname, dat)
+                archive.writestr(fname, _encode_bgr_array_as_png(rect_img))
 
             # DEBUG BRYAN (TEMP)
             # need reference
@@ -562,17 +836,49 @@ class RectangleExtractor:
         )
 
         try:
-            cropped_scanned_bytes = self.extract_rect_region(
+            cropped_scanned = self.extract_rect_region_array(
                 paper_num, left, top, right, bottom
             )
         except ValueError:
             return None
 
-        with BytesIO(cropped_scanned_bytes) as fh:
-            pil_img = Image.open(fh)
-            cropped_scanned = np.array(pil_img)
+        return cv.cvtColor(cropped_scanned, cv.COLOR_BGR2RGB)
+
+    def get_cropped_scanned_imgs(
+        self, paper_numbers: Iterable[int], rects: dict[str, float]
+    ) -> dict[int, np.ndarray]:
+        """Get numpy arrays of a cropped region of the scanned images of many papers.
+
+        Like :meth:`get_cropped_scanned_img_or_none` but looking up all the
+        scanned images at once.
+
+        Args:
+            paper_numbers: the paper numbers whose scanned pages will be extracted.
+            rects: a dictionary defining the cropped region. Must have these keys:
+                [left, top, right, bottom].
+
+        Returns:
+            A dict keyed by paper number of numpy arrays (RGB) of the cropped
+            scanned images.  Papers we cannot read from (e.g., not
+            enough QR codes) are omitted.
 
-        return cropped_scanned
+        Raises:
+            KeyError: malformed arg.
+        """
+        expected_keys = {"left", "top", "right", "bottom"}
+        if not expected_keys.issubset(rects):
+            missing = expected_keys - rects.keys()
+            raise KeyError(f"Missing rect keys: {missing}")
+        return {
+            pn: cv.cvtColor(rect_img, cv.COLOR_BGR2RGB)
+            for pn, rect_img in self.iter_rect_region_arrays(
+                paper_numbers,
+                rects["left"],
+                rects["top"],
+                rects["right"],
+                rects["bottom"],
+            )
+        }
 
 
 def get_largest_rectangle_contour_from_image(
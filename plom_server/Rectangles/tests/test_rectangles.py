@@ -16,7 +16,9 @@ import plom_server.Scan.tests as _Scan_tests
 from plom_server.Scan.services import ScanService
 
 from ..services.rectangle import (
+    _DecodedPageImageCache,
     _extract_rect_region_from_image,
+    _extract_rect_region_array_from_image,
     get_largest_rectangle_contour_from_image,
     get_reference_rectangle_from_QR_data,
     _get_affine_transf_matrix_ref_to_QR_target,
@@ -260,3 +262,62 @@ class RectangleServiceTests(TestCase):
             # print(((t, b), (l, r)))
             white_subimage = output_opencv[t:b, l:r]
             self.assertAlmostEqual(np.mean(white_subimage.astype(float)), 255, delta=5)
+
+    def test_rect_region_array_matches_png(self) -> None:
+        img_path = resources.files(_Scan_tests) / "id_page_img.png"
+        codes = QRextract(img_path)
+        parsed_codes = ScanService.parse_qr_code([codes])
+        rd = get_reference_rectangle_from_QR_data(parsed_codes)
+        ref_rect = (rd["left"], rd["top"], rd["right"], rd["bottom"])
+        args = (img_path, parsed_codes, 0.1, 0.3, 0.9, 0.6, ref_rect)
+        arr = _extract_rect_region_array_from_image(*args)  # type: ignore[arg-type]
+        png = _extract_rect_region_from_image(*args)  # type: ignore[arg-type]
+        assert arr is not None and png is not None
+        decoded = cv.imdecode(np.frombuffer(png, np.uint8), cv.IMREAD_COLOR)
+        self.assertEqual(arr.shape, decoded.shape)
+        self.assertTrue(np.array_equal(arr, decoded))
+
+    def test_rect_region_cached_and_downscaled(self) -> None:
+        img_path = resources.files(_Scan_tests) / "id_page_img.png"
+        codes = QRextract(img_path)
+        parsed_codes = ScanService.parse_qr_code([codes])
+        rd = get_reference_rectangle_from_QR_data(parsed_codes)
+        ref_rect = (rd["left"], rd["top"], rd["right"], rd["bottom"])
+        args = (img_path, parsed_codes, 0.1, 0.3, 0.9, 0.6, ref_rect)
+        full = _extract_rect_region_array_from_image(*args)  # type: ignore[arg-type]
+        cached = _extract_rect_region_array_from_image(
+            *args, image_key="id_page_img"  # type: ignore[arg-type]
+        )
+        assert full is not None and cached is not None
+        self.assertTrue(np.array_equal(full, cached))
+        half = _extract_rect_region_array_from_image(
+            *args, image_key="id_page_img", scale=0.5  # type: ignore[arg-type]
+        )
+        assert half is not None
+        self.assertEqual(full.shape, half.shape)
+        diff = np.abs(full.astype(float) - half.astype(float))
+        self.assertLess(np.mean(diff), 10)
+
+    def test_decoded_page_image_cache_is_bounded(self) -> None:
+        cache = _DecodedPageImageCache(max_bytes=250)
+        loads = []
+
+        def loader(k):
+            loads.append(k)
+            return np.full(100, k, dtype=np.uint8)
+
+        for k in (1, 2, 1, 3, 1):
+            a = cache.get_or_load(k, lambda: loader(k))
+            self.assertEqual(a[0], k)
+            self.assertFalse(a.flags.writeable)
+        # 1 was recently used so 2 was evicted when 3 arrived
+        self.assertEqual(loads, [1, 2, 3])
+        cache.get_or_load(2, lambda: loader(2))
+        self.assertEqual(loads, [1, 2, 3, 2])
+
+    def test_decoded_page_image_cache_can_be_off(self) -> None:
+        cache = _DecodedPageImageCache(max_bytes=0)
+        loads = []
+        for _ in range(2):
+            cache.get_or_load(1, lambda: loads.append(1) or np.zeros(10))
+        self.assertEqual(loads, [1, 1])
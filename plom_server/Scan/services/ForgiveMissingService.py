@@ -16,6 +16,7 @@ from django.db import transaction, IntegrityError
 from django.contrib.auth.models import User
 
 from plom_server.Base.models import BaseImage
+from plom_server.Base.services import page_image_renditions
 from plom_server.Papers.models import Bundle, DiscardPage, Image, FixedPage
 from plom_server.Papers.services import SpecificationService, PaperInfoService
 from plom_server.Preparation.services import SourceService
@@ -245,6 +246,9 @@ def erase_all_substitute_images_and_their_bundle() -> None:
             image__bundle=sys_sub_bundle_obj
         )
         files_to_unlink = [bimg.image_file.path for bimg in base_images_to_delete]
+        files_to_unlink.extend(
+            page_image_renditions.get_rendition_paths(base_images_to_delete)
+        )
         # carefully delete the Image objects before we delete the base-image objects
         # (they are protected).
         sys_sub_bundle_obj.image_set.all().delete()
@@ -5,7 +5,7 @@
 # Copyright (C) 2023-2024 Andrew Rechnitzer
 # Copyright (C) 2024 Forest Kobayashi
 
-from typing import Any
+from typing import Any, Iterable
 
 from django.db import transaction
 
@@ -57,8 +57,14 @@ class QRService:
             raise ValueError("This bundle has not had its QR codes read")
 
         with transaction.atomic():
-            images = bundle.stagingimage_set.all()
-            for img in images:
+            images = {img.pk: img for img in bundle.stagingimage_set.all()}
+            # Look up everything we need to check the QR codes just once,
+            # rather than once per image.
+            correct_public_code = Settings.get_public_code()
+            page_versions = PaperInfoService.get_page_versions_of_papers(
+                cls._get_paper_numbers_from_QR_codes(images.values())
+            )
+            for img in images.values():
                 if len(img.parsed_qr) == 0:
                     # no qr-codes found.
                     no_qr_imgs.append(img.pk)
@@ -77,7 +83,11 @@ class QRService:
                     )
                     continue
                 try:
-                    cls._check_qrs_against_spec_and_qvmap(img.parsed_qr)
+                    cls._check_qrs_against_spec_and_qvmap(
+                        img.parsed_qr,
+                        correct_public_code=correct_public_code,
+                        page_versions=page_versions,
+                    )
                 except ValueError as err:
                     error_imgs.append(
                         (
@@ -129,60 +139,94 @@ class QRService:
                     )
                 )
 
+        # Apply the results in memory, then write them back with one
+        # bulk_update per kind of change.
+        known_to_save = []
+        for tpv, img_list in known_imgs.items():
+            if len(img_list) > 1:
+                # this indicates a collision, and so handled by error-images
+                continue
+            img = images[img_list[0]]
+            papernum, page_number, version = parse_paper_page_version(tpv)
+            img.paper_number = papernum
+            img.page_number = page_number
+            img.version = version
+            img.image_type = StagingImage.KNOWN
+            img.history += (
+                f"; Made known ({papernum}, {page_number}, {version})"
+                " based on QR codes"
+            )
+            known_to_save.append(img)
+
+        # all the images with no-qrs.
+        for k in no_qr_imgs:
+            img = images[k]
+            img.image_type = StagingImage.UNKNOWN
+            img.history += "; Had no QR codes, making unknown"
+        # all the extra-pages.
+        for k in extra_imgs:
+            img = images[k]
+            img.image_type = StagingImage.EXTRA
+            img.paper_number = None
+            img.question_idx_list = None
+            img.history += "; Made extra based on special extra sheet QR codes"
+        # all the scrap-paper pages.
+        for k in scrap_imgs:
+            img = images[k]
+            img.image_type = StagingImage.DISCARD
+            img.discard_reason = "Scrap paper"
+            img.history += "; Discarded based on special scrap paper QR codes"
+        # all the bundle-separator-paper pages.
+        for k in bsep_imgs:
+            img = images[k]
+            img.image_type = StagingImage.DISCARD
+            img.discard_reason = "Bundle separator paper"
+            img.history += "; Discarded based on special bundle separator QR codes"
+        # all the error-pages with the error string
+        for k, enum, short_err, long_err in error_imgs:
+            img = images[k]
+            img.image_type = StagingImage.ERROR
+            img.error_reason_enum = enum
+            img.error_reason = long_err
+            img.history += f"; Made into error image: {short_err}"
+
         with transaction.atomic():
-            # save all the known images that are not collisions.
-            for tpv, img_list in known_imgs.items():
-                if len(img_list) > 1:
-                    # this indicates a collision, and so handled by error-images
-                    continue
-                img = StagingImage.objects.get(pk=img_list[0])
-                papernum, page_number, version = parse_paper_page_version(tpv)
-                img.paper_number = papernum
-                img.page_number = page_number
-                img.version = version
-                img.image_type = StagingImage.KNOWN
-                img.history += (
-                    f"; Made known ({papernum}, {page_number}, {version})"
-                    " based on QR codes"
-                )
-                img.save()
-
-            # save all the images with no-qrs.
-            for k in no_qr_imgs:
-                img = StagingImage.objects.get(pk=k)
-                img.image_type = StagingImage.UNKNOWN
-                img.history += "; Had no QR codes, making unknown"
-                img.save()
-            # save all the extra-pages.
-            for k in extra_imgs:
-                img = StagingImage.objects.get(pk=k)
-                img.image_type = StagingImage.EXTRA
-                img.paper_number = None
-                img.question_idx_list = None
-                img.history += "; Made extra based on special extra sheet QR codes"
-                img.save()
-            # save all the scrap-paper pages.
-            for k in scrap_imgs:
-                img = StagingImage.objects.get(pk=k)
-                img.image_type = StagingImage.DISCARD
-                img.discard_reason = "Scrap paper"
-                img.history += "; Discarded based on special scrap paper QR codes"
-                img.save()
-            # save all the bundle-separator-paper pages.
-            for k in bsep_imgs:
-                img = StagingImage.objects.get(pk=k)
-                img.image_type = StagingImage.DISCARD
-                img.discard_reason = "Bundle separator paper"
-                img.history += "; Discarded based on special bundle separator QR codes"
-                img.save()
-            # save all the error-pages with the error string
-            for k, enum, short_err, long_err in error_imgs:
-                img = StagingImage.objects.get(pk=k)
-                img.image_type = StagingImage.ERROR
-                img.error_reason_enum = enum
-                img.error_reason = long_err
-                img.history += f"; Made into error image: {short_err}"
-                img.save()
+            StagingImage.objects.bulk_update(
+                known_to_save,
+                ["paper_number", "page_number", "version", "image_type", "history"],
+            )
+            StagingImage.objects.bulk_update(
+                [images[k] for k in no_qr_imgs], ["image_type", "history"]
+            )
+            StagingImage.objects.bulk_update(
+                [images[k] for k in extra_imgs],
+                ["image_type", "paper_number", "question_idx_list", "history"],
+            )
+            StagingImage.objects.bulk_update(
+                [images[k] for k in scrap_imgs + bsep_imgs],
+                ["image_type", "discard_reason", "history"],
+            )
+            StagingImage.objects.bulk_update(
+                [images[k] for k, *_ in error_imgs],
+                ["image_type", "error_reason_enum", "error_reason", "history"],
+            )
+
+    @staticmethod
+    def _get_paper_numbers_from_QR_codes(
+        images: Iterable[StagingImage],
+    ) -> set[int]:
+        """Get the paper numbers appearing in the QR codes of some images.
+
+        Malformed or special QR codes (such as extra pages) are ignored.
+        """
+        paper_numbers = set()
+        for img in images:
+            for qr in img.parsed_qr.values():
+                try:
+                    paper_numbers.add(qr["page_info"]["paper_id"])
+                except (KeyError, TypeError):
+                    pass
+        return paper_numbers
 
     @staticmethod
     def _check_consistent_qrs(parsed_qr_dict: dict[str, dict[str, Any]]) -> None:
@@ -253,6 +297,9 @@ class QRService:
     @staticmethod
     def _check_qrs_against_spec_and_qvmap(
         parsed_qr_dict: dict[str, dict[str, Any]],
+        *,
+        correct_public_code: str | None = None,
+        page_versions: dict[int, dict[int, set[int]]] | None = None,
     ) -> bool:
         """Check the info in the qr-code against the spec and the qv-map in the database.
 
@@ -267,6 +314,16 @@ class QRService:
              because it assumes the multiple QR codes are already self-consistent
            * if the page is an extra, scrap or unknown page then this test simply returns "True".
 
+        Args:
+            parsed_qr_dict: the parsed QR codes of one image.
+
+        Keyword Args:
+            correct_public_code: the public code of this assessment.  If
+                omitted, we look it up in the database.
+            page_versions: the versions of the pages of the papers, as from
+                :meth:`PaperInfoService.get_page_versions_of_papers`.  If
+                omitted, we look up the version in the database.
+
         Returns:
             True if the QR code is consistent with the spec.
 
@@ -286,7 +343,8 @@ class QRService:
 
         # make sure the public code matches
         public_code = qr_info["page_info"]["public_code"]
-        correct_public_code = Settings.get_public_code()
+        if correct_public_code is None:
+            correct_public_code = Settings.get_public_code()
         if public_code != correct_public_code:
             raise ValueError(
                 f"Public code {public_code} does not match server {correct_public_code}"
@@ -294,12 +352,50 @@ class QRService:
             )
 
         v_on_page = qr_info["page_info"]["version_num"]
-        v_in_db = PaperInfoService.get_version_from_paper_page(
-            qr_info["page_info"]["paper_id"], qr_info["page_info"]["page_num"]
-        )
+        paper_number = qr_info["page_info"]["paper_id"]
+        page_number = qr_info["page_info"]["page_num"]
+        if page_versions is None:
+            v_in_db = PaperInfoService.get_version_from_paper_page(
+                paper_number, page_number
+            )
+        else:
+            v_in_db = _version_from_page_versions(
+                page_versions, paper_number, page_number
+            )
         if v_on_page != v_in_db:
             raise ValueError(
                 f"Version of paper/page in qr-code = {v_on_page} does not match version in database = {v_in_db}"
             )
 
         return True
+
+
+def _version_from_page_versions(
+    page_versions: dict[int, dict[int, set[int]]], paper_number: int, page_number: int
+) -> int:
+    """Look up a version in a table, as :meth:`PaperInfoService.get_version_from_paper_page` does in the database.
+
+    Raises:
+        ValueError: paper and/or page does not exist.
+        NotImplementedError: multiple versions on the page that do not agree.
+    """
+    try:
+        pages = page_versions[paper_number]
+    except KeyError:
+        raise ValueError(
+            f"Paper {paper_number} does not exist in the database."
+        ) from None
+    try:
+        vers = pages[page_number]
+    except KeyError:
+        raise ValueError(
+            f"Page {page_number} of paper {paper_number} does not exist in the database."
+        ) from None
+    try:
+        (ver,) = vers
+        return ver
+    except ValueError:
+        raise NotImplementedError(
+            f"Heterogeneous versions per page not supported: got versions {sorted(vers)}"
+            f" for page {page_number} of paper {paper_number}"
+        ) from None
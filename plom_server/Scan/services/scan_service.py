@@ -36,6 +36,7 @@ import huey
 import huey.api
 import huey.exceptions
 import pymupdf
+from PIL import Image
 
 from plom.common.misc_utils import format_int_list_with_runs
 from plom.common.exceptions import PlomConflict
@@ -48,13 +49,14 @@ from plom.common.tpv_utils import (
     isValidScrapPaperCode,
     isValidBundleSeparatorPaperCode,
 )
-from plom.scan import QRextract
+from plom.scan import QRextract, rotate, rotate_QR_results
 from plom.scan import render_page_to_bitmap, try_to_extract_image
 
 from plom_server.Papers.services import ImageBundleService, SpecificationService
 from plom_server.Papers.models import MobilePage
 from plom_server.Scan.services.cast_service import ScanCastService
 from plom_server.Base.models import HueyTaskTracker, BaseImage
+from plom_server.Base.services import page_image_renditions
 from ..models import (
     StagingBundle,
     StagingImage,
@@ -105,6 +107,7 @@ class ScanService:
         pdf_hash: str = "",
         force_render: bool = False,
         read_after: bool = False,
+        fused_qr_read: bool = False,
         force: bool = False,
     ) -> dict[str, Any]:
         """Upload a bundle PDF and store it in the filesystem + database.
@@ -132,6 +135,9 @@ class ScanService:
                 render the page.
             read_after: Automatically read the qr codes from the bundle after
                 upload+splitting is finished.
+            fused_qr_read: read the qr codes while splitting, from the
+                page image already in memory, instead of as a separate
+                stage afterwards.  See :meth:`split_and_save_bundle_images`.
             force: accept an upload that would otherwise be an error.
                 Off by default.  Currently this allows duplicate bundles
                 to be uploaded which would otherwise be an error.
@@ -259,7 +265,9 @@ class ScanService:
             bundle_obj.pdf_hash = pdf_hash
             bundle_obj.number_of_pages = number_of_pages
             bundle_obj.save()
-        cls.split_and_save_bundle_images(bundle_obj.pk, read_after=read_after)
+        cls.split_and_save_bundle_images(
+            bundle_obj.pk, read_after=read_after, fused_qr_read=fused_qr_read
+        )
 
         if len(pdf_hash) >= (12 + 12 + 3):
             brief_hash = pdf_hash[:12] + "..." + pdf_hash[-12:]
@@ -321,6 +329,7 @@ class ScanService:
         *,
         number_of_chunks: int = 16,
         read_after: bool = False,
+        fused_qr_read: bool = False,
     ) -> None:
         """Read a PDF document and save page images to filesystem/database.
 
@@ -333,6 +342,11 @@ class ScanService:
                 number_of_pages_in_bundle / number_of_chunks pages.
             read_after: Automatically read the qr codes from the bundle after
                 upload+splitting is finished.
+            fused_qr_read: Read the qr codes in the same pass as splitting:
+                each page is decoded once and the hash, thumbnail and
+                qr codes all come from that in-memory image.  The bundle
+                is then classified as soon as splitting finishes, with no
+                separate qr-reading chore.  Implies ``read_after``.
 
         Returns:
             None
@@ -350,6 +364,7 @@ class ScanService:
             number_of_chunks,
             tracker_pk=tracker_pk,
             read_after=read_after,
+            fused_qr_read=fused_qr_read,
             _debug_be_flaky=False,
         )
         # print(f"Just enqueued Huey parent_split_and_save task id={res.id}")
@@ -420,6 +435,13 @@ class ScanService:
                 bimg.image_file.path
                 for bimg in BaseImage.objects.filter(stagingimage__bundle=_bundle_obj)
             ]
+            # and any downscaled copies of them (made when pushed, or
+            # on demand, so there might be some even on an unpushed bundle)
+            files_to_unlink.extend(
+                page_image_renditions.get_rendition_paths(
+                    BaseImage.objects.filter(stagingimage__bundle=_bundle_obj)
+                )
+            )
             # and the thumbnails...
             # (note subtle difference in staging_image / stagingimage - sigh)
             files_to_unlink.extend(
@@ -697,11 +719,16 @@ class ScanService:
                 groupings[quadrant] = qr_code_dict
         return groupings
 
-    def read_qr_codes(self, bundle_pk: int) -> None:
+    def read_qr_codes(self, bundle_pk: int, *, number_of_chunks: int = 16) -> None:
         """Read QR codes of scanned pages in a bundle.
 
         Args:
             bundle_pk: primary key of bundle DB object
+
+        Keyword Args:
+            number_of_chunks: the number of QR-reading jobs to run;
+                each huey-qr-read-task will process approximately
+                number_of_pages_in_bundle / number_of_chunks pages.
         """
         bundle_obj = StagingBundle.objects.get(pk=bundle_pk)
         # check that the qr-codes have not been read already, or that a task has not been set
@@ -719,7 +746,10 @@ class ScanService:
 
         log.info("starting the read_qr_codes_chore...")
         res = huey_parent_read_qr_codes_chore(
-            bundle_pk, tracker_pk=tracker_pk, _debug_be_flaky=False
+            bundle_pk,
+            number_of_chunks,
+            tracker_pk=tracker_pk,
+            _debug_be_flaky=False,
         )
         # print(f"Just enqueued Huey parent_read_qr_codes task id={res.id}")
         HueyTaskTracker.transition_to_queued_or_running(tracker_pk, res.id)
@@ -1227,6 +1257,10 @@ class ScanService:
         if raise_this_after:
             raise raise_this_after
 
+        # make the smaller copies of the page images for clients, in background
+        pushed = BaseImage.objects.filter(stagingimage__bundle_id=bundle_obj_pk)
+        page_image_renditions.queue_make_renditions(pushed.values_list("pk", flat=True))
+
     def push_bundle_cmd(self, bundle_name: str, username: str) -> None:
         """Wrapper around push_bundle_to_server().
 
@@ -1743,6 +1777,7 @@ def huey_parent_split_bundle_chore(
     *,
     tracker_pk: int,
     read_after: bool = False,
+    fused_qr_read: bool = False,
     _debug_be_flaky: bool = False,
     task: huey.api.Task | None = None,
 ) -> bool:
@@ -1761,6 +1796,10 @@ def huey_parent_split_bundle_chore(
         tracker_pk: a key into the database for anyone interested in
             our progress.
         read_after: automatically trigger a qr-code read after splitting finished.
+        fused_qr_read: the child chores read the qr-codes from each
+            page image while they have it in memory; we then store
+            those results and classify the bundle ourselves, instead
+            of triggering a separate qr-code read.
         task: includes our ID in the Huey process queue.  This kwarg is
             passed by `context=True` in decorator: callers should not
             pass this in!
@@ -1804,6 +1843,7 @@ def huey_parent_split_bundle_chore(
                 bundle_pk,
                 ord_chnk,  # note pg is 1-indexed
                 pathlib.Path(tmpdir),
+                read_qr=fused_qr_read,
                 _debug_be_flaky=_debug_be_flaky,
             )
             for ord_chnk in order_chunks
@@ -1847,6 +1887,12 @@ def huey_parent_split_bundle_chore(
 
         with transaction.atomic():
             for X in results:
+                history = f"Created in bundle {bundle_obj.id} order {X['order']}"
+                if fused_qr_read:
+                    history += (
+                        f"; {len(X['parsed_qr'])} QR codes read during split,"
+                        f" rotation set to {X['rotation']}"
+                    )
                 with open(X["file_path"], "rb") as fh:
                     bimg = BaseImage.objects.create(
                         image_file=File(fh, name=X["file_name"]),
@@ -1857,8 +1903,11 @@ def huey_parent_split_bundle_chore(
                         bundle_order=X["order"],
                         image_type=StagingImage.UNREAD,
                         baseimage=bimg,
-                        history=f"Created in bundle {bundle_obj.id} order {X['order']}",
+                        parsed_qr=X.get("parsed_qr", {}),
+                        rotation=X.get("rotation"),
+                        history=history,
                     )
+                # in the fused case, the child already rotated the thumbnail
                 with open(X["thumb_path"], "rb") as fh:
                     StagingThumbnail.objects.create(
                         staging_image=img, image_file=File(fh, X["thumb_name"])
@@ -1868,11 +1917,30 @@ def huey_parent_split_bundle_chore(
             _write_bundle = StagingBundle.objects.select_for_update().get(pk=bundle_pk)
             _write_bundle.has_page_images = True
             _write_bundle.time_to_make_page_images = time.time() - start_time
+            if fused_qr_read:
+                # the qr-codes were read in the same pass, so no separate time
+                _write_bundle.has_qr_codes = True
+                _write_bundle.time_to_read_qr = 0.0
             _write_bundle.save()
 
+            if fused_qr_read:
+                # A completed chore records that the qr codes have been read
+                # and prevents :meth:`ScanService.read_qr_codes` re-reading.
+                ManageParseQRChore.objects.create(
+                    bundle=bundle_obj,
+                    status=HueyTaskTracker.COMPLETE,
+                    completed_pages=len(results),
+                )
+
+    if fused_qr_read:
+        bundle_obj.refresh_from_db()
+        # this could unexpected raise ValueError errors which would be caught
+        # by the general catch-all handler
+        QRService.classify_staging_images_based_on_QR_codes(bundle_obj)
+
     HueyTaskTracker.transition_to_complete(tracker_pk)
     # if requested automatically queue qr-code reading
-    if read_after:
+    if read_after and not fused_qr_read:
         ScanService().read_qr_codes(bundle_pk)
     return True
 
@@ -1881,6 +1949,7 @@ def huey_parent_split_bundle_chore(
 @db_task(queue="parentchores", context=True)
 def huey_parent_read_qr_codes_chore(
     bundle_pk: int,
+    number_of_chunks: int,
     *,
     tracker_pk: int,
     _debug_be_flaky: bool = False,
@@ -1893,6 +1962,9 @@ def huey_parent_read_qr_codes_chore(
 
     Args:
         bundle_pk: StagingBundle object primary key
+        number_of_chunks: the number of QR-reading jobs to run;
+            each huey-qr-read-task will handle 1/number_of_chunks of the
+            pages in the bundle.
 
     Keyword Args:
         tracker_pk: a key into the database for anyone interested in
@@ -1904,6 +1976,9 @@ def huey_parent_read_qr_codes_chore(
     Returns:
         True, no meaning, just as per the Huey docs: "if you need to
         block or detect whether a task has finished".
+
+    Raises:
+        RuntimeError: child chore failed.
     """
     assert task is not None
 
@@ -1913,45 +1988,73 @@ def huey_parent_read_qr_codes_chore(
 
     bundle_obj = StagingBundle.objects.get(pk=bundle_pk)
 
+    # cut the list of all image pks into chunks
+    all_image_pks = list(
+        bundle_obj.stagingimage_set.order_by("bundle_order").values_list(
+            "pk", flat=True
+        )
+    )
+    n_images = len(all_image_pks)
+    chunk_length = max(1, ceil(n_images / number_of_chunks))
+    pk_chunks = [
+        all_image_pks[n : n + chunk_length] for n in range(0, n_images, chunk_length)
+    ]
+
     task_list = [
-        huey_child_parse_qr_code(page.pk, _debug_be_flaky=_debug_be_flaky)
-        for page in bundle_obj.stagingimage_set.all()
+        huey_child_parse_qr_codes(pk_chnk, _debug_be_flaky=_debug_be_flaky)
+        for pk_chnk in pk_chunks
     ]
 
     # results = [X.get(blocking=True) for X in task_list]
 
     n_tasks = len(task_list)
     while True:
+        # list items are None (if not completed) or list [dict of qr info]
         try:
-            results = [X.get() for X in task_list]
+            result_chunks = [X.get() for X in task_list]
         except huey.exceptions.TaskException as e:
             log.error("Parent: child QR read chore failed with %s", str(e))
-            # TODO: what about the child tasks still running?
+            # make an attempt to stop any remaining unqueued child tasks.
+            # note those already started probably will not stop.
+            for chore in task_list:
+                log.info("Parent: trying to revoke child chore %s", chore)
+                chore.revoke()
             raise RuntimeError(f"child task failed QR read: {e}") from e
 
-        count = sum(1 for X in results if X is not None)
+        # remove all the nones to get list of completed tasks
+        not_none_result_chunks = [chunk for chunk in result_chunks if chunk is not None]
+        completed_tasks = len(not_none_result_chunks)
+        # flatten that list of lists to get a list of read pages
+        results = [X for chunk in not_none_result_chunks for X in chunk]
 
         with transaction.atomic():
             _task = ManageParseQRChore.objects.select_for_update().get(
                 bundle=bundle_obj
             )
-            _task.completed_pages = count
+            _task.completed_pages = len(results)
             _task.save()
 
-        if count == n_tasks:
+        if completed_tasks == n_tasks:
             break
         else:
             time.sleep(1)
 
+    results_by_pk = {X["image_pk"]: X for X in results}
     with transaction.atomic():
-        for X in results:
-            # TODO - check for error status here.
-            img = StagingImage.objects.select_for_update().get(pk=X["image_pk"])
+        # TODO - check for error status here.
+        images = list(
+            StagingImage.objects.select_for_update()
+            .filter(pk__in=results_by_pk.keys())
+            .select_related("stagingthumbnail")
+        )
+        for img in images:
+            X = results_by_pk[img.pk]
             img.parsed_qr = X["parsed_qr"]
             img.rotation = X["rotation"]
             img.history += f"; {len(X['parsed_qr'])} QR codes read, rotation set to {X['rotation']}"
-            img.save()
-            # the thumbnail may need rotation.
+        StagingImage.objects.bulk_update(images, ["parsed_qr", "rotation", "history"])
+        # the thumbnails may need rotation.
+        for img in images:
             if img.rotation:
                 update_thumbnail_after_rotation(img, img.rotation)
 
@@ -1977,6 +2080,7 @@ def huey_child_get_page_images(
     order_list: list[int],
     basedir: pathlib.Path,
     *,
+    read_qr: bool = False,
     _debug_be_flaky: bool = False,
     task: huey.api.Task | None = None,
 ) -> list[dict[str, Any]]:
@@ -1989,6 +2093,10 @@ def huey_child_get_page_images(
         bundle_pk: bundle DB object's primary key
         order_list: a list of bundle orders of pages to extract - 1-indexed
         basedir (pathlib.Path): were to put the image
+
+    Keyword Args:
+        read_qr: also read the QR codes from the page image, while we
+            have it decoded in memory.  Default False.
         _debug_be_flaky: for debugging, all take a while and some
             percentage will fail.
         task: includes our ID in the Huey process queue.  This is added
@@ -1997,11 +2105,10 @@ def huey_child_get_page_images(
 
     Returns:
         Information about the page image, including its file name,
-        thumbnail, hash etc.
+        thumbnail, hash etc.  If ``read_qr`` then also the parsed
+        QR codes and the rotation, as per :func:`huey_child_parse_qr_codes`.
     """
     import pymupdf
-    from plom.scan import rotate
-    from PIL import Image
 
     assert task is not None
     log.debug("Huey debug, we are task %s with id %s", task, task.id)
@@ -2043,30 +2150,9 @@ def huey_child_get_page_images(
                     add_metadata=True,
                 )
 
-            with open(save_path, "rb") as f:
-                image_hash = hashlib.sha256(f.read()).hexdigest()
-
-            # make sure we load with exif rotations if required
-            pil_img = rotate.pil_load_with_jpeg_exif_rot_applied(save_path)
-            size = 256, 256
-            try:
-                _lanczos = Image.Resampling.LANCZOS
-            except AttributeError:
-                # TODO: Issue #2886: Deprecated, drop when minimum Pillow > 9.1.0
-                _lanczos = Image.LANCZOS  # type: ignore
-            pil_img.thumbnail(size, _lanczos)
-            thumb_path = basedir / ("thumb-" + basename + ".png")
-            pil_img.save(thumb_path)
-
             rendered_page_info.append(
-                {
-                    "order": order,
-                    "file_name": save_path.name,
-                    "file_path": str(save_path),
-                    "image_hash": image_hash,
-                    "thumb_name": thumb_path.name,
-                    "thumb_path": str(thumb_path),
-                }
+                _process_page_image(save_path, basedir, basename, read_qr=read_qr)
+                | {"order": order}
             )
 
     # TODO - return an error of some sort here if problems?
@@ -2075,19 +2161,19 @@ def huey_child_get_page_images(
 
 # The decorated function returns a ``huey.api.Result``
 @db_task(queue="chores", context=True)
-def huey_child_parse_qr_code(
-    image_pk: int,
+def huey_child_parse_qr_codes(
+    image_pks: list[int],
     *,
     _debug_be_flaky: bool = False,
     task: huey.api.Task | None = None,
-) -> dict[str, Any]:
-    """Huey task to parse QR codes, check QR errors, and save to database in the background.
+) -> list[dict[str, Any]]:
+    """Huey task to parse the QR codes of several images in the background.
 
     It is important to understand that running this function starts an
     async task in queue that will run sometime in the future.
 
     Args:
-        image_pk: primary key of the image
+        image_pks: primary keys of the StagingImages.
 
     Keyword Args:
         _debug_be_flaky: for debugging, all take a while and some
@@ -2097,42 +2183,133 @@ def huey_child_parse_qr_code(
             not pass this in!
 
     Returns:
-        Information about the QR codes.
+        Information about the QR codes, a list of dicts, one for each
+        image with keys "image_pk", "parsed_qr" and "rotation".  The
+        caller is responsible for storing these in the database.
     """
     assert task is not None
     log.debug("Huey debug, we are task %s with id %s", task, task.id)
 
-    staging_img = StagingImage.objects.get(pk=image_pk)
     # TODO: Issue #3888 this `.path` assumes storage is local and will fail
     # with a NotImplementedError when FileField uses remote storage.
     # TODO: refactor the rotation stuff to work with FieldFile:
     # image_fieldfile = staging_img.baseimage.image_file
-    image_path = staging_img.baseimage.image_file.path
+    image_paths = {
+        staging_img.pk: staging_img.baseimage.image_file.path
+        for staging_img in StagingImage.objects.filter(pk__in=image_pks).select_related(
+            "baseimage"
+        )
+    }
 
-    code_dict = QRextract(image_path)
+    qr_info = []
+    for image_pk in image_pks:
+        if _debug_be_flaky:
+            log.debug("Huey debug, random sleep in task %d", task.id)
+            time.sleep(random.random() * 4)
+            if random.random() < 0.04:
+                raise RuntimeError("Flaky simulated QR read failure")
 
-    page_data = ScanService.parse_qr_code([code_dict])
+        page_data, rotation = _read_qr_codes_and_rotation(image_paths[image_pk])
+
+        # Return the parsed QR codes for parent process to store in db
+        qr_info.append(
+            {
+                "image_pk": image_pk,
+                "parsed_qr": page_data,
+                "rotation": rotation,
+            }
+        )
+    return qr_info
+
+
+def _read_qr_codes_and_rotation(
+    image: pathlib.Path | str | Image.Image,
+) -> tuple[dict[str, Any], int | None]:
+    """Read and parse the QR codes of a page image, and determine its rotation.
+
+    Args:
+        image: a filename or an already-loaded Pillow image.
 
-    if _debug_be_flaky:
-        log.debug("Huey debug, random sleep in task %d", task.id)
-        time.sleep(random.random() * 4)
-        if random.random() < 0.04:
-            raise RuntimeError("Flaky simulated QR read failure")
+    Returns:
+        The parsed QR codes as per :meth:`ScanService.parse_qr_code` and
+        the rotation angle, or None if it could not be determined.
+    """
+    if not isinstance(image, Image.Image):
+        image = rotate.pil_load_with_jpeg_exif_rot_applied(image)
+    code_dict = QRextract(image)
+    page_data = ScanService.parse_qr_code([code_dict])
 
     rotation = PageImageProcessor.get_rotation_angle_or_None_from_QRs(page_data)
 
     # Andrew wanted to leave the possibility of re-introducing hard
     # rotations in the future, such as `plom.scan.rotate_bitmap`.
 
-    # Re-read QR codes if the page image needs to be rotated
+    # If the page image needs to be rotated, infer where the QR codes would
+    # be from their current positions rather than decoding a rotated copy
     if rotation and rotation != 0:
-        code_dict = QRextract(image_path, rotation=rotation)
+        code_dict = rotate_QR_results(code_dict, rotation, image.size)
         page_data = ScanService.parse_qr_code([code_dict])
         # qr_error_checker.check_qr_codes(page_data, image_path, bundle)
+    return page_data, rotation
 
-    # Return the parsed QR codes for parent process to store in db
-    return {
-        "image_pk": image_pk,
-        "parsed_qr": page_data,
-        "rotation": rotation,
-    }
+
+def _process_page_image(
+    save_path: pathlib.Path,
+    basedir: pathlib.Path,
+    basename: str,
+    *,
+    read_qr: bool = False,
+) -> dict[str, Any]:
+    """Hash a page image, make its thumbnail and optionally read its QR codes.
+
+    The image is decoded only once: the thumbnail and the QR codes both
+    come from the same in-memory Pillow image.
+
+    Args:
+        save_path: the page image on disc.
+        basedir: where to put the thumbnail.
+        basename: used to construct the filename of the thumbnail.
+
+    Keyword Args:
+        read_qr: also read the QR codes.  If a rotation is found, the
+            thumbnail is rotated to match.
+
+    Returns:
+        Information about the page image, including its file name,
+        thumbnail, hash etc, and if ``read_qr``, the keys "parsed_qr"
+        and "rotation".
+    """
+    with open(save_path, "rb") as f:
+        image_hash = hashlib.sha256(f.read()).hexdigest()
+
+    # make sure we load with exif rotations if required
+    pil_img = rotate.pil_load_with_jpeg_exif_rot_applied(save_path)
+
+    info: dict[str, Any] = {}
+    rotation = None
+    if read_qr:
+        page_data, rotation = _read_qr_codes_and_rotation(pil_img)
+        info.update({"parsed_qr": page_data, "rotation": rotation})
+
+    size = 256, 256
+    try:
+        _lanczos = Image.Resampling.LANCZOS
+    except AttributeError:
+        # TODO: Issue #2886: Deprecated, drop when minimum Pillow > 9.1.0
+        _lanczos = Image.LANCZOS  # type: ignore
+    pil_img.thumbnail(size, _lanczos)
+    if rotation:
+        pil_img = pil_img.rotate(rotation, expand=True)
+    thumb_path = basedir / ("thumb-" + basename + ".png")
+    pil_img.save(thumb_path)
+
+    info.update(
+        {
+            "file_name": save_path.name,
+            "file_path": str(save_path),
+            "image_hash": image_hash,
+            "thumb_name": thumb_path.name,
+            "thumb_path": str(thumb_path),
+        }
+    )
+    return info
@@ -237,3 +237,49 @@ class QRServiceTest(TestCase):
         img = StagingImage.objects.get(pk=self.img_inconsistent_types.pk)
         self.assertEqual(img.image_type, StagingImage.ERROR)
         self.assertIn("Inconsistent QR codes", img.error_reason)
+
+    def test_classification_inconsistent_with_spec(self):
+        bundle = StagingBundle.objects.create(has_qr_codes=True)
+
+        def make_img(paper_id, page_num, version_num, public_code="123456"):
+            return StagingImage.objects.create(
+                bundle=bundle,
+                parsed_qr={
+                    "NE": {
+                        "tpv": f"{paper_id:05}{page_num:03}{version_num:02}",
+                        "page_type": "plom_qr",
+                        "page_info": {
+                            "public_code": public_code,
+                            "paper_id": paper_id,
+                            "page_num": page_num,
+                            "version_num": version_num,
+                        },
+                    }
+                },
+                image_type=StagingImage.UNREAD,
+            )
+
+        wrong_version = make_img(1, 3, 2)
+        no_such_paper = make_img(7, 3, 1)
+        no_such_page = make_img(1, 6, 1)
+        wrong_code = make_img(1, 4, 1, public_code="654321")
+        good = make_img(1, 5, 1)
+
+        QRService.classify_staging_images_based_on_QR_codes(bundle)
+
+        for img, msg in (
+            (wrong_version, "does not match version"),
+            (no_such_paper, "Paper 7 does not exist"),
+            (no_such_page, "Page 6 of paper 1 does not exist"),
+            (wrong_code, "Public code"),
+        ):
+            img.refresh_from_db()
+            self.assertEqual(img.image_type, StagingImage.ERROR)
+            self.assertEqual(
+                img.error_reason_enum,
+                StagingImage.ErrorReasonChoices.INCONSISTENT_WITH_SPEC,
+            )
+            self.assertIn(msg, img.error_reason)
+        good.refresh_from_db()
+        self.assertEqual(good.image_type, StagingImage.KNOWN)
+        self.assertIn("Made known (1, 5, 1)", good.history)
@@ -6,6 +6,7 @@
 # Copyright (C) 2024 Bryan Tanady
 # Copyright (C) 2025-2026 Aidan Murphy
 
+import hashlib
 import pathlib
 import random
 import tempfile
@@ -33,6 +34,7 @@ from plom_server.Scan.services.scan_service import (
     StagingImage,
     PageImageProcessor,
     ScanService,
+    _process_page_image,
 )
 
 
@@ -392,6 +394,33 @@ class MoreScanServiceTests(TestCase):
                 self.assertTrue((original[0] - rotated[0]) / rotated[0] < 0.01)
                 self.assertTrue((original[1] - rotated[1]) / rotated[1] < 0.01)
 
+    def test_process_page_image_fused_qr_read(self) -> None:
+        """Test the fused split+read gets QR codes, rotation and a rotated thumbnail."""
+        image_original_path = resources.files(_Scan_tests) / "id_page_img.png"
+        # mypy complains about Traversable
+        image_original = Image.open(image_original_path)  # type: ignore[arg-type]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmp = pathlib.Path(tmpdir)
+            image_flipped_path = tmp / "flipped.png"
+            image_original.rotate(180).save(image_flipped_path)
+
+            info = _process_page_image(image_flipped_path, tmp, "foo", read_qr=True)
+            self.assertEqual(info["rotation"], 180)
+            self.assertEqual(len(info["parsed_qr"]), 3)
+            for qr in info["parsed_qr"].values():
+                self.assertEqual(qr["page_info"]["paper_id"], 11)
+            with open(image_flipped_path, "rb") as f:
+                self.assertEqual(
+                    info["image_hash"], hashlib.sha256(f.read()).hexdigest()
+                )
+            with Image.open(info["thumb_path"]) as thumb:
+                self.assertLessEqual(max(thumb.size), 256)
+
+            info = _process_page_image(image_flipped_path, tmp, "bar")
+            self.assertNotIn("parsed_qr", info)
+            self.assertNotIn("rotation", info)
+
     def test_get_all_known_images(self) -> None:
         user: User = baker.make(User, username="user")
         scanner = ScanService()
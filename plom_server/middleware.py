@@ -2,7 +2,7 @@
 # Copyright (C) 2022 Chris Jin
 # Copyright (C) 2022 Brennen Chiu
 # Copyright (C) 2022 Edith Coates
-# Copyright (C) 2023 Colin B. Macdonald
+# Copyright (C) 2023, 2026 Colin B. Macdonald
 # Copyright (C) 2024 Andrew Rechnitzer
 # Copyright (C) 2024, 2026 Aidan Murphy
 #
@@ -19,7 +19,8 @@ class OnlineNowMiddleware:
 
     Rather than posting to the db every time a user makes a request,
     it is cached for fast recall.
-    Using the cache means the list isn't reliable if the server is multithreaded.
+    The list is only reliable if the cache is shared by all the server's
+    processes (see ``CACHES`` in the settings).
     """
 
     def __init__(self, get_response):
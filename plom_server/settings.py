@@ -69,6 +69,45 @@ if not __:
 else:
     PLOM_QR_CODE_SIZE = int(__)
 
+# Optionally keep decoded scanned page images in a per-process cache when
+# extracting rectangles (e.g., ID boxes, clustering): its maximum size in
+# megabytes.  Every web worker and Huey process holds its own cache for as
+# long as it lives, so this is off by default: leave unset or "0" to disable.
+__ = os.environ.get("PLOM_PAGE_IMAGE_CACHE_MB")
+if not __:
+    PLOM_PAGE_IMAGE_CACHE_MB = 0
+else:
+    PLOM_PAGE_IMAGE_CACHE_MB = int(__)
+
+# Build papers by stamping copies of a shared unstamped "base" PDF, one per
+# pattern of page versions, rather than merging the source pages for every
+# paper.  Off by default; set to "1" to enable.
+__ = os.environ.get("PLOM_BUILD_PAPERS_FROM_BASE")
+if __ and __.isdigit() and int(__) != 0:
+    PLOM_BUILD_PAPERS_FROM_BASE = True
+else:
+    PLOM_BUILD_PAPERS_FROM_BASE = False
+
+# Optionally, background chores that finish in large numbers (building and
+# reassembling papers) mark their trackers complete in batches, at most this
+# many seconds late.  Completions still buffered when a worker process dies
+# or exits may be lost, leaving their trackers Running, so this is off by
+# default: leave unset or "0" to write each completion immediately.
+__ = os.environ.get("PLOM_TRACKER_FLUSH_SECONDS")
+if not __:
+    PLOM_TRACKER_FLUSH_SECONDS = 0.0
+else:
+    PLOM_TRACKER_FLUSH_SECONDS = float(__)
+
+# Optionally keep a prefetched queue of this many "to do" marking tasks per
+# question-version, so markers asking for the next task don't each sort the
+# task table.  Set to "0" or leave unset to disable.
+__ = os.environ.get("PLOM_MARKING_DISPATCH_QUEUE")
+if not __:
+    PLOM_MARKING_DISPATCH_QUEUE = 0
+else:
+    PLOM_MARKING_DISPATCH_QUEUE = int(__)
+
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("PLOM_SECRET_KEY")
@@ -222,6 +261,48 @@ if not default:
     default = "postgres"
 DATABASES["default"] = DATABASES[default]
 
+
+# The cache holds the spec, the settings and summaries of the marking,
+# which must agree between the web server's worker processes and the
+# Huey consumers.  For production, we recommend setting PLOM_CACHE_BACKEND
+# to "redis" and PLOM_CACHE_LOCATION to a URL such as
+# "redis://127.0.0.1:6379" (this requires the "redis" package).
+# The default, "file", needs no server: it stores the cache in files in
+# PLOM_BASE_DIR, which works if all processes run on one machine, but it
+# is slower and its counters are not atomic (see below).  "locmem" keeps
+# a separate cache in each process: only suitable for a single process,
+# e.g., some development or testing.
+_cache_location = os.environ.get("PLOM_CACHE_LOCATION")
+CACHES = {
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": _cache_location or PLOM_BASE_DIR / "cache",
+        # summaries are keyed by generation, so many short-lived entries
+        "OPTIONS": {"MAX_ENTRIES": 5000, "CULL_FREQUENCY": 4},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": _cache_location or "redis://127.0.0.1:6379",
+    },
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+default = os.environ.get("PLOM_CACHE_BACKEND")
+if not default:
+    default = "file"
+CACHES = {"default": CACHES[default]}
+# The marking dispatch queue relies on an atomic counter in the cache to
+# hand concurrent markers different tasks: the file cache's is not.
+if PLOM_MARKING_DISPATCH_QUEUE and default == "file":
+    warnings.warn(
+        "PLOM_MARKING_DISPATCH_QUEUE needs PLOM_CACHE_BACKEND=redis (or locmem"
+        " with a single process): with the file cache, concurrent markers may"
+        " be offered the same task",
+        RuntimeWarning,
+    )
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 